@@ -1,6 +1,52 @@
 import cv2
 import numpy as np
 
+from .ingest import open_luma_reader
+from .processor import below_threshold, diff_metric, frame_diffs, read_frames
+from .profiling import NULL_PROFILER
+
+# バッチ処理で返すフレームごとの指標
+# frame: analyze_stutter と同じ 0 始まりのフレーム番号（前フレームとの差分）
+METRIC_DTYPE = np.dtype([
+    ('frame', np.int64),
+    ('mean_diff', np.float64),
+    ('nonzero', np.int64),
+    ('max_diff', np.uint8),
+])
+
+
+def batch_diff_metrics(block, count, diff_block):
+    """
+    連続フレームの輝度ブロックから、隣接フレーム間の差分指標をまとめて計算する関数
+
+    Parameters:
+    block (numpy.ndarray): (N + 1, H, W) の uint8 輝度ブロック。block[0] は前バッチの最後のフレーム
+    count (int): block[1:count + 1] に有効なフレームが入っている数
+    diff_block (numpy.ndarray): (N, H, W) の uint8 差分用バッファ（事前確保）
+
+    Returns:
+    tuple: (平均差分, 非ゼロ画素数, 最大差分) の配列（各 count 要素）
+    """
+    _, h, w = block.shape
+    # 2 次元に並べ替えて count 組の absdiff を 1 回の呼び出しで計算（コピーなし）
+    current = block[1:count + 1].reshape(-1, w)
+    previous = block[:count].reshape(-1, w)
+    diffs = diff_block[:count]
+    cv2.absdiff(current, previous, dst=diffs.reshape(-1, w))
+
+    # 1 行 = 1 フレームとして行ごとに集約（cv2.reduce は行方向の合計を SIMD で計算する）
+    # 合計は整数で正確に求まるので、平均は np.mean(diff) と同じ値になる
+    flat = diffs.reshape(count, h * w)
+    sum_type = cv2.CV_32S if h * w * 255 < 2 ** 31 else cv2.CV_64F
+    sums = cv2.reduce(flat, 1, cv2.REDUCE_SUM, dtype=sum_type).ravel()
+    mean_diff = sums.astype(np.float64) / (h * w)
+    max_diff = flat.max(axis=1)
+    # 差分があれば 1 に置き換えて（差分バッファをそのまま上書き）合計 → 非ゼロ画素数
+    cv2.threshold(flat, 0, 1, cv2.THRESH_BINARY, dst=flat)
+    nonzero = cv2.reduce(flat, 1, cv2.REDUCE_SUM, dtype=cv2.CV_32S).ravel().astype(np.int64)
+    return mean_diff, nonzero, max_diff
+
+
 # ===============================================
 # VideoAnalyzer クラス
 # 動画ファイルを解析してカクつき（stutter）を検出する
@@ -8,42 +54,127 @@ import numpy as np
 class VideoAnalyzer:
     # コンストラクタ
     # video_path: 解析する動画ファイルのパス
-    def __init__(self, video_path):
+    # ingest: None ならBGRフレームのまま比較、'bgr'/'raw'/'ffmpeg'/'auto' なら輝度のみで比較（ingest.py）
+    # profiler: 各段（decode / luma / diff / metric / threshold）の処理時間を記録する（profiling.py）
+    # prefetch: prefetch.Prefetcher を渡すと analyze_stutter（batch_size なし）でデコードを別スレッドで先読みする
+    def __init__(self, video_path, ingest=None, profiler=NULL_PROFILER, prefetch=None):
         self.video_path = video_path
-        self.cap = cv2.VideoCapture(video_path)  # OpenCVで動画を読み込む
+        self.ingest = ingest
+        self.profiler = profiler
+        self.prefetch = prefetch
+        if ingest is None:
+            self.cap = cv2.VideoCapture(video_path)  # OpenCVで動画を読み込む
+        else:
+            # 輝度だけを取り込む（VideoCapture と同じ read/get/release を持つ）
+            # （読んだ輝度は差分・バッチへのコピーで使い終わるため、バッファを使い回す。
+            #   先読みではキューに積んだフレームの分も必要）
+            self.cap = open_luma_reader(video_path, ingest, reuse=True if prefetch is None else prefetch.buffers())
+        # FPS は解放後に取得できないため先に保持しておく
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
 
     # -----------------------------------------------
     # カクつきフレームを検出するメソッド
+    # batch_size: 指定するとフレームを輝度ブロックにまとめて一括で差分を計算する
+    #             （analyze_metrics を使用。比較は輝度の非ゼロ画素数）
+    # nonzero_thresh: 差分画素数がこれ未満ならカクつきと判定
     # 戻り値: カクつきが検出されたフレーム番号のリスト
     # -----------------------------------------------
-    def analyze_stutter(self):
+    def analyze_stutter(self, batch_size=None, nonzero_thresh=1000):
+        if batch_size:
+            metrics = self.analyze_metrics(batch_size)
+            return metrics['frame'][metrics['nonzero'] < nonzero_thresh].tolist()
+
         # 動画の総フレーム数を取得
         frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        # 動画のFPS（フレーム/秒）を取得
-        fps = self.cap.get(cv2.CAP_PROP_FPS)
-        stutter_frames = []
 
-        previous_frame = None
-        for i in range(frame_count):
-            ret, current_frame = self.cap.read()
-            if not ret:
-                break  # フレーム読み込みに失敗したら終了
+        # 共通パイプライン（processor.py）で前フレームとの差分を計算
+        # フレーム番号は 0 始まり（読み込みに失敗したら終了）
+        prof = self.profiler
+        frames = prof.timed('decode', read_frames(self.cap, frame_count, first_index=0))
+        if self.prefetch is not None:
+            frames = self.prefetch.frames(frames, prof)
+        # 差分があるピクセル数をカウント
+        diffs = prof.timed('diff', frame_diffs(frames, reuse=True))
+        non_zero_counts = prof.timed('metric', diff_metric(diffs, 'nonzero'))
+
+        # 差分が少ない場合はカクつきと判定
+        # （この閾値は動画サイズや内容に応じて調整可能）
+        flags = prof.timed('threshold', below_threshold(non_zero_counts, nonzero_thresh))
+        try:
+            stutter_frames = [i for i, similar in flags if similar]
+        finally:
+            frames.close()  # 先読みのスレッドを止めてから閉じる
+
+        self.cap.release()  # 動画ファイルを閉じる
+        return stutter_frames
+
+    # -----------------------------------------------
+    # フレームごとの差分指標をバッチでまとめて計算するメソッド
+    # batch_size フレームずつ事前確保した (batch_size + 1, H, W) の輝度ブロックに読み込み、
+    # batch_size 組の差分と平均・非ゼロ数・最大値をそれぞれ 1 回のベクトル演算で求める。
+    # ブロックの最後のフレームは次のバッチの先頭（block[0]）に引き継ぐ。
+    # 戻り値: METRIC_DTYPE の NumPy 構造化配列
+    # -----------------------------------------------
+    def analyze_metrics(self, batch_size=64):
+        prof = self.profiler
+        frame_count = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        results = []
+        block = None
+        diff_block = None
+        index = 0  # 次に読むフレームの番号（0 始まり）
+
+        while index < frame_count:
+            if block is None:
+                # 最初のフレームでサイズを確定してバッファを確保
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                h, w = frame.shape[:2]
+                block = np.empty((batch_size + 1, h, w), dtype=np.uint8)
+                diff_block = np.empty((batch_size, h, w), dtype=np.uint8)
+                self._store_luma(frame, block[0])
+                index += 1
+                continue
 
-            if previous_frame is not None:
-                # 現在フレームと前フレームの差分を計算
-                difference = cv2.absdiff(current_frame, previous_frame)
-                # 差分があるピクセル数をカウント
-                non_zero_count = np.count_nonzero(difference)
+            # block[1:] にフレームを読み込む
+            count = 0
+            while count < batch_size and index < frame_count:
+                with prof.span('decode'):
+                    ret, frame = self.cap.read()
+                if not ret:
+                    frame_count = index  # 読み込みに失敗したら終了
+                    break
+                with prof.span('luma'):
+                    self._store_luma(frame, block[count + 1])
+                count += 1
+                index += 1
+            if count == 0:
+                break
 
-                # 差分が少ない場合はカクつきと判定
-                # （この閾値は動画サイズや内容に応じて調整可能）
-                if non_zero_count < 1000:
-                    stutter_frames.append(i)
+            with prof.span('batch_diff'):
+                mean_diff, nonzero, max_diff = batch_diff_metrics(block, count, diff_block)
+            batch = np.empty(count, dtype=METRIC_DTYPE)
+            batch['frame'] = np.arange(index - count, index)
+            batch['mean_diff'] = mean_diff
+            batch['nonzero'] = nonzero
+            batch['max_diff'] = max_diff
+            results.append(batch)
 
-            previous_frame = current_frame  # 次フレームとの比較用に保持
+            # 最後のフレームを次のバッチに引き継ぐ
+            block[0] = block[count]
 
         self.cap.release()  # 動画ファイルを閉じる
-        return stutter_frames
+        if not results:
+            return np.empty(0, dtype=METRIC_DTYPE)
+        return np.concatenate(results)
+
+    @staticmethod
+    def _store_luma(frame, dst):
+        # BGR はブロックへ直接グレースケール変換、輝度ならそのままコピー
+        if frame.ndim == 2:
+            np.copyto(dst, frame)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=dst)
 
     # -----------------------------------------------
     # カクつきの合計時間を計算するメソッド
@@ -55,7 +186,7 @@ class VideoAnalyzer:
             return 0
 
         # 合計フレーム数をFPSで割って秒数を算出
-        stutter_duration = len(stutter_frames) / self.cap.get(cv2.CAP_PROP_FPS)
+        stutter_duration = len(stutter_frames) / self.fps
         return stutter_duration
 
 # ===============================================
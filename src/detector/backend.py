@@ -0,0 +1,143 @@
+import importlib
+import os
+import sys
+import types
+
+# ===============================================
+# 配列バックエンド（NumPy / CuPy）の選択と重い依存の遅延読み込み
+#
+# get_backend() は最初に呼ばれたときに一度だけ NumPy か CuPy かを決める
+# （環境変数 STUTTER_BACKEND = auto / numpy / cupy、既定は auto）。
+# auto では CuPy が読み込めて GPU が 1 台以上ある場合だけ CuPy を使い、それ以外は NumPy で動く。
+# GPU のないマシンでも cupy を import しようとして失敗することはない。
+#
+# lazy_import('cv2') は最初に属性を参照したときに本物のモジュールを読み込む代理モジュールを返す。
+# CLI の --help や引数エラーのように解析まで進まない起動では OpenCV / NumPy を読み込まない。
+# ===============================================
+
+BACKEND_ENV = "STUTTER_BACKEND"
+BACKENDS = ('auto', 'numpy', 'cupy')
+
+
+class LazyModule(types.ModuleType):
+    """最初の属性参照で name のモジュールを読み込み、以降はその属性をそのまま持つ代理モジュール"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_name'] = name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self.__dict__['_lazy_name'])
+        # 以降の参照で __getattr__ を通らないように、本物のモジュールの属性を写しておく
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """読み込み済みならそのモジュール、まだなら LazyModule を返す"""
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+class ArrayBackend:
+    """
+    差分・しきい値計算に使う配列モジュール
+
+    Attributes:
+    name (str): 'numpy' または 'cupy'
+    xp (module): numpy / cupy モジュール
+    gpu (bool): GPU で計算するか
+    """
+
+    def __init__(self, name, xp):
+        self.name = name
+        self.xp = xp
+        self.gpu = name == 'cupy'
+
+    def asarray(self, a, dtype=None):
+        """ホストの配列をこのバックエンドの配列にする（CuPy なら GPU へ転送）"""
+        return self.xp.asarray(a, dtype=dtype)
+
+    def asnumpy(self, a):
+        """このバックエンドの配列を NumPy 配列にする（CuPy なら GPU から転送）"""
+        return self.xp.asnumpy(a) if self.gpu else a
+
+    def upload(self, a, out=None):
+        """
+        ホストの配列をこのバックエンドの配列に写す（out が同じ形・型ならそこへ書き込み、新しい配列を確保しない）
+
+        Returns:
+        書き込んだ配列（out を使えなかった場合は新しく確保した配列）
+        """
+        if out is None or out.shape != a.shape or out.dtype != a.dtype:
+            return self.xp.array(a, copy=True)
+        if self.gpu:
+            out.set(a)
+        else:
+            self.xp.copyto(out, a)
+        return out
+
+    def count_changed(self, a, b, out=None):
+        """
+        同じ形の 2 枚の輝度画像で値が異なる画素数（= 絶対差分の非ゼロ画素数）
+
+        out (bool 配列) を渡すと比較結果をそこに書き込み、フレームごとの一時配列を確保しない
+        """
+        return int(self.xp.count_nonzero(self.xp.not_equal(a, b, out=out)))
+
+    def device_name(self):
+        if not self.gpu:
+            return "CPU (NumPy)"
+        try:
+            name = self.xp.cuda.runtime.getDeviceProperties(0)['name']
+            return name.decode() if isinstance(name, bytes) else str(name)
+        except Exception:
+            return "GPU (CuPy)"
+
+    def __repr__(self):
+        return f"ArrayBackend({self.name!r})"
+
+
+_backend = None
+
+
+def _resolve(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name} (choose from {', '.join(BACKENDS)})")
+    if name in ('auto', 'cupy'):
+        try:
+            import cupy as cp
+            if cp.cuda.runtime.getDeviceCount() > 0:
+                return ArrayBackend('cupy', cp)
+            error = RuntimeError("no CUDA device found")
+        except Exception as e:
+            error = e
+        if name == 'cupy':
+            raise RuntimeError(f"CuPy backend is not available: {error}") from error
+    import numpy as np
+    return ArrayBackend('numpy', np)
+
+
+def get_backend(name=None):
+    """
+    配列バックエンドを返す（初回呼び出し時に決めて以降は同じものを返す）
+
+    Parameters:
+    name (str | None): 'auto' / 'numpy' / 'cupy'。None なら環境変数 STUTTER_BACKEND（未設定なら 'auto'）
+
+    Returns:
+    ArrayBackend
+    """
+    global _backend
+    if name is not None:
+        return _resolve(name)
+    if _backend is None:
+        _backend = _resolve(os.environ.get(BACKEND_ENV, 'auto').lower())
+    return _backend
+
+
+def set_backend(name):
+    """以降の get_backend() が返すバックエンドを切り替える（None なら次回の呼び出しで決め直す）"""
+    global _backend
+    _backend = None if name is None else _resolve(name)
+    return _backend
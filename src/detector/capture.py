@@ -0,0 +1,328 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .profiling import NULL_PROFILER, Profiler, print_report
+
+# ===============================================
+# ライブキャプチャ用のフレームリングバッファとスレッドカメラ
+#
+# キャプチャスレッドは事前確保したバッファに直接デコードし（cap.retrieve(image=buf)）、
+# 利用側はシーケンス番号付きの読み取り専用ビューを受け取る。フレームのコピーは行わない。
+#
+# 各 RingReader は自分のカーソル（次に読む seq と stride）をリングに登録する。リングが一周したときに
+# 登録中のいずれかの読み手がまだ読むはずだったフレームを上書きした場合だけ overwrites に数え、
+# 各 RingReader も自分が取りこぼしたフレーム数を dropped に数える（黙って捨てない）。
+# stride で間引いて読まないフレームや、最新フレームだけを見るプレビュー・FrameScheduler が飛ばしたフレームは数えない。
+# ===============================================
+
+# リングに登録できる読み手の数
+MAX_READERS = 8
+
+
+def needed_by_reader(cursors, seq):
+    """
+    seq のフレームを、登録中のいずれかの読み手がまだ読むはずか
+
+    Parameters:
+    cursors (numpy.ndarray): 読み手ごとの [次に読む seq, stride]（int64 × MAX_READERS × 2、stride 0 は空き）
+    seq (int): 上書きされるフレームの seq
+    """
+    if seq < 0:
+        return False
+    active = cursors[:, 1] > 0
+    if not active.any():
+        return False
+    next_seqs, strides = cursors[active, 0], cursors[active, 1]
+    return bool(np.any((next_seqs <= seq) & ((seq - next_seqs) % strides == 0)))
+
+
+def register_cursor(cursors, next_seq, stride, slot=None):
+    """
+    空いている行（slot を指定した場合はその行）に読み手のカーソルを登録し、その行のビューを返す
+
+    Raises:
+    RuntimeError: 空いている行がない、または指定した行が使用中の場合
+    """
+    if slot is None:
+        free = np.flatnonzero(cursors[:, 1] == 0)
+        if not len(free):
+            raise RuntimeError(f"Too many ring readers (max {len(cursors)})")
+        slot = int(free[0])
+    elif cursors[slot, 1] != 0:
+        raise RuntimeError(f"Ring reader slot {slot} is already in use")
+    cursor = cursors[slot]
+    cursor[0] = next_seq
+    cursor[1] = stride
+    return cursor
+
+
+class FrameRing:
+    """
+    事前確保したフレームバッファのリング（書き込み 1、読み取り複数）
+
+    シーケンス番号 seq のフレームはスロット seq % capacity に入る。
+    書き込み中のスロットは次の seq（head + 1）なので、seq が is_valid(seq) の間はビューの内容が保証される。
+    """
+
+    def __init__(self, capacity, shape, dtype=np.uint8):
+        if capacity < 2:
+            raise ValueError("FrameRing needs at least 2 slots")
+        self.capacity = capacity
+        self.buffers = np.empty((capacity,) + tuple(shape), dtype=dtype)
+        self.seqs = np.full(capacity, -1, dtype=np.int64)       # 各スロットに入っているフレームの seq
+        self.timestamps = np.zeros(capacity, dtype=np.float64)  # 各スロットの取得時刻（perf_counter 秒）
+        self.cursors = np.zeros((MAX_READERS, 2), dtype=np.int64)  # 登録した読み手の [次に読む seq, stride]
+        self.head = -1        # 最後に公開したフレームの seq
+        self.writes = 0       # 公開したフレーム数
+        self.overwrites = 0   # 登録中の読み手が読む前に上書きされたフレーム数
+        self.cond = threading.Condition()
+
+    # -----------------------------------------------
+    # 書き込み側（キャプチャスレッドのみが呼ぶ）
+    # -----------------------------------------------
+    def acquire_write(self):
+        """次に書き込むスロットのバッファ（書き込み可能なビュー）を返す"""
+        return self.buffers[(self.head + 1) % self.capacity]
+
+    def publish(self, timestamp=None):
+        """acquire_write で得たバッファへの書き込みを完了し、読み手に公開する"""
+        with self.cond:
+            seq = self.head + 1
+            slot = seq % self.capacity
+            # head を進めると、次の書き込み先になる seq + 1 - capacity のフレームが無効になる
+            if needed_by_reader(self.cursors, seq + 1 - self.capacity):
+                self.overwrites += 1
+            self.seqs[slot] = seq
+            self.timestamps[slot] = time.perf_counter() if timestamp is None else timestamp
+            self.head = seq
+            self.writes += 1
+            self.cond.notify_all()
+        return seq
+
+    # -----------------------------------------------
+    # 読み取り側
+    # -----------------------------------------------
+    def register_reader(self, next_seq, stride=1, slot=None):
+        """読み手のカーソル [次に読む seq, stride] を登録し、その行のビューを返す（get(seq, cursor) で進める）"""
+        with self.cond:
+            return register_cursor(self.cursors, next_seq, stride, slot)
+
+    def unregister_reader(self, cursor):
+        """登録したカーソルを外す（以降の上書きは overwrites に数えない）"""
+        with self.cond:
+            cursor[1] = 0
+
+    def oldest_valid(self):
+        """内容が保証されている最も古い seq（書き込み中のスロットを除く）"""
+        return max(0, self.head + 2 - self.capacity)
+
+    def is_valid(self, seq):
+        """seq のフレームがまだ上書きされていない（上書き中でもない）か"""
+        return self.oldest_valid() <= seq <= self.head
+
+    def get(self, seq, cursor=None):
+        """
+        seq のフレームを読み取り専用ビューで返す
+
+        Parameters:
+        cursor (numpy.ndarray): register_reader のカーソル。指定すると有効性の確認と同じロックの中で
+                                次に読む seq を seq + stride に進める（読んだフレームを overwrites に数えない）
+
+        Returns:
+        numpy.ndarray | None: 既に上書きされていれば（またはまだ書かれていなければ）None
+        """
+        with self.cond:
+            if not self.is_valid(seq):
+                return None
+            slot = seq % self.capacity
+            if cursor is not None:
+                cursor[0] = seq + cursor[1]
+        view = self.buffers[slot].view()
+        view.flags.writeable = False
+        return view
+
+    def timestamp(self, seq):
+        """seq のフレームの取得時刻（perf_counter 秒）"""
+        return float(self.timestamps[seq % self.capacity])
+
+    def latest(self):
+        """最新フレームの (seq, ビュー) を返す（まだなければ (-1, None)）"""
+        with self.cond:
+            seq = self.head
+        if seq < 0:
+            return -1, None
+        return seq, self.get(seq)
+
+    def wait_for(self, seq, timeout=None):
+        """seq 以降のフレームが公開されるまで待つ（公開されたら True）"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.head >= seq, timeout)
+
+
+class RingReader:
+    """
+    FrameRing を先頭から順に読む利用者ごとのカーソル
+
+    stride > 1 の場合は stride フレームごとに 1 フレームを読む（間引き分は dropped にもリングの overwrites にも含めない）。
+    読む前に上書きされたフレームは dropped に数えて読み飛ばす。
+    カーソルはリングに登録される（slot は共有メモリのリングを複数プロセスから読む場合に重ならないように指定する）。
+    読み終えたら close() で登録を外す。
+    """
+
+    def __init__(self, ring, stride=1, start=None, slot=None):
+        self.ring = ring
+        self.stride = max(1, int(stride))
+        self._cursor = ring.register_reader(ring.head + 1 if start is None else start, self.stride, slot)
+        self._registered = True
+        self.dropped = 0
+        self.frames_read = 0
+
+    @property
+    def next_seq(self):
+        """次に読むフレームの seq"""
+        return int(self._cursor[0])
+
+    @next_seq.setter
+    def next_seq(self, seq):
+        self._cursor[0] = seq
+
+    def read(self, timeout=None):
+        """
+        次のフレームを (seq, 読み取り専用ビュー) で返す
+
+        Returns:
+        tuple | None: タイムアウトした場合は None
+        """
+        while True:
+            if not self.ring.wait_for(self.next_seq, timeout):
+                return None
+            oldest = self.ring.oldest_valid()
+            if self.next_seq < oldest:
+                # 追いつけずに上書きされた分を取りこぼしとして数える
+                skipped = oldest - self.next_seq
+                skipped_seq = self.next_seq + ((skipped + self.stride - 1) // self.stride) * self.stride
+                self.dropped += (skipped_seq - self.next_seq) // self.stride
+                self.next_seq = skipped_seq
+                continue
+            seq = self.next_seq
+            view = self.ring.get(seq, self._cursor)
+            if view is None:
+                continue
+            self.frames_read += 1
+            return seq, view
+
+    def frames(self, stop_flag, timeout=0.5):
+        """stop_flag が立つまで (seq, ビュー) を yield するパイプライン用のフレーム供給源"""
+        while not stop_flag.is_set():
+            item = self.read(timeout)
+            if item is not None:
+                yield item
+
+    def still_valid(self, seq):
+        """処理中に seq のフレームが上書きされていないか確認する（上書きされていたら取りこぼしに数える）"""
+        if self.ring.is_valid(seq):
+            return True
+        self.dropped += 1
+        return False
+
+    def close(self):
+        """リングからカーソルの登録を外す（外した後も next_seq は手元の写しで参照できる。2 回呼んでもよい）"""
+        if self._registered:
+            cursor, self._cursor = self._cursor, self._cursor.copy()
+            self.ring.unregister_reader(cursor)
+            self._registered = False
+
+
+class CameraCapture:
+    """🎥 スレッドカメラクラス（リングバッファに直接デコードして常に最新フレームを保持）"""
+
+    def __init__(self, device_number=0, target_width=1920, target_height=1080, target_fps=60,
+                 ring_size=16, backend=cv2.CAP_DSHOW, debug=False, open_capture=None, ring_factory=None,
+                 profiler=NULL_PROFILER):
+        """
+        debug: True ならフレーム間隔・grab・デコード時間を計測し、release() 時に p50/p95/p99 を表示する
+        profiler: 取得ループの段（capture.grab / capture.decode / capture.interval）を記録する Profiler
+        open_capture: (device_number, backend) から VideoCapture 互換オブジェクトを作る関数（省略時は cv2.VideoCapture）
+        ring_factory: (capacity, shape, dtype) からリングを作る関数（省略時は FrameRing、
+                      プロセス間で共有する場合は shm_capture.SharedFrameRing）
+        """
+        if open_capture is not None:
+            self.cap = open_capture(device_number, backend)
+        elif backend is None:
+            self.cap = cv2.VideoCapture(device_number)
+        else:
+            self.cap = cv2.VideoCapture(device_number, backend)
+        if not self.cap.isOpened():
+            raise RuntimeError("❌ カメラを開けませんでした。")
+
+        # 解像度・FPS設定
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, target_width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, target_height)
+        self.cap.set(cv2.CAP_PROP_FPS, target_fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # 常に最新フレームに更新
+        self.fps_set = self.cap.get(cv2.CAP_PROP_FPS) or target_fps
+
+        # 最初のフレームでサイズを確定してリングを確保する
+        ret, frame = self.cap.read()
+        if not ret:
+            self.cap.release()
+            raise RuntimeError("❌ カメラからフレームを取得できませんでした。")
+        self.ring = (ring_factory or FrameRing)(ring_size, frame.shape, frame.dtype)
+        np.copyto(self.ring.acquire_write(), frame)
+        self.ring.publish()
+
+        self.debug = debug
+        if debug and not profiler.enabled:
+            profiler = Profiler()
+        self.profiler = profiler
+        self.running = True
+
+        # 別スレッドで常時読み取り
+        self.thread = threading.Thread(target=self._update, daemon=True)
+        self.thread.start()
+
+    def _update(self):
+        prof = self.profiler
+        prev_ns = time.perf_counter_ns()
+        while self.running:
+            with prof.span('capture.grab'):
+                grabbed = self.cap.grab()
+            if not grabbed:
+                time.sleep(0.001)
+                continue
+
+            # 次のスロットへ直接デコード（コピーなし）
+            buf = self.ring.acquire_write()
+            with prof.span('capture.decode'):
+                ret, out = self.cap.retrieve(image=buf)
+            if not ret:
+                continue
+            if out is not buf and not np.shares_memory(out, buf):
+                # 途中で解像度が変わった等でバッファに直接書けなかった場合
+                if out.shape != buf.shape:
+                    continue
+                np.copyto(buf, out)
+
+            now_ns = time.perf_counter_ns()
+            self.ring.publish(now_ns / 1e9)
+            # フレーム間隔（毎フレームの print はせず、ヒストグラムに数えるだけ）
+            prof.record('capture.interval', now_ns - prev_ns)
+            prev_ns = now_ns
+
+    def read(self):
+        """最新フレームの読み取り専用ビューを返す（コピーが必要な場合は呼び出し側で行う）"""
+        return self.ring.latest()[1]
+
+    def reader(self, stride=1):
+        """このカメラのフレームを順に読むカーソルを作成する"""
+        return RingReader(self.ring, stride)
+
+    def release(self):
+        self.running = False
+        self.thread.join(timeout=1)  # スレッド終了を待機
+        self.cap.release()
+        if self.debug:
+            print_report(self.profiler.report())
@@ -1,6 +1,200 @@
 import argparse
-from detector.processor import process_video  # 動画の前処理関数
-from detector.analyzer import analyze_stutter  # カクつき解析関数
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .processor import CascadeFilter, process_video  # 共通パイプラインで動画を処理してカクつきを検出
+from .fingerprint import MAX_AGE, FrameIndex
+from .prefetch import DEPTH as PREFETCH_DEPTH, Prefetcher
+from .roi import CALIBRATION_SECONDS, parse_roi
+from .tiles import StripeDiff
+from .profiling import NULL_PROFILER, Profiler, finish_profile
+
+# バッチモードでディレクトリから拾う動画の拡張子
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.m4v', '.wmv')
+
+
+# ===============================================
+# 入力（ファイル・ディレクトリ・glob）を動画ファイルのリストに展開する
+# 重複は除き、指定順（ディレクトリ内・glob 内は名前順）を保つ
+# ===============================================
+def expand_inputs(inputs, extensions=VIDEO_EXTENSIONS, recursive=False):
+    """
+    Parameters:
+    inputs (list of str): ファイルパス・ディレクトリ・glob パターン
+    extensions (tuple): ディレクトリ・glob から拾う拡張子（小文字）
+    recursive (bool): ディレクトリをサブディレクトリまで探すか
+
+    Returns:
+    list of str: 動画ファイルのパス
+    """
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*') if recursive else os.path.join(item, '*')
+            found = sorted(glob.glob(pattern, recursive=recursive))
+        elif os.path.isfile(item):
+            # 明示的に指定されたファイルは拡張子に関係なく対象にする
+            paths.append(os.path.normpath(item))
+            continue
+        else:
+            found = sorted(glob.glob(item, recursive=True))
+        paths.extend(os.path.normpath(f) for f in found
+                     if os.path.isfile(f) and os.path.splitext(f)[1].lower() in extensions)
+
+    seen = set()
+    unique = []
+    for path in paths:
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+
+# ===============================================
+# 既存の JSON Lines 出力から解析済みのファイルを読む（再開用）
+# 書き込み途中で中断した最終行（壊れた JSON）は無視し、エラーだったファイルは再解析する
+# ===============================================
+def load_completed(output_path):
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status') == 'ok' and 'video_path' in record:
+                completed.add(os.path.abspath(record['video_path']))
+    return completed
+
+
+# ===============================================
+# バッチモードのワーカー（プロセスプール内で 1 ファイルを解析）
+# 例外は呼び出し側に投げずに結果レコードへ記録する（1 ファイルの失敗で全体を止めない）
+# profile=True なら計測結果（Profiler.state()）を '_profile' に入れて返す（出力には書かない）
+# cascade=True ならファイルごとに CascadeFilter で判定し、段ごとの判定数を 'cascade' に記録する
+# roi='auto' ならファイルごとに動く領域を求め、使った ROI を 'roi' に記録する
+# repeats（フレーム数）を指定すると隣接していない重複フレームを 'repeats' / 'repeat_counts' に記録する
+# prefetch（キューの長さ）を指定するとデコードを先読みし、キューの深さと待ち時間を 'prefetch' に記録する
+# diff_threads（スレッド数）を指定すると差分を横帯ごとに並列に計算し、局所的な静止を 'tiles' に記録する
+# ===============================================
+def _analyze_file(video_path, diff_thresh, min_consec, ingest, profile=False, cascade=False, block_thresh=None,
+                  roi=None, roi_seconds=CALIBRATION_SECONDS, repeats=None, prefetch=None, diff_threads=None):
+    start = time.perf_counter()
+    record = {'video_path': video_path, 'worker_pid': os.getpid()}
+    profiler = Profiler() if profile else NULL_PROFILER
+    tiles = StripeDiff(diff_threads) if diff_threads else None
+    try:
+        record.update(process_video(video_path, diff_thresh=diff_thresh, min_consec=min_consec, ingest=ingest,
+                                    profiler=profiler,
+                                    cascade=CascadeFilter(block_thresh=block_thresh) if cascade else None,
+                                    roi=roi, roi_seconds=roi_seconds,
+                                    fingerprints=FrameIndex(repeats) if repeats else None,
+                                    prefetch=Prefetcher(prefetch) if prefetch else None, tiles=tiles))
+        record['status'] = 'ok'
+    except Exception as e:
+        record.update(status='error', error=f'{type(e).__name__}: {e}', total_frames=0)
+    finally:
+        if tiles is not None:
+            tiles.close()
+    record['elapsed_sec'] = time.perf_counter() - start
+    if profile:
+        record['_profile'] = profiler.state()
+    return record
+
+
+def run_batch(video_paths, output_path, workers=None, diff_thresh=2.0, min_consec=3, ingest='bgr', resume=True,
+              profiler=NULL_PROFILER, cascade=False, block_thresh=None, roi=None, roi_seconds=CALIBRATION_SECONDS,
+              repeats=None, prefetch=None, diff_threads=None):
+    """
+    複数の動画をプロセスプールで解析し、終わった順に JSON Lines で追記する関数
+
+    Parameters:
+    video_paths (list of str): 解析する動画ファイル
+    output_path (str): 出力先（1 行 1 ファイルの JSON Lines）
+    workers (int): 同時に解析するプロセス数（None なら CPU 数、1 ならこのプロセスで順に解析）
+    resume (bool): True なら出力に status=ok で記録済みのファイルを読み飛ばす
+    profiler (profiling.Profiler): 各ワーカーの段ごとの処理時間を集計する
+    cascade (bool): 2 段のカスケード（processor.CascadeFilter）で判定する（block_thresh はブロック判定の閾値）
+    roi (str | list | None): 'auto' ならファイルごとに動く領域だけで判定する（roi.py）。(x, y, w, h) のリストなら全ファイル共通
+    repeats (int | None): 指定すると直近 repeats フレーム以内の隣接していない重複フレームも記録する（fingerprint.py）
+    prefetch (int | None): 指定するとファイルごとに長さ prefetch のキューでデコードを先読みする（prefetch.py）
+    diff_threads (int | None): 指定するとファイルごとに差分を diff_threads スレッドで横帯に分けて計算する（tiles.py）
+
+    Returns:
+    dict: {'processed', 'skipped', 'errors', 'wall_sec', 'workers'（pid ごとの files / frames / busy_sec / fps）}
+    """
+    completed = load_completed(output_path) if resume else set()
+    pending = [p for p in video_paths if os.path.abspath(p) not in completed]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+
+    per_worker = {}
+    processed = errors = 0
+    start = time.perf_counter()
+
+    mode = 'a' if resume else 'w'
+    with open(output_path, mode, encoding='utf-8') as out:
+        # 中断で最終行が改行なしで終わっている場合は改行してから追記する
+        if mode == 'a' and out.tell() > 0:
+            with open(output_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    out.write('\n')
+
+        def write(record):
+            nonlocal processed, errors
+            profiler.merge_state(record.pop('_profile', None))
+            out.write(json.dumps(record, ensure_ascii=False) + '\n')
+            out.flush()
+            processed += 1
+            errors += record['status'] != 'ok'
+            stats = per_worker.setdefault(record['worker_pid'], {'files': 0, 'frames': 0, 'busy_sec': 0.0})
+            stats['files'] += 1
+            stats['frames'] += record.get('total_frames', 0)
+            stats['busy_sec'] += record['elapsed_sec']
+            print(f"[{processed}/{len(pending)}] {record['status']}: {record['video_path']} "
+                  f"({record.get('total_frames', 0)} frames, {record['elapsed_sec']:.2f}s)")
+
+        if workers == 1:
+            for path in pending:
+                write(_analyze_file(path, diff_thresh, min_consec, ingest, profiler.enabled, cascade, block_thresh,
+                                    roi, roi_seconds, repeats, prefetch, diff_threads))
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_analyze_file, path, diff_thresh, min_consec, ingest, profiler.enabled,
+                                       cascade, block_thresh, roi, roi_seconds, repeats, prefetch, diff_threads)
+                           for path in pending]
+                for future in as_completed(futures):
+                    write(future.result())
+
+    for stats in per_worker.values():
+        stats['fps'] = stats['frames'] / stats['busy_sec'] if stats['busy_sec'] > 0 else 0.0
+    return {
+        'processed': processed,
+        'skipped': len(video_paths) - len(pending),
+        'errors': errors,
+        'wall_sec': time.perf_counter() - start,
+        'workers': per_worker,
+    }
+
+
+def print_batch_summary(summary):
+    """run_batch の結果（ワーカーごとのスループット）を表示する"""
+    print(f"\nProcessed {summary['processed']} file(s), skipped {summary['skipped']}, "
+          f"errors {summary['errors']} in {summary['wall_sec']:.2f}s")
+    total_frames = 0
+    for pid, stats in sorted(summary['workers'].items()):
+        total_frames += stats['frames']
+        print(f"  worker {pid}: {stats['files']} file(s), {stats['frames']} frames, "
+              f"{stats['busy_sec']:.2f}s busy, {stats['fps']:.1f} frames/s")
+    if summary['wall_sec'] > 0:
+        print(f"  total: {total_frames / summary['wall_sec']:.1f} frames/s")
+
 
 # ===============================================
 # CLI（コマンドラインインターフェース）用のメイン関数
@@ -10,44 +204,184 @@ def main():
     # 引数パーサーを作成
     # -----------------------------------------------
     parser = argparse.ArgumentParser(description='Video Stutter Detector CLI')
-    
-    # 必須引数: 分析対象の動画ファイルパス
+
+    # 必須引数: 分析対象の動画ファイルパス（ディレクトリ・glob・複数指定ならバッチモード）
+    parser.add_argument(
+        'video_path',
+        type=str,
+        nargs='+',
+        help='Video file(s), directories or glob patterns to analyze'
+    )
+
+    # 任意引数: 分析結果を保存するファイルパス（デフォルトは output.json、バッチモードでは output.jsonl）
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Path to save the analysis results (JSON for one file, JSON Lines in batch mode)'
+    )
+
+    # 任意引数: 判定パラメータ（main.py の detect_stutter と同じ意味）
     parser.add_argument(
-        'video_path', 
-        type=str, 
-        help='Path to the video file to analyze'
+        '--diff-thresh',
+        type=float,
+        default=2.0,
+        help='Mean diff threshold to consider frames identical'
     )
-    
-    # 任意引数: 分析結果を保存するファイルパス（デフォルトは output.json）
     parser.add_argument(
-        '--output', 
-        type=str, 
-        default='output.json', 
-        help='Path to save the analysis results'
+        '--min-consec',
+        type=int,
+        default=3,
+        help='Minimum consecutive similar frames to mark stutter'
     )
-    
+    parser.add_argument(
+        '--ingest',
+        choices=['bgr', 'raw', 'ffmpeg', 'auto'],
+        default='bgr',
+        help='How to get luma from the decoder (see ingest.py)'
+    )
+
+    parser.add_argument(
+        '--cascade',
+        action='store_true',
+        help='Screen frame pairs on every 8th row and run the full-resolution diff only on candidates'
+    )
+    parser.add_argument(
+        '--block-thresh',
+        type=float,
+        default=None,
+        help='With --cascade, treat a pair as different if any 32x32 block mean diff reaches this value'
+    )
+
+    parser.add_argument(
+        '--roi',
+        type=parse_roi,
+        default=None,
+        metavar='auto|x,y,w,h[;x,y,w,h]',
+        help='Diff only these regions ("auto" finds the moving regions from the first --roi-seconds of each file)'
+    )
+    parser.add_argument(
+        '--roi-seconds',
+        type=float,
+        default=CALIBRATION_SECONDS,
+        help='Calibration length for --roi auto'
+    )
+
+    parser.add_argument(
+        '--repeats',
+        nargs='?',
+        type=int,
+        const=MAX_AGE,
+        default=None,
+        metavar='FRAMES',
+        help='Also record frames that repeat an older (non-adjacent) frame within the last FRAMES frames'
+    )
+
+    parser.add_argument(
+        '--prefetch',
+        nargs='?',
+        type=int,
+        const=PREFETCH_DEPTH,
+        default=None,
+        metavar='DEPTH',
+        help='Decode on a separate thread into a queue of DEPTH frames and record queue depth and stall times'
+    )
+    parser.add_argument(
+        '--diff-threads',
+        type=int,
+        default=None,
+        metavar='N',
+        help='Compute each frame diff in horizontal stripes on N threads and record localized freezes'
+    )
+
+    # バッチモード用の引数
+    parser.add_argument(
+        '--workers', '-j',
+        type=int,
+        default=None,
+        help='Number of files analyzed in parallel in batch mode (default: CPU count)'
+    )
+    parser.add_argument(
+        '--recursive', '-r',
+        action='store_true',
+        help='Search directories recursively in batch mode'
+    )
+    parser.add_argument(
+        '--no-resume',
+        action='store_true',
+        help='Overwrite the JSON Lines output instead of skipping files already recorded in it'
+    )
+
+    parser.add_argument(
+        '--profile',
+        nargs='?',
+        const='profile.json',
+        default=None,
+        metavar='PATH',
+        help='Time each pipeline stage and save p50/p95/p99 and peak RSS as JSON (default path: profile.json)'
+    )
+
     # コマンドライン引数の解析
     args = parser.parse_args()
-    
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    if args.block_thresh is not None and not args.cascade:
+        parser.error('--block-thresh requires --cascade')
+    if args.diff_threads is not None and args.cascade:
+        parser.error('--diff-threads cannot be combined with --cascade')
+    if args.diff_threads is not None and args.diff_threads < 1:
+        parser.error('--diff-threads must be at least 1')
+
     # -----------------------------------------------
-    # 動画処理
+    # バッチモード: ディレクトリ・glob・複数ファイルをプロセスプールで解析して JSON Lines に追記
     # -----------------------------------------------
-    print(f'Processing video: {args.video_path}')
-    stutter_data = process_video(args.video_path)  # 動画からフレーム情報やカクつきデータを取得
-    
+    single = len(args.video_path) == 1 and os.path.isfile(args.video_path[0])
+    if not single or (args.output or '').endswith('.jsonl'):
+        video_paths = expand_inputs(args.video_path, recursive=args.recursive)
+        output = args.output or 'output.jsonl'
+        print(f'Found {len(video_paths)} video(s), writing results to: {output}')
+        summary = run_batch(video_paths, output, workers=args.workers, diff_thresh=args.diff_thresh,
+                            min_consec=args.min_consec, ingest=args.ingest, resume=not args.no_resume,
+                            profiler=profiler, cascade=args.cascade, block_thresh=args.block_thresh,
+                            roi=args.roi, roi_seconds=args.roi_seconds, repeats=args.repeats,
+                            prefetch=args.prefetch, diff_threads=args.diff_threads)
+        print_batch_summary(summary)
+        finish_profile(profiler, args.profile)
+        return
+
     # -----------------------------------------------
-    # カクつき解析
+    # 動画処理とカクつき解析（フレームを 1〜2 枚ずつ流すパイプライン）
     # -----------------------------------------------
-    print('Analyzing stutter...')
-    analysis_results = analyze_stutter(stutter_data)  # カクつきの検出・解析を実行
-    
+    video_path = args.video_path[0]
+    output = args.output or 'output.json'
+    print(f'Processing video: {video_path}')
+    tiles = StripeDiff(args.diff_threads) if args.diff_threads else None
+    try:
+        analysis_results = process_video(
+            video_path,
+            diff_thresh=args.diff_thresh,
+            min_consec=args.min_consec,
+            ingest=args.ingest,
+            profiler=profiler,
+            cascade=CascadeFilter(block_thresh=args.block_thresh) if args.cascade else None,
+            roi=args.roi,
+            roi_seconds=args.roi_seconds,
+            fingerprints=FrameIndex(args.repeats) if args.repeats else None,
+            prefetch=Prefetcher(args.prefetch) if args.prefetch else None,
+            tiles=tiles,
+        )
+    finally:
+        if tiles is not None:
+            tiles.close()
+
     # -----------------------------------------------
     # 結果をファイルに保存
     # -----------------------------------------------
-    with open(args.output, 'w') as f:
-        f.write(analysis_results)
-    
-    print(f'Analysis results saved to: {args.output}')
+    analysis_results['video_path'] = video_path
+    with open(output, 'w') as f:
+        json.dump(analysis_results, f, ensure_ascii=False, indent=2)
+
+    print(f'Analysis results saved to: {output}')
+    finish_profile(profiler, args.profile)
 
 # ===============================================
 # このスクリプトが直接実行された場合に main() を呼び出す
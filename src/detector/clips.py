@@ -0,0 +1,155 @@
+import os
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+# ===============================================
+# イベント発生時だけ短いクリップを書き出す録画（ライブキャプチャ用）
+#
+# 全フレームを JPEG で保存する代わりに、直近 buffer_sec 秒分のフレームを
+# 縮小（scale）または JPEG 圧縮（jpeg_quality）してメモリ上のリングに保持する。
+# カクつき検知ワーカーが区間を閉じたら trigger(start_seq, end_seq) を呼び、
+# 録画ワーカーは post_roll 秒分のフレームが揃った時点で
+# 「pre_roll + イベント区間 + post_roll」を cv2.VideoWriter で 1 本のクリップに書き出す。
+# 定常状態ではディスクへの書き込みは発生しない。
+#
+# 注意: クリップはリングに残っている範囲だけを含む（buffer_sec より長い区間は先頭が欠ける）
+# ===============================================
+
+
+class ClipRecorder:
+    """
+    プリロール用のメモリリングとイベントクリップの書き出し
+
+    Parameters:
+    reader (capture.RingReader): カメラのリングを読むカーソル（検知ワーカーと同じ stride）
+    output_folder (str): クリップの保存先
+    fps (float): reader が読むフレームのレート（クリップの FPS）
+    pre_roll (float): イベント前に含める秒数
+    post_roll (float): イベント後に含める秒数
+    buffer_sec (float): メモリに保持する秒数（pre_roll + post_roll 以上）
+    scale (float): 保持するフレームの縮小率（1.0 なら等倍）
+    jpeg_quality (int | None): 指定すると JPEG に圧縮して保持する（さらにメモリを節約）
+    fourcc (str): クリップのコーデック
+    ext (str): クリップの拡張子
+    """
+
+    def __init__(self, reader, output_folder, fps=30, pre_roll=3.0, post_roll=2.0, buffer_sec=10.0,
+                 scale=0.5, jpeg_quality=None, fourcc='mp4v', ext='.mp4'):
+        self.reader = reader
+        self.output_folder = output_folder
+        self.fps = max(1.0, float(fps))
+        self.scale = scale
+        self.jpeg_quality = jpeg_quality
+        self.fourcc = fourcc
+        self.ext = ext
+
+        # 秒数をカメラのシーケンス番号の差に換算する（stride フレームごとに 1 枚読むため）
+        seq_per_sec = self.fps * reader.stride
+        self.pre_seq = int(round(pre_roll * seq_per_sec))
+        self.post_seq = int(round(post_roll * seq_per_sec))
+        self.capacity = max(2, int(np.ceil(max(buffer_sec, pre_roll + post_roll) * self.fps)))
+
+        self._seqs = deque(maxlen=self.capacity)
+        self._slots = None    # 縮小フレーム用の事前確保バッファ（JPEG 保持時は None）
+        self._encoded = None  # JPEG 保持時のバイト列リング
+        self._next_slot = 0
+        self._slot_of = {}    # seq -> スロット番号
+        self._events = deque()
+        self._lock = threading.Lock()
+        self.clips = []       # 書き出したクリップのパス
+        os.makedirs(output_folder, exist_ok=True)
+
+    # -----------------------------------------------
+    # 検知ワーカーから呼ぶ（スレッドセーフ）
+    # -----------------------------------------------
+    def trigger(self, start_seq, end_seq):
+        """カクつき区間 [start_seq, end_seq]（カメラのシーケンス番号）のクリップを予約する"""
+        with self._lock:
+            self._events.append((start_seq, end_seq))
+
+    # -----------------------------------------------
+    # 録画ワーカー本体
+    # -----------------------------------------------
+    def run(self, stop_flag):
+        """stop_flag が立つまでフレームをメモリリングに取り込み、揃ったイベントのクリップを書き出す"""
+        for seq, frame in self.reader.frames(stop_flag):
+            self._store(seq, frame)
+            self._write_ready(seq)
+
+    def finish(self):
+        """
+        残っているイベントを手元にあるフレームで書き出す
+        （検知ワーカーが最後の区間を trigger するので、run と検知ワーカーの両方が終わってから呼ぶ）
+        """
+        self._write_ready(None)
+        print(f"🎬 クリップ録画ワーカー終了（{len(self.clips)} 本, 取りこぼし: {self.reader.dropped} フレーム）")
+        return self.clips
+
+    def _store(self, seq, frame):
+        if self.scale != 1.0:
+            h, w = frame.shape[:2]
+            size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+        else:
+            size = None
+
+        # 最も古いフレームのスロットを上書きする（保存できたら seq の対応を入れ替える）
+        slot = self._next_slot
+        if self.jpeg_quality is not None:
+            if self._encoded is None:
+                self._encoded = [None] * self.capacity
+            small = frame if size is None else cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            ok, buf = cv2.imencode('.jpg', small, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+            if not ok:
+                return
+            self._encoded[slot] = buf
+        else:
+            if self._slots is None:
+                shape = frame.shape if size is None else (size[1], size[0]) + frame.shape[2:]
+                self._slots = np.empty((self.capacity,) + shape, dtype=frame.dtype)
+            if size is None:
+                np.copyto(self._slots[slot], frame)
+            else:
+                cv2.resize(frame, size, dst=self._slots[slot], interpolation=cv2.INTER_AREA)
+
+        if len(self._seqs) == self.capacity:
+            self._slot_of.pop(self._seqs[0], None)
+        self._seqs.append(seq)
+        self._slot_of[seq] = slot
+        self._next_slot = (slot + 1) % self.capacity
+
+    def _frame(self, seq):
+        slot = self._slot_of[seq]
+        if self._encoded is not None:
+            return cv2.imdecode(self._encoded[slot], cv2.IMREAD_UNCHANGED)
+        return self._slots[slot]
+
+    def _write_ready(self, latest_seq):
+        while True:
+            with self._lock:
+                if not self._events:
+                    return
+                start_seq, end_seq = self._events[0]
+                if latest_seq is not None and latest_seq < end_seq + self.post_seq:
+                    return
+                self._events.popleft()
+            self._write_clip(start_seq, end_seq)
+
+    def _write_clip(self, start_seq, end_seq):
+        first, last = start_seq - self.pre_seq, end_seq + self.post_seq
+        seqs = [s for s in self._seqs if first <= s <= last]
+        if not seqs:
+            return None
+        path = os.path.join(self.output_folder, f"stutter_{start_seq:08d}{self.ext}")
+        frame = self._frame(seqs[0])
+        h, w = frame.shape[:2]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (w, h), frame.ndim == 3)
+        try:
+            for s in seqs:
+                writer.write(self._frame(s))
+        finally:
+            writer.release()
+        self.clips.append(path)
+        return path
@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import threading
+from multiprocessing.connection import Client, Listener
+
+# ===============================================
+# ライブキャプチャの制御用ローカル IPC（multiprocessing.connection）
+#
+# キャプチャ本体は ControlServer を起動し、接続先（アドレスと認証キー）を
+# 出力フォルダの control.json に書き出す。プレビューや別のターミナルからは
+# send_command で {'cmd': 'status'} / {'cmd': 'stop'} を送る（キー入力のポーリングは不要）。
+#
+# 使い方:
+#   python -m src.detector.control path/to/stutter_frames/control.json status
+#   python -m src.detector.control path/to/stutter_frames/control.json stop
+# ===============================================
+
+CONTROL_FILE = "control.json"
+
+
+class ControlServer:
+    """
+    コマンドを受け付けるスレッド
+
+    Parameters:
+    handlers (dict): コマンド名 → 引数なしの関数（戻り値は pickle できる値）
+    address (tuple): 待ち受けるアドレス（ポート 0 なら空きポート）
+    control_file (str): 接続先を書き出す JSON のパス（省略可）
+    """
+
+    def __init__(self, handlers, address=('127.0.0.1', 0), control_file=None):
+        self.handlers = dict(handlers)
+        self.authkey = os.urandom(16)
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+        self.control_file = control_file
+        if control_file is not None:
+            with open(control_file, 'w', encoding='utf-8') as f:
+                json.dump({'address': list(self.address), 'authkey': self.authkey.hex()}, f)
+        self._closing = False
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    @property
+    def endpoint(self):
+        """別プロセスに渡す接続先 (address, authkey)"""
+        return self.address, self.authkey
+
+    def _serve(self):
+        while not self._closing:
+            try:
+                conn = self._listener.accept()
+            except Exception:
+                # 認証に失敗した接続などは無視して待ち受けを続ける
+                continue
+            with conn:
+                try:
+                    request = conn.recv()
+                    cmd = request.get('cmd') if isinstance(request, dict) else request
+                    handler = self.handlers.get(cmd)
+                    if cmd == '_shutdown':
+                        conn.send({'ok': True})
+                        break
+                    if handler is None:
+                        conn.send({'ok': False, 'error': f'unknown command: {cmd}'})
+                    else:
+                        conn.send({'ok': True, 'result': handler()})
+                except (EOFError, OSError):
+                    pass
+                except Exception as e:
+                    conn.send({'ok': False, 'error': f'{type(e).__name__}: {e}'})
+        self._listener.close()
+
+    def close(self):
+        """待ち受けを終了する"""
+        if self._closing:
+            return
+        self._closing = True
+        try:
+            send_command(self.endpoint, '_shutdown', timeout=1.0)
+        except Exception:
+            pass
+        self._thread.join(timeout=2)
+        if self.control_file is not None:
+            try:
+                os.remove(self.control_file)
+            except OSError:
+                pass
+
+
+def load_endpoint(control_file):
+    """control.json から (address, authkey) を読む"""
+    with open(control_file, encoding='utf-8') as f:
+        info = json.load(f)
+    return tuple(info['address']), bytes.fromhex(info['authkey'])
+
+
+def send_command(endpoint, cmd, timeout=5.0):
+    """
+    ControlServer にコマンドを送る関数
+
+    Parameters:
+    endpoint (tuple): (address, authkey)（ControlServer.endpoint または load_endpoint の戻り値）
+    cmd (str): 'status' / 'stop' など
+
+    Returns:
+    応答の result（失敗した場合は RuntimeError）
+    """
+    address, authkey = endpoint
+    with Client(tuple(address), authkey=authkey) as conn:
+        conn.send({'cmd': cmd})
+        if not conn.poll(timeout):
+            raise TimeoutError(f"No response to '{cmd}'")
+        reply = conn.recv()
+    if not reply.get('ok'):
+        raise RuntimeError(reply.get('error'))
+    return reply.get('result')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Send a control command to a running live capture')
+    parser.add_argument('control_file', help=f'Path to {CONTROL_FILE} written by the capture')
+    parser.add_argument('command', choices=['status', 'stop'])
+    args = parser.parse_args()
+    print(json.dumps(send_command(load_endpoint(args.control_file), args.command), ensure_ascii=False, indent=2))
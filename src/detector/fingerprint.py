@@ -0,0 +1,158 @@
+import zlib
+from collections import deque
+
+from .backend import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+# ===============================================
+# 直近フレームの指紋（フィンガープリント）索引 — 隣接していない重複フレームの検出
+#
+# 前フレームとの差分だけでは、A-B-A-B の往復・古いバッファからの再送・順序の入れ替わりで
+# 何フレームか前の絵がもう一度届いても見えない。直近 max_age フレームの指紋を辞書に持ち、
+# 新しいフレームを O(1) で引いて次のどれかに分類する:
+#   'new'      : 直近 max_age フレームに同じ指紋がない
+#   'previous' : 直前のフレームと完全に同じ（通常のカクつき）
+#   'older'    : 2 フレーム以上前のフレームと完全に同じ（distance = 何フレーム前か）
+#   'similar'  : CRC32 は一致しないが dHash が一致した（再エンコードされた再送の可能性。distance は何フレーム前か）
+#
+# 指紋は 2 種類:
+#   - 輝度の CRC32（zlib、完全一致）
+#   - dHash（8 行・列おきに間引いて 9x8 に縮小し、横に隣り合う画素の大小 64 ビット）
+#     再エンコードで画素が少し変わった再送も拾う。静止した絵にノイズが乗っているだけの映像では
+#     毎フレームが一致するので、完全一致の previous / older には混ぜずに similar として別に数える
+# 'older' / 'similar' のフレームは、連続して同じ種類・同じ距離のものを 1 つの区間にまとめ、
+# 直近 max_runs 区間だけを repeats に残す（何時間もの静止・ノイズの映像でもメモリと出力は一定）。
+# 1080p の 1 フレームあたり CRC32 は MD5 の約 1/6、dHash と索引の更新を含めた observe 全体でも約 1/4
+# （python -m tests.benchmark_fingerprint）。
+# 古い指紋はフレーム番号の差が max_age を超えたら捨てる（メモリは max_age に比例して一定）。
+# ===============================================
+
+# 既定の保持フレーム数（30fps で 10 秒）
+MAX_AGE = 300
+
+# repeats に残す区間の数
+MAX_RUNS = 1000
+
+NEW = 'new'
+PREVIOUS = 'previous'
+OLDER = 'older'
+SIMILAR = 'similar'
+
+
+def fast_hash(luma):
+    """輝度フレームの CRC32（非連続のビューは連続な配列にしてから計算）"""
+    return zlib.crc32(np.ascontiguousarray(luma))
+
+
+def dhash(luma, step=8):
+    """
+    輝度フレームの dHash（64 ビット整数）
+
+    step 行・列おきに間引いてから 9x8 に INTER_AREA で縮小し、横に隣り合う画素の大小をビットにする。
+    間引きで 1080p でも縮小の対象は約 3 万画素になる。
+    """
+    small = cv2.resize(luma[::step, ::step], (9, 8), interpolation=cv2.INTER_AREA)
+    return int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), 'big')
+
+
+class FrameIndex:
+    """
+    直近フレームの指紋の索引
+
+    Attributes:
+    max_age (int): 指紋を保持するフレーム数（フレーム番号の差）
+    perceptual (bool): dHash の一致を similar として数えるか（False なら CRC32 の完全一致のみ）
+    counts (dict): 分類ごとのフレーム数 {'new', 'previous', 'older', 'similar'}
+    repeats (collections.deque): 'older' / 'similar' のフレームを連続ごとにまとめた区間（直近 max_runs 個）
+                                 {'start', 'end', 'kind', 'match'（start が一致したフレーム番号）, 'distance', 'frames'}
+    runs_dropped (int): max_runs を超えて repeats から捨てた区間の数
+    max_distance (int): 'older' の距離の最大値
+    """
+
+    def __init__(self, max_age=MAX_AGE, perceptual=True, max_runs=MAX_RUNS):
+        self.max_age = max_age
+        self.perceptual = perceptual
+        self._exact = {}        # CRC32 → 最後に見たフレーム番号
+        self._similar = {}      # dHash → 最後に見たフレーム番号
+        self._order = deque()   # (フレーム番号, CRC32, dHash)（古い順）
+        self._last = None
+        self.counts = {NEW: 0, PREVIOUS: 0, OLDER: 0, SIMILAR: 0}
+        self.repeats = deque(maxlen=max_runs)
+        self.runs_dropped = 0
+        self.max_distance = 0
+
+    def __len__(self):
+        return len(self._order)
+
+    def _evict(self, index):
+        while self._order and index - self._order[0][0] > self.max_age:
+            old, crc, dh = self._order.popleft()
+            # 辞書の値が新しいフレームで上書きされていれば残す
+            if self._exact.get(crc) == old:
+                del self._exact[crc]
+            if dh is not None and self._similar.get(dh) == old:
+                del self._similar[dh]
+
+    def observe(self, index, luma):
+        """
+        フレームを分類して索引に加える
+
+        Parameters:
+        index (int): フレーム番号（単調増加）
+        luma (numpy.ndarray): 輝度フレーム
+
+        Returns:
+        dict: {'frame', 'kind', 'match'（一致したフレーム番号 or None）, 'distance', 'exact'}
+        """
+        self._evict(index)
+        crc = fast_hash(luma)
+        dh = dhash(luma) if self.perceptual else None
+
+        match = self._exact.get(crc)
+        if match is not None:
+            kind = PREVIOUS if match == self._last else OLDER
+        elif dh is not None and self._similar.get(dh) is not None:
+            match, kind = self._similar[dh], SIMILAR
+        else:
+            kind = NEW
+        result = {'frame': index, 'kind': kind, 'match': match,
+                  'distance': 0 if match is None else index - match, 'exact': kind in (PREVIOUS, OLDER)}
+        self.counts[kind] += 1
+        if kind == OLDER:
+            self.max_distance = max(self.max_distance, result['distance'])
+        if kind in (OLDER, SIMILAR):
+            self._add_run(result)
+
+        self._exact[crc] = index
+        if dh is not None:
+            self._similar[dh] = index
+        self._order.append((index, crc, dh))
+        self._last = index
+        return result
+
+    def _add_run(self, result):
+        """直前の区間と連続（同じ種類・同じ距離）ならその区間を延ばし、そうでなければ新しい区間を始める"""
+        run = self.repeats[-1] if self.repeats else None
+        if (run is not None and run['end'] == result['frame'] - 1 and run['kind'] == result['kind']
+                and run['distance'] == result['distance']):
+            run['end'] = result['frame']
+            run['frames'] += 1
+            return
+        if len(self.repeats) == self.repeats.maxlen:
+            self.runs_dropped += 1
+        self.repeats.append({'start': result['frame'], 'end': result['frame'], 'kind': result['kind'],
+                             'match': result['match'], 'distance': result['distance'], 'frames': 1})
+
+    def observe_item(self, item):
+        """パイプラインの tap 用: (フレーム番号, 輝度) を受け取る"""
+        return self.observe(item[0], item[1])
+
+    def stats(self):
+        """
+        Returns:
+        dict: {'new', 'previous', 'older', 'similar', 'max_distance', 'runs', 'runs_dropped'}
+        """
+        return {**self.counts, 'max_distance': self.max_distance,
+                'runs': len(self.repeats) + self.runs_dropped, 'runs_dropped': self.runs_dropped}
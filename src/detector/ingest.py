@@ -0,0 +1,280 @@
+import shutil
+import subprocess
+
+from .backend import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+# ===============================================
+# 輝度（Y / グレースケール）専用の入力モジュール
+# カクつき検出で使うのは輝度だけなので、BGR を経由せずに Y プレーンを取り出す
+#
+# mode:
+#   'bgr'    : 従来どおり BGR でデコードして cvtColor でグレースケール化
+#   'raw'    : CAP_PROP_CONVERT_RGB を無効にしてデバイスの生フォーマット（YUYV/NV12）から Y を取り出す
+#              （FFmpeg バックエンドの OpenCV ではファイル入力でも yuv420p の Y プレーンが返る）
+#   'ffmpeg' : ffmpeg サブプロセスで gray の rawvideo を直接受け取る（ファイル入力向け）
+#   'auto'   : デバイス番号なら 'raw'、ファイルで ffmpeg が使えるなら 'ffmpeg'、それ以外は 'bgr'
+#
+# 注意: 'raw' / 'ffmpeg' の輝度はデコーダーの Y 値そのもの（リミテッドレンジ）なので、
+#       BGR→GRAY 変換の結果とは数階調ずれることがある。閾値は同じ感覚で使えるが完全一致はしない。
+#
+# reuse=True のリーダーは 2 組のバッファ（BufferRing）に交互にデコード・変換し、毎フレームの画像の確保をしない。
+# 返した輝度は 2 回後の read() で上書きされるため、直前の 1 フレームより長く保持する場合は copy() すること
+# （パイプラインの frame_diffs / CascadeFilter が保持するのは直前の 1 フレームだけなので、そのまま使える）。
+# reuse に整数を渡すとその組数のバッファを順に使う（先読みの prefetch.Prefetcher はキューの長さ + 3 組）。
+# ===============================================
+
+INGEST_MODES = ('auto', 'bgr', 'raw', 'ffmpeg')
+
+
+class BufferRing:
+    """
+    順に使い回す size 枚の出力バッファ（size=2 なら今回と前回の ping-pong）
+
+    next() で今回書き込むバッファ（最初は None → OpenCV が確保する）を受け取り、
+    書き込んだ結果を keep() に渡すと次回は次のバッファを返す。keep() しなかったバッファは次回も同じものを使う
+    （捨てたフレームで直前のフレームを上書きしない）。put() は書き込んだ結果を残すだけで次に進まない
+    （その場で使い終わる中間のバッファ用）。
+    """
+
+    def __init__(self, size=2):
+        self.slots = [None] * size
+        self.turn = 0
+
+    def next(self):
+        return self.slots[self.turn]
+
+    def put(self, array):
+        self.slots[self.turn] = array
+        return array
+
+    def keep(self, array):
+        self.put(array)
+        self.turn = (self.turn + 1) % len(self.slots)
+        return array
+
+
+def reuse_slots(reuse):
+    """reuse（True なら 2、整数ならその値）から使い回すバッファの数を求める"""
+    return 2 if reuse is True else max(2, int(reuse))
+
+
+class BGRLumaReader:
+    """BGR でデコードしてからグレースケールに変換する従来の読み込み"""
+
+    def __init__(self, cap, reuse=False):
+        self.cap = cap
+        self.reuse = reuse
+        if reuse:
+            self._frames = BufferRing(reuse_slots(reuse))
+            self._lumas = BufferRing(reuse_slots(reuse))
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def set(self, prop, value):
+        return self.cap.set(prop, value)
+
+    def grab(self):
+        return self.cap.grab()
+
+    def _read_raw(self):
+        if not self.reuse:
+            return self.cap.read()
+        buf = self._frames.next()
+        ret, frame = self.cap.read() if buf is None else self.cap.read(buf)
+        if ret:
+            self._frames.put(frame)
+        return ret, frame
+
+    def _hold(self, frame):
+        """読み込みのバッファ（またはそのビュー）をそのまま返す場合は、次の read で上書きしないように次に進める"""
+        if self.reuse:
+            self._frames.keep(self._frames.next())
+        return frame
+
+    def read(self):
+        # BGR から変換する場合、デコード先のバッファは変換で使い終わるので 1 枚を使い続ける
+        ret, frame = self._read_raw()
+        if not ret:
+            return False, None
+        if frame.ndim == 2:
+            return True, self._hold(frame)
+        if not self.reuse:
+            return True, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return True, self._lumas.keep(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._lumas.next()))
+
+    def release(self):
+        self.cap.release()
+
+
+class RawLumaReader(BGRLumaReader):
+    """
+    キャプチャデバイスの生フレーム（YUYV / NV12 など）から Y プレーンだけを取り出す読み込み
+
+    バックエンドが生フォーマットを返さない場合（BGR が返ってくる場合）は cvtColor にフォールバックする
+    """
+
+    def __init__(self, cap, reuse=False):
+        super().__init__(cap, reuse)
+        self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        self.width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    def read(self):
+        # Y プレーンは生フレームのビューなので、reuse では生フレームのバッファを交互に使う
+        ret, raw = self._read_raw()
+        if not ret:
+            return False, None
+        return True, self._hold(extract_luma(raw, self.width, self.height))
+
+
+def extract_luma(raw, width, height):
+    """
+    生フレームから Y プレーンを取り出す関数（可能な限りコピーなしのビュー）
+
+    Parameters:
+    raw (numpy.ndarray): VideoCapture が返したフレーム
+    width, height (int): フレームの幅と高さ
+
+    Returns:
+    numpy.ndarray: (height, width) の uint8 輝度画像
+    """
+    n_pixels = width * height
+    if raw.ndim == 3 and raw.shape[2] == 3:
+        # 既に BGR に変換されている（バックエンドが生フォーマット非対応）
+        return cv2.cvtColor(raw, cv2.COLOR_BGR2GRAY)
+    if raw.ndim == 2 and raw.shape == (height, width):
+        # 既にグレースケール（GREY / Y800）
+        return raw
+
+    flat = raw.reshape(-1)
+    if flat.size == n_pixels * 2:
+        # YUYV (YUY2): Y0 U Y1 V の並びなので偶数バイトが Y
+        return flat.reshape(height, width * 2)[:, 0::2]
+    if flat.size == n_pixels * 3 // 2:
+        # NV12 / I420: 先頭の width*height バイトが Y プレーン
+        return flat[:n_pixels].reshape(height, width)
+    raise ValueError(f"Unsupported raw frame layout: shape={raw.shape}, size={width}x{height}")
+
+
+class FFmpegLumaReader:
+    """
+    ffmpeg サブプロセスから gray の rawvideo を受け取る読み込み（BGR 変換を一切行わない）
+    """
+
+    def __init__(self, path, width, height, fps=0.0, frame_count=0, ffmpeg='ffmpeg', reuse=False):
+        self.reuse = reuse
+        if reuse:
+            self._lumas = BufferRing(reuse_slots(reuse))
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = frame_count
+        self.frame_size = width * height
+        self.proc = subprocess.Popen(
+            [ffmpeg, '-v', 'error', '-nostdin', '-i', str(path),
+             '-map', '0:v:0', '-f', 'rawvideo', '-pix_fmt', 'gray', '-'],
+            stdout=subprocess.PIPE,
+            bufsize=self.frame_size * 4,
+        )
+
+    def isOpened(self):
+        return self.proc is not None and self.proc.poll() in (None, 0)
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.frame_count)
+        return 0.0
+
+    def read(self):
+        if self.proc is None:
+            return False, None
+        gray = self._lumas.next() if self.reuse else None
+        if gray is None:
+            gray = np.empty((self.height, self.width), dtype=np.uint8)
+        view = memoryview(gray).cast('B')
+        got = 0
+        while got < self.frame_size:
+            n = self.proc.stdout.readinto(view[got:])
+            if not n:
+                return False, None
+            got += n
+        if self.reuse:
+            self._lumas.keep(gray)
+        return True, gray
+
+    def release(self):
+        if self.proc is None:
+            return
+        self.proc.stdout.close()
+        if self.proc.poll() is None:
+            self.proc.terminate()
+        self.proc.wait()
+        self.proc = None
+
+
+def open_luma_reader(src, mode='bgr', backend=None, open_capture=None, reuse=False):
+    """
+    輝度フレームを返す読み込みオブジェクトを作成する関数
+
+    Parameters:
+    src (str | int): 動画ファイルパスまたはデバイス番号
+    mode (str): 'auto' / 'bgr' / 'raw' / 'ffmpeg'
+    backend: OpenCV backend flag（None で既定値）
+    open_capture (callable): (src, backend) から cv2.VideoCapture を作る関数
+    reuse (bool | int): True なら 2 組のバッファを交互に使い、フレームごとに画像を確保しない
+                        （返した輝度は 2 回後の read() で上書きされる）。整数ならその組数を順に使う
+
+    Returns:
+    read() -> (ret, gray) を持つ読み込みオブジェクト（cv2.VideoCapture 互換の get/isOpened/release）
+    """
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unknown ingest mode: {mode} (choose from {INGEST_MODES})")
+    if open_capture is None:
+        open_capture = _default_open_capture
+
+    ffmpeg = shutil.which('ffmpeg')
+    if mode == 'auto':
+        if isinstance(src, int):
+            mode = 'raw'
+        elif ffmpeg is not None:
+            mode = 'ffmpeg'
+        else:
+            mode = 'bgr'
+
+    if mode == 'ffmpeg':
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg was not found on PATH (required for ingest mode 'ffmpeg')")
+        # サイズ・FPS は OpenCV で取得（ヘッダーのみ読むのでデコードはほぼ発生しない）
+        probe = open_capture(src, backend)
+        if not probe.isOpened():
+            return probe
+        width = int(probe.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(probe.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = probe.get(cv2.CAP_PROP_FPS)
+        frame_count = int(probe.get(cv2.CAP_PROP_FRAME_COUNT))
+        probe.release()
+        return FFmpegLumaReader(src, width, height, fps, frame_count, ffmpeg=ffmpeg, reuse=reuse)
+
+    cap = open_capture(src, backend)
+    if mode == 'raw':
+        return RawLumaReader(cap, reuse)
+    return BGRLumaReader(cap, reuse)
+
+
+def _default_open_capture(src, backend=None):
+    if backend is not None:
+        return cv2.VideoCapture(src, backend)
+    return cv2.VideoCapture(src)
@@ -0,0 +1,498 @@
+import argparse
+import os
+import threading
+import time
+
+import cv2
+
+from .backend import get_backend
+from .capture import CameraCapture
+from .clips import ClipRecorder
+from .ingest import BufferRing
+from .control import CONTROL_FILE, ControlServer
+from .metrics_log import MetricsLog, clock_text
+from .preview import open_preview
+from .processor import diff_metric, frame_diffs
+from .profiling import NULL_PROFILER, Profiler, finish_profile
+from .report import THRESHOLD_LOG, render_report, summarize_log
+from .scheduler import FrameScheduler
+from .threshold import make_threshold
+
+# ===============================================
+# ライブキャプチャ＋逐次カクつき検知（notebooks/v0.0.4.ipynb から移植）
+#
+# カメラスレッドはリングバッファ（capture.FrameRing）に直接デコードし、
+# カクつき検知ワーカー・保存ワーカーはそれぞれ RingReader でシーケンス番号順にフレームを読む。
+# フレームのコピーやキューへの積み込みは行わず、追いつけずに上書きされたフレームは
+# 各ワーカーの dropped / リングの overwrites（登録中の読み手が読む前に上書きされたフレーム）として明示的に数える。
+# プレビュー（preview.py）は最新フレームを表示するだけの任意の読み手で、--display-fps 0 ならヘッドレスで動く。
+# 実行中の状態確認・停止は control.py（stutter_frames/control.json）経由で行う。
+# --schedule では検知ワーカーが間引き間隔（stride）の代わりに perf_counter_ns の締め切りごとに最新フレームを受け取り
+# （scheduler.FrameScheduler）、フレーム間隔のヒストグラムと締め切りの遅れ・飛ばしを記録する。
+#
+# 使い方:
+#   python -m src.detector.live --device 0 --width 640 --height 480
+# ===============================================
+
+# 逐次カクつき検知ログ（adaptive_threshold_log.csv / .mlog）の列と CSV 書式
+THRESHOLD_LOG_FIELDS = [
+    ("time", "f8"), ("frame_idx", "i8"), ("frame_diff", "i8"),
+    ("threshold", "f8"), ("dynamic_k", "f8"), ("stutter_flag", "u1"),
+]
+THRESHOLD_LOG_FORMATS = {"time": clock_text, "threshold": "{:.3f}", "dynamic_k": "{:.2f}"}
+
+# 保存ワーカーの遅れログ（queue_log.csv / .mlog）の列
+QUEUE_LOG_FIELDS = [("frame_idx", "i8"), ("queue_size", "i4"), ("queue_max", "i4"), ("dropped", "i8")]
+
+
+def _log_path(folder, name, log_format):
+    return os.path.join(folder, f"{name}.{log_format}")
+
+
+def ring_luma(reader, stop_flag, profiler=NULL_PROFILER):
+    """
+    リングから読んだフレームをグレースケール化して流すパイプラインの供給源
+
+    変換中にフレームが上書きされた場合（読み手が遅れすぎた場合）は取りこぼしとして捨てる
+    （新しいフレームを待つ時間は profiler の 'detect.wait' に記録する）
+    輝度は 2 枚のバッファに交互に変換する（捨てたフレームのバッファは次のフレームで使い直す）
+    """
+    lumas = BufferRing()
+    for seq, frame in profiler.timed('detect.wait', reader.frames(stop_flag)):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=lumas.next())
+        if reader.still_valid(seq):
+            yield seq, lumas.keep(gray)
+
+
+def _gpu_nonzero_counts(lumas, backend):
+    """
+    配列バックエンド（CuPy）で前フレームとの差分画素数を求める段（frame_diffs + diff_metric('nonzero') の GPU 版）
+
+    GPU 側の輝度 2 枚（ping-pong）と比較結果の bool 配列を使い回し、フレームごとに GPU メモリを確保しない
+    """
+    grays = BufferRing()
+    changed = None
+    prev_gray_gpu = None
+    for seq, gray in lumas:
+        gray_gpu = grays.keep(backend.upload(gray, grays.next()))
+        if prev_gray_gpu is not None:
+            if changed is None:
+                changed = backend.xp.empty(gray_gpu.shape, dtype=bool)
+            yield seq, backend.count_changed(gray_gpu, prev_gray_gpu, out=changed)
+        prev_gray_gpu = gray_gpu
+
+
+# ====================================================
+# stutter_worker_auto_threshold_cupy 関数
+# バックグラウンドワーカー付き 逐次自動閾値カクつき検知（CSVログ出力付き）
+# ====================================================
+def stutter_worker_auto_threshold_cupy(reader, output_folder, stop_flag,
+                                       fps=30, min_time_diff=0.1, k=2.0,
+                                       alpha_mean=0.05, alpha_std=0.05, log_format="csv", on_event=None,
+                                       threshold="ema", window=600, profiler=NULL_PROFILER):
+    """
+    CuPy対応の適応型異常検知ワーカー。
+    - AdaptiveThresholdTrainer（EMA）または RollingMedianThreshold（移動窓の中央値・MAD）により閾値を動的更新。
+
+    引数:
+        reader (capture.RingReader): カメラのリングバッファを順に読むカーソル
+        output_folder (str): カクつきフレーム保存先フォルダパス。存在しない場合は自動作成。
+        stop_flag (threading.Event): ワーカー終了を通知するフラグ。
+        fps (float): 検知するフレームレート（min_time_diff をフレーム数に換算するのに使用）
+        min_time_diff (float): これ未満の短いカクつきは除外する秒数。
+        k (float): 自動閾値算出用の係数。
+        log_format (str): ログ形式（'csv' または列指向バイナリの 'mlog'、metrics_log.py）
+        on_event (callable, optional): カクつき区間を閉じたときに (開始 seq, 終了 seq) で呼ぶ関数
+                                       （ClipRecorder.trigger でクリップを書き出す場合）
+        threshold (str): しきい値の推定方式（'ema' または 'median'、threshold.py）
+        window (int): 'median' の窓の長さ（フレーム数）
+        profiler (profiling.Profiler): 各段（detect.*）の処理時間とリング内の遅れ（detect.lag）を記録する
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    log = MetricsLog(_log_path(output_folder, "adaptive_threshold_log", log_format),
+                     THRESHOLD_LOG_FIELDS, log_format, formats=THRESHOLD_LOG_FORMATS)
+
+    backend = get_backend()
+    trainer = make_threshold(threshold, k, alpha_mean, alpha_std, window)
+
+    min_frame_diff = max(1, int(min_time_diff * fps))
+    run_length = 0
+    first_frame = None  # 連続カクつきの最初のフレーム（コピーは区間ごとに 1 枚だけ）
+    last_idx = None     # 連続カクつきの最後のフレームの seq
+
+    print(f"▶ 異常検知ワーカー開始 ({'GPU' if backend.gpu else 'CPU'}) - 適応学習モード（{threshold}）")
+
+    # リング → 輝度 → 差分画素数 の共通パイプライン（processor.py）
+    prof = profiler
+    lumas = prof.timed('detect.luma', ring_luma(reader, stop_flag, prof))
+    if backend.gpu:
+        counts = prof.timed('detect.gpu_diff', _gpu_nonzero_counts(lumas, backend))
+    else:
+        counts = prof.timed('detect.metric',
+                            diff_metric(prof.timed('detect.diff', frame_diffs(lumas, reuse=True)), 'nonzero'))
+
+    def flush_run():
+        if run_length >= min_frame_diff and first_frame is not None:
+            first_idx, frame = first_frame
+            with prof.span('detect.png'):
+                cv2.imwrite(os.path.join(output_folder, f"stutter_{first_idx:08d}.png"), frame)
+            if on_event is not None:
+                on_event(first_idx, last_idx)
+
+    try:
+        for idx, non_zero_count in counts:
+            prof.gauge('detect.lag', reader.ring.head - idx)
+            with prof.span('detect.threshold'):
+                thresh_value = trainer.update(non_zero_count)
+            stutter_flag = 0
+            if non_zero_count <= thresh_value:
+                if run_length == 0:
+                    frame = reader.ring.get(idx)
+                    first_frame = (idx, frame.copy()) if frame is not None else None
+                run_length += 1
+                last_idx = idx
+                stutter_flag = 1
+            else:
+                flush_run()
+                run_length = 0
+                first_frame = None
+
+            # ログ（メモリにため込み、行数・時間でまとめて書き出す）
+            with prof.span('detect.log'):
+                log.append(time.time(), idx, non_zero_count, thresh_value, trainer.dynamic_k, stutter_flag)
+
+        flush_run()
+    finally:
+        log.close()
+    print(f"✅ 適応学習ワーカー終了（取りこぼし: {reader.dropped} フレーム）")
+
+
+# -------------------------------------------------------
+# save_worker 関数
+# 非同期保存用ワーカー
+# -------------------------------------------------------
+def save_worker(reader, folder_path, stop_flag, queue_log_file=None, log_format="csv", profiler=NULL_PROFILER):
+    """
+    リングバッファのフレームを順に JPEG で保存する。
+    保存ごとにリング内の未処理フレーム数（遅れ）と取りこぼし数をログに残す。
+
+    Args:
+        reader (capture.RingReader): 保存対象フレームを読むカーソル
+        folder_path (str): 保存先フォルダ
+        stop_flag (threading.Event): 終了フラグ
+        queue_log_file (str, optional): 遅れを記録するログファイルパス
+        log_format (str): ログ形式（'csv' または 'mlog'）
+        profiler (profiling.Profiler): 待ち・JPEG 保存・ログの時間と遅れ（save.lag）を記録する
+    """
+    # キューログファイルをフォルダ内に作成する場合
+    if queue_log_file is None:
+        queue_log_file = _log_path(folder_path, "queue_log", log_format)
+
+    # ログファイルは開いたままにしてまとめて書き出す
+    try:
+        log = MetricsLog(queue_log_file, QUEUE_LOG_FIELDS, log_format)
+    except Exception as e:
+        print(f"⚠ キューログ作成エラー: {e}")
+        log = None
+
+    try:
+        for idx, frame in profiler.timed('save.wait', reader.frames(stop_flag)):
+            try:
+                filename = os.path.join(folder_path, f"frame_{idx:05d}.jpg")
+                with profiler.span('save.jpeg'):
+                    cv2.imwrite(filename, frame)
+            except Exception as e:
+                print(f"⚠ フレーム保存エラー: {e}")
+
+            # --- 遅れ（リング内の未保存フレーム数）ログ ---
+            lag = reader.ring.head - idx
+            profiler.gauge('save.lag', lag)
+            if log is not None:
+                with profiler.span('save.log'):
+                    log.append(idx, lag, reader.ring.capacity, reader.dropped)
+    finally:
+        if log is not None:
+            log.close()
+
+
+# ======================================================
+# 🧠 メインキャプチャ＆カクつき検知スレッド統合関数
+# ======================================================
+def start_capture_and_detect_worker(device_number=0, target_width=1920, target_height=1080,
+                                    capture_fps=30, display_fps=10, target_fps=60,
+                                    min_time_diff=0.1, max_temp_frames=18000,
+                                    stop_no_diff_sec=300, k=2.0, ring_size=16, output_root=None, log_format="csv",
+                                    save_mode="frames", pre_roll=3.0, post_roll=2.0, clip_scale=0.5,
+                                    threshold="ema", window=600, profile=None, schedule=False):
+    """
+    カメラをリングバッファ付きスレッドで起動し、カクつき検知・保存ワーカーとプレビューを動かす
+
+    capture_fps: 検知・保存ワーカーが処理するフレームレート（カメラ FPS から間引き間隔を決める）
+    ring_size: リングバッファのフレーム数（ワーカーの処理が遅れても上書きされない猶予）
+    output_root: 出力先の親フォルダ（省略時はデスクトップ）
+    log_format: 検知・遅れログの形式（'csv' または列指向バイナリの 'mlog'）
+    save_mode: 'frames' なら全フレームを temp_frames に JPEG 保存（従来動作）、
+               'clips' なら直近のフレームをメモリに保持し、カクつき区間ごとに
+               pre_roll + 区間 + post_roll 秒のクリップだけを stutter_frames に書き出す（clips.py）
+    clip_scale: 'clips' モードでメモリに保持するフレームの縮小率
+    threshold / window: カクつき判定のしきい値推定方式（'ema' / 'median'）と 'median' の窓の長さ
+    display_fps: プレビューの表示レート（0 ならプレビューなしのヘッドレス）。
+                 プレビューを閉じてもキャプチャは続き、終了は 'q' キー・control.py の stop・Ctrl+C で行う
+    profile: JSON の保存先を指定すると、取得・検知・保存の各段の処理時間（p50/p95/p99）、
+             リング内の遅れの推移、ピークメモリを記録する（profiling.py）
+    schedule: True なら検知ワーカーは capture_fps の締め切りごとに最新フレームを受け取り（scheduler.py）、
+              カメラの実際の FPS が設定値とずれても同じフレームを 2 回処理しない。
+              フレーム間隔のヒストグラムと遅れ・飛ばした締め切りは status と終了時の表示に出る
+    """
+    # --- 出力先パス準備 ---
+    if output_root is None:
+        output_root = os.path.join(os.path.expanduser("~"), "Desktop")
+    temp_folder = os.path.join(output_root, "temp_frames")
+    output_folder = os.path.join(output_root, "stutter_frames")
+
+    for folder in (temp_folder, output_folder):
+        if os.path.exists(folder):
+            for f in os.listdir(folder):
+                try:
+                    os.remove(os.path.join(folder, f))
+                except OSError:
+                    pass
+        os.makedirs(folder, exist_ok=True)
+    print(f"📁 {temp_folder} と {output_folder} を作成しました。")
+
+    # --- カメラ起動（スレッド化・リングバッファ） ---
+    profiler = Profiler() if profile else NULL_PROFILER
+    try:
+        cam = CameraCapture(device_number, target_width, target_height, target_fps, ring_size=ring_size,
+                            profiler=profiler)
+    except RuntimeError as e:
+        print(str(e))
+        return 0, output_folder, 0, []
+
+    # カメラ FPS に対する間引き間隔（例: 60fps カメラを 30fps で処理 → 2 フレームに 1 回）
+    stride = max(1, int(round(cam.fps_set / capture_fps))) if capture_fps else 1
+
+    # --- スレッド起動系（各ワーカーはリングを直接読む） ---
+    stop_flag = threading.Event()
+    save_reader = cam.reader(stride)
+    recorder = None
+    if save_mode == "clips":
+        recorder = ClipRecorder(save_reader, output_folder, cam.fps_set / stride,
+                                pre_roll=pre_roll, post_roll=post_roll, scale=clip_scale)
+        save_thread = threading.Thread(target=recorder.run, args=(stop_flag,), daemon=True)
+    else:
+        save_thread = threading.Thread(target=save_worker, args=(save_reader, temp_folder, stop_flag),
+                                       kwargs={"log_format": log_format, "profiler": profiler}, daemon=True)
+    save_thread.start()
+
+    if schedule:
+        detect_reader = FrameScheduler(cam.ring, capture_fps or cam.fps_set, profiler=profiler)
+        detect_fps = detect_reader.fps
+    else:
+        detect_reader = cam.reader(stride)
+        detect_fps = cam.fps_set / stride
+    worker = threading.Thread(
+        target=stutter_worker_auto_threshold_cupy,
+        args=(detect_reader, output_folder, stop_flag, detect_fps, min_time_diff, k),
+        kwargs={"log_format": log_format, "on_event": recorder.trigger if recorder is not None else None,
+                "threshold": threshold, "window": window, "profiler": profiler},
+        daemon=True
+    )
+    worker.start()
+
+    # --- 制御チャネル（status / stop）（経過時間は時刻合わせで跳ばない perf_counter で測る） ---
+    start_time = time.perf_counter()
+
+    def status():
+        elapsed = time.perf_counter() - start_time
+        state = {
+            'elapsed_sec': round(elapsed, 3), 'frames': cam.ring.writes, 'overwrites': cam.ring.overwrites,
+            'fps': round(cam.ring.writes / elapsed, 2) if elapsed > 0 else 0.0, 'stopping': stop_flag.is_set(),
+            'detect': {'frames_read': detect_reader.frames_read, 'dropped': detect_reader.dropped},
+            'save': {'frames_read': save_reader.frames_read, 'dropped': save_reader.dropped},
+        }
+        if schedule:
+            # フレーム間隔のヒストグラムと締め切りの遅れ（実行中でも見られる）
+            state['schedule'] = detect_reader.stats()
+        return state
+
+    def stop():
+        stop_flag.set()
+        return {'stopping': True}
+
+    server = ControlServer({'status': status, 'stop': stop}, control_file=os.path.join(output_folder, CONTROL_FILE))
+
+    # --- メインループ（プレビューは任意・一時フォルダの掃除） ---
+    preview = open_preview(display_fps)
+    cleared_at = 0
+
+    print(f"🎥 映像キャプチャ開始。終了: 'q'キー / python -m src.detector.control {server.control_file} stop")
+
+    try:
+        while not stop_flag.is_set():
+            if preview is not None:
+                event = preview.step(cam.ring)
+                if event == 'quit':
+                    print("🧍 ユーザー操作による終了")
+                    stop_flag.set()
+                    break
+                if event == 'closed':
+                    print("🪟 プレビューを閉じました（キャプチャは継続中）")
+                    preview.close()
+                    preview = None
+            else:
+                stop_flag.wait(0.2)
+
+            frame_count = cam.ring.writes
+            if recorder is None and frame_count // max_temp_frames > cleared_at:
+                cleared_at = frame_count // max_temp_frames
+                print(f"🧹 一時フォルダをクリアしました（{max_temp_frames}フレーム到達）")
+                for f in os.listdir(temp_folder):
+                    try:
+                        os.remove(os.path.join(temp_folder, f))
+                    except OSError:
+                        pass
+
+    except KeyboardInterrupt:
+        stop_flag.set()
+
+    finally:
+        # --- 終了処理 ---
+        if preview is not None:
+            preview.close()
+        server.close()
+        stop_flag.set()
+        worker.join(timeout=5)
+        save_thread.join()
+        if recorder is not None:
+            # 検知ワーカーが最後に閉じた区間も含めて、残りのクリップを書き出す
+            recorder.finish()
+        # 読み終えたカーソルを外してから止める（止まるまでの上書きを overwrites に数えない）
+        save_reader.close()
+        detect_reader.close()
+        cam.release()
+
+        frame_count = cam.ring.writes
+        total_time = time.perf_counter() - start_time
+        actual_fps = frame_count / total_time if total_time > 0 else 0
+        stutter_files = [f for f in os.listdir(output_folder) if f.endswith(".png")]
+        if recorder is not None:
+            print(f"🎬 クリップ: {len(recorder.clips)} 本")
+
+        print(f"✅ 完全終了: {frame_count} フレーム（実測FPS: {actual_fps:.2f}）")
+        print(f"📉 取りこぼし: 検知 {detect_reader.dropped} / 保存 {save_reader.dropped} フレーム"
+              f"（読む前に上書き: {cam.ring.overwrites}）")
+        if schedule:
+            print(f"⏱ {detect_reader.summary()}")
+        print(f"💾 カクつきフレームは {output_folder} に保存済み")
+        finish_profile(profiler, profile)
+
+    return frame_count, output_folder, actual_fps, stutter_files
+
+
+# ====================================================
+# plot_stutter_csv 関数
+# 逐次カクつき検知のログをグラフ表示する（長時間のログも画素の列ごとに間引いて数秒で描く、report.py）
+# ====================================================
+def plot_stutter_csv(output_folder, fps=30, mode="minmax"):
+    log_file = os.path.join(output_folder, "adaptive_threshold_log.csv")
+    binary_log = os.path.join(output_folder, "adaptive_threshold_log.mlog")
+    if os.path.exists(binary_log):
+        path = binary_log
+    elif os.path.exists(log_file):
+        path = log_file
+    else:
+        print("⚠ adaptive_threshold_log.csv / .mlog が存在しません。")
+        return
+
+    summary = summarize_log(path, THRESHOLD_LOG, mode=mode, x_scale=1 / fps)
+    render_report(summary, output_folder, show=True)
+
+
+def _build_cli():
+    p = argparse.ArgumentParser(description='Live capture stutter detector (ring-buffered camera thread).')
+    p.add_argument('--device', type=int, default=0, help='Capture device index')
+    p.add_argument('--width', type=int, default=640, help='Capture width')
+    p.add_argument('--height', type=int, default=480, help='Capture height')
+    p.add_argument('--target-fps', type=int, default=60, help='FPS requested from the camera')
+    p.add_argument('--capture-fps', type=int, default=30, help='FPS processed by the detect/save workers')
+    p.add_argument('--display-fps', type=int, default=10, help='Preview refresh rate (0: headless, no preview)')
+    p.add_argument('--ring-size', type=int, default=16, help='Number of preallocated frame buffers')
+    p.add_argument('--output-root', default=None, help='Parent folder for temp_frames/stutter_frames (default: Desktop)')
+    p.add_argument('--log-format', choices=['csv', 'mlog'], default='csv',
+                   help='Format of the detection/queue logs (mlog: compact binary, convert with metrics_log.py)')
+    p.add_argument('--save-mode', choices=['frames', 'clips'], default='frames',
+                   help='frames: save every frame to temp_frames; clips: keep a pre-roll in memory and '
+                        'write a short clip per stutter event')
+    p.add_argument('--pre-roll', type=float, default=3.0, help='Seconds before an event kept in clips')
+    p.add_argument('--post-roll', type=float, default=2.0, help='Seconds after an event kept in clips')
+    p.add_argument('--clip-scale', type=float, default=0.5, help='Downscale factor for frames held for clips')
+    p.add_argument('--threshold', choices=['ema', 'median'], default='ema',
+                   help='Adaptive threshold: EMA mean/deviation (ema) or rolling median/MAD (median)')
+    p.add_argument('--window', type=int, default=600, help='Window length in frames for --threshold median')
+    p.add_argument('--k', type=float, default=2.0, help='Threshold coefficient')
+    p.add_argument('--schedule', action='store_true',
+                   help='Pace the detect worker with perf_counter_ns deadlines at --capture-fps and take the newest '
+                        'unprocessed frame by sequence number (never the same frame twice); reports a histogram of '
+                        'frame intervals and late/missed deadlines')
+    p.add_argument('--processes', action='store_true',
+                   help='Run capture, detection and saving in separate processes sharing a shared-memory ring '
+                        '(shm_capture.py; frames save mode only, not with --schedule)')
+    p.add_argument('--profile', nargs='?', const='profile.json', default=None, metavar='PATH',
+                   help='Time each capture/detect/save stage and save p50/p95/p99, ring lag over time and '
+                        'peak RSS as JSON (default path: profile.json)')
+    p.add_argument('--plot', action='store_true', help='Plot the threshold log after capture')
+    return p
+
+
+if __name__ == "__main__":
+    parser = _build_cli()
+    args = parser.parse_args()
+    if args.processes and args.schedule:
+        # 検知プロセスは stride で間引く RingReader で読む（FrameScheduler は共有メモリのリングに対応していない）
+        parser.error('--schedule cannot be combined with --processes')
+    if args.processes:
+        from .shm_capture import start_multiprocess_capture
+        if args.save_mode != 'frames':
+            print("⚠ --processes では --save-mode frames のみ対応しています。")
+        stats = start_multiprocess_capture(
+            device_number=args.device,
+            target_width=args.width,
+            target_height=args.height,
+            capture_fps=args.capture_fps,
+            display_fps=args.display_fps,
+            target_fps=args.target_fps,
+            k=args.k,
+            ring_size=args.ring_size,
+            output_root=args.output_root,
+            log_format=args.log_format,
+            threshold=args.threshold,
+            window=args.window,
+            profile=args.profile,
+        )
+        if args.plot:
+            plot_stutter_csv(stats['output_folder'], fps=args.capture_fps)
+        raise SystemExit(0)
+
+    frame_count, output_folder, actual_fps, stutter_files = start_capture_and_detect_worker(
+        device_number=args.device,
+        target_width=args.width,
+        target_height=args.height,
+        capture_fps=args.capture_fps,
+        display_fps=args.display_fps,
+        target_fps=args.target_fps,
+        ring_size=args.ring_size,
+        output_root=args.output_root,
+        log_format=args.log_format,
+        save_mode=args.save_mode,
+        pre_roll=args.pre_roll,
+        post_roll=args.post_roll,
+        clip_scale=args.clip_scale,
+        k=args.k,
+        threshold=args.threshold,
+        window=args.window,
+        profile=args.profile,
+        schedule=args.schedule,
+    )
+    if args.plot:
+        plot_stutter_csv(output_folder, fps=args.capture_fps)
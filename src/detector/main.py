@@ -1,9 +1,200 @@
-import cv2
-import numpy as np
 import argparse
 import time
 import os
 
+from .backend import lazy_import
+from .ingest import open_luma_reader
+from .fingerprint import MAX_AGE, OLDER, FrameIndex
+from .mp4scan import find_candidates, read_sample_table
+from .prefetch import DEPTH as PREFETCH_DEPTH, Prefetcher
+from .processor import CascadeFilter, read_frames, stutter_events, tap
+from .profiling import NULL_PROFILER, Profiler, finish_profile
+from .roi import CALIBRATION_SECONDS, calibrate, parse_roi, roi_report
+from .tiles import StripeDiff
+from .utils import merge_runs
+
+# OpenCV は解析を始めるまで読み込まない（--help などの起動を速くする）
+cv2 = lazy_import('cv2')
+
+
+# ===============================================
+# キャプチャを開く共通処理
+# source: ファイルパスまたはデバイス番号（int）
+# backend: OpenCV backend flag（None なら既定値）
+# ===============================================
+def _open_capture(src, backend=None):
+    if isinstance(src, int):
+        if backend is not None:
+            return cv2.VideoCapture(src, backend)
+        # Windowsでキャプチャボードを使う場合はCAP_DSHOWが安定することが多い
+        return cv2.VideoCapture(src, cv2.CAP_DSHOW)
+    # ファイルパスやデバイス名（DirectShow文字列など）
+    if backend is not None:
+        return cv2.VideoCapture(src, backend)
+    return cv2.VideoCapture(src)
+
+
+# ===============================================
+# 並列解析用ワーカー（フレーム範囲 [start, stop) を担当）
+# 戻り値: (ほぼ同一フレームの区間リスト（長さ制限なし）, 読み込んだフレーム数)
+# 区間のフレーム番号は detect_stutter と同じ 1 始まり
+# ===============================================
+def _analyze_segment(src, backend, start, stop, diff_thresh, ingest='bgr', profiler=NULL_PROFILER, cascade=None,
+                     rois=None):
+    cap = open_luma_reader(src, ingest, backend, open_capture=_open_capture, reuse=True)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open source: {src}")
+
+    # 区間の直前フレームから読み始め、境界をまたぐ差分も計算できるようにする
+    first = max(0, start - 1)
+    if first > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+        if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != first:
+            # シークが正確でないコンテナでは先頭から読み飛ばす（結果の一致を優先）
+            cap.release()
+            cap = open_luma_reader(src, ingest, backend, open_capture=_open_capture, reuse=True)
+            for _ in range(first):
+                if not cap.grab():
+                    break
+
+    # 直前フレーム（first）から stop までを共通パイプラインに流す（区間は長さ制限なしで全て返す）
+    last = {'index': start}
+
+    def track(item):
+        last['index'] = item[0]
+
+    frames = profiler.timed('decode', read_frames(cap, None if stop is None else stop - first, first_index=first + 1))
+    runs = list(stutter_events(tap(frames, track), diff_thresh, min_consec=1, profiler=profiler, cascade=cascade,
+                               rois=rois, reuse=True))
+
+    cap.release()
+    return runs, max(0, last['index'] - start)
+
+
+def _analyze_segment_profiled(*args, **kwargs):
+    """プロセスプール用: _analyze_segment の結果に計測結果（Profiler.state()）を添えて返す"""
+    profiler = Profiler()
+    runs, count = _analyze_segment(*args, profiler=profiler, **kwargs)
+    return runs, count, profiler.state()
+
+
+# ===============================================
+# 動画ファイルをフレーム範囲に分割して複数プロセスで解析する
+# 各ワーカーの区間を境界で結合し、単一プロセス版と同じ (start, end) を返す
+# ===============================================
+def _detect_stutter_parallel(src, diff_thresh, min_consec, max_frames, backend, workers, ingest,
+                             profiler=NULL_PROFILER, cascade=None, rois=None):
+    from concurrent.futures import ProcessPoolExecutor
+
+    cap = _open_capture(src, backend)
+    if not cap.isOpened():
+        print(f"Error: Could not open source: {src}")
+        return []
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    if total <= 0:
+        # 総フレーム数が分からない場合は単一プロセスで処理
+        return None
+    if max_frames is not None:
+        total = min(total, max_frames)
+
+    workers = max(1, min(workers, total))
+    # ffmpeg パイプはフレーム単位でシークできないため、各ワーカーは OpenCV のデコーダーを使う
+    if ingest in ('auto', 'ffmpeg'):
+        ingest = 'bgr'
+
+    bounds = [total * i // workers for i in range(workers + 1)]
+    # 最終区間はEOFまで読む（CAP_PROP_FRAME_COUNT は推定値のことがあるため）
+    bounds[-1] = max_frames
+
+    # 計測時は各ワーカーの計測結果を受け取って集計する
+    target = _analyze_segment_profiled if profiler.enabled else _analyze_segment
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(target, src, backend, bounds[i], bounds[i + 1], diff_thresh, ingest, cascade=cascade,
+                        rois=rois)
+            for i in range(workers)
+        ]
+        results = [f.result() for f in futures]
+    for result in results:
+        if len(result) == 3:
+            profiler.merge_state(result[2])
+
+    runs = merge_runs([run for seg_runs in results for run in seg_runs[0]])
+    stutter_frames = [(start, end) for start, end in runs if end - start + 1 >= min_consec]
+    for start, end in stutter_frames:
+        print(f"Stutter detected: frames {start} - {end}")
+    return stutter_frames
+
+
+# ===============================================
+# MP4 のサンプルテーブル（mp4scan.py）で候補区間を求め、その近傍だけをデコードして確認する
+# 候補の前後 margin フレームを含めて解析し、検出区間が窓の端に接していれば窓を広げて読み直す
+# 戻り値: MP4/MOV でなければ None（呼び出し側で全フレームをデコード）
+# ===============================================
+def _detect_stutter_prefiltered(src, diff_thresh, min_consec, max_frames, backend, ingest, margin=8,
+                                profiler=NULL_PROFILER, cascade=None, rois=None):
+    try:
+        with profiler.span('mp4scan'):
+            table = read_sample_table(src)
+    except (OSError, ValueError):
+        return None
+
+    total = len(table) if max_frames is None else min(len(table), max_frames)
+    # 候補 (start_frame, end_frame) を前後に広げた窓（_analyze_segment の (start, stop]）
+    windows = merge_runs([
+        (max(0, c['start_frame'] - 1 - margin), min(total, c['end_frame'] + margin))
+        for c in find_candidates(table, min_consec)
+        if c['start_frame'] <= total
+    ])
+    # ffmpeg パイプはシークできないため OpenCV のデコーダーを使う
+    if ingest in ('auto', 'ffmpeg'):
+        ingest = 'bgr'
+
+    runs = []
+    for start, stop in windows:
+        grow = margin
+        while True:
+            seg_runs, _ = _analyze_segment(src, backend, start, stop, diff_thresh, ingest, profiler, cascade, rois)
+            touches_start = start > 0 and any(s == start + 1 for s, _ in seg_runs)
+            touches_stop = stop < total and any(e == stop for _, e in seg_runs)
+            if not (touches_start or touches_stop):
+                break
+            # 静止区間が窓の外まで続いている可能性があるので窓を広げる
+            grow *= 2
+            if touches_start:
+                start = max(0, start - grow)
+            if touches_stop:
+                stop = min(total, stop + grow)
+        runs.extend(seg_runs)
+
+    stutter_frames = [(s, e) for s, e in merge_runs(runs) if e - s + 1 >= min_consec]
+    for start, end in stutter_frames:
+        print(f"Stutter detected: frames {start} - {end}")
+    return stutter_frames
+
+
+# ===============================================
+# --roi の指定から解析に使う ROI を決める
+# roi: None / 'auto' / (x, y, w, h) のリスト
+# 戻り値: (ROI のリスト（None ならフレーム全体）, roi_report の結果（ROI 指定なしなら None）)
+# ===============================================
+def _resolve_rois(src, roi, roi_seconds, ingest, backend, profiler=NULL_PROFILER):
+    if roi is None:
+        return None, None
+    if roi != 'auto':
+        rois = list(roi)
+        return rois, roi_report(rois, mode='manual')
+    if isinstance(src, int) or not os.path.isfile(src):
+        # デバイスは先頭を読み直せないため、自動検出はファイルだけ（デバイスは --roi x,y,w,h で指定）
+        print("Warning: --roi auto needs a video file; analyzing the whole frame")
+        return None, roi_report(None)
+    with profiler.span('roi.calibrate'):
+        rois, report = calibrate(src, roi_seconds, 'bgr' if ingest in ('auto', 'ffmpeg') else ingest, backend,
+                                 open_capture=_open_capture)
+    return rois or None, report
+
 
 # ===============================================
 # 動画のカクつき（stutter）を検出する関数
@@ -11,7 +202,9 @@ import os
 # 戻り値: カクつきが発生したフレーム番号のリスト
 # 動作: ファイル or キャプチャデバイスの両方に対応
 # ===============================================
-def detect_stutter(source, diff_thresh=2.0, min_consec=3, max_frames=None, backend=None, record_path=None):
+def detect_stutter(source, diff_thresh=2.0, min_consec=3, max_frames=None, backend=None, record_path=None,
+                   workers=None, ingest='bgr', cache=False, prefilter=False, profiler=NULL_PROFILER, cascade=None,
+                   roi=None, roi_seconds=CALIBRATION_SECONDS, fingerprints=None, prefetch=None, tiles=None):
     """
     source: str or int - 動画ファイルパスかカメラデバイス（インデックスまたはDirectShow名）
     diff_thresh: float - グレースケール差分の平均がこれ以下なら「ほぼ同一フレーム」と判定
@@ -19,6 +212,28 @@ def detect_stutter(source, diff_thresh=2.0, min_consec=3, max_frames=None, backe
     max_frames: int|None - ライブキャプチャ時に処理する最大フレーム数（Noneで制限なし、ただし手動で終了可）
     backend: OpenCV backend flag（例: cv2.CAP_DSHOW） - WindowsでDirectShowを使う場面で指定
     record_path: 出力録画パス（省略可）
+    workers: int|None - 2以上ならファイル入力をフレーム範囲に分割して複数プロセスで解析
+             （ライブキャプチャ・録画時は単一プロセスで処理）
+    ingest: str - 輝度の取り込み方法（'bgr' / 'raw' / 'ffmpeg' / 'auto'、詳細は ingest.py）
+            録画時は BGR フレームが必要なため 'bgr' で処理
+    cache: bool - True ならファイル入力のフレーム指標をサイドカー（<動画>.sig.npz）に保存し、
+           次回以降は閾値を変えてもデコードせずにサイドカーから判定（signature.py）
+    prefilter: bool - True なら MP4/MOV のサンプルテーブルで候補区間を求め、その近傍だけをデコードして確認
+               （mp4scan.py、MP4/MOV 以外は全フレームをデコード）。サンプルサイズが小さくならない
+               静止（ノイズの多い映像など）は見逃す可能性がある
+    profiler: profiling.Profiler - 各段（decode / luma / diff / metric / threshold / record）の処理時間を記録する
+    cascade: processor.CascadeFilter|None - 間引いた行（stride 行ごとのビュー、コピーなし）の差分合計で明らかに違う
+             フレームを落とし、残りだけ全解像度で判定する（結果は全解像度だけで判定した場合と同じ。
+             段ごとの判定数は cascade に残る。複数プロセスで解析した場合は各ワーカーの分は数えない）
+    roi: None|'auto'|list - 差分を取る領域 (x, y, w, h) のリスト。'auto' ならファイルの先頭 roi_seconds 秒の
+         アクティビティマップから動く領域を求める（roi.py）。None ならフレーム全体
+    fingerprints: fingerprint.FrameIndex|None - 直近フレームの指紋で、隣接していない重複フレーム
+                  （A-B-A-B の往復・古いフレームの再送）も分類する。全フレームを順に見る必要があるため
+                  cache / prefilter / workers は使わずに単一プロセスで解析する
+    prefetch: prefetch.Prefetcher|None - ファイル入力を 1 プロセスで解析する場合に、デコードを別スレッドで先読みして
+              解析と重ねる（キューの深さと待ち時間は prefetch に残る。ライブキャプチャ・録画では使わない）
+    tiles: tiles.StripeDiff|None - 差分を横帯ごとにスレッドプールで計算し、局所的な静止も記録する
+           （局所的な静止は全フレームを順に見る必要があるため、fingerprints と同じく単一プロセスで解析する）
     """
     # source が数字文字列なら int に変換
     cap = None
@@ -27,88 +242,105 @@ def detect_stutter(source, diff_thresh=2.0, min_consec=3, max_frames=None, backe
     except Exception:
         src = source
 
-    # キャプチャオープン
-    if isinstance(src, int):
-        if backend is not None:
-            cap = cv2.VideoCapture(src, backend)
-        else:
-            # Windowsでキャプチャボードを使う場合はCAP_DSHOWが安定することが多い
-            cap = cv2.VideoCapture(src, cv2.CAP_DSHOW)
+    rois, report = _resolve_rois(src, roi, roi_seconds, ingest, backend, profiler)
+    if report is not None:
+        print(f"ROI ({report['mode']}): {report['regions'] or 'whole frame'}"
+              + (f", {report['pixel_fraction'] * 100:.1f}% of the pixels" if 'pixel_fraction' in report else ''))
+
+    # 重複フレームの索引・局所的な静止は全フレームを順に見る必要があるため、以下の近道は使わない
+    sequential = fingerprints is not None or tiles is not None
+
+    # サイドカーがあればデコードせずに判定（なければ 1 回デコードして作成）
+    # （サイドカーはフレーム全体の指標なので ROI 指定時は使わない）
+    if cache and not sequential and rois is None and not isinstance(src, int) and not record_path and os.path.isfile(src):
+        from .signature import detect_stutter_from_signatures, get_signatures
+
+        with profiler.span('signatures'):
+            signatures = get_signatures(src, ingest, backend)
+        with profiler.span('threshold'):
+            stutter_frames = detect_stutter_from_signatures(signatures, diff_thresh, min_consec, max_frames)
+        for start, end in stutter_frames:
+            print(f"Stutter detected: frames {start} - {end}")
+        return stutter_frames
+
+    # MP4/MOV はメタデータで候補を絞り込み、近傍だけをデコード
+    if prefilter and not sequential and not isinstance(src, int) and not record_path and os.path.isfile(src):
+        results = _detect_stutter_prefiltered(src, diff_thresh, min_consec, max_frames, backend, ingest,
+                                              profiler=profiler, cascade=cascade, rois=rois)
+        if results is not None:
+            return results
+
+    # ファイル入力は複数プロセスで分割解析
+    if workers is not None and workers > 1 and not sequential and not isinstance(src, int) and not record_path:
+        results = _detect_stutter_parallel(src, diff_thresh, min_consec, max_frames, backend, workers, ingest,
+                                           profiler, cascade, rois)
+        if results is not None:
+            return results
+
+    # キャプチャオープン（録画時は BGR フレームを書き出すため VideoCapture をそのまま使う）
+    # 先読みはファイル入力だけ（ライブキャプチャは取得のタイミングを変えないように、録画は BGR を書き出すため使わない）
+    if isinstance(src, int) or record_path:
+        prefetch = None
+    if record_path:
+        cap = _open_capture(src, backend)
     else:
-        # ファイルパスやデバイス名（DirectShow文字列など）
-        if backend is not None:
-            cap = cv2.VideoCapture(src, backend)
-        else:
-            cap = cv2.VideoCapture(src)
+        # 先読みではキューに積んだフレームも保持されるので、その分のバッファを使い回す
+        cap = open_luma_reader(src, ingest, backend, open_capture=_open_capture,
+                               reuse=True if prefetch is None else prefetch.buffers())
 
     stutter_frames = []
-    frame_count = 0
 
     if not cap or not cap.isOpened():
         print(f"Error: Could not open source: {source}")
         return stutter_frames
 
-    previous_gray = None
-    consec = 0
+    # フレーム取得 → （録画） → 輝度 → 差分 → 閾値 → 連続区間 の共通パイプライン
+    # （max_frames はライブキャプチャで処理する最大フレーム数、None なら終端・切断まで）
+    frames = profiler.timed('decode', read_frames(cap, max_frames))
+    if prefetch is not None:
+        frames = prefetch.frames(frames, profiler)
 
     writer = None
     if record_path:
         # 出力ファイル用のVideoWriterを準備（入力フレームサイズと同じ設定）
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            # ファイルの終端かキャプチャが切断された
-            break
+        def record(item):
+            nonlocal writer
+            frame = item[1]
+            # VideoWriterがあれば初期化（最初のフレームのサイズを使う）
+            if writer is None:
+                h, w = frame.shape[:2]
+                writer = cv2.VideoWriter(record_path, fourcc, max(1, cap.get(cv2.CAP_PROP_FPS) or 30), (w, h))
+            with profiler.span('record'):
+                writer.write(frame)
 
-        frame_count += 1
+        frames = tap(frames, record)
 
-        # VideoWriterがあれば初期化（最初のフレームのサイズを使う）
-        if record_path and writer is None:
-            h, w = frame.shape[:2]
-            writer = cv2.VideoWriter(record_path, fourcc, max(1, cap.get(cv2.CAP_PROP_FPS) or 30), (w, h))
+    # 輝度・差分はバッファを使い回す（録画は各フレームをその場で書き出すので影響しない）
+    try:
+        for start, end in stutter_events(frames, diff_thresh, min_consec, profiler, cascade, rois, fingerprints,
+                                         reuse=True, tiles=tiles):
+            # カクつき区間を記録（区間が閉じた時点で出力される）
+            stutter_frames.append((start, end))
+            print(f"Stutter detected: frames {start} - {end}")
+    finally:
+        if prefetch is not None:
+            # 先読みのスレッドを止めてから閉じる
+            frames.close()
 
-        if writer is not None:
-            writer.write(frame)
+    if tiles is not None:
+        for f in tiles.local_freezes:
+            print(f"Localized freeze: frames {f['start']} - {f['end']} in region {tuple(f['region'])} "
+                  f"({f['tiles']} tiles)")
 
-        # グレースケールで差分を取る
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        if previous_gray is None:
-            previous_gray = gray
-            # ライブモードで手動停止したい場合に備え、continue
-            if max_frames is not None and frame_count >= max_frames:
-                break
-            continue
-
-        diff = cv2.absdiff(gray, previous_gray)
-        mean_diff = float(np.mean(diff))
-
-        # 閾値以下ならほぼ同じフレーム（スタッターの候補）
-        if mean_diff < diff_thresh:
-            consec += 1
-        else:
-            if consec >= min_consec:
-                # カクつき区間を記録（終了フレーム番号）
-                start = frame_count - consec
-                end = frame_count - 1
-                stutter_frames.append((start, end))
-                print(f"Stutter detected: frames {start} - {end} (mean_diff={mean_diff:.2f})")
-            consec = 0
-
-        previous_gray = gray
-
-        # ライブキャプチャで最大フレーム数に達したら終了
-        if max_frames is not None and frame_count >= max_frames:
-            if consec >= min_consec:
-                start = frame_count - consec + 1
-                stutter_frames.append((start, frame_count))
-            break
-
-    # ループ後の連続カウント処理
-    if consec >= min_consec:
-        start = frame_count - consec + 1
-        stutter_frames.append((start, frame_count))
+    if fingerprints is not None:
+        for r in fingerprints.repeats:
+            frames = f"frame {r['start']}" if r['frames'] == 1 else f"frames {r['start']} - {r['end']}"
+            print(f"Repeated {frames} ({r['distance']} frames back, "
+                  f"{'exact' if r['kind'] == OLDER else 'similar'})")
+        if fingerprints.runs_dropped:
+            print(f"  ... {fingerprints.runs_dropped} earlier runs not kept")
 
     if writer is not None:
         writer.release()
@@ -120,8 +352,8 @@ def detect_stutter(source, diff_thresh=2.0, min_consec=3, max_frames=None, backe
 # ===============================================
 # スクリプトを直接実行した場合の処理（CLI）
 # 使い方の例:
-#   python main.py --source 0 --max-frames 500
-#   python main.py --source "C:/path/to/video.mp4"
+#   python -m src.detector.main --source 0 --max-frames 500
+#   python -m src.detector.main --source "C:/path/to/video.mp4" --workers 4
 # ===============================================
 def _build_cli():
     p = argparse.ArgumentParser(description='Simple video stutter detector (file or capture device).')
@@ -130,6 +362,38 @@ def _build_cli():
     p.add_argument('--min-consec', type=int, default=3, help='Minimum consecutive similar frames to mark stutter')
     p.add_argument('--max-frames', type=int, default=None, help='Max frames to process (for live capture)')
     p.add_argument('--record', '-r', default=None, help='Optional path to save processed video (mp4)')
+    p.add_argument('--ingest', choices=['bgr', 'raw', 'ffmpeg', 'auto'], default='bgr',
+                   help='How to get luma: decode to BGR then convert (bgr), raw YUYV/NV12 from the device (raw), '
+                        'ffmpeg gray pipe (ffmpeg) or pick automatically (auto)')
+    p.add_argument('--cache', action='store_true',
+                   help='Store per-frame metrics next to the video (<video>.sig.npz) and reuse them on later runs')
+    p.add_argument('--workers', '-j', type=int, default=None,
+                   help='Number of processes for file analysis (splits the video into frame ranges)')
+    p.add_argument('--prefilter', action='store_true',
+                   help='For MP4/MOV files, read the sample size table first and decode only the suspicious ranges')
+    p.add_argument('--cascade', action='store_true',
+                   help='Screen frame pairs on every 8th row first and run the full-resolution diff only on '
+                        'near-identical candidates (same results, fewer full diffs)')
+    p.add_argument('--block-thresh', type=float, default=None,
+                   help='With --cascade, treat a pair as different if any 32x32 block mean diff reaches this value '
+                        '(catches small localized motion such as a mouse cursor)')
+    p.add_argument('--roi', type=parse_roi, default=None, metavar='auto|x,y,w,h[;x,y,w,h]',
+                   help='Diff only these regions. "auto" finds the moving regions from the first --roi-seconds '
+                        'of a video file (skips static taskbars, letterboxes and HUDs)')
+    p.add_argument('--roi-seconds', type=float, default=CALIBRATION_SECONDS,
+                   help='Calibration length for --roi auto (default: 5 seconds)')
+    p.add_argument('--repeats', nargs='?', type=int, const=MAX_AGE, default=None, metavar='FRAMES',
+                   help='Also report frames that repeat an older (non-adjacent) frame within the last FRAMES frames, '
+                        'e.g. A-B-A-B oscillation or replays from a stale buffer (default window: 300 frames)')
+    p.add_argument('--diff-threads', type=int, default=None, metavar='N',
+                   help='Compute each frame diff in horizontal stripes on N threads (for 4K input); also reports '
+                        'localized freezes, i.e. regions that stop while the rest of the frame keeps moving')
+    p.add_argument('--prefetch', nargs='?', type=int, const=PREFETCH_DEPTH, default=None, metavar='DEPTH',
+                   help='Decode a video file on a separate thread into a queue of DEPTH frames so decoding overlaps '
+                        'the analysis; reports whether the file is decode-bound or analysis-bound (default: 8)')
+    p.add_argument('--profile', nargs='?', const='profile.json', default=None, metavar='PATH',
+                   help='Time each pipeline stage and save p50/p95/p99, queue depth and peak RSS as JSON '
+                        '(default path: profile.json)')
     return p
 
 
@@ -146,12 +410,35 @@ if __name__ == "__main__":
         pass
 
     print(f"Opening source: {src}")
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    if args.block_thresh is not None and not args.cascade:
+        parser.error('--block-thresh requires --cascade')
+    cascade = CascadeFilter(block_thresh=args.block_thresh) if args.cascade else None
+    fingerprints = FrameIndex(args.repeats) if args.repeats else None
+    prefetch = Prefetcher(args.prefetch) if args.prefetch else None
+    if args.diff_threads is not None and args.cascade:
+        parser.error('--diff-threads cannot be combined with --cascade')
+    if args.diff_threads is not None and args.diff_threads < 1:
+        parser.error('--diff-threads must be at least 1')
+    tiles = StripeDiff(args.diff_threads) if args.diff_threads else None
     start = time.time()
-    results = detect_stutter(src, diff_thresh=args.diff_thresh, min_consec=args.min_consec, max_frames=args.max_frames, record_path=args.record)
+    results = detect_stutter(src, diff_thresh=args.diff_thresh, min_consec=args.min_consec, max_frames=args.max_frames, record_path=args.record,
+                             workers=args.workers, ingest=args.ingest, cache=args.cache,
+                             prefilter=args.prefilter, profiler=profiler, cascade=cascade, roi=args.roi,
+                             roi_seconds=args.roi_seconds, fingerprints=fingerprints, prefetch=prefetch, tiles=tiles)
     elapsed = time.time() - start
+    if tiles is not None:
+        tiles.close()
 
     if results:
         print(f"Stutter detected at intervals: {results}")
     else:
         print("No stutter detected.")
     print(f"Processed in {elapsed:.2f}s")
+    if cascade is not None and cascade.pairs:
+        print(cascade.summary())
+    if fingerprints is not None:
+        print(f"Repeats: {fingerprints.stats()}")
+    if prefetch is not None and prefetch.frames_read:
+        print(prefetch.summary())
+    finish_profile(profiler, args.profile)
@@ -0,0 +1,241 @@
+import csv
+import json
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+# ===============================================
+# 計測ログの書き出し（ライブキャプチャのワーカーで共通）
+#
+# ファイルは開いたままにし、行は固定 dtype の NumPy レコード配列にため込んで
+# 「flush_rows 行たまった」「flush_interval 秒経った」のどちらかでまとめて書き出す。
+# 書き出しはバックグラウンドのスレッドでも flush_interval ごとに行うため、
+# プロセスが落ちても失うのは最後の flush_interval 秒分（未書き出しの行）だけ。
+#
+# 形式:
+#   'csv'  : ヘッダー付き CSV（従来の *_log.csv と同じ列）
+#   'mlog' : 列指向のバイナリ（チャンクごとに列を連続して並べる）。convert_to_csv で CSV に変換できる
+#            [MAGIC][ヘッダー長 u4][ヘッダー JSON] ([CHUNK_MAGIC][行数 u4][列0][列1]...)*
+#            途中で落ちて最後のチャンクが欠けていても、読み込み時はそのチャンクだけ捨てる
+# ===============================================
+
+MAGIC = b'MLOG\x01\x00\x00\x00'
+CHUNK_MAGIC = b'CHNK'
+LOG_FORMATS = ('csv', 'mlog')
+
+
+def clock_text(timestamp):
+    """UNIX 時刻（秒）を従来のログと同じ "HH:MM:SS.mmm" 形式にする"""
+    return datetime.fromtimestamp(timestamp).strftime("%H:%M:%S.%f")[:-3]
+
+
+def _formatter(fmt):
+    if fmt is None:
+        return lambda v: v
+    if callable(fmt):
+        return fmt
+    return fmt.format
+
+
+class MetricsLog:
+    """
+    行をまとめて書き出す計測ログ
+
+    Parameters:
+    path (str): 出力先（format='mlog' なら拡張子は .mlog を推奨）
+    fields (list of tuple): (列名, NumPy dtype) のリスト
+    format (str): 'csv' または 'mlog'
+    flush_rows (int): この行数たまったら書き出す
+    flush_interval (float): 最後の書き出しからこの秒数経ったら書き出す（0 以下ならバックグラウンド書き出しなし）
+    formats (dict): CSV 出力時の列ごとの書式（"{:.3f}" のような文字列または関数）
+    fsync (bool): 書き出しごとに os.fsync する（電源断にも備える場合）
+    """
+
+    def __init__(self, path, fields, format='csv', flush_rows=1024, flush_interval=1.0, formats=None, fsync=False):
+        if format not in LOG_FORMATS:
+            raise ValueError(f"Unknown log format: {format} (expected one of {LOG_FORMATS})")
+        self.path = path
+        self.format = format
+        self.dtype = np.dtype(list(fields))
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval = flush_interval or 0
+        self.fsync = fsync
+        self.rows_written = 0
+        self.flushes = 0
+
+        formats = formats or {}
+        self._formatters = [_formatter(formats.get(name)) for name in self.dtype.names]
+        self._chunk = np.zeros(self.flush_rows, dtype=self.dtype)
+        self._count = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+        if format == 'csv':
+            self._file = open(path, 'w', newline='', encoding='utf-8')
+            self._csv = csv.writer(self._file)
+            self._csv.writerow(self.dtype.names)
+        else:
+            self._file = open(path, 'wb')
+            header = json.dumps({'descr': self.dtype.descr}).encode('utf-8')
+            self._file.write(MAGIC + struct.pack('<I', len(header)) + header)
+        self._sync()
+
+        self._thread = None
+        if self.flush_interval > 0:
+            self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._thread.start()
+
+    def append(self, *values):
+        """1 行を追加する（値は fields の順）"""
+        with self._lock:
+            self._chunk[self._count] = values
+            self._count += 1
+            if self._count >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_interval > 0:
+                self._flush_locked()
+
+    def flush(self):
+        """ため込んだ行を書き出す"""
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """残りの行を書き出してファイルを閉じる（複数回呼んでもよい）"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            self._flush_locked()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                if self._count and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._count:
+            return
+        rows = self._chunk[:self._count]
+        if self.format == 'csv':
+            formatters = self._formatters
+            self._csv.writerows([f(v) for f, v in zip(formatters, row)] for row in rows.tolist())
+        else:
+            self._file.write(CHUNK_MAGIC + struct.pack('<I', self._count))
+            for name in self.dtype.names:
+                self._file.write(np.ascontiguousarray(rows[name]).tobytes())
+        self._sync()
+        self.rows_written += self._count
+        self.flushes += 1
+        self._count = 0
+
+    def _sync(self):
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+
+def _read_header(f, path):
+    """ファイルの先頭からヘッダーを読み、行の dtype を返す（f はヘッダーの直後を指す）"""
+    if f.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"Not a metrics log: {path}")
+    (header_len,) = struct.unpack('<I', f.read(4))
+    header = json.loads(f.read(header_len))
+    return np.dtype([tuple(field) for field in header['descr']])
+
+
+def metrics_log_dtype(path):
+    """'mlog' 形式のログの行の dtype（列名は dtype.names）"""
+    with open(path, 'rb') as f:
+        return _read_header(f, path)
+
+
+def iter_metrics_log(path):
+    """
+    'mlog' 形式のログをチャンクごとに読む関数（ファイル全体をメモリに読み込まない）
+
+    Parameters:
+    path (str): MetricsLog(format='mlog') の出力
+
+    Yields:
+    numpy.ndarray: チャンクごとのレコード配列（途中で切れた最後のチャンクは含まない）
+    """
+    with open(path, 'rb') as f:
+        dtype = _read_header(f, path)
+        while True:
+            head = f.read(8)
+            if len(head) < 8 or head[:4] != CHUNK_MAGIC:
+                return
+            (count,) = struct.unpack_from('<I', head, 4)
+            data = f.read(count * dtype.itemsize)
+            if len(data) < count * dtype.itemsize:
+                return
+            chunk = np.empty(count, dtype=dtype)
+            offset = 0
+            for name in dtype.names:
+                column = dtype.fields[name][0]
+                chunk[name] = np.frombuffer(data, dtype=column, count=count, offset=offset)
+                offset += count * column.itemsize
+            yield chunk
+
+
+def read_metrics_log(path):
+    """
+    'mlog' 形式のログを読み込む関数
+
+    Parameters:
+    path (str): MetricsLog(format='mlog') の出力
+
+    Returns:
+    numpy.ndarray: 全行のレコード配列（途中で切れた最後のチャンクは含まない）
+    """
+    chunks = list(iter_metrics_log(path))
+    if not chunks:
+        return np.empty(0, dtype=metrics_log_dtype(path))
+    return np.concatenate(chunks)
+
+
+def convert_to_csv(path, csv_path=None, formats=None):
+    """
+    'mlog' 形式のログを CSV に変換する関数
+
+    Parameters:
+    path (str): 'mlog' 形式のログ
+    csv_path (str): 出力先（省略時は拡張子を .csv にしたパス）
+    formats (dict): 列ごとの書式（MetricsLog と同じ）
+
+    Returns:
+    str: 出力した CSV のパス
+    """
+    records = read_metrics_log(path)
+    if csv_path is None:
+        csv_path = os.path.splitext(path)[0] + '.csv'
+    formatters = [_formatter((formats or {}).get(name)) for name in records.dtype.names]
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(records.dtype.names)
+        writer.writerows([fmt(v) for fmt, v in zip(formatters, row)] for row in records.tolist())
+    return csv_path
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert binary metrics logs (.mlog) to CSV')
+    parser.add_argument('logs', nargs='+', help='.mlog files')
+    for log in parser.parse_args().logs:
+        print(convert_to_csv(log))
@@ -0,0 +1,288 @@
+import mmap
+import statistics
+import struct
+import sys
+from array import array
+
+# ===============================================
+# MP4 / MOV のサンプルテーブル（stsz / stts / ctts）を読むプレフィルター
+# 標準ライブラリのみで実装し、ファイルはメモリマップで読む（画素のデコードは一切しない）
+#
+# エンコーダーは静止・重複フレームに対して非常に小さい P/B サンプルを書き出し、
+# イントラのみのコーデック（stss がない = 全サンプルがキーフレーム）では同一フレームが同じサイズのサンプルになる。
+# そこで「小さいサンプル」（イントラのみなら「直前と同じサイズのサンプル」）が連続する区間をカクつき候補とし、
+# （途中のキーフレームは区間を切らない）
+# 表示時刻（PTS）の間隔が乱れている箇所も合わせて秒単位で返す。
+# main.detect_stutter(prefilter=True) は候補の近傍だけをデコードして確認する。
+#
+# 注意:
+#   - フラグメント化 MP4（moof / trun）には対応していない（ValueError）
+#   - 編集リスト（elst）は考慮しないため、フレーム番号は数フレームずれる可能性がある
+# ===============================================
+
+# 子ボックスを持つコンテナボックス
+CONTAINER_BOXES = {b'moov', b'trak', b'mdia', b'minf', b'stbl', b'edts', b'dinf'}
+
+
+class SampleTable:
+    """1 本の映像トラックのサンプル情報（デコード順）"""
+
+    def __init__(self, timescale, sizes, deltas, cts_offsets=None, sync_samples=None):
+        self.timescale = timescale
+        self.sizes = sizes                # 各サンプルのバイト数
+        self.deltas = deltas              # 各サンプルの長さ（timescale 単位）
+        self.cts_offsets = cts_offsets    # 表示時刻のオフセット（B フレームがある場合のみ）
+        self.sync_samples = sync_samples  # キーフレームのサンプル番号（1 始まり）の集合、None なら全てキーフレーム
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def presentation_order(self):
+        """
+        表示順に並べた (PTS 秒, サンプルサイズ, キーフレームか) のリストを返す
+
+        OpenCV が返すフレーム番号（1 始まり）は、このリストの添字 + 1 に対応する
+        """
+        dts = 0
+        entries = []
+        for i, size in enumerate(self.sizes):
+            pts = dts + (self.cts_offsets[i] if self.cts_offsets else 0)
+            is_sync = self.sync_samples is None or (i + 1) in self.sync_samples
+            entries.append((pts, size, is_sync))
+            dts += self.deltas[i] if i < len(self.deltas) else 0
+        entries.sort(key=lambda e: e[0])
+        return [(pts / self.timescale, size, is_sync) for pts, size, is_sync in entries]
+
+
+def _iter_boxes(buf, start, end):
+    """[start, end) の範囲にあるボックスを (type, 本体の開始位置, 終了位置) で返す"""
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack_from('>I4s', buf, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from('>Q', buf, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            raise ValueError(f"Corrupt MP4 box '{box_type!r}' at offset {pos}")
+        yield box_type, pos + header, pos + size
+        pos += size
+
+
+def _u32_array(buf, offset, count):
+    """ビッグエンディアンの uint32 列を array('I') として読む"""
+    values = array('I')
+    values.frombytes(bytes(buf[offset:offset + count * 4]))
+    if sys.byteorder == 'little':
+        values.byteswap()
+    return values
+
+
+def _parse_stsz(buf, start):
+    sample_size, count = struct.unpack_from('>II', buf, start + 4)
+    if sample_size:
+        return array('I', [sample_size]) * count
+    return _u32_array(buf, start + 12, count)
+
+
+def _parse_stz2(buf, start):
+    field_size = buf[start + 7]
+    count = struct.unpack_from('>I', buf, start + 8)[0]
+    data = buf[start + 12:]
+    if field_size == 8:
+        return array('I', bytes(data[:count]))
+    if field_size == 16:
+        values = array('H')
+        values.frombytes(bytes(data[:count * 2]))
+        if sys.byteorder == 'little':
+            values.byteswap()
+        return array('I', values)
+    if field_size == 4:
+        sizes = array('I')
+        for byte in bytes(data[:(count + 1) // 2]):
+            sizes.append(byte >> 4)
+            sizes.append(byte & 0x0F)
+        return sizes[:count]
+    raise ValueError(f"Unsupported stz2 field size: {field_size}")
+
+
+def _expand_runs(buf, start, signed=False):
+    """stts / ctts の (count, value) エントリを 1 サンプルずつに展開する"""
+    entry_count = struct.unpack_from('>I', buf, start + 4)[0]
+    raw = _u32_array(buf, start + 8, entry_count * 2)
+    values = array('q') if signed else array('Q')
+    for i in range(entry_count):
+        value = raw[2 * i + 1]
+        if signed and value >= 1 << 31:
+            value -= 1 << 32
+        values.extend([value] * raw[2 * i])
+    return values
+
+
+def _parse_trak(buf, start, end):
+    handler = None
+    timescale = None
+    tables = {}
+    stack = [(start, end)]
+    while stack:
+        s, e = stack.pop()
+        for box_type, body, box_end in _iter_boxes(buf, s, e):
+            if box_type in CONTAINER_BOXES:
+                stack.append((body, box_end))
+            elif box_type == b'hdlr':
+                handler = bytes(buf[body + 8:body + 12])
+            elif box_type == b'mdhd':
+                version = buf[body]
+                offset = body + (20 if version == 1 else 12)
+                timescale = struct.unpack_from('>I', buf, offset)[0]
+            elif box_type == b'stsz':
+                tables['sizes'] = _parse_stsz(buf, body)
+            elif box_type == b'stz2':
+                tables['sizes'] = _parse_stz2(buf, body)
+            elif box_type == b'stts':
+                tables['deltas'] = _expand_runs(buf, body)
+            elif box_type == b'ctts':
+                tables['cts_offsets'] = _expand_runs(buf, body, signed=buf[body] == 1)
+            elif box_type == b'stss':
+                count = struct.unpack_from('>I', buf, body + 4)[0]
+                tables['sync_samples'] = set(_u32_array(buf, body + 8, count))
+    return handler, timescale, tables
+
+
+def read_sample_table(path):
+    """
+    MP4 / MOV ファイルから最初の映像トラックのサンプルテーブルを読む関数
+
+    Parameters:
+    path (str): 動画ファイルのパス
+
+    Returns:
+    SampleTable: サンプルサイズ・長さ・表示時刻オフセット
+
+    Raises:
+    ValueError: MP4 / MOV でない、映像トラックがない、フラグメント化 MP4 の場合
+    """
+    with open(path, 'rb') as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError(f"Empty file: {path}")
+    with mm:
+        buf = memoryview(mm)
+        try:
+            top = {box_type: (body, end) for box_type, body, end in _iter_boxes(buf, 0, len(buf))}
+            if b'moov' not in top:
+                raise ValueError(f"No moov box (not an MP4/MOV file?): {path}")
+            for box_type, body, end in _iter_boxes(buf, *top[b'moov']):
+                if box_type != b'trak':
+                    continue
+                handler, timescale, tables = _parse_trak(buf, body, end)
+                if handler != b'vide' or 'sizes' not in tables:
+                    continue
+                if not tables['sizes'] and b'moof' in top:
+                    raise ValueError(f"Fragmented MP4 is not supported: {path}")
+                return SampleTable(timescale or 1, tables['sizes'], tables.get('deltas', array('Q')),
+                                   tables.get('cts_offsets'), tables.get('sync_samples'))
+            raise ValueError(f"No video track found: {path}")
+        finally:
+            buf.release()
+
+
+def find_candidates(table, min_consec=3, small_ratio=0.25):
+    """
+    サンプルサイズからカクつき候補区間を求める関数
+
+    Parameters:
+    table (SampleTable): read_sample_table の戻り値
+    min_consec (int): 候補にする最小連続サンプル数
+    small_ratio (float): キーフレーム以外のサイズ中央値に対してこの比率以下のサンプルを「小さい」とみなす
+
+    Returns:
+    list of dict: {'start_frame', 'end_frame'（1 始まり・両端含む）, 'start_sec', 'end_sec'}
+    """
+    frames = table.presentation_order()
+    if not frames:
+        return []
+    sizes = [size for _, size, _ in frames]
+    intra_only = table.sync_samples is None
+    if not intra_only:
+        inter = [size for _, size, is_sync in frames if not is_sync] or sizes
+        small = statistics.median(inter) * small_ratio
+
+    candidates = []
+    run_start = None
+    last_suspect = None
+    for i in range(1, len(frames) + 1):
+        if i == len(frames):
+            suspect = False
+        elif intra_only:
+            suspect = sizes[i] == sizes[i - 1]
+        elif frames[i][2]:
+            # キーフレームは静止中でも大きいので、区間の途中なら継続扱い（区間は始めない）
+            suspect = None if run_start is not None else False
+        else:
+            suspect = sizes[i] <= small
+
+        if suspect:
+            if run_start is None:
+                run_start = i
+            last_suspect = i
+        elif suspect is False and run_start is not None:
+            if last_suspect - run_start + 1 >= min_consec:
+                candidates.append({
+                    'start_frame': run_start + 1,
+                    'end_frame': last_suspect + 1,
+                    'start_sec': frames[run_start][0],
+                    'end_sec': frames[last_suspect][0],
+                })
+            run_start = None
+    return candidates
+
+
+def find_irregular_timestamps(table, tolerance=0.5):
+    """
+    表示時刻（PTS）の間隔が中央値から tolerance（比率）以上ずれている箇所を求める関数
+
+    Returns:
+    list of dict: {'frame'（1 始まり）, 'time_sec', 'interval_sec', 'expected_sec'}
+    """
+    times = [pts for pts, _, _ in table.presentation_order()]
+    intervals = [b - a for a, b in zip(times, times[1:])]
+    if not intervals:
+        return []
+    expected = statistics.median(intervals)
+    irregular = []
+    for i, interval in enumerate(intervals, start=1):
+        if abs(interval - expected) > expected * tolerance:
+            irregular.append({
+                'frame': i + 1,
+                'time_sec': times[i],
+                'interval_sec': interval,
+                'expected_sec': expected,
+            })
+    return irregular
+
+
+def scan(path, min_consec=3, small_ratio=0.25, tolerance=0.5):
+    """
+    MP4 / MOV ファイルのメタデータだけを走査してカクつき候補と時刻の乱れを返す関数
+
+    Returns:
+    dict: {'frames', 'duration_sec', 'candidates', 'irregular_timestamps'}
+    """
+    table = read_sample_table(path)
+    return {
+        'frames': len(table),
+        'duration_sec': sum(table.deltas) / table.timescale,
+        'candidates': find_candidates(table, min_consec, small_ratio),
+        'irregular_timestamps': find_irregular_timestamps(table, tolerance),
+    }
+
+
+if __name__ == '__main__':
+    import json
+
+    for video in sys.argv[1:]:
+        print(json.dumps({'video': video, **scan(video)}, ensure_ascii=False, indent=2))
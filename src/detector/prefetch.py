@@ -0,0 +1,156 @@
+import threading
+import time
+from queue import Empty, Full, Queue
+
+from .profiling import NULL_PROFILER
+
+# ===============================================
+# デコードと解析を重ねる先読み（--prefetch）
+#
+# ファイル解析は「1 フレームをデコード → 差分 → 次のフレームをデコード」を交互に行うため、
+# デコード中は解析が、解析中はデコードが止まっている。OpenCV のデコード・色変換と NumPy / OpenCV の集約は
+# どちらも GIL を解放するので、デコードを別スレッドで進めれば 2 つを重ねられる。
+#
+# Prefetcher.frames は上流の段（read_frames など）をデコードスレッドで回し、長さ depth のキューに積む。
+# 解析側（呼び出したスレッド）はキューから順に取り出す。キューが一杯ならデコード側が、空なら解析側が待つ:
+#   - 解析側の待ち時間が長い → デコードが律速（decode-bound）。キューを深くしても速くならない
+#   - デコード側の待ち時間が長い → 解析が律速（analysis-bound）。--cascade / --roi などで解析を軽くすると速くなる
+# 待ち時間とキューの深さは stats() / summary() と profiler（prefetch.* の段・gauge）に残る。
+#
+# 読み込みのバッファを使い回す場合（ingest の reuse）は、デコード中の 1 枚・キューの depth 枚・
+# 解析中の今回と前回の 2 枚が同時に使われるため、buffers()（= depth + 3）組のバッファが必要。
+#
+# 使い方:
+#   python -m src.detector.main --source video.mp4 --prefetch
+#   python -m src.detector.cli video.mp4 --prefetch 16
+# ===============================================
+
+# 既定のキューの長さ（フレーム数）
+DEPTH = 8
+
+# デコードスレッドがキューの空き・停止を確かめる間隔（秒）
+_POLL_SEC = 0.1
+
+_END = object()
+
+
+class Prefetcher:
+    """
+    デコードスレッドと長さ depth のキューでフレームを先読みする段
+
+    Attributes:
+    depth (int): キューの長さ（フレーム数）
+    frames_read (int): 解析側に渡したフレーム数
+    producer_stall_ns (int): デコード側がキューの空きを待った時間の合計
+    consumer_stall_ns (int): 解析側がフレームを待った時間の合計
+    max_queue_depth (int): 解析側が取り出す時点のキューの深さの最大値
+    """
+
+    def __init__(self, depth=DEPTH):
+        if depth < 1:
+            raise ValueError(f"Prefetch depth must be at least 1: {depth}")
+        self.depth = depth
+        self.frames_read = 0
+        self.producer_stall_ns = 0
+        self.consumer_stall_ns = 0
+        self.max_queue_depth = 0
+        self._depth_total = 0
+        self._error = None
+
+    def buffers(self):
+        """読み込みのバッファを使い回す場合に必要な組数（ingest.open_luma_reader の reuse に渡す）"""
+        return self.depth + 3
+
+    def _put(self, queue, item, stop, profiler):
+        """キューに空きができるまで待って積む（解析側が止めたら False）"""
+        start = time.perf_counter_ns()
+        with profiler.span('prefetch.full'):
+            while not stop.is_set():
+                try:
+                    queue.put(item, timeout=_POLL_SEC)
+                    break
+                except Full:
+                    continue
+        self.producer_stall_ns += time.perf_counter_ns() - start
+        return not stop.is_set()
+
+    def _produce(self, items, queue, stop, profiler):
+        try:
+            for item in items:
+                if not self._put(queue, item, stop, profiler):
+                    break
+        except BaseException as e:
+            # 例外は解析側で投げ直す
+            self._error = e
+        finally:
+            close = getattr(items, 'close', None)
+            if close is not None:
+                close()
+            self._put(queue, _END, stop, profiler)
+
+    def frames(self, items, profiler=NULL_PROFILER):
+        """
+        items をデコードスレッドで先読みしながら順に流す段
+
+        Parameters:
+        items: (フレーム番号, フレーム) のイテレータ（デコードスレッドで回す）
+        profiler (profiling.Profiler): 解析側の待ち時間（prefetch.wait）、デコード側の待ち時間（prefetch.full）、
+                                       キューの深さ（prefetch.depth）を記録する
+
+        Yields:
+        items と同じ要素（順序も同じ）
+        """
+        queue = Queue(maxsize=self.depth)
+        stop = threading.Event()
+        self._error = None
+        thread = threading.Thread(target=self._produce, args=(items, queue, stop, profiler), name='prefetch', daemon=True)
+        thread.start()
+        try:
+            while True:
+                depth = queue.qsize()
+                start = time.perf_counter_ns()
+                # span にすると待ち時間が下流の段（luma など）の時間から差し引かれる
+                with profiler.span('prefetch.wait'):
+                    item = queue.get()
+                self.consumer_stall_ns += time.perf_counter_ns() - start
+                if item is _END:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                profiler.gauge('prefetch.depth', depth)
+                self._depth_total += depth
+                if depth > self.max_queue_depth:
+                    self.max_queue_depth = depth
+                self.frames_read += 1
+                yield item
+        finally:
+            # 途中で止めた場合（例外・max_frames など）もデコードスレッドを止めてから戻る
+            # （呼び出し側がこの後で読み込みを閉じられるように）
+            stop.set()
+            while thread.is_alive():
+                try:
+                    queue.get_nowait()
+                except Empty:
+                    thread.join(_POLL_SEC)
+
+    def stats(self):
+        """
+        Returns:
+        dict: {'depth', 'frames', 'mean_queue_depth', 'max_queue_depth', 'producer_stall_ms', 'consumer_stall_ms',
+               'bound'（'decode' = 解析がデコードを待った方が長い / 'analysis' = デコードが解析を待った方が長い）}
+        """
+        return {
+            'depth': self.depth,
+            'frames': self.frames_read,
+            'mean_queue_depth': round(self._depth_total / self.frames_read, 2) if self.frames_read else 0.0,
+            'max_queue_depth': self.max_queue_depth,
+            'producer_stall_ms': round(self.producer_stall_ns / 1e6, 3),
+            'consumer_stall_ms': round(self.consumer_stall_ns / 1e6, 3),
+            'bound': 'decode' if self.consumer_stall_ns >= self.producer_stall_ns else 'analysis',
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"Prefetch: {s['frames']} frames, queue depth mean {s['mean_queue_depth']:.1f} / max "
+                f"{s['max_queue_depth']} of {s['depth']}, decoder waited {s['producer_stall_ms']:.1f} ms (queue full), "
+                f"analysis waited {s['consumer_stall_ms']:.1f} ms (queue empty) -> {s['bound']}-bound")
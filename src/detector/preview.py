@@ -0,0 +1,104 @@
+import time
+
+import cv2
+import numpy as np
+
+# ===============================================
+# ライブキャプチャのプレビュー（取得・検知の本体とは切り離した任意の読み手）
+#
+# プレビューはリングの最新フレーム（ring.latest()）を自分のレートで取りに行くだけで、
+# 取得ループやワーカーのシーケンスには関与しない。ウィンドウは WINDOW_NORMAL で作るので
+# ドラッグ・リサイズでき、閉じてもプレビューが終わるだけでキャプチャは続く。
+# 'q' キーは on_quit（スレッド版は stop_flag.set、マルチプロセス版は control.py の stop）を呼ぶ。
+# ===============================================
+
+WINDOW_TITLE = "Preview"
+
+
+class PreviewWindow:
+    """
+    リングの最新フレームを display_fps で表示するウィンドウ
+
+    Parameters:
+    display_fps (float): 表示の更新レート
+    title (str): ウィンドウ名
+    """
+
+    def __init__(self, display_fps, title=WINDOW_TITLE):
+        self.title = title
+        self.interval = 1.0 / display_fps
+        self._buffer = None  # 文字を描き込むためのプレビュー用バッファ（使い回す）
+        self._prev_time = time.perf_counter()
+        cv2.namedWindow(title, cv2.WINDOW_NORMAL)
+
+    def step(self, ring):
+        """
+        次の表示時刻まで待って最新フレームを表示する
+
+        Returns:
+        str | None: 'quit'（'q' キー） / 'closed'（ウィンドウが閉じられた） / None
+        """
+        wait_ms = max(1, int((self._prev_time + self.interval - time.perf_counter()) * 1000))
+        if cv2.waitKey(wait_ms) & 0xFF == ord('q'):
+            return 'quit'
+        if cv2.getWindowProperty(self.title, cv2.WND_PROP_VISIBLE) < 1:
+            return 'closed'
+
+        now = time.perf_counter()
+        fps_disp = 1.0 / max(now - self._prev_time, 1e-6)
+        self._prev_time = now
+        _, frame = ring.latest()
+        if frame is not None:
+            if self._buffer is None or self._buffer.shape != frame.shape:
+                self._buffer = np.empty_like(frame)
+            np.copyto(self._buffer, frame)
+            cv2.putText(self._buffer, f"Display FPS: {fps_disp:.2f}",
+                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
+            cv2.imshow(self.title, self._buffer)
+        return None
+
+    def close(self):
+        try:
+            cv2.destroyWindow(self.title)
+            cv2.waitKey(1)
+        except cv2.error:
+            pass
+
+
+def open_preview(display_fps, title=WINDOW_TITLE):
+    """display_fps が 0 または GUI が使えない環境（opencv-headless など）では None を返す"""
+    if not display_fps:
+        return None
+    try:
+        return PreviewWindow(display_fps, title)
+    except cv2.error as e:
+        print(f"⚠ プレビューを表示できません（ヘッドレスで続行）: {e}")
+        return None
+
+
+def preview_main(meta, stop_event, display_fps, control_endpoint):
+    """
+    プレビュープロセス: 共有リング（shm_capture.SharedFrameRing）にアタッチして最新フレームを表示する
+
+    'q' キーで control.py の stop を送り、ウィンドウを閉じたらこのプロセスだけが終了する
+    """
+    from .control import send_command
+    from .shm_capture import SharedFrameRing
+
+    window = open_preview(display_fps)
+    if window is None:
+        return
+    ring = SharedFrameRing.attach(meta)
+    try:
+        while not stop_event.is_set():
+            event = window.step(ring)
+            if event == 'quit':
+                print("🧍 ユーザー操作による終了")
+                send_command(control_endpoint, 'stop')
+                break
+            if event == 'closed':
+                print("🪟 プレビューを閉じました（キャプチャは継続中）")
+                break
+    finally:
+        window.close()
+        ring.close()
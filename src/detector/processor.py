@@ -1,20 +1,364 @@
+from .backend import lazy_import
+from .ingest import BufferRing, open_luma_reader
+from .profiling import NULL_PROFILER
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
 # ===============================================
 # 動画処理およびカクつき解析モジュール
+#
+# フレーム取得からカクつき区間の出力までを、イテレータを受け取って yield する
+# ジェネレーターの段（ステージ）として組み立てる:
+#
+#   read_frames → to_luma → frame_diffs → diff_metric → below_threshold → group_runs → (sink)
+#
+# 各段は 1〜2 フレーム分しか保持しないため、長時間の動画やライブキャプチャでもメモリ使用量は一定
+# ファイル解析（main.detect_stutter / analyzer.VideoAnalyzer）、ライブキャプチャ、CLI はこの段を共有する
+#
+# fingerprints（fingerprint.FrameIndex）を指定すると to_luma の後で各フレームの指紋を索引に加え、
+# 隣接していない重複フレーム（A-B-A-B の往復・古いフレームの再送）も記録する
+# rois を指定すると to_luma の後に crop_regions を挟み、以降の段は関心領域（ROI）の画素だけを処理する（roi.py）
+# cascade を指定すると frame_diffs → diff_metric → below_threshold の代わりに CascadeFilter.flags を使い、
+# 間引いた行だけで「明らかに違う」と分かったフレームの組では全解像度の差分を計算しない（結果は同じ）
+#
+# reuse=True の段は出力先のバッファを使い回す（cvtColor / absdiff の dst、輝度は 2 枚を交互に使う ping-pong）。
+# 平均差分は cv2.norm(NORM_L1) / 画素数で求め、np.mean のような一時配列を作らない（値は np.mean と一致する）。
+# 定常状態ではフレームごとの画像の確保がほぼなくなる（python -m tests.benchmark_alloc）。
+# process_video(prefetch=) はデコードを別スレッドで先読みし（prefetch.py）、以降の段と重ねる。
+# tiles（tiles.StripeDiff）を指定すると frame_diffs → diff_metric の代わりに横帯ごとの並列な差分を使う（値は同じ）。
+# ===============================================
+
+
+def read_frames(cap, max_frames=None, first_index=1):
+    """
+    VideoCapture 互換オブジェクトからフレームを順に取り出す段
+
+    Parameters:
+    cap: read() -> (ret, frame) を持つオブジェクト（cv2.VideoCapture / ingest のリーダー）
+    max_frames (int | None): 取り出す最大フレーム数
+    first_index (int): 最初のフレームに付ける番号（既定は 1 始まり）
+
+    Yields:
+    (int, numpy.ndarray): (フレーム番号, フレーム)
+    """
+    index = first_index
+    count = 0
+    while max_frames is None or count < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield index, frame
+        index += 1
+        count += 1
+
+
+def tap(items, func):
+    """各要素に func を適用してからそのまま流す段（録画・ログ・計測用）"""
+    for item in items:
+        func(item)
+        yield item
+
+
+def to_luma(frames, reuse=False):
+    """
+    BGR フレームをグレースケールに変換する段（既に 2 次元ならそのまま流す）
+
+    reuse=True なら 2 枚の出力バッファに交互に変換する（出力は 2 フレーム後に上書きされる）
+    """
+    lumas = BufferRing() if reuse else None
+    for index, frame in frames:
+        if frame.ndim == 2:
+            yield index, frame
+        elif lumas is None:
+            yield index, cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        else:
+            yield index, lumas.keep(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=lumas.next()))
+
+
+def crop_regions(frames, rois, reuse=False):
+    """
+    輝度フレームから関心領域（ROI）だけを切り出す段
+
+    Parameters:
+    rois (list of tuple): (x, y, w, h) のリスト。1 つならコピーなしのビュー、複数なら各領域を 1 列に連結する
+                          （平均差分は全 ROI の画素の平均になる）
+    reuse (bool): 複数の ROI を連結するバッファを 2 枚交互に使う
+
+    Yields:
+    (int, numpy.ndarray): (フレーム番号, 切り出した輝度)
+    """
+    slices = None
+    joined = BufferRing() if reuse else None
+    for index, frame in frames:
+        if slices is None:
+            h, w = frame.shape[:2]
+            slices = []
+            for x, y, rw, rh in rois:
+                x0, y0, x1, y1 = max(0, x), max(0, y), min(w, x + rw), min(h, y + rh)
+                if x1 <= x0 or y1 <= y0:
+                    raise ValueError(f"ROI {(x, y, rw, rh)} is outside the {w}x{h} frame")
+                slices.append((slice(y0, y1), slice(x0, x1)))
+        if len(slices) == 1:
+            yield index, frame[slices[0]]
+        elif joined is None:
+            yield index, np.concatenate([frame[s].reshape(-1) for s in slices]).reshape(-1, 1)
+        else:
+            out = joined.next()
+            if out is None:
+                out = np.empty((sum(frame[s].size for s in slices), 1), dtype=frame.dtype)
+            offset = 0
+            for s in slices:
+                region = frame[s]
+                np.copyto(out[offset:offset + region.size].reshape(region.shape), region)
+                offset += region.size
+            yield index, joined.keep(out)
+
+
+def frame_diffs(frames, reuse=False):
+    """
+    前フレームとの絶対差分を求める段（保持するのは直前の 1 フレームのみ）
+
+    Parameters:
+    reuse (bool): True なら差分画像を 1 枚のバッファに書き込む（次のフレームで上書きされるため、
+                  diff_metric のようにその場で集約する段に渡すこと）
+
+    Yields:
+    (int, numpy.ndarray): (フレーム番号, 差分画像)。最初のフレームは前フレームがないため出力しない
+    """
+    previous = None
+    out = None
+    for index, frame in frames:
+        if previous is not None:
+            if reuse:
+                out = cv2.absdiff(frame, previous, dst=out)
+                yield index, out
+            else:
+                yield index, cv2.absdiff(frame, previous)
+        previous = frame
+
+
+def diff_metric(diffs, metric='mean'):
+    """
+    差分画像を 1 つの数値に集約する段
+
+    Parameters:
+    metric (str): 'mean'（平均差分） / 'nonzero'（差分がある画素数） / 'max'（最大差分）
+    """
+    if metric == 'mean':
+        # L1 ノルム（画素値の総和）/ 画素数: np.mean と同じ値で、一時配列を作らない
+        reduce = lambda d: cv2.norm(d, cv2.NORM_L1) / d.size
+    elif metric == 'nonzero':
+        reduce = lambda d: int(np.count_nonzero(d))
+    elif metric == 'max':
+        reduce = lambda d: int(d.max())
+    else:
+        raise ValueError(f"Unknown metric: {metric}")
+    for index, diff in diffs:
+        yield index, reduce(diff)
+
+
+def below_threshold(values, threshold):
+    """値が閾値未満（＝前フレームとほぼ同一）かどうかを判定する段"""
+    for index, value in values:
+        yield index, value < threshold
+
+
+def group_runs(flags, min_consec=3):
+    """
+    ほぼ同一フレームの連続区間をまとめる段（区間が閉じた時点で出力する）
+
+    Parameters:
+    flags: (フレーム番号, bool) のイテレータ
+    min_consec (int): 出力する最小連続フレーム数
+
+    Yields:
+    (int, int): (開始フレーム番号, 終了フレーム番号)
+    """
+    run_start = None
+    last_index = None
+    for index, similar in flags:
+        if similar:
+            if run_start is None:
+                run_start = index
+        elif run_start is not None:
+            if index - run_start >= min_consec:
+                yield run_start, index - 1
+            run_start = None
+        last_index = index
+    # 末尾まで続いた区間
+    if run_start is not None and last_index - run_start + 1 >= min_consec:
+        yield run_start, last_index
+
+
 # ===============================================
+# 2 段のカスケード判定（間引いた行で「明らかに違う」組を落とす → 残りだけ全解像度で確認）
+# ===============================================
+class CascadeFilter:
+    """
+    ほぼ同一フレームの判定を 2 段で行うフィルター
+
+    1 段目: stride 行おきの行だけで絶対差分の合計を求める（cv2.norm の L1、行の間引きはコピーなしのビュー）。
+            差分は非負なので、一部の画素の合計は全画素の合計を超えない。間引いた行の合計だけで
+            diff_thresh × 全画素数 に達した組は、全解像度の平均差分も必ず閾値以上（＝明らかに違う）なので
+            全解像度の差分を計算せずに落とす。
+    2 段目: 残った組だけ全解像度の絶対差分の平均で判定する（整数の合計 / 画素数なので
+            stutter_events の既定の diff_metric('mean') と同じ値）。
+            block_thresh を指定すると、さらに block 画素四方のブロック平均差分の最大値が block_thresh 以上の組
+            （マウスカーソルなど局所的な動き）を「違う」と判定する（全体の平均では見えない動きを拾う）。
+
+    block_thresh を指定しなければ判定結果は全解像度の判定とフレーム単位で一致する。
+
+    Attributes:
+    pairs (int): 判定したフレームの組の数
+    coarse_rejected (int): 1 段目で「違う」と判定した数
+    full_rejected (int): 2 段目の全解像度の平均差分で「違う」と判定した数
+    block_rejected (int): 2 段目のブロック判定で「違う」と判定した数
+    similar (int): 「ほぼ同一」と判定した数
+    """
+
+    def __init__(self, stride=8, block=32, block_thresh=None):
+        self.stride = stride
+        self.block = block
+        self.block_thresh = block_thresh
+        self.pairs = 0
+        self.coarse_rejected = 0
+        self.full_rejected = 0
+        self.block_rejected = 0
+        self.similar = 0
+
+    def flags(self, lumas, diff_thresh, profiler=NULL_PROFILER):
+        """
+        輝度フレーム列から (フレーム番号, ほぼ同一か) を求める段（below_threshold と同じ形で出力）
+
+        Parameters:
+        lumas: (フレーム番号, 輝度フレーム) のイテレータ
+        diff_thresh (float): 全解像度の平均差分がこれ未満なら「ほぼ同一フレーム」
+        profiler (profiling.Profiler): cascade.coarse / cascade.full の処理時間を記録する
+        """
+        previous = None
+        for index, frame in lumas:
+            if previous is not None:
+                self.pairs += 1
+                with profiler.span('cascade.coarse'):
+                    # 間引いた行の差分合計が全画素ぶんの閾値に届けば、全解像度でも閾値以上
+                    partial = cv2.norm(frame[::self.stride], previous[::self.stride], cv2.NORM_L1)
+                if partial / frame.size >= diff_thresh:
+                    self.coarse_rejected += 1
+                    similar = False
+                else:
+                    with profiler.span('cascade.full'):
+                        similar = self._confirm(frame, previous, diff_thresh)
+                yield index, similar
+            previous = frame
 
-def process_video(video_path):
+    def _confirm(self, frame, previous, diff_thresh):
+        if cv2.norm(frame, previous, cv2.NORM_L1) / frame.size >= diff_thresh:
+            self.full_rejected += 1
+            return False
+        if self.block_thresh is not None:
+            diff = cv2.absdiff(frame, previous)
+            h, w = diff.shape[:2]
+            blocks = cv2.resize(diff, (max(1, w // self.block), max(1, h // self.block)),
+                                interpolation=cv2.INTER_AREA)
+            if float(blocks.max()) >= self.block_thresh:
+                self.block_rejected += 1
+                return False
+        self.similar += 1
+        return True
+
+    def stats(self):
+        """
+        Returns:
+        dict: {'pairs', 'coarse_rejected', 'full_rejected', 'block_rejected', 'similar', 'coarse_reject_rate'}
+        """
+        return {
+            'pairs': self.pairs,
+            'coarse_rejected': self.coarse_rejected,
+            'full_rejected': self.full_rejected,
+            'block_rejected': self.block_rejected,
+            'similar': self.similar,
+            'coarse_reject_rate': round(self.coarse_rejected / self.pairs, 4) if self.pairs else 0.0,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"Cascade: {s['pairs']} pairs, coarse rejected {s['coarse_rejected']} "
+                f"({s['coarse_reject_rate'] * 100:.1f}%), full rejected {s['full_rejected']}, "
+                f"block rejected {s['block_rejected']}, similar {s['similar']}")
+
+
+def stutter_events(frames, diff_thresh=2.0, min_consec=3, profiler=NULL_PROFILER, cascade=None, rois=None,
+                   fingerprints=None, reuse=False, tiles=None):
+    """
+    フレーム列からカクつき区間を求めるパイプラインを組み立てる（遅延評価）
+
+    Parameters:
+    frames: (フレーム番号, フレーム) のイテレータ（read_frames など）
+    diff_thresh (float): 平均差分がこれ未満なら「ほぼ同一フレーム」
+    min_consec (int): カクつきと判断する最小連続フレーム数
+    profiler (profiling.Profiler): 各段（luma / diff / metric / threshold）の処理時間を記録する
+    cascade (CascadeFilter | None): 指定すると差分・閾値判定を 2 段のカスケードで行う（段ごとの件数は cascade に残る）
+    rois (list of tuple | None): 指定すると (x, y, w, h) の領域だけで判定する（None ならフレーム全体）
+    fingerprints (fingerprint.FrameIndex | None): 指定するとフレーム全体の指紋で重複フレームを分類する
+                                                  （分類の件数と older / similar の区間は fingerprints に残る）
+    reuse (bool): 輝度・差分のバッファを使い回す（frames の各フレームは次のフレームを読む前に使い終わる前提）
+    tiles (tiles.StripeDiff | None): 指定すると差分を横帯ごとにスレッドプールで計算する
+                                     （局所的な静止は tiles.local_freezes に残る。cascade とは併用できない）
+
+    Returns:
+    generator: (start, end) のカクつき区間
+    """
+    lumas = profiler.timed('luma', to_luma(frames, reuse))
+    if fingerprints is not None:
+        lumas = tap(lumas, fingerprints.observe_item)
+    if rois:
+        lumas = profiler.timed('crop', crop_regions(lumas, rois, reuse))
+    if cascade is not None and tiles is not None:
+        raise ValueError("cascade and tiles cannot be combined")
+    if cascade is not None:
+        return group_runs(cascade.flags(lumas, diff_thresh, profiler), min_consec)
+    if tiles is not None:
+        values = tiles.values(lumas, diff_thresh, min_consec, profiler)
+    else:
+        diffs = profiler.timed('diff', frame_diffs(lumas, reuse))
+        values = profiler.timed('metric', diff_metric(diffs, 'mean'))
+    flags = profiler.timed('threshold', below_threshold(values, diff_thresh))
+    return group_runs(flags, min_consec)
+
+
+def process_video(video_path, diff_thresh=2.0, min_consec=3, max_frames=None, ingest='bgr', backend=None,
+                  profiler=NULL_PROFILER, cascade=None, roi=None, roi_seconds=5.0, fingerprints=None, prefetch=None,
+                  tiles=None):
     """
     動画を処理してカクつきを検出する関数
 
     Parameters:
-    video_path (str): 解析対象の動画ファイルのパス
+    video_path (str | int): 解析対象の動画ファイルのパス（またはデバイス番号）
+    diff_thresh (float): 平均差分がこれ未満なら「ほぼ同一フレーム」
+    min_consec (int): カクつきと判断する最小連続フレーム数
+    max_frames (int | None): 処理する最大フレーム数
+    ingest (str): 輝度取り込みモード（ingest.py）
+    backend: OpenCV backend flag
+    profiler (profiling.Profiler): 各段の処理時間を記録する（--profile）
+    cascade (CascadeFilter | None): 2 段のカスケードで判定する
+    roi (str | list | None): 'auto'（先頭 roi_seconds 秒から動く領域を求める）または (x, y, w, h) のリスト（roi.py）
+    fingerprints (fingerprint.FrameIndex | None): 隣接していない重複フレームも分類する
+    prefetch (prefetch.Prefetcher | None): デコードを別スレッドで先読みし、解析と重ねる
+    tiles (tiles.StripeDiff | None): 差分を横帯ごとにスレッドプールで計算し、局所的な静止も記録する
 
     Returns:
     dict: カクつき解析結果を含む辞書
         {
             'stutter_detected': bool,   # カクつきが検出されたか
-            'stutter_frames': list,     # カクつきが発生したフレーム番号リスト
-            'total_frames': int         # 総フレーム数
+            'stutter_frames': list,     # カクつき区間 (start, end) のリスト
+            'total_frames': int,        # 総フレーム数
+            'cascade': dict,            # cascade 指定時のみ: 段ごとの判定数（CascadeFilter.stats）
+            'roi': dict,                # roi 指定時のみ: 使った ROI（roi.roi_report）
+            'repeats': list,            # fingerprints 指定時のみ: older / similar のフレームの区間（FrameIndex.repeats）
+            'repeat_counts': dict,      # fingerprints 指定時のみ: 分類ごとの件数（FrameIndex.stats）
+            'prefetch': dict,           # prefetch 指定時のみ: キューの深さと待ち時間（Prefetcher.stats）
+            'tiles': dict               # tiles 指定時のみ: スレッド数と局所的な静止（StripeDiff.stats）
         }
     """
     # -----------------------------------------------
@@ -26,28 +370,72 @@ def process_video(video_path):
         'total_frames': 0
     }
 
+    rois = None
+    if roi is not None:
+        # roi.py は processor.py を読み込むため、ここで読み込む
+        from .roi import calibrate, roi_report
+        if roi == 'auto':
+            rois, results['roi'] = calibrate(video_path, roi_seconds,
+                                             'bgr' if ingest in ('auto', 'ffmpeg') else ingest, backend)
+        else:
+            rois = list(roi)
+            results['roi'] = roi_report(rois, mode='manual')
+
+    # 先読みではキューに積んだフレームも保持されるので、その分のバッファを使い回す
+    cap = open_luma_reader(video_path, ingest, backend, reuse=True if prefetch is None else prefetch.buffers())
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video: {video_path}")
+
     # -----------------------------------------------
-    # ここに動画処理とカクつき検出のロジックを実装する
-    # 例: フレームごとに analyze_frame を呼び出して stutter_frames を記録
+    # パイプラインを流しながらフレーム数を数える
     # -----------------------------------------------
+    def count(item):
+        results['total_frames'] = item[0]
+        if rois and 'frame_size' not in results['roi']:
+            results['roi'] = roi_report(rois, item[1].shape[:2], results['roi']['mode'],
+                                        results['roi'].get('calibration_frames'))
 
+    decoded = profiler.timed('decode', read_frames(cap, max_frames))
+    if prefetch is not None:
+        decoded = prefetch.frames(decoded, profiler)
+    try:
+        frames = tap(decoded, count)
+        for event in stutter_events(frames, diff_thresh, min_consec, profiler, cascade, rois or None, fingerprints,
+                                    reuse=True, tiles=tiles):
+            results['stutter_frames'].append(event)
+    finally:
+        # 先読みのスレッドを止めてから閉じる
+        decoded.close()
+        cap.release()
+
+    results['stutter_detected'] = bool(results['stutter_frames'])
+    if cascade is not None:
+        results['cascade'] = cascade.stats()
+    if fingerprints is not None:
+        results['repeats'] = list(fingerprints.repeats)
+        results['repeat_counts'] = fingerprints.stats()
+    if prefetch is not None:
+        results['prefetch'] = prefetch.stats()
+    if tiles is not None:
+        results['tiles'] = tiles.stats()
     return results
 
 
-def analyze_frame(frame):
+def analyze_frame(frame, previous_frame=None, diff_thresh=2.0):
     """
-    単一フレームを解析してカクつきの有無を判定する関数
+    単一フレームを直前フレームと比較してカクつき（ほぼ同一フレーム）か判定する関数
 
     Parameters:
-    frame: 解析対象の動画フレーム（numpy 配列など）
+    frame: 解析対象の動画フレーム（numpy 配列、BGR またはグレースケール）
+    previous_frame: 直前のフレーム（None の場合は比較できないため False）
+    diff_thresh (float): 平均差分がこれ未満なら「ほぼ同一フレーム」
 
     Returns:
     bool: カクつきが検出された場合 True、そうでなければ False
     """
-    # -----------------------------------------------
-    # フレーム解析ロジックのプレースホルダー
-    # ここで前後フレームとの差分や閾値判定などを行う
-    # -----------------------------------------------
-    stutter_detected = False
-
-    return stutter_detected
+    if previous_frame is None:
+        return False
+    pairs = to_luma([(0, previous_frame), (1, frame)])
+    for _, mean_diff in diff_metric(frame_diffs(pairs), 'mean'):
+        return mean_diff < diff_thresh
+    return False
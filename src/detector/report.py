@@ -0,0 +1,393 @@
+import argparse
+import csv
+import itertools
+import os
+
+from .backend import lazy_import
+from .metrics_log import iter_metrics_log, metrics_log_dtype
+
+np = lazy_import('numpy')
+
+# ===============================================
+# 長時間のログのグラフ（min/max・LTTB の間引き）
+#
+# 10 時間・60fps のセッションのログは 200 万行を超え、pandas で全行を読んで matplotlib に全点を渡すと
+# 描画に数分かかるかメモリが足りなくなる。画面（画像）の横幅は高々数千画素なので、
+# ログをチャンク（既定 65536 行）ごとに読みながら、各系列を画素の列ごとの最小・最大の 2 点に間引いて足し込む
+# （MinMaxDecimator、メモリは列数に比例するだけ）。最小・最大を残すので、1 フレームだけの落ち込みや
+# スパイクも線から消えない。mode='lttb' では最後に LTTB（Largest-Triangle-Three-Buckets）で width 点まで減らす。
+# カクつきのフラグが立った行は間引かずにすべて残し、マーカーで重ねる。
+#
+# 読めるログ（列名から自動判定）:
+#   - 逐次カクつき検知ログ（live.py の adaptive_threshold_log.csv / .mlog）: 差分・しきい値
+#   - カメラの FPS 計測ログ（tests/benchmark_test.py の camera_frame_test.csv）: FPS・差分・CPU / メモリ
+# matplotlib はグラフを描くときに初めて読み込む（間引きだけなら NumPy だけで動く）。
+#
+# 使い方:
+#   python -m src.detector.report ~/Desktop/stutter_frames/adaptive_threshold_log.mlog --fps 30
+#   python -m src.detector.report CameraCapture_GPU_Output/<日時>/camera_frame_test.csv --mode lttb
+#   python -m tests.benchmark_report          # 200 万行のログの読み込み・間引き・描画の時間
+# ===============================================
+
+# 1 回に読む行数
+CHUNK_ROWS = 65536
+
+# 既定の横幅（画素の列数）
+WIDTH = 1600
+
+# 逐次カクつき検知ログ（live.THRESHOLD_LOG_FIELDS）。x は frame_idx / fps 秒
+THRESHOLD_LOG = {
+    'x': 'frame_idx',
+    'flag': 'stutter_flag',
+    'charts': [
+        {'name': 'stutter_detection', 'title': 'Realtime Stutter Detection',
+         'ylabel': 'Frame Difference (Non-zero pixels)',
+         'series': [('frame_diff', 'Frame difference', 'tab:blue'), ('threshold', 'Threshold', 'tab:orange')],
+         'flagged': 'frame_diff'},
+    ],
+}
+
+# カメラの FPS 計測ログ（tests/benchmark_test.py）。x は Timestamp_ms の先頭からの秒、DiffFlag '×'（差分なし）がカクつき
+CAMERA_LOG = {
+    'x': 'Timestamp_ms',
+    'x_scale': 1 / 1000,
+    'relative': True,
+    'flag': 'DiffFlag',
+    'converters': {'DiffFlag': lambda v: v == '×'},
+    'charts': [
+        {'name': 'frame_rate', 'title': 'Frame Rate Over Time', 'ylabel': 'FPS', 'ylim': (0, 120),
+         'series': [('FPS', 'FPS', 'tab:blue')], 'flagged': 'FPS'},
+        {'name': 'frame_diff', 'title': 'Max Frame Difference Over Time', 'ylabel': 'Diff (max pixel)',
+         'series': [('Diff', 'Diff', 'tab:purple')], 'flagged': 'Diff'},
+        {'name': 'cpu_memory_usage', 'title': 'CPU and Memory Usage Over Time (0-100%)', 'ylabel': '%',
+         'ylim': (0, 100), 'series': [('CPU_percent', 'CPU (%)', 'tab:green'),
+                                      ('Memory_percent', 'Memory (%)', 'tab:orange')]},
+    ],
+}
+
+LAYOUTS = {'threshold': THRESHOLD_LOG, 'camera': CAMERA_LOG}
+
+
+# ===============================================
+# ログをチャンクごとに読む
+# ===============================================
+def log_columns(path):
+    """ログの列名（CSV はヘッダー行、.mlog はヘッダーの dtype）"""
+    if path.endswith('.mlog'):
+        return list(metrics_log_dtype(path).names)
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f), [])
+
+
+def detect_layout(path):
+    """列名からログの種類（'threshold' / 'camera'）を判定する"""
+    columns = set(log_columns(path))
+    for name, layout in LAYOUTS.items():
+        if _layout_columns(layout) <= columns:
+            return name
+    raise ValueError(f"Unknown log layout: {path} (columns: {sorted(columns)})")
+
+
+def _layout_columns(layout):
+    columns = {layout['x']}
+    if layout.get('flag'):
+        columns.add(layout['flag'])
+    for chart in layout['charts']:
+        columns.update(column for column, _, _ in chart['series'])
+    return columns
+
+
+def iter_log_chunks(path, columns, chunk_rows=CHUNK_ROWS, converters=None):
+    """
+    CSV または .mlog のログを chunk_rows 行ずつ読む関数（ファイル全体をメモリに読み込まない）
+
+    Parameters:
+    path (str): ログのパス
+    columns (list): 読む列名
+    chunk_rows (int): CSV の 1 チャンクの行数（.mlog は書き出し時のチャンクのまま）
+    converters (dict): CSV の列ごとの変換関数（文字列 → 数値。省略した列は float）
+                       CSV は NumPy の C 実装の loadtxt で読む（csv モジュールで 1 行ずつ分けるより約 4 倍速い）
+
+    Yields:
+    dict: {列名: numpy.ndarray（float64）}
+    """
+    converters = converters or {}
+    if path.endswith('.mlog'):
+        for chunk in iter_metrics_log(path):
+            yield {c: chunk[c].astype(np.float64) for c in columns}
+        return
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader([f.readline()]), [])
+        missing = [c for c in columns if c not in header]
+        if missing:
+            raise ValueError(f"Columns not found in {path}: {missing}")
+        indices = [header.index(c) for c in columns]
+        by_index = {header.index(c): fn for c, fn in converters.items() if c in columns}
+        while True:
+            lines = list(itertools.islice(f, chunk_rows))
+            if not lines:
+                return
+            table = np.loadtxt(lines, delimiter=',', usecols=indices, converters=by_index or None,
+                               dtype=np.float64, ndmin=2)
+            yield {c: table[:, k] for k, c in enumerate(columns)}
+
+
+# ===============================================
+# 間引き
+# ===============================================
+class MinMaxDecimator:
+    """
+    1 系列を x 方向の列ごとの最小・最大の 2 点に間引く（チャンクごとに足し込む、メモリは列数に比例）
+
+    x は単調増加（ログの行の順）を前提とする。列の幅は x の範囲が 2 × width 列を超えるたびに 2 倍にするので、
+    最終的な列数は x の範囲によらず width〜2 × width 列になる（範囲を先に知る必要がない）。
+
+    Attributes:
+    width (int): 横幅（画素の列数）
+    rows (int): 足し込んだ点の数（NaN を除く）
+    bin_width (float): 現在の列の幅（x の単位）
+    """
+
+    def __init__(self, width=WIDTH):
+        if width < 2:
+            raise ValueError(f"width must be at least 2: {width}")
+        self.width = width
+        self.capacity = 2 * width
+        self.rows = 0
+        self.x0 = None
+        self.bin_width = None
+        self._min_v = np.full(self.capacity, np.inf)
+        self._min_x = np.zeros(self.capacity)
+        self._max_v = np.full(self.capacity, -np.inf)
+        self._max_x = np.zeros(self.capacity)
+
+    def _coarsen(self):
+        """列の幅を 2 倍にする（隣り合う 2 列の最小・最大をまとめる）"""
+        self.bin_width *= 2
+        half = self.capacity // 2
+        rows = np.arange(half)
+        for values, xs, pick, empty in ((self._min_v, self._min_x, np.argmin, np.inf),
+                                        (self._max_v, self._max_x, np.argmax, -np.inf)):
+            pairs = values.reshape(half, 2)
+            j = pick(pairs, axis=1)
+            v, x = pairs[rows, j], xs.reshape(half, 2)[rows, j]
+            values[:half], xs[:half] = v, x
+            values[half:] = empty
+
+    def add(self, x, y):
+        """x, y（同じ長さの配列）を足し込む"""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        ok = np.isfinite(x) & np.isfinite(y)
+        if not ok.all():
+            x, y = x[ok], y[ok]
+        if not len(x):
+            return
+        if self.x0 is None:
+            self.x0 = x[0]
+            # 最初のチャンクの範囲から列の幅を決める（足りなくなれば 2 倍にしていく）
+            self.bin_width = (x[-1] - self.x0) / self.capacity or 1e-9
+        offset = x - self.x0
+        while offset.max() >= self.capacity * self.bin_width:
+            self._coarsen()
+        bins = np.clip((offset // self.bin_width).astype(np.int64), 0, self.capacity - 1)
+        # 列ごとに y の最小・最大の点を求める（列 → y の順に並べ、各列の先頭が最小・末尾が最大）
+        order = np.lexsort((y, bins))
+        sorted_bins = bins[order]
+        starts = np.flatnonzero(np.r_[True, sorted_bins[1:] != sorted_bins[:-1]])
+        ends = np.r_[starts[1:], len(order)] - 1
+        columns = sorted_bins[starts]
+        for index, values, xs, better in ((order[starts], self._min_v, self._min_x, np.less),
+                                          (order[ends], self._max_v, self._max_x, np.greater)):
+            keep = better(y[index], values[columns])
+            values[columns[keep]] = y[index[keep]]
+            xs[columns[keep]] = x[index[keep]]
+        self.rows += len(x)
+
+    def points(self, mode='minmax'):
+        """
+        間引いた点を x の順に返す
+
+        Parameters:
+        mode (str): 'minmax'（列ごとに最小・最大の 2 点）または 'lttb'（さらに LTTB で width 点まで減らす）
+
+        Returns:
+        tuple: (x, y) の numpy.ndarray
+        """
+        filled = np.isfinite(self._min_v)
+        xs = np.stack([self._min_x[filled], self._max_x[filled]], axis=1)
+        ys = np.stack([self._min_v[filled], self._max_v[filled]], axis=1)
+        # 列の中では x の順に並べる（最小と最大が同じ点なら 1 点）
+        swap = xs[:, 0] > xs[:, 1]
+        xs[swap] = xs[swap, ::-1]
+        ys[swap] = ys[swap, ::-1]
+        same = (xs[:, 0] == xs[:, 1]) & (ys[:, 0] == ys[:, 1])
+        keep = np.stack([np.ones(len(xs), dtype=bool), ~same], axis=1)
+        x, y = xs[keep], ys[keep]
+        if mode == 'lttb':
+            return lttb(x, y, self.width)
+        if mode != 'minmax':
+            raise ValueError(f"Unknown decimation mode: {mode} (expected 'minmax' or 'lttb')")
+        return x, y
+
+
+def lttb(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets で (x, y) を n 点に間引く（先頭と末尾の点は残す）
+
+    各バケットから、前に選んだ点と次のバケットの平均点とで作る三角形の面積が最大の点を選ぶ
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if n >= len(x) or n < 3:
+        return x, y
+    edges = np.linspace(1, len(x) - 1, n - 1).astype(np.int64)
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, len(x) - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return x[selected], y[selected]
+
+
+# ===============================================
+# ログ → 間引いた系列
+# ===============================================
+def summarize_log(path, layout=None, width=WIDTH, mode='minmax', chunk_rows=CHUNK_ROWS, x_scale=None):
+    """
+    ログをチャンクごとに読み、グラフに使う各系列を間引く（フラグが立った行はすべて残す）
+
+    Parameters:
+    path (str): ログ（CSV または .mlog）
+    layout (dict | str | None): THRESHOLD_LOG / CAMERA_LOG またはその名前（省略時は列名から判定）
+    width (int): 横幅（画素の列数）
+    mode (str): 'minmax' または 'lttb'
+    x_scale (float | None): x の列に掛ける係数（逐次カクつき検知ログなら 1 / fps。省略時は layout の値）
+
+    Returns:
+    dict: {'layout', 'rows'（読んだ行数）, 'x0'（先頭の x）, 'x_scale',
+           'series': {列名: (x, y)}（間引いた点）, 'flagged': {列名: (x, y)}（フラグが立った行のすべての点）}
+    """
+    if layout is None:
+        layout = detect_layout(path)
+    if isinstance(layout, str):
+        layout = LAYOUTS[layout]
+    flag = layout.get('flag')
+    names = [column for chart in layout['charts'] for column, _, _ in chart['series']]
+    flagged_names = {chart['flagged'] for chart in layout['charts'] if chart.get('flagged')}
+    decimators = {name: MinMaxDecimator(width) for name in names}
+    flagged = {name: [] for name in flagged_names}
+    columns = sorted(_layout_columns(layout))
+    rows = 0
+    x0 = None
+    for chunk in iter_log_chunks(path, columns, chunk_rows, layout.get('converters')):
+        x = chunk[layout['x']]
+        if x0 is None and len(x):
+            x0 = float(x[0])
+        rows += len(x)
+        for name, decimator in decimators.items():
+            decimator.add(x, chunk[name])
+        if flag is not None and flagged:
+            marked = chunk[flag] != 0
+            if marked.any():
+                for name, points in flagged.items():
+                    points.append((x[marked], chunk[name][marked]))
+
+    def join(points):
+        if not points:
+            return np.empty(0), np.empty(0)
+        return np.concatenate([p[0] for p in points]), np.concatenate([p[1] for p in points])
+
+    return {
+        'layout': layout,
+        'rows': rows,
+        'x0': x0 or 0.0,
+        'x_scale': layout.get('x_scale', 1.0) if x_scale is None else x_scale,
+        'series': {name: decimator.points(mode) for name, decimator in decimators.items()},
+        'flagged': {name: join(points) for name, points in flagged.items()},
+    }
+
+
+def render_report(summary, output_dir=None, show=False, prefix='00_', dpi=100, width=WIDTH):
+    """
+    summarize_log の結果をグラフにする（matplotlib はここで初めて読み込む）
+
+    Parameters:
+    summary (dict): summarize_log の戻り値
+    output_dir (str | None): 指定するとグラフごとに <prefix><name>.png を保存する
+    show (bool): 画面に表示する（False なら Agg で描画だけ行う）
+    width (int): 画像の横幅（画素）
+
+    Returns:
+    list: 保存した画像のパス
+    """
+    import matplotlib
+    if not show:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    layout, scale = summary['layout'], summary['x_scale']
+    x0 = summary['x0'] if layout.get('relative') else 0.0
+
+    def seconds(x):
+        return (x - x0) * scale
+
+    paths = []
+    for chart in layout['charts']:
+        fig, ax = plt.subplots(figsize=(width / dpi, 5), dpi=dpi)
+        for column, label, color in chart['series']:
+            x, y = summary['series'][column]
+            ax.plot(seconds(x), y, color=color, label=label, linewidth=1.0)
+        if chart.get('flagged'):
+            x, y = summary['flagged'][chart['flagged']]
+            ax.scatter(seconds(x), y, color='red', s=8, label=f"Stutter frames ({len(x)})", zorder=3)
+        ax.set_xlabel("Time (s)")
+        ax.set_ylabel(chart['ylabel'])
+        if chart.get('ylim'):
+            ax.set_ylim(*chart['ylim'])
+        ax.grid(True, alpha=0.3)
+        ax.legend(loc='upper right')
+        ax.set_title(f"{chart['title']} ({summary['rows']} rows)")
+        fig.tight_layout()
+        if output_dir is not None:
+            path = os.path.join(output_dir, f"{prefix}{chart['name']}.png")
+            fig.savefig(path)
+            paths.append(path)
+        if not show:
+            plt.close(fig)
+    if show:
+        plt.show()
+    return paths
+
+
+def _build_cli():
+    p = argparse.ArgumentParser(description='Render multi-hour stutter/FPS logs with min/max (or LTTB) decimation')
+    p.add_argument('log', help='adaptive_threshold_log.csv/.mlog (live.py) or camera_frame_test.csv (benchmark_test.py)')
+    p.add_argument('--fps', type=float, default=30, help='Frame rate of the detection log (x axis = frame_idx / fps)')
+    p.add_argument('--width', type=int, default=WIDTH, help='Image width in pixels (= decimation columns)')
+    p.add_argument('--mode', choices=['minmax', 'lttb'], default='minmax',
+                   help='minmax: keep the min and max of every pixel column; lttb: reduce further to WIDTH points')
+    p.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS, help='Rows read per chunk')
+    p.add_argument('--output-dir', default=None, help='Folder for the PNG charts (default: next to the log)')
+    p.add_argument('--show', action='store_true', help='Show the charts in a window')
+    return p
+
+
+if __name__ == '__main__':
+    args = _build_cli().parse_args()
+    name = detect_layout(args.log)
+    summary = summarize_log(args.log, name, args.width, args.mode, args.chunk_rows,
+                            x_scale=1 / args.fps if name == 'threshold' else None)
+    points = sum(len(x) for x, _ in summary['series'].values())
+    flagged = max((len(x) for x, _ in summary['flagged'].values()), default=0)
+    print(f"{args.log}: {summary['rows']} rows -> {points} points ({flagged} stutter rows kept)")
+    for path in render_report(summary, args.output_dir or os.path.dirname(os.path.abspath(args.log)),
+                              show=args.show, width=args.width):
+        print(f"📁 {path}")
@@ -0,0 +1,198 @@
+from .backend import lazy_import
+from .ingest import open_luma_reader
+from .processor import read_frames, to_luma
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+# ===============================================
+# 関心領域（ROI）の自動検出（--roi auto）
+#
+# 画面録画・キャプチャボードの録画では、フレームの大部分がタスクバー・黒帯・HUD などの静止した画素で、
+# 動くのは映像の領域だけということが多い。フレーム全体の平均差分はこの静止画素に引きずられて 0 に近づき、
+# 映像が動いていても「ほぼ同一」と誤判定（偽のカクつき）しやすい。
+#
+# 先頭 seconds 秒を読んで tile 画素四方のタイルごとに「動いたフレームの割合」（アクティビティマップ）を求め、
+# 動いたタイルのまとまりを外接矩形の ROI にする。以降の解析は ROI の画素だけで差分を取る
+# （processor.crop_regions）。動くタイルが見つからなければ ROI なし（フレーム全体）で解析する。
+#
+# 使い方:
+#   python -m src.detector.main --source capture.mp4 --roi auto
+#   python -m src.detector.main --source capture.mp4 --roi 320,180,1280,720
+#   python -m src.detector.roi capture.mp4          # 求めた ROI を JSON で表示
+# ===============================================
+
+# 既定の較正時間（秒）とタイルの大きさ（画素）
+CALIBRATION_SECONDS = 5.0
+TILE = 16
+
+
+def parse_roi(text):
+    """
+    --roi の値を解釈する関数
+
+    Parameters:
+    text (str | None): 'auto'、または 'x,y,w,h'（複数なら ';' 区切り）
+
+    Returns:
+    'auto' / (x, y, w, h) のリスト / None
+    """
+    if text is None or text.strip() == '':
+        return None
+    if text.strip().lower() == 'auto':
+        return 'auto'
+    rois = []
+    for part in text.split(';'):
+        values = [int(v) for v in part.replace(' ', '').split(',')]
+        if len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+            raise ValueError(f"ROI must be x,y,w,h with positive w and h: {part!r}")
+        rois.append(tuple(values))
+    return rois
+
+
+def activity_map(lumas, tile=TILE, noise_thresh=2.0):
+    """
+    タイルごとに「前フレームとの平均差分が noise_thresh 以上だったフレームの割合」を求める関数
+
+    Parameters:
+    lumas: (フレーム番号, 輝度フレーム) のイテレータ
+    tile (int): タイルの一辺（画素）。端の tile に満たない画素は最後のタイルに含めない
+    noise_thresh (float): 動いたとみなすタイル平均差分（圧縮ノイズ程度の変化は数えない）
+
+    Returns:
+    (numpy.ndarray, int, tuple): (タイルごとの割合 float32, 比べたフレームの組の数, (高さ, 幅))
+    """
+    counts = None
+    pairs = 0
+    previous = None
+    shape = None
+    for _, frame in lumas:
+        if previous is not None:
+            h, w = shape
+            th, tw = max(1, h // tile), max(1, w // tile)
+            diff = cv2.absdiff(frame, previous)[:th * tile, :tw * tile]
+            tiles = cv2.resize(diff, (tw, th), interpolation=cv2.INTER_AREA)
+            counts += tiles >= noise_thresh
+            pairs += 1
+        else:
+            shape = frame.shape[:2]
+            counts = np.zeros((max(1, shape[0] // tile), max(1, shape[1] // tile)), dtype=np.int32)
+        previous = frame
+    if shape is None:
+        return np.zeros((0, 0), dtype=np.float32), 0, (0, 0)
+    return (counts / max(1, pairs)).astype(np.float32), pairs, shape
+
+
+def _overlaps(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def _union(a, b):
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+    return x0, y0, x1 - x0, y1 - y0
+
+
+def find_regions(activity, shape, tile=TILE, min_activity=0.02, min_tiles=4, max_regions=4):
+    """
+    アクティビティマップから ROI を求める関数
+
+    Parameters:
+    activity (numpy.ndarray): activity_map のタイルごとの割合
+    shape (tuple): フレームの (高さ, 幅)
+    min_activity (float): この割合以上のフレームで動いたタイルを「動く」とみなす
+    min_tiles (int): これより小さいまとまり（カーソル・時計など）は ROI にしない
+    max_regions (int): ROI の最大数（面積の大きい順）
+
+    Returns:
+    list of tuple: (x, y, w, h) のリスト（画素単位、面積の大きい順）。動くタイルがなければ空
+    """
+    if activity.size == 0:
+        return []
+    mask = (activity >= min_activity).astype(np.uint8)
+    # 1 タイルの隙間は同じ領域とみなす（映像の中の一時的に静止した部分で領域が割れないように）。
+    # フレームの端で領域が膨らまないように、1 タイル分の余白を付けてから閉じる
+    closed = cv2.morphologyEx(np.pad(mask, 1), cv2.MORPH_CLOSE, np.ones((3, 3), np.uint8))[1:-1, 1:-1]
+    n, _, stats, _ = cv2.connectedComponentsWithStats(closed, connectivity=8)
+    boxes = [tuple(int(v) for v in stats[i, :4]) for i in range(1, n) if stats[i, cv2.CC_STAT_AREA] >= min_tiles]
+
+    # 外接矩形が重なるまとまりは 1 つにまとめる
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                if _overlaps(boxes[i], boxes[j]):
+                    boxes[i] = _union(boxes[i], boxes.pop(j))
+                    merged = True
+                    break
+            if merged:
+                break
+
+    h, w = shape
+    regions = []
+    for tx, ty, tw, th in sorted(boxes, key=lambda b: -b[2] * b[3])[:max_regions]:
+        x, y = tx * tile, ty * tile
+        # フレームの端のタイルに接する領域は端の余り画素まで含める
+        x1 = w if tx + tw >= activity.shape[1] else (tx + tw) * tile
+        y1 = h if ty + th >= activity.shape[0] else (ty + th) * tile
+        regions.append((x, y, x1 - x, y1 - y))
+    return regions
+
+
+def roi_report(rois, shape=None, mode='manual', calibration_frames=None):
+    """
+    結果に含める ROI の情報
+
+    Returns:
+    dict: {'mode', 'regions', 'frame_size', 'pixel_fraction', 'calibration_frames'}
+          mode は 'auto' / 'manual' / 'full'（自動検出で動く領域が見つからずフレーム全体を使う場合）
+    """
+    report = {'mode': mode if rois else 'full', 'regions': [list(r) for r in rois or []]}
+    if shape is not None:
+        h, w = shape
+        report['frame_size'] = [w, h]
+        pixels = sum(rw * rh for _, _, rw, rh in rois) if rois else w * h
+        report['pixel_fraction'] = round(pixels / (w * h), 4) if w * h else 0.0
+    if calibration_frames is not None:
+        report['calibration_frames'] = calibration_frames
+    return report
+
+
+def calibrate(source, seconds=CALIBRATION_SECONDS, ingest='bgr', backend=None, open_capture=None, tile=TILE,
+              noise_thresh=2.0, min_activity=0.02, min_tiles=4, max_regions=4):
+    """
+    動画の先頭 seconds 秒からアクティビティマップを作り、ROI を求める関数
+
+    Parameters:
+    source (str): 動画ファイルのパス（較正用に別途開いて先頭だけを読む）
+    seconds (float): 較正に使う時間（FPS が取れない場合は 30fps とみなす）
+    その他は activity_map / find_regions と同じ
+
+    Returns:
+    (list of tuple, dict): (ROI のリスト（空ならフレーム全体）, roi_report の結果)
+    """
+    cap = open_luma_reader(source, ingest, backend, open_capture=open_capture)
+    if not cap.isOpened():
+        raise FileNotFoundError(f"Could not open video: {source}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        n_frames = max(2, int(round(seconds * fps)))
+        activity, pairs, shape = activity_map(to_luma(read_frames(cap, n_frames)), tile, noise_thresh)
+    finally:
+        cap.release()
+    rois = find_regions(activity, shape, tile, min_activity, min_tiles, max_regions)
+    return rois, roi_report(rois, shape, 'auto', pairs + 1)
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description='Find the active regions of a video from its first seconds')
+    parser.add_argument('video_path')
+    parser.add_argument('--seconds', type=float, default=CALIBRATION_SECONDS, help='Calibration length')
+    parser.add_argument('--tile', type=int, default=TILE, help='Tile size in pixels')
+    args = parser.parse_args()
+    _, report = calibrate(args.video_path, args.seconds, tile=args.tile)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,182 @@
+import time
+
+from .profiling import NULL_PROFILER, Histogram
+
+# ===============================================
+# perf_counter_ns の締め切りで処理を刻むキャプチャスケジューラ（live.py の --schedule）
+#
+# 「一定間隔で sleep して最新フレームを読む」ループには次の問題がある:
+#   - time.time() は時刻合わせで前後に跳ぶので、間隔の計測・sleep の長さが狂う
+#   - カメラのフレームがまだ来ていなければ同じフレームをもう一度処理するか、空読みを繰り返す（busy-wait）
+#   - カメラ（例: 60fps）とループ（例: 30fps）が同期していないので、同じフレームを複数回処理したり取りこぼしたりする
+# FrameScheduler は perf_counter_ns の締め切り（開始時刻 + k × 周期）ごとに、前回処理した seq より新しい
+# 最新フレームをリング（capture.FrameRing）から受け取る。まだ来ていなければリングの Condition で眠って待つので、
+# 同じフレームを 2 回処理することも、空読みで CPU を回すこともない。
+#
+# 記録するもの（stats() / summary()、ライブキャプチャでは control.py の status でも実行中に見られる）:
+#   - 処理したフレームの取得時刻の間隔のヒストグラム（周期の何倍かの分布と p50/p95/p99）
+#     … カメラ側の間隔の乱れそのもので、カクつきの原因の切り分けに使う
+#   - 締め切りに対する遅れ（lateness）のヒストグラムと、遅れた回数（late_ms 超）
+#   - 処理が周期を超えて飛ばした締め切りの数（missed_deadlines、後から詰めて追いかけない）
+#   - 読まずに飛ばしたフレーム（skipped、カメラの方が速い場合は想定どおり）・処理中に上書きされたフレーム（dropped）
+#
+# 使い方:
+#   python -m src.detector.live --device 0 --target-fps 60 --capture-fps 30 --schedule
+# ===============================================
+
+# 間隔の分布をまとめる「周期の何倍か」の上限（これ以上は最後のビンにまとめる）
+MAX_PERIODS = 4
+
+
+class FrameScheduler:
+    """
+    締め切りごとにリングの最新フレームを 1 枚ずつ受け取るカーソル（RingReader と同じ使い方ができる）
+
+    Attributes:
+    ring (capture.FrameRing): 読むリング
+    period_ns (int): 締め切りの周期（ns）
+    late_ns (int): これを超えて遅れた締め切りを late に数える（ns）
+    frames_read (int): 処理に渡したフレーム数
+    skipped (int): 読まずに飛ばしたフレーム数（前回の seq と今回の seq の間）
+    dropped (int): 処理中に上書きされたフレーム数（still_valid）
+    late (int): late_ns を超えて遅れた締め切りの数
+    missed_deadlines (int): 処理が周期を超えたために飛ばした締め切りの数
+    intervals (profiling.Histogram): 処理したフレームの取得時刻の間隔（ns）
+    lateness (profiling.Histogram): 締め切りからフレームを受け取るまでの遅れ（ns）
+    """
+
+    def __init__(self, ring, fps, late_ms=None, profiler=NULL_PROFILER):
+        if fps <= 0:
+            raise ValueError(f"fps must be positive: {fps}")
+        self.ring = ring
+        self.fps = fps
+        self.period_ns = int(round(1e9 / fps))
+        self.late_ns = self.period_ns // 2 if late_ms is None else int(late_ms * 1e6)
+        self.profiler = profiler
+        self.frames_read = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.late = 0
+        self.missed_deadlines = 0
+        self.intervals = Histogram()
+        self.lateness = Histogram()
+        self.interval_periods = [0] * (MAX_PERIODS + 1)
+        self.last_seq = ring.head
+        self._deadline = None
+        self._pending = False
+        self._last_ns = None
+
+    # -----------------------------------------------
+    # 締め切りの管理
+    # -----------------------------------------------
+    def _next_deadline(self, now):
+        if self._deadline is None:
+            self._deadline = now
+            return
+        self._deadline += self.period_ns
+        if now >= self._deadline + self.period_ns:
+            # 処理が周期を超えた: 過ぎた締め切りはまとめて飛ばす（遅れを取り戻そうと連続で処理しない）
+            missed = (now - self._deadline) // self.period_ns
+            self.missed_deadlines += missed
+            self._deadline += missed * self.period_ns
+
+    def read(self, timeout=None):
+        """
+        次の締め切りまで眠り、前回より新しい最新フレームを (seq, 読み取り専用ビュー) で返す
+
+        Returns:
+        tuple | None: timeout 秒待ってもフレームが来なければ None（締め切りはそのまま）
+        """
+        # 前回タイムアウトした締め切りはまだ使っていないので進めない
+        if not self._pending:
+            self._next_deadline(time.perf_counter_ns())
+            self._pending = True
+        remaining = self._deadline - time.perf_counter_ns()
+        if remaining > 0:
+            time.sleep(remaining / 1e9)
+        # まだ来ていなければ次のフレームが公開されるまで眠って待つ
+        with self.profiler.span('schedule.wait'):
+            if not self.ring.wait_for(self.last_seq + 1, timeout):
+                return None
+        self._pending = False
+        seq, view = self.ring.latest()
+        now = time.perf_counter_ns()
+        lateness = max(0, now - self._deadline)
+        self.lateness.record(lateness)
+        if lateness > self.late_ns:
+            self.late += 1
+        if self.frames_read:
+            self.skipped += seq - self.last_seq - 1
+        self._record_interval(int(round(self.ring.timestamp(seq) * 1e9)))
+        self.last_seq = seq
+        self.frames_read += 1
+        return seq, view
+
+    def _record_interval(self, captured_ns):
+        if self._last_ns is not None:
+            interval = max(0, captured_ns - self._last_ns)
+            self.intervals.record(interval)
+            self.interval_periods[min(MAX_PERIODS, int(interval / self.period_ns + 0.5))] += 1
+        self._last_ns = captured_ns
+
+    # -----------------------------------------------
+    # RingReader と同じインターフェース
+    # -----------------------------------------------
+    def frames(self, stop_flag, timeout=0.5):
+        """stop_flag が立つまで締め切りごとに (seq, ビュー) を yield する"""
+        while not stop_flag.is_set():
+            item = self.read(timeout)
+            if item is not None:
+                yield item
+
+    def still_valid(self, seq):
+        """処理中に seq のフレームが上書きされていないか確認する（上書きされていたら dropped に数える）"""
+        if self.ring.is_valid(seq):
+            return True
+        self.dropped += 1
+        return False
+
+    def close(self):
+        """最新フレームだけを受け取るのでカーソルはリングに登録していない（飛ばしたフレームは overwrites に数えない）"""
+
+    # -----------------------------------------------
+    # 集計
+    # -----------------------------------------------
+    def stats(self):
+        """
+        Returns:
+        dict: {'fps', 'period_ms', 'frames', 'skipped', 'dropped', 'late', 'missed_deadlines',
+               'interval_ms': {'mean', 'p50', 'p95', 'p99', 'max'},
+               'interval_periods': {'0', '1', ..., 'N+'}（間隔が周期の何倍か。1 が正常、2 以上はフレームの抜け）,
+               'lateness_ms': {'p50', 'p95', 'p99', 'max'}}
+        """
+        def ms(ns):
+            return round(ns / 1e6, 3)
+
+        intervals, lateness = self.intervals, self.lateness
+        periods = {str(i): n for i, n in enumerate(self.interval_periods)}
+        periods[f'{MAX_PERIODS}+'] = periods.pop(str(MAX_PERIODS))
+        return {
+            'fps': self.fps,
+            'period_ms': ms(self.period_ns),
+            'frames': self.frames_read,
+            'skipped': self.skipped,
+            'dropped': self.dropped,
+            'late': self.late,
+            'missed_deadlines': self.missed_deadlines,
+            'interval_ms': {
+                'mean': ms(intervals.total / intervals.count) if intervals.count else 0.0,
+                **{f'p{p}': ms(intervals.percentile(p)) for p in (50, 95, 99)},
+                'max': ms(intervals.max),
+            },
+            'interval_periods': periods,
+            'lateness_ms': {**{f'p{p}': ms(lateness.percentile(p)) for p in (50, 95, 99)}, 'max': ms(lateness.max)},
+        }
+
+    def summary(self):
+        s = self.stats()
+        iv, lt = s['interval_ms'], s['lateness_ms']
+        periods = ' '.join(f"{k}x:{n}" for k, n in s['interval_periods'].items())
+        return (f"Schedule {s['fps']} fps: {s['frames']} frames, skipped {s['skipped']}, dropped {s['dropped']}, "
+                f"late {s['late']}, missed deadlines {s['missed_deadlines']} | interval p50 {iv['p50']:.1f} / "
+                f"p99 {iv['p99']:.1f} / max {iv['max']:.1f} ms ({periods}) | lateness p99 {lt['p99']:.1f} ms")
@@ -0,0 +1,373 @@
+import multiprocessing as mp
+import os
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from .capture import MAX_READERS, CameraCapture, RingReader, needed_by_reader, register_cursor
+from .control import CONTROL_FILE, ControlServer
+from .preview import preview_main
+from .profiling import NULL_PROFILER, Profiler, finish_profile
+
+# ===============================================
+# 共有メモリのフレームリングを使ったマルチプロセス版ライブキャプチャ
+#
+# スレッド版（live.start_capture_and_detect_worker）では、取得ループ・検知（cvtColor / absdiff）・
+# JPEG 保存・プレビューが 1 プロセス内で GIL を取り合う。この版では
+#   - 取得プロセス : CameraCapture がリング（SharedFrameRing）へ直接デコード
+#   - 検知プロセス : stutter_worker_auto_threshold_cupy
+#   - 保存プロセス : save_worker
+#   - プレビュー   : preview.preview_main（任意。最新フレームを自分のレートで表示するだけ）
+#   - 親プロセス   : 制御（control.py の status / stop）と終了処理のみ（ヘッドレス）
+# に分け、フレームは pickle せずに共有メモリ上のスロットをシーケンス番号で参照する。
+# SharedFrameRing は capture.FrameRing と同じインターフェースなので、RingReader と各ワーカーはそのまま使える。
+#
+# 使い方:
+#   python -m src.detector.live --device 0 --processes
+# ===============================================
+
+# 読み手が新しいフレームを待つときのポーリング間隔（秒）
+POLL_INTERVAL = 0.0005
+
+
+def _attach_shared_memory(name):
+    """
+    既存の共有メモリにアタッチする（resource_tracker には登録しない）
+
+    Python 3.12 以前はアタッチ側も resource_tracker に登録され、終了時に unlink されてしまうため、
+    作成したプロセスだけが解放するように登録を抑止する（3.13 以降は track=False）
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+
+    def register_except_shm(res_name, rtype):
+        if rtype != 'shared_memory':
+            register(res_name, rtype)
+
+    resource_tracker.register = register_except_shm
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class SharedFrameRing:
+    """
+    共有メモリ上のフレームリング（書き込み 1 プロセス、読み取り複数プロセス）
+
+    レイアウト: [head, writes, overwrites]（int64）, seqs（int64 × capacity）,
+               timestamps（float64 × capacity）, 読み手のカーソル（int64 × MAX_READERS × 2）, フレーム × capacity
+    書き込み側はフレームと seqs を書いてから最後に head を進めるので、読み手は head までのフレームを参照できる。
+    カーソルの登録はプロセス間でロックしないので、複数のプロセスから読む場合は RingReader の slot を重ならないように渡す。
+    """
+
+    def __init__(self, capacity, shape, dtype=np.uint8, name=None):
+        if capacity < 2:
+            raise ValueError("SharedFrameRing needs at least 2 slots")
+        self.capacity = capacity
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+
+        frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        size = 8 * 3 + 8 * capacity + 8 * capacity + 8 * MAX_READERS * 2 + frame_bytes * capacity
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = _attach_shared_memory(name)
+
+        buf = self.shm.buf
+        offset = 0
+        self._header = np.ndarray(3, np.int64, buffer=buf, offset=offset)
+        offset += 8 * 3
+        self.seqs = np.ndarray(capacity, np.int64, buffer=buf, offset=offset)
+        offset += 8 * capacity
+        self.timestamps = np.ndarray(capacity, np.float64, buffer=buf, offset=offset)
+        offset += 8 * capacity
+        self.cursors = np.ndarray((MAX_READERS, 2), np.int64, buffer=buf, offset=offset)
+        offset += 8 * MAX_READERS * 2
+        self.buffers = np.ndarray((capacity,) + self.shape, self.dtype, buffer=buf, offset=offset)
+
+        if self.owner:
+            self._header[:] = (-1, 0, 0)
+            self.seqs[:] = -1
+            self.timestamps[:] = 0
+            self.cursors[:] = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def meta(self):
+        """別プロセスから attach するための情報（pickle できる）"""
+        return self.name, self.capacity, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, meta):
+        name, capacity, shape, dtype = meta
+        return cls(capacity, shape, dtype, name=name)
+
+    @property
+    def head(self):
+        return int(self._header[0])
+
+    @property
+    def writes(self):
+        return int(self._header[1])
+
+    @property
+    def overwrites(self):
+        return int(self._header[2])
+
+    # -----------------------------------------------
+    # 書き込み側（取得プロセスのみが呼ぶ）
+    # -----------------------------------------------
+    def acquire_write(self):
+        return self.buffers[(self.head + 1) % self.capacity]
+
+    def publish(self, timestamp=None):
+        seq = self.head + 1
+        slot = seq % self.capacity
+        if needed_by_reader(self.cursors, seq + 1 - self.capacity):
+            self._header[2] += 1
+        self.seqs[slot] = seq
+        self.timestamps[slot] = time.perf_counter() if timestamp is None else timestamp
+        self._header[1] += 1
+        self._header[0] = seq  # 最後に公開する
+        return seq
+
+    # -----------------------------------------------
+    # 読み取り側（FrameRing と同じ）
+    # -----------------------------------------------
+    def register_reader(self, next_seq, stride=1, slot=None):
+        return register_cursor(self.cursors, next_seq, stride, slot)
+
+    def unregister_reader(self, cursor):
+        cursor[1] = 0
+
+    def oldest_valid(self):
+        return max(0, self.head + 2 - self.capacity)
+
+    def is_valid(self, seq):
+        return self.oldest_valid() <= seq <= self.head
+
+    def get(self, seq, cursor=None):
+        if not self.is_valid(seq):
+            return None
+        slot = seq % self.capacity
+        if cursor is not None:
+            cursor[0] = seq + cursor[1]
+        view = self.buffers[slot].view()
+        view.flags.writeable = False
+        return view
+
+    def timestamp(self, seq):
+        return float(self.timestamps[seq % self.capacity])
+
+    def latest(self):
+        seq = self.head
+        if seq < 0:
+            return -1, None
+        return seq, self.get(seq)
+
+    def wait_for(self, seq, timeout=None):
+        """seq 以降のフレームが公開されるまでポーリングで待つ（公開されたら True）"""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self._header[0] < seq:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+    def close(self):
+        """共有メモリを切り離す（作成したプロセスでは解放もする）"""
+        self._header = self.seqs = self.timestamps = self.cursors = self.buffers = None
+        try:
+            self.shm.close()
+        except BufferError:
+            # ワーカーに渡したビューが残っている場合（プロセス終了時に解放される）
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+# ===============================================
+# 各プロセスのエントリーポイント
+# ===============================================
+def capture_main(conn, stop_event, device_number, target_width, target_height, target_fps, ring_size,
+                 backend=cv2.CAP_DSHOW, open_capture=None, profile=False):
+    """
+    取得プロセス: カメラを開いて共有リングを作成し、(meta, fps_set) を conn で親に送ってから
+    stop_event が立つまでリングに書き込む。終了時に {'writes', 'overwrites', 'profile'} を送る
+    """
+    profiler = Profiler() if profile else NULL_PROFILER
+    try:
+        cam = CameraCapture(device_number, target_width, target_height, target_fps, ring_size=ring_size,
+                            backend=backend, open_capture=open_capture, ring_factory=SharedFrameRing,
+                            profiler=profiler)
+    except RuntimeError as e:
+        conn.send(('error', str(e)))
+        return
+    conn.send(('ready', cam.ring.meta(), cam.fps_set))
+    stop_event.wait()
+    cam.release()
+    conn.send(('done', {'writes': cam.ring.writes, 'overwrites': cam.ring.overwrites,
+                        'profile': profiler.state()}))
+    cam.ring.close()
+
+
+def consumer_main(role, meta, stride, stop_event, results, kwargs, progress=None, profile=False, slot=None):
+    """
+    検知・保存プロセス: 共有リングにアタッチしてワーカーを動かし、(role, 読んだ数, 取りこぼし数, 計測結果) を返す
+
+    progress: 共有配列 [読んだ数, 取りこぼし数]（status コマンド用に定期的に更新する）
+    profile: True なら各段の処理時間を計測して Profiler.state() を返す
+    slot: リングに登録するカーソルの行（プロセスごとに重ならないように親が割り当てる）
+    """
+    from .live import save_worker, stutter_worker_auto_threshold_cupy
+
+    ring = SharedFrameRing.attach(meta)
+    reader = RingReader(ring, stride, slot=slot)
+    profiler = Profiler() if profile else NULL_PROFILER
+    done = threading.Event()
+
+    def report_progress():
+        while not done.wait(0.2):
+            progress[0], progress[1] = reader.frames_read, reader.dropped
+
+    if progress is not None:
+        threading.Thread(target=report_progress, daemon=True).start()
+    try:
+        if role == 'detect':
+            stutter_worker_auto_threshold_cupy(reader, stop_flag=stop_event, profiler=profiler, **kwargs)
+        else:
+            save_worker(reader, stop_flag=stop_event, profiler=profiler, **kwargs)
+    finally:
+        done.set()
+        reader.close()
+        results.put((role, reader.frames_read, reader.dropped, profiler.state()))
+        ring.close()
+
+
+def start_multiprocess_capture(device_number=0, target_width=1920, target_height=1080,
+                               capture_fps=30, display_fps=10, target_fps=60, min_time_diff=0.1,
+                               k=2.0, ring_size=16, output_root=None, log_format="csv",
+                               threshold="ema", window=600, duration=None, backend=cv2.CAP_DSHOW,
+                               open_capture=None, save_frames=True, profile=None):
+    """
+    取得・検知・保存を別プロセスで動かすライブキャプチャ（引数は live.start_capture_and_detect_worker と同じ意味）
+
+    display_fps: プレビュープロセスの表示レート（0 ならプレビューなしのヘッドレス）
+    duration: 指定した秒数で自動終了（None なら control.py の stop、プレビューの 'q' キー、Ctrl+C で終了）
+    open_capture: カメラの代わりに使う VideoCapture 互換オブジェクトを作る関数（pickle できること）
+    save_frames: False なら保存プロセスを起動しない
+    profile: JSON の保存先を指定すると、各プロセスの段ごとの処理時間を集計して保存する（profiling.py）
+
+    Returns:
+    dict: {'frames', 'fps', 'overwrites', 'detect': {'frames_read', 'dropped'}, 'save': {...}, 'output_folder'}
+    """
+    if output_root is None:
+        output_root = os.path.join(os.path.expanduser("~"), "Desktop")
+    temp_folder = os.path.join(output_root, "temp_frames")
+    output_folder = os.path.join(output_root, "stutter_frames")
+    for folder in (temp_folder, output_folder):
+        os.makedirs(folder, exist_ok=True)
+
+    profiler = Profiler() if profile else NULL_PROFILER
+    stop_event = mp.Event()
+    parent_conn, child_conn = mp.Pipe()
+    capture = mp.Process(target=capture_main, daemon=True,
+                         args=(child_conn, stop_event, device_number, target_width, target_height, target_fps,
+                               ring_size, backend, open_capture, bool(profile)))
+    capture.start()
+    if not parent_conn.poll(30):
+        stop_event.set()
+        capture.join(1)
+        raise RuntimeError("❌ 取得プロセスが応答しませんでした。")
+    message = parent_conn.recv()
+    if message[0] == 'error':
+        capture.join()
+        raise RuntimeError(message[1])
+    _, meta, fps_set = message
+
+    stride = max(1, int(round(fps_set / capture_fps))) if capture_fps else 1
+    results = mp.Queue()
+    progress = {}
+    consumers = []
+    roles = [('detect', {'output_folder': output_folder, 'fps': fps_set / stride, 'min_time_diff': min_time_diff,
+                         'k': k, 'log_format': log_format, 'threshold': threshold, 'window': window})]
+    if save_frames:
+        roles.append(('save', {'folder_path': temp_folder, 'log_format': log_format}))
+    for slot, (role, kwargs) in enumerate(roles):
+        progress[role] = mp.Array('q', 2, lock=False)
+        consumers.append(mp.Process(target=consumer_main, daemon=True,
+                                    args=(role, meta, stride, stop_event, results, kwargs, progress[role],
+                                          bool(profile), slot)))
+    for p in consumers:
+        p.start()
+
+    # --- 親プロセス: ヘッドレスの制御ループ（status / stop は control.py 経由、経過時間は時刻合わせで跳ばない perf_counter で測る） ---
+    ring = SharedFrameRing.attach(meta)
+    start_time = time.perf_counter()
+
+    def status():
+        elapsed = time.perf_counter() - start_time
+        info = {'elapsed_sec': round(elapsed, 3), 'frames': ring.writes, 'overwrites': ring.overwrites,
+                'fps': round(ring.writes / elapsed, 2) if elapsed > 0 else 0.0, 'stopping': stop_event.is_set()}
+        for role, values in progress.items():
+            info[role] = {'frames_read': values[0], 'dropped': values[1]}
+        return info
+
+    def stop():
+        stop_event.set()
+        return {'stopping': True}
+
+    server = ControlServer({'status': status, 'stop': stop}, control_file=os.path.join(output_folder, CONTROL_FILE))
+    preview = None
+    if display_fps:
+        preview = mp.Process(target=preview_main, daemon=True,
+                             args=(meta, stop_event, display_fps, server.endpoint))
+        preview.start()
+    print(f"🎥 映像キャプチャ開始（マルチプロセス）。終了: python -m src.detector.control "
+          f"{server.control_file} stop（または Ctrl+C）")
+    try:
+        while not stop_event.wait(0.2):
+            if duration is not None and time.perf_counter() - start_time >= duration:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.close()
+        if preview is not None:
+            preview.join(5)
+        stats = {'output_folder': output_folder}
+        for _ in consumers:
+            role, frames_read, dropped, profile_state = results.get(timeout=30)
+            stats[role] = {'frames_read': frames_read, 'dropped': dropped}
+            profiler.merge_state(profile_state)
+        for p in consumers:
+            p.join()
+        if parent_conn.poll(10):
+            message = parent_conn.recv()
+            if message[0] == 'done':
+                stats['frames'] = message[1]['writes']
+                stats['overwrites'] = message[1]['overwrites']
+                profiler.merge_state(message[1]['profile'])
+        capture.join()
+        ring.close()
+
+    elapsed = time.perf_counter() - start_time
+    stats['fps'] = stats.get('frames', 0) / elapsed if elapsed > 0 else 0.0
+    print(f"✅ 完全終了: {stats.get('frames', 0)} フレーム（実測FPS: {stats['fps']:.2f}）")
+    print(f"📉 取りこぼし: 検知 {stats.get('detect', {}).get('dropped')} / 保存 {stats.get('save', {}).get('dropped')} "
+          f"フレーム（読む前に上書き: {stats.get('overwrites')}）")
+    finish_profile(profiler, profile)
+    return stats
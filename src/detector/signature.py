@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+
+import cv2
+import numpy as np
+
+from .ingest import open_luma_reader
+from .processor import read_frames, to_luma
+from .utils import find_runs
+
+# ===============================================
+# フレームシグネチャ（フレームごとの差分指標）のサイドカー保存
+# 1 回目の解析でフレームごとの指標を <動画>.sig.npz に保存しておき、
+# diff_thresh / min_consec を変えた再解析はデコードせずにサイドカーから答える
+#
+# サイドカーは (ファイルサイズ, mtime, 内容ハッシュ, ingest モード) をキーに持ち、
+# どれかが変わっていれば古いものとして作り直す
+# ===============================================
+
+SIDECAR_SUFFIX = '.sig.npz'
+SIDECAR_VERSION = 1
+
+# 内容ハッシュに使う先頭・中央・末尾のサンプルサイズ（長時間動画でも一定時間で計算できるようにする）
+HASH_CHUNK_SIZE = 1 << 20
+
+# フレームごとの指標（1 フレーム目は前フレームがないため mean_diff=NaN）
+SIGNATURE_DTYPE = np.dtype([
+    ('pts', np.float64),         # 表示時刻（秒）
+    ('mean_diff', np.float64),   # 前フレームとの平均絶対差（detect_stutter と同じ値）
+    ('nonzero', np.uint32),      # 差分が 0 でない画素数
+    ('max_diff', np.uint8),      # 最大差分
+    ('thumb_hash', np.uint64),   # 8x8 縮小画像の平均ハッシュ
+])
+
+
+def sidecar_path(video_path):
+    """動画ファイルに対応するサイドカーのパスを返す"""
+    return os.fspath(video_path) + SIDECAR_SUFFIX
+
+
+def video_key(video_path, ingest='bgr'):
+    """
+    サイドカーの有効性を判定するキーを作成する関数
+
+    Parameters:
+    video_path (str): 動画ファイルのパス
+    ingest (str): 指標の計算に使った輝度取り込みモード
+
+    Returns:
+    dict: size / mtime_ns / content_hash / ingest / version
+    """
+    st = os.stat(video_path)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(st.st_size.to_bytes(8, 'little'))
+    with open(video_path, 'rb') as f:
+        # 先頭・中央・末尾を読んでハッシュ化（全体を読むと数 GB の動画で遅くなるため）
+        for offset in (0, max(0, st.st_size // 2 - HASH_CHUNK_SIZE // 2), max(0, st.st_size - HASH_CHUNK_SIZE)):
+            f.seek(offset)
+            h.update(f.read(HASH_CHUNK_SIZE))
+    return {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'content_hash': h.hexdigest(),
+        'ingest': ingest,
+        'version': SIDECAR_VERSION,
+    }
+
+
+def thumbnail_hash(gray):
+    """8x8 に縮小した輝度画像の平均ハッシュ（64 bit）を返す"""
+    thumb = cv2.resize(gray, (8, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits(thumb > thumb.mean())
+    return int.from_bytes(bits.tobytes(), 'big')
+
+
+def compute_signatures(video_path, ingest='bgr', backend=None, max_frames=None):
+    """
+    動画をデコードしてフレームごとの指標を計算する関数
+
+    Parameters:
+    video_path (str): 動画ファイルのパス
+    ingest (str): 輝度取り込みモード（ingest.py）
+    backend: OpenCV backend flag
+    max_frames (int | None): 計算する最大フレーム数
+
+    Returns:
+    numpy.ndarray: SIGNATURE_DTYPE の構造化配列（フレーム順）
+    """
+    reader = open_luma_reader(video_path, ingest, backend)
+    if not reader.isOpened():
+        raise FileNotFoundError(f"Could not open video: {video_path}")
+
+    fps = reader.get(cv2.CAP_PROP_FPS) or 0.0
+    rows = []
+    previous_gray = None
+    # 共通パイプラインのフレーム取得・輝度変換段を使う（read_frames は 1 フレームずつ読むので
+    # ループ内の CAP_PROP_POS_MSEC は直前に読んだフレームの時刻になる）
+    for _, gray in to_luma(read_frames(reader, max_frames)):
+        pts = reader.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        if pts <= 0 and fps > 0:
+            # PTS が取れないリーダー（ffmpeg パイプなど）はフレーム番号から推定
+            pts = len(rows) / fps
+
+        if previous_gray is None:
+            mean_diff, nonzero, max_diff = np.nan, 0, 0
+        else:
+            diff = cv2.absdiff(gray, previous_gray)
+            mean_diff = float(np.mean(diff))
+            nonzero = int(np.count_nonzero(diff))
+            max_diff = int(diff.max())
+        rows.append((pts, mean_diff, nonzero, max_diff, thumbnail_hash(gray)))
+        previous_gray = gray
+
+    reader.release()
+    return np.array(rows, dtype=SIGNATURE_DTYPE)
+
+
+def save_signatures(video_path, signatures, key=None, path=None):
+    """指標をサイドカーに保存する（一時ファイルに書いてから置き換える）"""
+    if key is None:
+        key = video_key(video_path)
+    if path is None:
+        path = sidecar_path(video_path)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, signatures=signatures, key=np.array(json.dumps(key)))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_signatures(video_path, ingest='bgr', path=None):
+    """
+    サイドカーから指標を読み込む関数
+
+    Returns:
+    numpy.ndarray | None: 有効なサイドカーがあれば指標、なければ（または古ければ）None
+    """
+    if path is None:
+        path = sidecar_path(video_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            stored_key = json.loads(str(data['key']))
+            if stored_key != video_key(video_path, ingest):
+                return None
+            return data['signatures']
+    except (OSError, ValueError, KeyError):
+        # 壊れたサイドカーは作り直す
+        return None
+
+
+def get_signatures(video_path, ingest='bgr', backend=None):
+    """
+    サイドカーが有効ならそれを返し、なければデコードして作成・保存する関数
+
+    Returns:
+    numpy.ndarray: SIGNATURE_DTYPE の構造化配列
+    """
+    signatures = load_signatures(video_path, ingest)
+    if signatures is None:
+        signatures = compute_signatures(video_path, ingest, backend)
+        save_signatures(video_path, signatures, video_key(video_path, ingest))
+    return signatures
+
+
+def detect_stutter_from_signatures(signatures, diff_thresh=2.0, min_consec=3, max_frames=None):
+    """
+    保存済みの指標から detect_stutter と同じカクつき区間を求める関数（デコード不要）
+
+    Parameters:
+    signatures (numpy.ndarray): SIGNATURE_DTYPE の構造化配列
+    diff_thresh (float): 平均差分がこれ未満なら「ほぼ同一フレーム」
+    min_consec (int): カクつきと判断する最小連続フレーム数
+    max_frames (int | None): 先頭から何フレームまでを対象にするか
+
+    Returns:
+    list of tuple: (start, end) 形式のフレーム区間（1 始まり）
+    """
+    mean_diff = signatures['mean_diff'][:max_frames]
+    with np.errstate(invalid='ignore'):
+        similar = mean_diff < diff_thresh  # NaN（1 フレーム目）は False
+    return [(s, e) for s, e in find_runs(similar, offset=1) if e - s + 1 >= min_consec]
@@ -0,0 +1,255 @@
+import time
+
+import cv2
+import numpy as np
+
+# ===============================================
+# 正解付きの合成動画（ベンチマーク・テスト用）
+#
+# 乱数のシードから決まる絵柄を動かし、指定（または乱数で配置）したフレーム区間を
+# 直前のフレームの複製にする。複製した区間がそのまま正解（ground truth）になる。
+#   - freeze   : min_len 〜 max_len フレーム続く静止（カクつき）
+#   - duplicate: 1 フレームだけの複製（60fps 化などで生じる重複フレーム）
+# 区間の番号は detect_stutter と同じ 1 始まり・両端含む（(10, 15) はフレーム 10〜15 がフレーム 9 と同一）。
+#
+# active_region を指定すると、静止した「画面の枠」（タスクバー・黒帯・HUD を模した模様）の中の
+# その領域だけに絵柄を描く（画面録画・キャプチャボードの録画を模擬、roi.py のテスト・ベンチマーク用）。
+#
+# 使い方:
+#   truth = write_synthetic_video('bench.avi', n_frames=300, size=(1280, 720), motion='noise', seed=1)
+#   score_runs(detect_stutter('bench.avi'), truth['freezes'])
+# ===============================================
+
+# 絵柄の動き
+#   pan       : 横方向に 1 フレーム 8 画素ずつ流れる
+#   slow_pan  : 1 フレーム 1 画素（差分が小さく、しきい値に近い）
+#   noise     : pan にフレームごとのセンサーノイズを加える
+#   static_noise: 静止した絵柄にノイズだけが乗る（ノイズとカクつきの区別が最も難しい）
+MOTIONS = ('pan', 'slow_pan', 'noise', 'static_noise')
+
+
+def _base_image(size, rng):
+    w, h = size
+    coarse = rng.integers(0, 256, size=(max(1, h // 16), max(1, w // 16), 3), dtype=np.uint8)
+    base = cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC)
+    # 細かいエッジも含める（縮小・差分の検知でぼけて見えなくならないように）
+    fine = rng.integers(0, 64, size=(h, w, 3), dtype=np.uint8)
+    return cv2.add(base, fine)
+
+
+def make_frames(n_frames, size=(640, 360), motion='pan', seed=0, repeat=()):
+    """
+    合成フレームを順に返すジェネレーター
+
+    Parameters:
+    n_frames (int): フレーム数
+    size (tuple): (幅, 高さ)
+    motion (str): 絵柄の動き（MOTIONS）
+    seed (int): 絵柄・ノイズの乱数シード
+    repeat (set): 直前のフレームをそのまま繰り返すフレーム番号（1 始まり）
+
+    Yields:
+    numpy.ndarray: BGR フレーム（uint8）
+    """
+    if motion not in MOTIONS:
+        raise ValueError(f"Unknown motion: {motion} (choose from {', '.join(MOTIONS)})")
+    rng = np.random.default_rng(seed)
+    base = _base_image(size, rng)
+    step = {'pan': 8, 'slow_pan': 1, 'noise': 8, 'static_noise': 0}[motion]
+    noisy = motion in ('noise', 'static_noise')
+    frame = None
+    for number in range(1, n_frames + 1):
+        if frame is None or number not in repeat:
+            frame = np.roll(base, (number * step) % size[0], axis=1) if step else base.copy()
+            if noisy:
+                noise = rng.integers(-6, 7, size=frame.shape, dtype=np.int16)
+                frame = np.clip(frame.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        yield frame
+
+
+def _static_chrome(size, rng):
+    """黒帯・上下のバー・HUD の文字を模した静止画像"""
+    w, h = size
+    canvas = np.zeros((h, w, 3), dtype=np.uint8)
+    canvas[:max(1, h // 12)] = (48, 48, 48)
+    canvas[h - max(1, h // 12):] = (32, 32, 32)
+    for _ in range(8):
+        x, y = int(rng.integers(0, max(1, w - 40))), int(rng.integers(0, max(1, h // 12)))
+        cv2.putText(canvas, 'HUD', (x, y + 8), cv2.FONT_HERSHEY_SIMPLEX, 0.3, (200, 200, 200), 1)
+    return canvas
+
+
+def place_runs(n_frames, count, min_len, max_len, rng, taken=(), margin=3):
+    """
+    重ならない区間 (start, end) を count 個ランダムに配置する（先頭フレームと前後 margin フレームは空ける）
+
+    Returns:
+    list of tuple: 開始フレーム順に並んだ区間
+    """
+    busy = np.zeros(n_frames + 2, dtype=bool)
+    busy[:2] = True  # フレーム 1 は比較対象がない
+    for start, end in taken:
+        busy[max(0, start - margin):end + margin + 1] = True
+    runs = []
+    for _ in range(count * 20):
+        if len(runs) == count:
+            break
+        length = int(rng.integers(min_len, max_len + 1))
+        start = int(rng.integers(2, max(3, n_frames - length + 2)))
+        end = start + length - 1
+        if end > n_frames or busy[max(0, start - margin):end + margin + 1].any():
+            continue
+        busy[max(0, start - margin):end + margin + 1] = True
+        runs.append((start, end))
+    return sorted(runs)
+
+
+def write_synthetic_video(path, n_frames=300, size=(640, 360), fps=30, motion='pan', seed=0,
+                          freezes=None, n_freezes=4, freeze_len=(3, 12), duplicates=None, n_duplicates=6,
+                          fourcc='MJPG', active_region=None):
+    """
+    正解付きの合成動画を書き出す関数
+
+    Parameters:
+    path (str): 出力先（MJPG なら .avi、mp4v なら .mp4）
+    n_frames (int): 総フレーム数
+    size (tuple): (幅, 高さ)
+    fps (int): フレームレート
+    motion (str): 絵柄の動き（MOTIONS）
+    seed (int): 乱数シード（同じ引数なら同じ動画・正解になる）
+    freezes (list | None): 静止区間 (start, end) を明示する場合に指定（None なら n_freezes 個をランダムに配置）
+    freeze_len (tuple): ランダムに配置する静止区間の長さの範囲（フレーム数）
+    duplicates (list | None): 1 フレームの複製の位置（None なら n_duplicates 個をランダムに配置）
+    fourcc (str): コーデック
+    active_region (tuple | None): (x, y, w, h)。指定するとこの領域だけが動き、残りは静止した枠になる
+
+    Returns:
+    dict: {'path', 'n_frames', 'size', 'fps', 'motion', 'seed', 'freezes', 'duplicates', 'active_region'}
+    """
+    rng = np.random.default_rng(seed)
+    if freezes is None:
+        freezes = place_runs(n_frames, n_freezes, freeze_len[0], freeze_len[1], rng)
+    if duplicates is None:
+        duplicates = [start for start, _ in place_runs(n_frames, n_duplicates, 1, 1, rng, taken=freezes)]
+    repeat = {f for start, end in freezes for f in range(start, end + 1)} | set(duplicates)
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, tuple(size))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open VideoWriter for {path} ({fourcc})")
+    try:
+        if active_region is None:
+            for frame in make_frames(n_frames, size, motion, seed, repeat):
+                writer.write(frame)
+        else:
+            x, y, rw, rh = active_region
+            canvas = _static_chrome(size, rng)
+            for frame in make_frames(n_frames, (rw, rh), motion, seed, repeat):
+                canvas[y:y + rh, x:x + rw] = frame
+                writer.write(canvas)
+    finally:
+        writer.release()
+    return {'path': str(path), 'n_frames': n_frames, 'size': list(size), 'fps': fps, 'motion': motion,
+            'seed': seed, 'freezes': [list(r) for r in freezes], 'duplicates': sorted(duplicates),
+            'active_region': None if active_region is None else list(active_region)}
+
+
+def frames_to_runs(frames):
+    """フレーム番号の列を連続区間 (start, end) のリストにまとめる"""
+    runs = []
+    for f in sorted(frames):
+        if runs and f == runs[-1][1] + 1:
+            runs[-1][1] = f
+        else:
+            runs.append([f, f])
+    return [tuple(r) for r in runs]
+
+
+def score_runs(detected, truth):
+    """
+    検出区間を正解区間と比べる関数
+
+    区間単位: 正解と 1 フレームでも重なる検出を正検出とする（precision / recall）
+    フレーム単位: 区間に含まれるフレームの一致（frame_precision / frame_recall）
+
+    Returns:
+    dict: {'precision', 'recall', 'f1', 'frame_precision', 'frame_recall', 'detected', 'truth'}
+    """
+    detected = [tuple(r) for r in detected]
+    truth = [tuple(r) for r in truth]
+
+    def overlaps(a, b):
+        return a[0] <= b[1] and b[0] <= a[1]
+
+    hit_detected = sum(any(overlaps(d, t) for t in truth) for d in detected)
+    hit_truth = sum(any(overlaps(t, d) for d in detected) for t in truth)
+    precision = hit_detected / len(detected) if detected else 1.0
+    recall = hit_truth / len(truth) if truth else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+    det_frames = {f for s, e in detected for f in range(s, e + 1)}
+    true_frames = {f for s, e in truth for f in range(s, e + 1)}
+    both = len(det_frames & true_frames)
+    return {
+        'precision': round(precision, 4), 'recall': round(recall, 4), 'f1': round(f1, 4),
+        'frame_precision': round(both / len(det_frames), 4) if det_frames else 1.0,
+        'frame_recall': round(both / len(true_frames), 4) if true_frames else 1.0,
+        'detected': len(detected), 'truth': len(truth),
+    }
+
+
+class SyntheticCamera:
+    """
+    一定のフレームレートでフレームを返す VideoCapture 互換の疑似カメラ（ライブキャプチャのベンチマーク用）
+
+    grab() は次のフレーム時刻まで待ち、retrieve() は事前にエンコードした JPEG をデコードする
+    （MJPG カメラのデコード負荷を模擬）。絵柄は 3 フレームごとに同じ（カクつき）。
+    """
+
+    def __init__(self, device_number=0, backend=None):
+        self.props = {cv2.CAP_PROP_FRAME_WIDTH: 640, cv2.CAP_PROP_FRAME_HEIGHT: 480, cv2.CAP_PROP_FPS: 30}
+        self._jpegs = None
+        self._index = 0
+        self._next_time = None
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        self.props[prop] = value
+        self._jpegs = None
+        return True
+
+    def get(self, prop):
+        return float(self.props.get(prop, 0))
+
+    def _prepare(self):
+        size = (int(self.props[cv2.CAP_PROP_FRAME_WIDTH]), int(self.props[cv2.CAP_PROP_FRAME_HEIGHT]))
+        repeat = {n for n in range(1, 31) if n % 3 != 1}
+        self._jpegs = [cv2.imencode('.jpg', frame)[1] for frame in make_frames(30, size, 'pan', 0, repeat)]
+
+    def grab(self):
+        if self._jpegs is None:
+            self._prepare()
+        now = time.perf_counter()
+        interval = 1.0 / self.props[cv2.CAP_PROP_FPS]
+        if self._next_time is None:
+            self._next_time = now
+        if self._next_time > now:
+            time.sleep(self._next_time - now)
+        self._next_time += interval
+        self._index += 1
+        return True
+
+    def retrieve(self, image=None):
+        frame = cv2.imdecode(self._jpegs[self._index % len(self._jpegs)], cv2.IMREAD_COLOR)
+        if image is not None and image.shape == frame.shape:
+            np.copyto(image, frame)
+            return True, image
+        return True, frame
+
+    def read(self, image=None):
+        self.grab()
+        return self.retrieve(image)
+
+    def release(self):
+        pass
@@ -0,0 +1,352 @@
+import bisect
+from collections import deque
+
+import numpy as np
+
+# ===============================================
+# 適応型しきい値の推定器
+# ライブキャプチャのカクつき検知ワーカー（live.py）で使う
+#   - AdaptiveThresholdTrainer: EMA ＋分散比（'ema'、従来）
+#   - RollingMedianThreshold  : 移動窓の中央値・MAD（'median'）
+#
+# update() は 1 点ずつ、update_batch() は配列をまとめて処理する（記録済みログの再生・パラメータ調整用）。
+# update_batch は EMA を 1 次の再帰フィルター（scipy.signal.lfilter）として計算し、
+# update() を順に呼んだ場合と浮動小数点演算の順序まで同じ（結果はビット単位で一致する）。
+# ===============================================
+
+# update_batch の戻り値（1 行 = 1 サンプル）
+THRESHOLD_DTYPE = np.dtype([
+    ('mean', 'f8'),          # 更新後の平均（EMA）
+    ('std', 'f8'),           # 更新後の平均絶対偏差（EMA）
+    ('threshold', 'f8'),     # しきい値
+    ('dynamic_k', 'f8'),     # 係数（base_k × 分散比）
+    ('stutter_flag', 'u1'),  # 値がしきい値以下（カクつき）なら 1
+])
+
+
+class AdaptiveThresholdTrainer:
+    """
+    指数移動平均（EMA）＋分散比ベースの適応型しきい値推定器。
+    """
+
+    def __init__(self, alpha_mean=0.05, alpha_std=0.05, base_k=2.0):
+        self.alpha_mean = alpha_mean
+        self.alpha_std = alpha_std
+        self.base_k = base_k
+        self.reset()
+
+    def reset(self):
+        self.mean = None
+        self.std = None
+        self.var_ratio = 1.0
+
+    @property
+    def dynamic_k(self):
+        """現在の係数（base_k × 分散比）"""
+        return self.base_k * self.var_ratio
+
+    def update(self, x):
+        """1点ずつ更新"""
+        x = float(x)
+
+        if self.mean is None:
+            self.mean = x
+            self.std = 0.0
+        else:
+            prev_mean = self.mean
+            self.mean = (1 - self.alpha_mean) * self.mean + self.alpha_mean * x
+            diff = abs(x - prev_mean)
+            self.std = (1 - self.alpha_std) * self.std + self.alpha_std * diff
+
+        # 安定度に応じて係数を変える（安定→k大きめ、変動→k小さめ）
+        var = self.std / (self.mean + 1e-9)
+        self.var_ratio = max(0.5, min(2.0, 1.0 + (var - 0.1)))  # 変動範囲制限
+
+        dynamic_k = self.base_k * self.var_ratio
+        threshold = max(self.mean - dynamic_k * self.std, 0.0)
+
+        return threshold
+
+    def update_batch(self, values):
+        """
+        配列をまとめて更新する関数（update を順に呼んだ場合とビット単位で同じ結果）
+
+        Parameters:
+        values (array-like): フレーム差分などの 1 次元配列（CuPy 配列ならホストに転送してから計算）
+
+        Returns:
+        numpy.ndarray: THRESHOLD_DTYPE のレコード配列（各サンプルを update した直後の値）
+
+        推定器の状態（mean / std / var_ratio）は最後のサンプルまで進むので、続けて update() を呼べる
+        """
+        from scipy.signal import lfilter  # 再生・調整時にだけ読み込む
+
+        if type(values).__module__.startswith('cupy'):
+            values = values.get()  # CuPy 配列（lfilter は CPU で計算する）
+        x = np.asarray(values, dtype=np.float64).ravel()
+        out = np.zeros(len(x), dtype=THRESHOLD_DTYPE)
+        if len(x) == 0:
+            return out
+
+        # 初回サンプルは update() と同じく mean = x, std = 0 で初期化する
+        if self.mean is None:
+            mean0, std0, rest = x[0], 0.0, x[1:]
+            head = 1
+        else:
+            mean0, std0, rest = self.mean, self.std, x
+            head = 0
+
+        # mean[t] = (1 - a) * mean[t-1] + a * x[t] を初期状態 zi 付きの 1 次 IIR フィルターで計算
+        am, ast = self.alpha_mean, self.alpha_std
+        means = lfilter([am], [1.0, -(1 - am)], rest, zi=[(1 - am) * mean0])[0]
+        # 偏差は更新前の平均との差
+        prev_means = np.empty_like(rest)
+        if len(rest):
+            prev_means[0] = mean0
+            prev_means[1:] = means[:-1]
+        diffs = np.abs(rest - prev_means)
+        stds = lfilter([ast], [1.0, -(1 - ast)], diffs, zi=[(1 - ast) * std0])[0]
+
+        if head:
+            out['mean'][0], out['std'][0] = mean0, std0
+        out['mean'][head:] = means
+        out['std'][head:] = stds
+
+        var = out['std'] / (out['mean'] + 1e-9)
+        var_ratio = np.minimum(np.maximum(1.0 + (var - 0.1), 0.5), 2.0)
+        out['dynamic_k'] = self.base_k * var_ratio
+        out['threshold'] = np.maximum(out['mean'] - out['dynamic_k'] * out['std'], 0.0)
+        out['stutter_flag'] = x <= out['threshold']
+
+        self.mean = float(out['mean'][-1])
+        self.std = float(out['std'][-1])
+        self.var_ratio = float(var_ratio[-1])
+        return out
+
+
+# ===============================================
+# 移動窓の中央値・MAD によるロバストなしきい値（シーンチェンジや動きのバーストに強い）
+#
+# 直近 window 個の値を IndexedSortedList（バケット分割したソート済みリスト＋
+# バケットサイズの Fenwick 木）に保持し、追加・削除・添字アクセスを O(log window) で行う。
+# 中央値は添字アクセス 1〜2 回、MAD（|x - 中央値| の中央値）は中央値の左右を
+# 「距離の昇順に並んだ 2 本の列」とみなした k 番目選択（二分探索）で求める。
+# ===============================================
+class IndexedSortedList:
+    """
+    添字アクセスできるソート済みの多重集合
+
+    値は最大 2 × load 個ずつのバケットに分けて保持し、バケットの要素数を Fenwick 木で管理する。
+    """
+
+    def __init__(self, values=(), load=64):
+        self._load = load
+        self._buckets = []
+        self._maxes = []
+        self._tree = [0]
+        self._len = 0
+        for value in values:
+            self.add(value)
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for bucket in self._buckets:
+            yield from bucket
+
+    # -----------------------------------------------
+    # Fenwick 木（1 始まり、_tree[i] はバケット i-1 を含む区間の要素数）
+    # -----------------------------------------------
+    def _rebuild(self):
+        tree = [0] + [len(b) for b in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket, delta):
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket):
+        """バケット 0〜bucket-1 の要素数の合計"""
+        total = 0
+        i = bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, index):
+        """全体の添字を (バケット番号, バケット内の位置) に変換する"""
+        pos = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] <= index:
+                index -= self._tree[nxt]
+                pos = nxt
+            step >>= 1
+        return pos, index
+
+    # -----------------------------------------------
+    # 追加・削除・参照
+    # -----------------------------------------------
+    def add(self, value):
+        if not self._buckets:
+            self._buckets.append([value])
+            self._maxes.append(value)
+            self._rebuild()
+            self._len = 1
+            return
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._buckets):
+            i -= 1
+        bucket = self._buckets[i]
+        bisect.insort(bucket, value)
+        self._maxes[i] = bucket[-1]
+        self._len += 1
+        if len(bucket) > 2 * self._load:
+            # 大きくなりすぎたバケットは半分に分ける（Fenwick 木は作り直す）
+            self._buckets[i:i + 1] = [bucket[:self._load], bucket[self._load:]]
+            self._maxes[i:i + 1] = [bucket[self._load - 1], bucket[-1]]
+            self._rebuild()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, value):
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._buckets):
+            raise ValueError(f"{value!r} not in list")
+        bucket = self._buckets[i]
+        j = bisect.bisect_left(bucket, value)
+        if j == len(bucket) or bucket[j] != value:
+            raise ValueError(f"{value!r} not in list")
+        del bucket[j]
+        self._len -= 1
+        if bucket:
+            self._maxes[i] = bucket[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._buckets[i]
+            del self._maxes[i]
+            self._rebuild()
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("index out of range")
+        bucket, offset = self._locate(index)
+        return self._buckets[bucket][offset]
+
+    def bisect_left(self, value):
+        """value を挿入できる最も左の位置（value 未満の要素数）"""
+        i = bisect.bisect_left(self._maxes, value)
+        if i == len(self._buckets):
+            return self._len
+        return self._prefix(i) + bisect.bisect_left(self._buckets[i], value)
+
+
+class RollingMedianThreshold:
+    """
+    移動窓の中央値・MAD ベースのしきい値推定器（AdaptiveThresholdTrainer と同じ update / dynamic_k を持つ）
+
+    threshold = max(median - k × 1.4826 × MAD, 0)
+    （1.4826 × MAD は正規分布の標準偏差に相当する尺度）
+    """
+
+    MAD_SCALE = 1.4826
+
+    def __init__(self, window=600, k=3.0):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.base_k = k
+        self.reset()
+
+    def reset(self):
+        self._values = deque()
+        self._sorted = IndexedSortedList()
+        self.median = None
+        self.mad = None
+
+    @property
+    def dynamic_k(self):
+        """係数（中央値・MAD 方式では一定）"""
+        return self.base_k
+
+    def update(self, x):
+        """1点ずつ更新"""
+        x = float(x)
+        self._values.append(x)
+        self._sorted.add(x)
+        if len(self._values) > self.window:
+            self._sorted.remove(self._values.popleft())
+
+        self.median = self._median()
+        self.mad = self._mad(self.median)
+        return max(self.median - self.base_k * self.MAD_SCALE * self.mad, 0.0)
+
+    def _median(self):
+        s = self._sorted
+        n = len(s)
+        if n % 2:
+            return s[n // 2]
+        return (s[n // 2 - 1] + s[n // 2]) / 2
+
+    def _mad(self, m):
+        n = len(self._sorted)
+        p = self._sorted.bisect_left(m)  # 中央値未満の要素数
+        if n % 2:
+            return self._kth_distance(m, p, n // 2)
+        return (self._kth_distance(m, p, n // 2 - 1) + self._kth_distance(m, p, n // 2)) / 2
+
+    def _kth_distance(self, m, p, k):
+        """
+        |x - m| の小さい方から k 番目（0 始まり）を求める
+
+        左側 L[i] = m - s[p-1-i]（i < p）と右側 R[j] = s[p+j] - m はどちらも昇順なので、
+        L から取る個数を二分探索する（2 本のソート済み列の k 番目選択）
+        """
+        s = self._sorted
+        n = len(s)
+        take = k + 1
+        lo, hi = max(0, take - (n - p)), min(take, p)
+        while lo < hi:
+            i = (lo + hi) // 2
+            j = take - i
+            # L を i 個・R を j 個取ったとき、R の j 個目が L の i+1 個目より大きければ L をもっと取る
+            if j > 0 and s[p + j - 1] - m > m - s[p - 1 - i]:
+                lo = i + 1
+            else:
+                hi = i
+        i, j = lo, take - lo
+        left = m - s[p - i] if i > 0 else float('-inf')
+        right = s[p + j - 1] - m if j > 0 else float('-inf')
+        return max(left, right)
+
+
+# しきい値推定器の選択肢（live.py の --threshold で指定）
+THRESHOLD_STRATEGIES = ('ema', 'median')
+
+
+def make_threshold(strategy='ema', k=2.0, alpha_mean=0.05, alpha_std=0.05, window=600):
+    """
+    しきい値推定器を作成する関数
+
+    Parameters:
+    strategy (str): 'ema'（AdaptiveThresholdTrainer）または 'median'（RollingMedianThreshold）
+    k (float): 係数
+    alpha_mean, alpha_std (float): 'ema' の平滑化係数
+    window (int): 'median' の窓の長さ（フレーム数）
+    """
+    if strategy == 'ema':
+        return AdaptiveThresholdTrainer(alpha_mean, alpha_std, base_k=k)
+    if strategy == 'median':
+        return RollingMedianThreshold(window, k)
+    raise ValueError(f"Unknown threshold strategy: {strategy} (expected one of {THRESHOLD_STRATEGIES})")
@@ -0,0 +1,203 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from .backend import lazy_import
+from .profiling import NULL_PROFILER
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+
+# ===============================================
+# 横帯（stripe）に分けて並列に計算する差分カーネル（4K 入力向け、--diff-threads）
+#
+# 3840x2160 では 1 フレームの absdiff と集約だけで数 ms かかり、1 コアで回すと 60fps の予算の大きな部分を使う。
+# StripeDiff は輝度フレームを横帯に分け、常駐のスレッドプールで帯ごとに
+#   absdiff（事前確保した差分バッファの帯へ書き込む）→ L1 ノルム（差分の合計）・非ゼロ画素数・最大値
+#   → tile 行ごとの列方向の合計（cv2.reduce）
+# を計算し、呼び出し側で帯ごとの値を合算する。OpenCV の関数は GIL を解放するので帯は同時に進む。
+# 差分の合計は整数なので、平均差分は diff_metric('mean') と同じ値になる（判定結果も同じ）。
+#
+# 副産物として tile 画素四方のタイルごとの平均差分（tile_map）が得られるので、
+# フレーム全体は動いているのに一部の領域だけが止まる「局所的な静止」も記録する:
+#   直前まで動いていた（平均差分が閾値以上だった）タイルが、フレーム全体が動いている間に
+#   min_consec 組以上続けて閾値未満になった場合、同時に止まって同時に動き出したタイルをまとめて 1 件とする。
+#
+# 使い方:
+#   python -m src.detector.main --source video_4k.mp4 --diff-threads 4
+#   python -m tests.benchmark_tiles          # 1〜N スレッドのスケーリング
+# ===============================================
+
+# 既定のタイルの一辺（画素）
+TILE = 32
+
+
+class StripeDiff:
+    """
+    横帯に分けた差分を常駐のスレッドプールで計算するカーネル
+
+    Attributes:
+    threads (int): スレッド数（1 ならプールを使わずに呼び出したスレッドで計算する）
+    stripes (int): 横帯の数（既定はスレッド数と同じ）
+    tile (int): tile_map のタイルの一辺（画素）
+    min_tiles (int): 局所的な静止として記録する最小のタイル数
+    pairs (int): 計算したフレームの組の数
+    last (dict): 直前の組の {'sum', 'nonzero', 'max', 'mean'}
+    tile_map (numpy.ndarray): 直前の組のタイルごとの平均差分（float32、端の tile に満たない画素は含めない）
+    local_freezes (list): 局所的な静止 {'start', 'end', 'region'（x, y, w, h）, 'tiles'}
+    """
+
+    def __init__(self, threads=4, stripes=None, tile=TILE, min_tiles=4):
+        if threads < 1:
+            raise ValueError(f"threads must be at least 1: {threads}")
+        self.threads = threads
+        self.stripes = stripes or threads
+        self.tile = tile
+        self.min_tiles = min_tiles
+        self.pairs = 0
+        self.last = None
+        self.tile_map = None
+        self.local_freezes = []
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='stripe') if threads > 1 else None
+        self._shape = None
+        self._run = None
+
+    # -----------------------------------------------
+    # 常駐スレッドの管理
+    # -----------------------------------------------
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # -----------------------------------------------
+    # 1 組の差分
+    # -----------------------------------------------
+    def _allocate(self, shape):
+        h, w = shape[:2]
+        t = self.tile
+        rows, cols = h // t, w // t
+        # 帯の境界はタイルの行にそろえる（最後の帯はタイルに満たない下端の行も含む）
+        cuts = [round(i * rows / self.stripes) for i in range(self.stripes + 1)]
+        self._bounds = []
+        for i in range(self.stripes):
+            r0, r1 = cuts[i], cuts[i + 1]
+            y0, y1 = r0 * t, (h if i == self.stripes - 1 else r1 * t)
+            if y1 > y0:
+                self._bounds.append((y0, y1, r0, r1))
+        self._diff = np.empty(shape, dtype=np.uint8)
+        self._rows = np.empty((rows, w), dtype=np.int32)
+        self._sums = np.empty((rows, cols), dtype=np.int64)
+        self.tile_map = np.zeros((rows, cols), dtype=np.float32)
+        self._shape = shape
+        self._run = None
+
+    def _stripe(self, frame, previous, bounds):
+        y0, y1, r0, r1 = bounds
+        diff = cv2.absdiff(frame[y0:y1], previous[y0:y1], dst=self._diff[y0:y1])
+        total = cv2.norm(diff, cv2.NORM_L1)
+        nonzero = cv2.countNonZero(diff)
+        peak = cv2.minMaxLoc(diff)[1] if diff.size else 0.0
+        t = self.tile
+        for r in range(r0, r1):
+            cv2.reduce(self._diff[r * t:(r + 1) * t], 0, cv2.REDUCE_SUM, dst=self._rows[r:r + 1], dtype=cv2.CV_32S)
+        return total, nonzero, peak
+
+    def measure(self, frame, previous):
+        """
+        2 枚の輝度フレームの差分を帯ごとに並列に計算する
+
+        Returns:
+        dict: {'sum'（差分の合計）, 'nonzero'（差分がある画素数）, 'max'（最大差分）, 'mean'（平均差分）}
+              tile_map も更新する
+        """
+        if self._shape != frame.shape:
+            self._allocate(frame.shape)
+        if self._pool is None:
+            parts = [self._stripe(frame, previous, b) for b in self._bounds]
+        else:
+            parts = list(self._pool.map(lambda b: self._stripe(frame, previous, b), self._bounds))
+        total = sum(p[0] for p in parts)
+        rows, cols = self._sums.shape
+        t = self.tile
+        if rows and cols:
+            np.sum(self._rows[:, :cols * t].reshape(rows, cols, t), axis=2, out=self._sums)
+            np.divide(self._sums, t * t, out=self.tile_map)
+        self.pairs += 1
+        self.last = {'sum': int(total), 'nonzero': sum(p[1] for p in parts), 'max': int(max(p[2] for p in parts)),
+                     'mean': total / frame.size}
+        return self.last
+
+    # -----------------------------------------------
+    # 局所的な静止の追跡（tile_map から）
+    # -----------------------------------------------
+    def _track(self, index, moving, diff_thresh, min_consec):
+        static = self.tile_map < diff_thresh
+        if self._run is None:
+            self._run = np.zeros(static.shape, dtype=np.int64)
+            self._start = np.zeros(static.shape, dtype=np.int64)
+            self._armed = np.zeros(static.shape, dtype=bool)
+            self._active = np.zeros(static.shape, dtype=bool)
+            self._last_index = index
+        counting = static & moving
+        started = counting & (self._run == 0)
+        # 直前の組で動いていたタイルだけが「止まった」とみなせる（ずっと静止している枠・黒帯は数えない）
+        self._armed[started] = self._active[started]
+        self._start[started] = index
+        self._emit(~counting & (self._run >= min_consec) & self._armed, self._last_index)
+        self._run[counting] += 1
+        self._run[~counting] = 0
+        self._active = ~static
+        self._last_index = index
+
+    def _emit(self, ended, end):
+        if not ended.any():
+            return
+        t = self.tile
+        for start in np.unique(self._start[ended]):
+            ys, xs = np.nonzero(ended & (self._start == start))
+            if len(ys) < self.min_tiles:
+                continue
+            x, y = int(xs.min()) * t, int(ys.min()) * t
+            self.local_freezes.append({'start': int(start), 'end': int(end),
+                                       'region': [x, y, (int(xs.max()) + 1) * t - x, (int(ys.max()) + 1) * t - y],
+                                       'tiles': int(len(ys))})
+
+    def _finish(self, min_consec):
+        if self._run is not None:
+            self._emit((self._run >= min_consec) & self._armed, self._last_index)
+            self._run[:] = 0
+
+    def values(self, lumas, diff_thresh, min_consec=3, profiler=NULL_PROFILER):
+        """
+        輝度フレーム列から (フレーム番号, 平均差分) を求める段（frame_diffs + diff_metric('mean') と同じ値）
+
+        Parameters:
+        lumas: (フレーム番号, 輝度フレーム) のイテレータ
+        diff_thresh (float): 局所的な静止の判定に使う閾値（タイルの平均差分・フレーム全体の平均差分）
+        min_consec (int): 局所的な静止として記録する最小の連続数
+        profiler (profiling.Profiler): tiles.diff（帯の並列計算）/ tiles.track（静止の追跡）の処理時間を記録する
+        """
+        previous = None
+        for index, frame in lumas:
+            if previous is not None:
+                with profiler.span('tiles.diff'):
+                    mean = self.measure(frame, previous)['mean']
+                with profiler.span('tiles.track'):
+                    self._track(index, mean >= diff_thresh, diff_thresh, min_consec)
+                yield index, mean
+            previous = frame
+        self._finish(min_consec)
+
+    def stats(self):
+        """
+        Returns:
+        dict: {'threads', 'stripes', 'tile', 'pairs', 'local_freezes'（局所的な静止のリスト）}
+        """
+        return {'threads': self.threads, 'stripes': self.stripes, 'tile': self.tile, 'pairs': self.pairs,
+                'local_freezes': list(self.local_freezes)}
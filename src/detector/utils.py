@@ -1,4 +1,7 @@
-import cv2
+from .backend import lazy_import
+
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
 
 # ===============================================
 # フレーム差分計算とカクつき判定用ユーティリティ
@@ -54,3 +57,44 @@ def release_video_capture(video_capture):
     video_capture (cv2.VideoCapture): 解放する動画キャプチャオブジェクト
     """
     video_capture.release()
+
+
+def merge_runs(runs):
+    """
+    隣接・重複するフレーム区間を結合する関数
+
+    Parameters:
+    runs (list of tuple): (start, end) 形式のフレーム区間リスト（両端を含む）
+
+    Returns:
+    list of tuple: start 順に並べ、end + 1 == 次の start となる区間を結合したリスト
+    """
+    merged = []
+    for start, end in sorted(runs):
+        if merged and start <= merged[-1][1] + 1:
+            # 前の区間と接している（または重なっている）場合は結合
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def find_runs(mask, offset=0):
+    """
+    真偽値配列の中で True が連続する区間を求める関数
+
+    Parameters:
+    mask (array-like of bool): 判定結果の配列
+    offset (int): 返す番号に加算する値（1 始まりのフレーム番号にする場合は 1）
+
+    Returns:
+    list of tuple: (start, end) 形式の区間リスト（両端を含む）
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if mask.size == 0:
+        return []
+    # 前後に False を足して立ち上がり・立ち下がり位置を検出
+    edges = np.diff(np.concatenate(([False], mask, [False])).astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return [(int(s) + offset, int(e) + offset) for s, e in zip(starts, ends)]
@@ -0,0 +1,42 @@
+import cv2
+import numpy as np
+import pytest
+
+
+# ===============================================
+# テスト用の合成動画を生成するフィクスチャ
+# ===============================================
+def write_test_video(path, n_frames=60, freeze=((10, 15), (29, 30), (40, 48)), size=(64, 48), fps=30,
+                     fourcc='MJPG'):
+    """
+    動くグラデーションに「静止区間」を埋め込んだ動画を書き出す
+
+    Parameters:
+    path (str): 出力先（既定は MJPG の .avi）
+    n_frames (int): 総フレーム数
+    freeze (tuple): 前フレームと同一にするフレーム区間 (start, end)（1 始まり・両端含む）
+    size (tuple): (幅, 高さ)
+    fps (int): フレームレート
+    fourcc (str): コーデック（'mp4v' なら .mp4 に書き出す）
+
+    Returns:
+    str: 出力先パス
+    """
+    w, h = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, (w, h))
+    frozen = {f for start, end in freeze for f in range(start, end + 1)}
+    frame = None
+    for number in range(1, n_frames + 1):
+        if frame is None or number not in frozen:
+            x = np.arange(w, dtype=np.int32)[None, :] * 4 + number * 16
+            y = np.arange(h, dtype=np.int32)[:, None] * 2
+            gray = ((x + y) % 256).astype(np.uint8)
+            frame = cv2.merge([gray, gray, gray])
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+@pytest.fixture
+def stutter_video(tmp_path):
+    return write_test_video(tmp_path / "stutter.avi")
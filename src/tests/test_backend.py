@@ -0,0 +1,74 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from src.detector import backend
+from src.detector.backend import ArrayBackend, LazyModule, get_backend, lazy_import, set_backend
+
+
+def test_lazy_import_defers_until_first_attribute():
+    name = 'json.tool'
+    saved = sys.modules.pop(name, None)
+    try:
+        module = lazy_import(name)
+        assert isinstance(module, LazyModule)
+        assert name not in sys.modules
+        assert callable(module.main)
+        assert name in sys.modules
+    finally:
+        if saved is not None:
+            sys.modules[name] = saved
+
+
+def test_lazy_import_returns_loaded_module():
+    assert lazy_import('numpy') is np
+
+
+def test_numpy_backend_counts_changed_pixels():
+    b = get_backend('numpy')
+    assert isinstance(b, ArrayBackend) and not b.gpu
+    a = np.zeros((4, 5), dtype=np.uint8)
+    c = a.copy()
+    c[1, 2] = 3
+    c[3, 4] = 255
+    assert b.count_changed(b.asarray(a), b.asarray(c)) == 2
+    assert b.asnumpy(a) is a
+
+
+def test_env_selects_backend(monkeypatch):
+    monkeypatch.setenv(backend.BACKEND_ENV, 'numpy')
+    set_backend(None)
+    try:
+        assert get_backend().name == 'numpy'
+    finally:
+        set_backend(None)
+
+
+def test_unknown_backend_raises():
+    with pytest.raises(ValueError):
+        get_backend('opencl')
+
+
+def test_cupy_backend_raises_without_gpu():
+    try:
+        import cupy
+        if cupy.cuda.runtime.getDeviceCount() > 0:
+            pytest.skip('CUDA device available')
+    except Exception:
+        pass
+    with pytest.raises(RuntimeError):
+        get_backend('cupy')
+
+
+def test_main_help_does_not_import_opencv():
+    code = ("import sys, runpy\n"
+            "sys.argv = ['main', '--help']\n"
+            "try:\n"
+            "    runpy.run_module('src.detector.main', run_name='__main__')\n"
+            "except SystemExit:\n"
+            "    pass\n"
+            "print('cv2' in sys.modules, 'numpy' in sys.modules)\n")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    assert out.strip().splitlines()[-1] == 'False False'
@@ -0,0 +1,121 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.detector.capture import CameraCapture, FrameRing, RingReader
+
+# ===============================================
+# capture モジュール（リングバッファ）の単体テスト
+# ===============================================
+def _write(ring, value):
+    ring.acquire_write()[:] = value
+    return ring.publish()
+
+
+def test_ring_views_are_read_only_and_zero_copy():
+    ring = FrameRing(4, (2, 3))
+    seq = _write(ring, 7)
+    view = ring.get(seq)
+    assert view[0, 0] == 7
+    assert np.shares_memory(view, ring.buffers)
+    with pytest.raises(ValueError):
+        view[0, 0] = 1
+
+
+def test_ring_counts_overwrites_of_frames_a_reader_still_needed():
+    # -----------------------------------------------
+    # 登録中の読み手が読む前に上書きされたフレームだけが数えられることを確認
+    # -----------------------------------------------
+    ring = FrameRing(4, (1,))
+    for i in range(4):
+        _write(ring, i)  # 読み手がいなければ数えない
+    assert ring.overwrites == 0
+    reader = RingReader(ring, start=2)
+    assert reader.read(timeout=0)[0] == 2
+    ring.latest()        # 最新だけを見るプレビューは数に影響しない
+    for i in range(4, 8):
+        _write(ring, i)  # seq 3, 4 が読まれないまま無効になる（seq 8 のスロット = seq 4 は書き込み先）
+    assert ring.overwrites == 2
+    # 書き込み中のスロット（次の seq）と上書き済みの seq は無効
+    assert ring.get(3) is None
+    assert ring.get(4) is None
+    assert ring.get(5)[0] == 5
+    # 登録を外した後は数えない
+    reader.close()
+    for i in range(8, 16):
+        _write(ring, i)
+    assert ring.overwrites == 2
+    assert reader.next_seq == 3
+
+
+def test_stride_readers_that_keep_up_do_not_count_overwrites():
+    # -----------------------------------------------
+    # 60→30fps（stride 2）の読み手が追いついていれば、間引いた奇数 seq は上書きに数えない
+    # -----------------------------------------------
+    ring = FrameRing(8, (1,))
+    readers = [RingReader(ring, stride=2), RingReader(ring, stride=2)]
+    for i in range(600):
+        _write(ring, i % 256)
+        if i % 2 == 0:
+            for reader in readers:
+                assert reader.read(timeout=0)[0] == i
+        if i % 10 == 0:
+            ring.latest()
+    assert ring.writes == 600
+    assert ring.overwrites == 0
+    assert [r.dropped for r in readers] == [0, 0]
+    assert [r.frames_read for r in readers] == [300, 300]
+
+
+def test_ring_reader_slots():
+    ring = FrameRing(4, (1,))
+    RingReader(ring, slot=1)
+    with pytest.raises(RuntimeError):
+        RingReader(ring, slot=1)
+    readers = [RingReader(ring) for _ in range(len(ring.cursors) - 1)]
+    with pytest.raises(RuntimeError):
+        RingReader(ring)
+    readers[0].close()
+    readers[0].close()
+    RingReader(ring)
+
+
+def test_reader_reports_drops_explicitly():
+    ring = FrameRing(4, (1,))
+    reader = RingReader(ring)
+    for i in range(10):
+        _write(ring, i)
+    seq, view = reader.read(timeout=0)
+    # capacity=4 では seq 7〜9 のみ有効 → 0〜6 の 7 フレームは取りこぼし
+    assert (seq, int(view[0])) == (7, 7)
+    assert reader.dropped == 7
+    assert [reader.read(timeout=0)[0] for _ in range(2)] == [8, 9]
+    assert reader.read(timeout=0) is None
+
+
+def test_reader_stride():
+    ring = FrameRing(8, (1,))
+    reader = RingReader(ring, stride=2)
+    for i in range(6):
+        _write(ring, i)
+    assert [reader.read(timeout=0)[0] for _ in range(3)] == [0, 2, 4]
+    assert reader.dropped == 0
+
+
+def test_camera_capture_reads_every_frame_in_order(stutter_video):
+    # -----------------------------------------------
+    # 動画ファイルをデバイスの代わりにして、全フレームが順番どおりに読めることを確認
+    # -----------------------------------------------
+    cam = CameraCapture(stutter_video, 64, 48, 30, ring_size=64, backend=None)
+    reader = RingReader(cam.ring, start=0)
+    stop = threading.Event()
+    seqs = []
+    for seq, frame in reader.frames(stop, timeout=1.0):
+        seqs.append(seq)
+        assert frame.shape == (48, 64, 3)
+        if len(seqs) == 60:
+            break
+    cam.release()
+    assert seqs == list(range(60))
+    assert reader.dropped == 0
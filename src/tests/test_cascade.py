@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from src.detector.main import detect_stutter
+from src.detector.processor import (
+    CascadeFilter,
+    below_threshold,
+    diff_metric,
+    frame_diffs,
+    process_video,
+    stutter_events,
+    to_luma,
+)
+from src.detector.synthetic import MOTIONS, make_frames, place_runs, write_synthetic_video
+
+
+# ===============================================
+# processor.CascadeFilter（2 段のカスケード判定）の単体テスト
+# ===============================================
+def _full_flags(lumas, diff_thresh):
+    return list(below_threshold(diff_metric(frame_diffs(lumas), 'mean'), diff_thresh))
+
+
+@pytest.mark.parametrize('motion', MOTIONS)
+def test_cascade_matches_full_resolution_on_synthetic_frames(motion):
+    rng = np.random.default_rng(7)
+    freezes = place_runs(120, 4, 2, 6, rng)
+    repeat = {f for s, e in freezes for f in range(s, e + 1)}
+    frames = list(make_frames(120, (160, 96), motion, seed=7, repeat=repeat))
+    lumas = list(to_luma(enumerate(frames, 1)))
+
+    cascade = CascadeFilter()
+    expected = list(stutter_events(enumerate(frames, 1), min_consec=1))
+    assert list(stutter_events(enumerate(frames, 1), min_consec=1, cascade=cascade)) == expected
+    for thresh in (0.5, 2.0, 4.0, 8.0):
+        assert list(CascadeFilter().flags(lumas, thresh)) == _full_flags(lumas, thresh)
+
+    s = cascade.stats()
+    assert s['pairs'] == 119
+    assert s['coarse_rejected'] + s['full_rejected'] + s['similar'] == s['pairs']
+
+
+def test_cascade_is_exact_near_the_threshold():
+    # 平均差分が閾値のすぐ上下に散らばる組でも、1 段目で落とした組は全解像度でも閾値以上
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, size=(72, 128), dtype=np.uint8)
+    lumas = [(0, base)]
+    for i in range(1, 200):
+        noise = rng.integers(-(i % 9), i % 9 + 1, size=base.shape)
+        lumas.append((i, np.clip(base.astype(int) + noise, 0, 255).astype(np.uint8)))
+    pairs = [p for i in range(1, len(lumas)) for p in (lumas[0], lumas[i])]
+    for thresh in np.linspace(0.5, 4.0, 8):
+        got = [flag for j, flag in enumerate(CascadeFilter().flags(pairs, thresh)) if j % 2 == 0]
+        want = [flag for j, flag in enumerate(_full_flags(pairs, thresh)) if j % 2 == 0]
+        assert got == want
+
+
+def test_coarse_stage_rejects_moving_content():
+    frames = enumerate(make_frames(60, (320, 180), 'pan', seed=1), 1)
+    cascade = CascadeFilter()
+    list(stutter_events(frames, cascade=cascade))
+    assert cascade.coarse_rejected == cascade.pairs == 59
+    assert cascade.similar == 0
+
+
+def test_block_check_catches_small_localized_motion():
+    # 16x16 の「カーソル」だけが動く: 全体の平均差分は閾値未満だがブロックでは大きい
+    frame = np.full((240, 320), 60, dtype=np.uint8)
+    moved = frame.copy()
+    moved[100:116, 200:216] = 255
+    lumas = [(1, frame), (2, moved), (3, moved.copy())]
+    assert [f for _, f in CascadeFilter().flags(lumas, 2.0)] == [True, True]
+    cascade = CascadeFilter(block_thresh=20)
+    assert [f for _, f in cascade.flags(lumas, 2.0)] == [False, True]
+    assert cascade.block_rejected == 1 and cascade.similar == 1
+
+
+def test_process_video_and_detect_stutter_with_cascade(tmp_path):
+    truth = write_synthetic_video(tmp_path / "c.avi", n_frames=90, size=(128, 72), motion='noise', seed=2,
+                                  n_freezes=3, freeze_len=(3, 6))
+    result = process_video(truth['path'], min_consec=3, cascade=CascadeFilter())
+    assert result['stutter_frames'] == [tuple(r) for r in truth['freezes']]
+    assert result['cascade']['pairs'] == 89
+    assert detect_stutter(truth['path'], min_consec=3, cascade=CascadeFilter()) == detect_stutter(
+        truth['path'], min_consec=3)
@@ -0,0 +1,46 @@
+import json
+import os
+
+from src.detector.cli import expand_inputs, load_completed, run_batch
+from conftest import write_test_video
+
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_expand_inputs_directories_and_globs(tmp_path):
+    a = write_test_video(tmp_path / "a.avi", n_frames=5)
+    os.makedirs(tmp_path / "sub")
+    b = write_test_video(tmp_path / "sub" / "b.avi", n_frames=5)
+    (tmp_path / "notes.txt").write_text("not a video")
+
+    assert expand_inputs([str(tmp_path)]) == [os.path.normpath(a)]
+    assert expand_inputs([str(tmp_path)], recursive=True) == [os.path.normpath(a), os.path.normpath(b)]
+    assert expand_inputs([str(tmp_path / "**" / "*.avi"), a]) == [os.path.normpath(a), os.path.normpath(b)]
+
+
+def test_run_batch_streams_jsonl_and_resumes(tmp_path):
+    videos = [write_test_video(tmp_path / f"v{i}.avi") for i in range(2)]
+    missing = str(tmp_path / "missing.avi")
+    output = str(tmp_path / "out.jsonl")
+
+    summary = run_batch(videos + [missing], output, workers=1)
+    records = {r['video_path']: r for r in _read_jsonl(output)}
+    assert summary['processed'] == 3 and summary['errors'] == 1
+    assert records[videos[0]]['stutter_frames'] == [[10, 15], [40, 48]]
+    assert records[videos[1]]['total_frames'] == 60
+    assert records[missing]['status'] == 'error'
+    (stats,) = summary['workers'].values()
+    assert stats['frames'] == 120 and stats['fps'] > 0
+
+    # 中断で壊れた最終行があっても、解析済みのファイルは読み飛ばしてエラーのファイルだけ再解析する
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write('{"video_path": "trunc')
+    assert load_completed(output) == {os.path.abspath(v) for v in videos}
+    summary = run_batch(videos + [missing], output, workers=1)
+    assert summary['skipped'] == 2 and summary['processed'] == 1
+    # 壊れた行の後ろに改行を補ってから追記している
+    with open(output, encoding='utf-8') as f:
+        assert json.loads(f.read().splitlines()[-1])['video_path'] == missing
@@ -0,0 +1,61 @@
+import threading
+
+import cv2
+import numpy as np
+
+from src.detector.capture import FrameRing, RingReader
+from src.detector.clips import ClipRecorder
+
+
+def _run_recorder(tmp_path, n_frames, events, **kwargs):
+    """合成フレームをリングに流し、イベントを trigger してクリップを書き出す"""
+    ring = FrameRing(n_frames + 2, (48, 64, 3))
+    recorder = ClipRecorder(RingReader(ring, start=0), str(tmp_path), fps=10, fourcc='MJPG', ext='.avi', **kwargs)
+    for i in range(n_frames):
+        ring.acquire_write()[:] = i
+        ring.publish()
+    for start, end in events:
+        recorder.trigger(start, end)
+
+    stop_flag = threading.Event()
+    thread = threading.Thread(target=recorder.run, args=(stop_flag,))
+    thread.start()
+    ring.wait_for(n_frames - 1)
+    while recorder.reader.next_seq < n_frames:
+        stop_flag.wait(0.01)
+    stop_flag.set()
+    thread.join()
+    return recorder, recorder.finish()
+
+
+def _frames(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def test_clip_contains_pre_and_post_roll(tmp_path):
+    # 10fps で pre 0.5 秒・post 0.3 秒 → seq 15〜20 の区間は 10〜23 の 14 フレーム
+    recorder, clips = _run_recorder(tmp_path, 60, [(15, 20)], pre_roll=0.5, post_roll=0.3, buffer_sec=6, scale=0.5)
+    assert [p.endswith("stutter_00000015.avi") for p in clips] == [True]
+    frames = _frames(clips[0])
+    assert len(frames) == 14
+    assert frames[0].shape[:2] == (24, 32)
+    assert abs(int(np.mean(frames[0])) - 10) <= 2
+    assert abs(int(np.mean(frames[-1])) - 23) <= 2
+
+
+def test_memory_ring_is_bounded_and_jpeg_mode(tmp_path):
+    # 保持できるのは直近 2 秒（20 フレーム）だけなので、古いイベントは手元にある範囲に切り詰められる
+    recorder, clips = _run_recorder(tmp_path, 60, [(50, 55)], pre_roll=1.0, post_roll=1.0, buffer_sec=2,
+                                    scale=1.0, jpeg_quality=90)
+    assert len(recorder._seqs) == 20
+    frames = _frames(clips[0])
+    assert len(frames) == 20  # seq 40〜59（post_roll の 65 までは届かない）
+    assert frames[0].shape[:2] == (48, 64)
@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+
+import cv2
+import numpy as np
+import pytest
+
+from src.detector.control import CONTROL_FILE, ControlServer, load_endpoint, send_command
+from src.detector.shm_capture import start_multiprocess_capture
+
+
+class _FakeCamera:
+    """一定間隔で同じフレームを返す VideoCapture 互換オブジェクト（プロセスに渡せるようにモジュール直下に置く）"""
+
+    def __init__(self, device_number=0, backend=None):
+        self.props = {cv2.CAP_PROP_FRAME_WIDTH: 64, cv2.CAP_PROP_FRAME_HEIGHT: 48, cv2.CAP_PROP_FPS: 30}
+
+    def isOpened(self):
+        return True
+
+    def set(self, prop, value):
+        self.props[prop] = value
+        return True
+
+    def get(self, prop):
+        return float(self.props.get(prop, 0))
+
+    def grab(self):
+        time.sleep(1.0 / self.props[cv2.CAP_PROP_FPS])
+        return True
+
+    def retrieve(self, image=None):
+        frame = np.zeros((int(self.props[cv2.CAP_PROP_FRAME_HEIGHT]), int(self.props[cv2.CAP_PROP_FRAME_WIDTH]), 3),
+                         np.uint8)
+        if image is not None:
+            image[:] = frame
+            return True, image
+        return True, frame
+
+    def read(self, image=None):
+        self.grab()
+        return self.retrieve(image)
+
+    def release(self):
+        pass
+
+
+def test_status_and_stop_roundtrip(tmp_path):
+    stop_flag = threading.Event()
+    control_file = str(tmp_path / CONTROL_FILE)
+    server = ControlServer({'status': lambda: {'frames': 42}, 'stop': stop_flag.set}, control_file=control_file)
+    try:
+        endpoint = load_endpoint(control_file)
+        assert send_command(endpoint, 'status') == {'frames': 42}
+        send_command(endpoint, 'stop')
+        assert stop_flag.is_set()
+        with pytest.raises(RuntimeError, match='unknown command'):
+            send_command(endpoint, 'pause')
+    finally:
+        server.close()
+    assert not os.path.exists(control_file)
+
+
+def test_rejects_wrong_authkey():
+    server = ControlServer({'status': lambda: 'ok'})
+    try:
+        with pytest.raises(AuthenticationError):
+            send_command((server.address, b'wrong-key'), 'status')
+        # 失敗した接続のあとも待ち受けは続く
+        assert send_command(server.endpoint, 'status') == 'ok'
+    finally:
+        server.close()
+
+
+def test_headless_multiprocess_capture_stops_over_ipc(tmp_path):
+    control_file = tmp_path / "stutter_frames" / CONTROL_FILE
+    seen = {}
+
+    def controller():
+        deadline = time.time() + 30
+        while not control_file.exists() and time.time() < deadline:
+            time.sleep(0.05)
+        endpoint = load_endpoint(str(control_file))
+        time.sleep(0.5)
+        seen['status'] = send_command(endpoint, 'status')
+        send_command(endpoint, 'stop')
+
+    thread = threading.Thread(target=controller)
+    thread.start()
+    stats = start_multiprocess_capture(0, 64, 48, capture_fps=30, display_fps=0, target_fps=30,
+                                       output_root=str(tmp_path), duration=60, open_capture=_FakeCamera,
+                                       save_frames=False)
+    thread.join()
+    assert seen['status']['frames'] > 0
+    assert 'detect' in seen['status']
+    assert stats['frames'] >= seen['status']['frames']
+    assert not control_file.exists()
@@ -0,0 +1,106 @@
+import cv2
+import numpy as np
+
+from src.detector.fingerprint import NEW, OLDER, PREVIOUS, SIMILAR, FrameIndex, dhash, fast_hash
+from src.detector.main import detect_stutter
+from src.detector.processor import process_video
+from src.detector.synthetic import make_frames
+
+
+# ===============================================
+# fingerprint.py（直近フレームの指紋の索引）の単体テスト
+# ===============================================
+def _lumas(n, size=(320, 64), seed=0):
+    return [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in make_frames(n, size, 'pan', seed)]
+
+
+def test_classifies_new_previous_and_older():
+    a, b, c = _lumas(3)
+    index = FrameIndex()
+    kinds = [index.observe(i, f) for i, f in enumerate([a, b, b, a, b, c], 1)]
+    assert [k['kind'] for k in kinds] == [NEW, NEW, PREVIOUS, OLDER, OLDER, NEW]
+    assert (kinds[3]['match'], kinds[3]['distance'], kinds[3]['exact']) == (1, 3, True)
+    # B は最後に見たフレーム 3 と一致（4 フレーム目の A を挟んで 2 フレーム前）
+    assert (kinds[4]['match'], kinds[4]['distance']) == (3, 2)
+    assert index.counts == {NEW: 3, PREVIOUS: 1, OLDER: 2, SIMILAR: 0}
+    # 距離が違うので別の区間
+    assert [(r['start'], r['end'], r['distance']) for r in index.repeats] == [(4, 4, 3), (5, 5, 2)]
+    assert index.stats()['max_distance'] == 3
+
+
+def test_entries_are_evicted_by_age():
+    frames = _lumas(20)
+    index = FrameIndex(max_age=5)
+    for i, f in enumerate(frames, 1):
+        index.observe(i, f)
+    assert len(index) == 6
+    # 19 フレーム前の絵は索引から消えている
+    assert index.observe(21, frames[1])['kind'] == NEW
+    assert index.observe(22, frames[18])['kind'] == OLDER
+
+
+def test_perceptual_hash_catches_reencoded_replay():
+    a, b = _lumas(2, size=(320, 180))
+    noisy = np.clip(a.astype(np.int16) + np.random.default_rng(1).integers(-1, 2, a.shape), 0, 255).astype(np.uint8)
+    assert fast_hash(noisy) != fast_hash(a)
+    assert dhash(noisy) == dhash(a)
+    index = FrameIndex()
+    index.observe(1, a)
+    index.observe(2, b)
+    result = index.observe(3, noisy)
+    assert (result['kind'], result['match'], result['distance'], result['exact']) == (SIMILAR, 1, 2, False)
+    assert index.counts[OLDER] == 0 and index.counts[SIMILAR] == 1
+    exact_only = FrameIndex(perceptual=False)
+    exact_only.observe(1, a)
+    exact_only.observe(2, b)
+    assert exact_only.observe(3, noisy)['kind'] == NEW
+
+
+def test_static_noise_is_similar_and_bounded():
+    # -----------------------------------------------
+    # 静止した絵にノイズが乗っただけの映像: 全フレームが異なる（完全一致なし）が dHash は毎フレーム一致する。
+    # previous / older には混ぜずに similar として数え、記録は連続ごとの区間にまとめる
+    # -----------------------------------------------
+    lumas = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in make_frames(150, (1280, 720), 'static_noise')]
+    assert len({fast_hash(f) for f in lumas}) == 150
+    index = FrameIndex()
+    for i, f in enumerate(lumas):
+        index.observe(i, f)
+    assert index.counts[PREVIOUS] == 0 and index.counts[OLDER] == 0
+    assert index.counts[SIMILAR] > 120
+    assert sum(r['frames'] for r in index.repeats) == index.counts[SIMILAR]
+    assert len(index.repeats) < 20
+    assert all(r['kind'] == SIMILAR for r in index.repeats)
+
+    # 区間の数は max_runs で頭打ちになり、捨てた数を数える
+    bounded = FrameIndex(max_runs=3)
+    a, b = _lumas(2)
+    for i in range(1, 21):
+        bounded.observe(i, a if i % 4 else b)
+    assert len(bounded.repeats) == 3
+    assert bounded.stats()['runs'] == len(bounded.repeats) + bounded.runs_dropped
+    assert bounded.runs_dropped > 0
+
+
+def test_fast_hash_accepts_views():
+    frame = _lumas(1)[0]
+    assert fast_hash(frame[10:20, 5:50]) == fast_hash(frame[10:20, 5:50].copy())
+
+
+def test_pipeline_reports_oscillation(tmp_path):
+    # A-B-A-B の往復: 前フレームとの差分は大きいので静止としては検出されない
+    # （pan は 1 フレーム 8 画素流れるので、幅 320 なら 40 フレームは同じ絵にならない）
+    frames = list(make_frames(40, (320, 64), 'pan', seed=2))
+    order = list(range(20)) + [18, 19, 18, 19] + list(range(20, 36))
+    path = str(tmp_path / "osc.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (320, 64))
+    for i in order:
+        writer.write(frames[i])
+    writer.release()
+
+    assert detect_stutter(path, min_consec=1) == []
+    index = FrameIndex()
+    assert detect_stutter(path, min_consec=1, fingerprints=index) == []
+    assert [(r['start'], r['end'], r['distance'], r['frames']) for r in index.repeats] == [(21, 24, 2, 4)]
+    result = process_video(path, min_consec=1, fingerprints=FrameIndex())
+    assert result['repeat_counts']['older'] == 4
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.detector.ingest import extract_luma, open_luma_reader
+
+# ===============================================
+# ingest モジュールの単体テスト
+# ===============================================
+def test_extract_luma_yuyv_and_nv12():
+    # -----------------------------------------------
+    # YUYV は偶数バイト、NV12 は先頭プレーンが Y として取り出されることを確認
+    # -----------------------------------------------
+    w, h = 8, 4
+    y = np.arange(w * h, dtype=np.uint8).reshape(h, w)
+
+    yuyv = np.empty((h, w, 2), dtype=np.uint8)
+    yuyv[..., 0] = y
+    yuyv[..., 1] = 200  # U / V
+    assert np.array_equal(extract_luma(yuyv, w, h), y)
+
+    nv12 = np.full((h * 3 // 2, w), 128, dtype=np.uint8)
+    nv12[:h] = y
+    assert np.array_equal(extract_luma(nv12.reshape(1, -1), w, h), y)
+
+    # 想定外のレイアウトは ValueError
+    with pytest.raises(ValueError):
+        extract_luma(np.zeros((1, 7), dtype=np.uint8), w, h)
+
+
+def test_open_luma_reader_returns_gray(stutter_video):
+    # BGR 経由の読み込みが 2 次元の輝度画像を返すことを確認
+    reader = open_luma_reader(stutter_video, 'bgr')
+    ret, gray = reader.read()
+    reader.release()
+    assert ret
+    assert gray.ndim == 2
+
+
+def test_open_luma_reader_rejects_unknown_mode(stutter_video):
+    with pytest.raises(ValueError):
+        open_luma_reader(stutter_video, 'rgb')
+
+
+def test_reuse_reader_alternates_two_buffers(stutter_video):
+    # -----------------------------------------------
+    # reuse=True では 2 枚のバッファを交互に返し（3 フレーム目は 1 フレーム目と同じ配列）、
+    # 値は reuse=False の読み込みと一致することを確認
+    # -----------------------------------------------
+    plain = open_luma_reader(stutter_video, 'bgr')
+    reused = open_luma_reader(stutter_video, 'bgr', reuse=True)
+    frames = []
+    for _ in range(4):
+        ret, expected = plain.read()
+        ret_reused, gray = reused.read()
+        assert ret and ret_reused
+        assert np.array_equal(gray, expected)
+        frames.append(gray)
+    plain.release()
+    reused.release()
+    assert frames[0] is not frames[1]
+    assert frames[2] is frames[0]
+    assert frames[3] is frames[1]
@@ -0,0 +1,25 @@
+from src.detector.main import detect_stutter
+
+# ===============================================
+# detect_stutter 関数の単体テスト
+# ===============================================
+def test_detect_stutter_single_process(stutter_video):
+    # 埋め込んだ静止区間（長さ3以上のもの）が検出されることを確認
+    result = detect_stutter(stutter_video, min_consec=3)
+    assert result == [(10, 15), (40, 48)]
+
+
+def test_detect_stutter_parallel_matches_single(stutter_video):
+    # -----------------------------------------------
+    # 区間境界をまたぐ静止区間も含め、並列版と単一プロセス版の結果が一致することを確認
+    # -----------------------------------------------
+    expected = detect_stutter(stutter_video, min_consec=2)
+    for workers in (2, 3, 4, 7):
+        assert detect_stutter(stutter_video, min_consec=2, workers=workers) == expected
+
+
+def test_detect_stutter_max_frames(stutter_video):
+    # max_frames で打ち切った場合も区間が重複して記録されないことを確認
+    expected = [(10, 15), (40, 44)]
+    assert detect_stutter(stutter_video, min_consec=3, max_frames=44) == expected
+    assert detect_stutter(stutter_video, min_consec=3, max_frames=44, workers=3) == expected
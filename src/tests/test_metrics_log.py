@@ -0,0 +1,61 @@
+import csv
+import os
+import time
+
+import numpy as np
+
+from src.detector.metrics_log import MetricsLog, convert_to_csv, read_metrics_log
+
+FIELDS = [("frame_idx", "i8"), ("value", "f8"), ("flag", "u1")]
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_csv_log_batches_rows(tmp_path):
+    path = str(tmp_path / "log.csv")
+    log = MetricsLog(path, FIELDS, 'csv', flush_rows=4, flush_interval=0, formats={"value": "{:.2f}"})
+    for i in range(6):
+        log.append(i, i / 3, i % 2)
+    # 4 行で 1 回だけ書き出され、残り 2 行はメモリ上
+    assert log.flushes == 1
+    assert len(_read_csv(path)) == 1 + 4
+    log.close()
+    rows = _read_csv(path)
+    assert rows[0] == ["frame_idx", "value", "flag"]
+    assert rows[-1] == ["5", "1.67", "1"]
+    assert len(rows) == 1 + 6
+
+
+def test_background_flush_bounds_loss(tmp_path):
+    path = str(tmp_path / "log.csv")
+    log = MetricsLog(path, FIELDS, 'csv', flush_rows=1000, flush_interval=0.05)
+    log.append(1, 1.0, 0)
+    deadline = time.monotonic() + 2
+    while len(_read_csv(path)) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(_read_csv(path)) == 2
+    log.close()
+
+
+def test_binary_log_roundtrip_and_truncation(tmp_path):
+    path = str(tmp_path / "log.mlog")
+    with MetricsLog(path, FIELDS, 'mlog', flush_rows=3, flush_interval=0) as log:
+        for i in range(7):
+            log.append(i, i * 0.5, i == 3)
+    records = read_metrics_log(path)
+    assert records.dtype.names == ("frame_idx", "value", "flag")
+    np.testing.assert_array_equal(records["frame_idx"], np.arange(7))
+    np.testing.assert_array_equal(records["value"], np.arange(7) * 0.5)
+    assert records["flag"].tolist() == [0, 0, 0, 1, 0, 0, 0]
+
+    # 最後のチャンク（1 行）の途中で落ちた場合はそのチャンクだけ失う
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 3)
+    assert len(read_metrics_log(path)) == 6
+
+    csv_path = convert_to_csv(path)
+    assert csv_path.endswith("log.csv")
+    assert _read_csv(csv_path)[1] == ["0", "0.0", "0"]
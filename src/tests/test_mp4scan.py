@@ -0,0 +1,95 @@
+import struct
+
+import pytest
+
+from src.detector.main import detect_stutter
+from src.detector.mp4scan import find_candidates, find_irregular_timestamps, read_sample_table, scan
+from conftest import write_test_video
+
+
+# ===============================================
+# 最小限の MP4 ボックスを組み立てるヘルパー
+# ===============================================
+def box(box_type, payload=b'', large=False):
+    if large:
+        return struct.pack('>I4sQ', 1, box_type, 16 + len(payload)) + payload
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def full_box(box_type, payload, version=0):
+    return box(box_type, struct.pack('>B3x', version) + payload)
+
+
+def make_mp4(sizes, deltas, sync=None, cts=None, handler=b'vide', timescale=30):
+    """サンプルテーブルだけを持つ MP4 のバイト列を作る"""
+    stbl = [
+        full_box(b'stsz', struct.pack('>II', 0, len(sizes)) + struct.pack(f'>{len(sizes)}I', *sizes)),
+        full_box(b'stts', struct.pack('>I', len(deltas)) + b''.join(struct.pack('>II', c, d) for c, d in deltas)),
+    ]
+    if sync is not None:
+        stbl.append(full_box(b'stss', struct.pack('>I', len(sync)) + struct.pack(f'>{len(sync)}I', *sync)))
+    if cts is not None:
+        stbl.append(full_box(b'ctts', struct.pack('>I', len(cts)) + b''.join(struct.pack('>II', c, o) for c, o in cts)))
+    mdhd = full_box(b'mdhd', struct.pack('>IIII', 0, 0, timescale, sum(c * d for c, d in deltas)) + b'\0' * 4)
+    hdlr = full_box(b'hdlr', struct.pack('>I4s', 0, handler) + b'\0' * 12)
+    minf = box(b'minf', box(b'stbl', b''.join(stbl)))
+    trak = box(b'trak', box(b'mdia', mdhd + hdlr + minf))
+    return box(b'ftyp', b'isom\0\0\0\0') + box(b'moov', trak) + box(b'mdat', b'\0' * 16, large=True)
+
+
+def write_bytes(tmp_path, data, name='clip.mp4'):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_reads_sample_table_and_presentation_order(tmp_path):
+    # デコード順 I P B → 表示順 I B P（ctts で B を前に出す）
+    path = write_bytes(tmp_path, make_mp4([500, 300, 100], [(3, 1)], sync=[1], cts=[(1, 1), (1, 2), (1, 0)]))
+    table = read_sample_table(path)
+    assert list(table.sizes) == [500, 300, 100]
+    assert table.timescale == 30
+    order = table.presentation_order()
+    assert [size for _, size, _ in order] == [500, 100, 300]
+    assert [is_sync for _, _, is_sync in order] == [True, False, False]
+
+
+def test_small_samples_become_candidates(tmp_path):
+    sizes = [5000] + [1200] * 5 + [40, 40, 40, 5000, 40] + [1200] * 5
+    path = write_bytes(tmp_path, make_mp4(sizes, [(len(sizes), 1)], sync=[1, 10]))
+    candidates = find_candidates(read_sample_table(path), min_consec=3)
+    # フレーム 7〜11（途中のキーフレーム 10 は区間を切らない）
+    assert [(c['start_frame'], c['end_frame']) for c in candidates] == [(7, 11)]
+    assert candidates[0]['start_sec'] == pytest.approx(6 / 30)
+
+
+def test_intra_only_uses_equal_sizes(tmp_path):
+    sizes = [900, 910, 920, 920, 920, 920, 930, 940]
+    path = write_bytes(tmp_path, make_mp4(sizes, [(len(sizes), 1)]))
+    candidates = find_candidates(read_sample_table(path), min_consec=3)
+    assert [(c['start_frame'], c['end_frame']) for c in candidates] == [(4, 6)]
+
+
+def test_irregular_timestamps(tmp_path):
+    path = write_bytes(tmp_path, make_mp4([100] * 6, [(3, 1), (1, 3), (2, 1)], sync=[1]))
+    irregular = find_irregular_timestamps(read_sample_table(path))
+    assert [(i['frame'], i['interval_sec']) for i in irregular] == [(5, pytest.approx(3 / 30))]
+
+
+def test_rejects_non_mp4(tmp_path):
+    with pytest.raises(ValueError):
+        read_sample_table(write_bytes(tmp_path, b'RIFF' + b'\0' * 60, 'clip.avi'))
+    with pytest.raises(ValueError):
+        read_sample_table(write_bytes(tmp_path, make_mp4([100], [(1, 1)], handler=b'soun')))
+
+
+def test_prefilter_matches_full_decode(tmp_path):
+    video = write_test_video(tmp_path / "stutter.mp4", fourcc='mp4v')
+    assert len(scan(video)['candidates']) >= 1
+    for min_consec in (1, 3):
+        expected = detect_stutter(video, min_consec=min_consec)
+        assert detect_stutter(video, min_consec=min_consec, prefilter=True) == expected
+
+
+def test_prefilter_falls_back_for_non_mp4(stutter_video):
+    assert detect_stutter(stutter_video, prefilter=True) == [(10, 15), (40, 48)]
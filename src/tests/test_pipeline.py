@@ -0,0 +1,99 @@
+import cv2
+import numpy as np
+
+from src.detector.analyzer import VideoAnalyzer
+from src.detector.main import detect_stutter
+from src.detector.processor import (
+    analyze_frame,
+    below_threshold,
+    crop_regions,
+    diff_metric,
+    frame_diffs,
+    group_runs,
+    process_video,
+    to_luma,
+)
+
+# ===============================================
+# processor.py のパイプライン（ジェネレーター段）の単体テスト
+# ===============================================
+def test_group_runs_matches_run_length_rules():
+    # -----------------------------------------------
+    # 区間の途中終了・末尾まで続く区間・min_consec 未満の除外を確認
+    # -----------------------------------------------
+    flags = [(i, i in (3, 4, 5, 8, 11, 12)) for i in range(2, 13)]
+    assert list(group_runs(flags, min_consec=2)) == [(3, 5), (11, 12)]
+    assert list(group_runs(flags, min_consec=1)) == [(3, 5), (8, 8), (11, 12)]
+    assert list(group_runs([], min_consec=1)) == []
+
+
+def test_stages_are_lazy():
+    # 入力を 1 つ渡すごとに 1 つ出力し、先読みしないことを確認
+    consumed = []
+
+    def values():
+        for i in range(5):
+            consumed.append(i)
+            yield i, float(i)
+
+    flags = below_threshold(values(), 2.0)
+    assert next(flags) == (0, True)
+    assert consumed == [0]
+
+
+def test_process_video(stutter_video):
+    result = process_video(stutter_video)
+    assert result == {
+        'stutter_detected': True,
+        'stutter_frames': [(10, 15), (40, 48)],
+        'total_frames': 60,
+    }
+    assert result['stutter_frames'] == detect_stutter(stutter_video)
+
+
+def test_reuse_stages_match_allocating_stages():
+    # -----------------------------------------------
+    # バッファを使い回す段（reuse=True）が従来の段と同じ値を返し、
+    # 差分画像は毎回同じバッファに書き込まれることを確認
+    # -----------------------------------------------
+    rng = np.random.default_rng(0)
+    frames = [(i, rng.integers(0, 256, size=(24, 32, 3), dtype=np.uint8)) for i in range(1, 7)]
+    rois = [(0, 0, 8, 8), (16, 8, 16, 16)]
+
+    def values(reuse):
+        lumas = crop_regions(to_luma(iter(frames), reuse), rois, reuse)
+        return list(diff_metric(frame_diffs(lumas, reuse), 'mean'))
+
+    assert values(True) == values(False)
+    # 平均差分は np.mean と同じ値
+    gray = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for _, f in frames]
+    full = list(diff_metric(frame_diffs(to_luma(iter(frames), True), True), 'mean'))
+    assert [v for _, v in full] == [float(np.mean(cv2.absdiff(b, a))) for a, b in zip(gray, gray[1:])]
+
+    diffs = [d for _, d in frame_diffs(to_luma(iter(frames), True), True)]
+    assert all(d is diffs[0] for d in diffs)
+
+
+def test_analyze_frame():
+    frame = np.zeros((8, 8, 3), dtype=np.uint8)
+    assert analyze_frame(frame, None) is False
+    assert analyze_frame(frame, frame.copy()) is True
+    assert analyze_frame(frame + 100, frame) is False
+
+
+def test_video_analyzer_runs_on_pipeline(stutter_video):
+    # -----------------------------------------------
+    # 旧実装（フレームごとのループ）と同じフレーム番号を返すことを確認
+    # -----------------------------------------------
+    cap = cv2.VideoCapture(stutter_video)
+    expected, previous = [], None
+    for i in range(int(cap.get(cv2.CAP_PROP_FRAME_COUNT))):
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if previous is not None and np.count_nonzero(cv2.absdiff(frame, previous)) < 1000:
+            expected.append(i)
+        previous = frame
+    cap.release()
+
+    assert VideoAnalyzer(stutter_video).analyze_stutter() == expected
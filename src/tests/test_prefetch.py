@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.detector.analyzer import VideoAnalyzer
+from src.detector.main import detect_stutter
+from src.detector.prefetch import Prefetcher
+from src.detector.processor import process_video
+from src.detector.profiling import Profiler
+
+
+# ===============================================
+# prefetch.Prefetcher（デコードの先読み）の単体テスト
+# ===============================================
+def _prefetch_threads():
+    return [t for t in threading.enumerate() if t.name == 'prefetch']
+
+
+def test_prefetch_keeps_order_and_counts():
+    items = [(i, np.full((2, 2), i, dtype=np.uint8)) for i in range(1, 51)]
+    prefetch = Prefetcher(depth=4)
+    out = list(prefetch.frames(iter(items)))
+    assert [i for i, _ in out] == list(range(1, 51))
+    s = prefetch.stats()
+    assert s['frames'] == 50
+    assert s['depth'] == 4
+    assert 0 <= s['max_queue_depth'] <= 4
+    assert not _prefetch_threads()
+
+
+def test_prefetch_reports_which_side_is_slower():
+    # -----------------------------------------------
+    # デコード側が遅ければ解析側が待ち（decode-bound）、解析側が遅ければキューが埋まる（analysis-bound）
+    # -----------------------------------------------
+    def slow_source(n, delay):
+        for i in range(n):
+            time.sleep(delay)
+            yield i, None
+
+    decode_bound = Prefetcher(depth=2)
+    for _ in decode_bound.frames(slow_source(10, 0.01)):
+        pass
+    assert decode_bound.stats()['bound'] == 'decode'
+
+    analysis_bound = Prefetcher(depth=2)
+    for _ in analysis_bound.frames(slow_source(10, 0)):
+        time.sleep(0.01)
+    s = analysis_bound.stats()
+    assert s['bound'] == 'analysis'
+    assert s['max_queue_depth'] == 2
+    assert 'analysis-bound' in analysis_bound.summary()
+
+
+def test_prefetch_stops_producer_when_consumer_stops_early():
+    def endless():
+        i = 0
+        while True:
+            i += 1
+            yield i, None
+
+    frames = Prefetcher(depth=3).frames(endless())
+    assert next(frames)[0] == 1
+    frames.close()
+    assert not _prefetch_threads()
+
+
+def test_prefetch_reraises_producer_errors():
+    def broken():
+        yield 1, None
+        raise ValueError('decode failed')
+
+    with pytest.raises(ValueError, match='decode failed'):
+        list(Prefetcher().frames(broken()))
+    assert not _prefetch_threads()
+
+
+def test_prefetch_rejects_empty_queue():
+    with pytest.raises(ValueError):
+        Prefetcher(depth=0)
+
+
+def test_prefetched_analysis_matches_sequential(stutter_video):
+    # 先読みしても（読み込みのバッファを使い回しても）結果は同じ
+    profiler = Profiler()
+    prefetch = Prefetcher(depth=2)
+    results = process_video(stutter_video, profiler=profiler, prefetch=prefetch)
+    expected = process_video(stutter_video)
+    assert results['stutter_frames'] == expected['stutter_frames']
+    assert results['prefetch']['frames'] == expected['total_frames']
+    assert profiler.stages['decode'].count >= expected['total_frames']
+    assert 'prefetch.wait' in profiler.stages
+
+    assert detect_stutter(stutter_video, prefetch=Prefetcher(depth=2)) == detect_stutter(stutter_video)
+    assert (VideoAnalyzer(stutter_video, ingest='bgr', prefetch=Prefetcher(depth=2)).analyze_stutter()
+            == VideoAnalyzer(stutter_video, ingest='bgr').analyze_stutter())
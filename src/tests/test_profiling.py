@@ -0,0 +1,70 @@
+import json
+import time
+
+from conftest import write_test_video
+
+from src.detector.main import detect_stutter
+from src.detector.processor import process_video
+from src.detector.profiling import NULL_PROFILER, Histogram, Profiler
+
+
+def test_histogram_percentiles_within_bucket_error():
+    hist = Histogram()
+    for us in range(1, 1001):
+        hist.record(us * 1000)
+    for p in (50, 95, 99):
+        expected = p * 10 * 1000
+        assert abs(hist.percentile(p) - expected) / expected < 0.05
+    assert hist.count == 1000 and hist.max == 1_000_000
+
+
+def test_nested_stages_record_exclusive_time():
+    prof = Profiler()
+
+    def slow_source():
+        for i in range(5):
+            time.sleep(0.004)
+            yield i
+
+    def slow_stage(items):
+        for item in items:
+            time.sleep(0.002)
+            yield item
+
+    assert list(prof.timed('outer', slow_stage(prof.timed('inner', slow_source())))) == list(range(5))
+    report = prof.report()['stages']
+    assert report['inner']['count'] == report['outer']['count'] == 5
+    # 外側の段には内側の段（4ms）の時間が含まれない
+    assert 1500 < report['outer']['p50_us'] < 3500
+    assert report['inner']['p50_us'] > 3500
+
+
+def test_state_roundtrip_merges_counts_and_gauges():
+    a, b = Profiler(), Profiler()
+    a.record('decode', 1000)
+    b.record('decode', 3000)
+    b.gauge('save.lag', 7)
+    a.merge_state(b.state())
+    report = a.report()
+    assert report['stages']['decode']['count'] == 2
+    assert report['gauges']['save.lag']['max'] == 7
+    json.dumps(report)  # JSON にそのまま書き出せる
+
+
+def test_null_profiler_passes_items_through():
+    items = iter([1, 2])
+    assert NULL_PROFILER.timed('decode', items) is items
+    with NULL_PROFILER.span('x'):
+        pass
+
+
+def test_pipeline_stages_are_profiled(tmp_path):
+    video = write_test_video(tmp_path / "v.avi")
+    prof = Profiler()
+    results = process_video(video, profiler=prof)
+    stages = prof.report()['stages']
+    assert {'decode', 'luma', 'diff', 'metric', 'threshold'} <= set(stages)
+    assert stages['decode']['count'] == results['total_frames']
+    assert stages['diff']['count'] == results['total_frames'] - 1
+    # 計測の有無で結果は変わらない
+    assert detect_stutter(video, profiler=Profiler()) == detect_stutter(video)
@@ -0,0 +1,131 @@
+import csv
+
+import numpy as np
+import pytest
+
+from src.detector.live import THRESHOLD_LOG_FIELDS, THRESHOLD_LOG_FORMATS
+from src.detector.metrics_log import MetricsLog, iter_metrics_log
+from src.detector.report import (MinMaxDecimator, detect_layout, iter_log_chunks, lttb, render_report,
+                                 summarize_log)
+
+
+# ===============================================
+# report モジュール（長時間のログの間引き）の単体テスト
+# ===============================================
+def _write_threshold_log(path, n, stutters, log_format, seed=0):
+    """逐次カクつき検知ログと同じ列のログを書き出す（stutters の行だけ stutter_flag=1）"""
+    rng = np.random.default_rng(seed)
+    diffs = rng.integers(1000, 5000, n)
+    with MetricsLog(path, THRESHOLD_LOG_FIELDS, log_format, flush_rows=4096, flush_interval=0,
+                    formats=THRESHOLD_LOG_FORMATS) as log:
+        for i in range(n):
+            flag = int(i in stutters)
+            log.append(1.7e9 + i / 30, i, 0 if flag else diffs[i], 800.0, 2.0, flag)
+    return diffs
+
+
+def test_minmax_keeps_extremes_of_every_column():
+    rng = np.random.default_rng(1)
+    x = np.arange(200_000, dtype=np.float64)
+    y = rng.normal(size=len(x))
+    y[12_345], y[150_001] = 40.0, -30.0
+    decimator = MinMaxDecimator(width=100)
+    for i in range(0, len(x), 7_000):
+        decimator.add(x[i:i + 7_000], y[i:i + 7_000])
+    px, py = decimator.points()
+    assert decimator.rows == len(x)
+    assert len(px) <= 4 * decimator.width
+    assert np.all(np.diff(px) >= 0)
+    assert py.max() == 40.0 and py.min() == -30.0
+    # 列ごとの最小・最大は全点から直接求めた値と一致する
+    columns = (x // decimator.bin_width).astype(int)
+    expected_max = np.full(columns.max() + 1, -np.inf)
+    np.maximum.at(expected_max, columns, y)
+    np.testing.assert_array_equal(np.sort(decimator._max_v[np.isfinite(decimator._max_v)]), np.sort(expected_max))
+
+
+def test_minmax_ignores_nan_and_keeps_short_series():
+    decimator = MinMaxDecimator(width=10)
+    decimator.add([0, 1, 2, 3], [1.0, np.nan, 3.0, 2.0])
+    px, py = decimator.points()
+    assert list(px) == [0, 2, 3]
+    assert list(py) == [1.0, 3.0, 2.0]
+    with pytest.raises(ValueError):
+        decimator.points('bogus')
+
+
+def test_lttb_reduces_to_n_points_and_keeps_peaks():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[4_321] = 10.0
+    lx, ly = lttb(x, y, 200)
+    assert len(lx) == 200
+    assert lx[0] == 0 and lx[-1] == 9_999
+    assert np.all(np.diff(lx) > 0)
+    assert 10.0 in ly
+    # 点が少なければそのまま
+    assert len(lttb(x[:50], y[:50], 200)[0]) == 50
+
+
+@pytest.mark.parametrize('log_format', ['csv', 'mlog'])
+def test_summarize_threshold_log_keeps_every_stutter_row(tmp_path, log_format):
+    path = str(tmp_path / f"adaptive_threshold_log.{log_format}")
+    stutters = set(range(5_000, 5_010)) | {77_777}
+    diffs = _write_threshold_log(path, 100_000, stutters, log_format)
+    assert detect_layout(path) == 'threshold'
+
+    summary = summarize_log(path, width=200, chunk_rows=10_000, x_scale=1 / 30)
+    assert summary['rows'] == 100_000
+    x, y = summary['series']['frame_diff']
+    assert len(x) <= 800
+    assert y.max() == diffs.max()
+    # カクつきの行は間引かずにすべて残る
+    fx, fy = summary['flagged']['frame_diff']
+    assert sorted(fx.astype(int)) == sorted(stutters)
+    assert np.all(fy == 0)
+
+    lttb_summary = summarize_log(path, 'threshold', width=200, mode='lttb')
+    assert len(lttb_summary['series']['frame_diff'][0]) == 200
+
+
+def test_iter_log_chunks_streams_csv_and_mlog(tmp_path):
+    csv_path = str(tmp_path / "log.csv")
+    mlog_path = str(tmp_path / "log.mlog")
+    _write_threshold_log(csv_path, 1_000, set(), 'csv')
+    _write_threshold_log(mlog_path, 1_000, set(), 'mlog')
+    chunks = list(iter_log_chunks(csv_path, ['frame_idx', 'frame_diff'], chunk_rows=300))
+    assert [len(c['frame_idx']) for c in chunks] == [300, 300, 300, 100]
+    assert len(list(iter_metrics_log(mlog_path))) == 1
+    mlog = np.concatenate([c['frame_diff'] for c in iter_log_chunks(mlog_path, ['frame_diff'])])
+    np.testing.assert_array_equal(np.concatenate([c['frame_diff'] for c in chunks]), mlog)
+    with pytest.raises(ValueError):
+        next(iter_log_chunks(csv_path, ['missing']))
+
+
+def test_summarize_camera_log(tmp_path):
+    # tests/benchmark_test.py の camera_frame_test.csv と同じ列
+    path = str(tmp_path / "camera_frame_test.csv")
+    fields = ["Frame", "Interval_sec", "FPS", "DiffFlag", "Diff", "SameHashFlag", "frame_hash", "RepeatOf",
+              "RepeatDistance", "RepeatKind", "Timestamp_ms", "CPU_percent", "Memory_percent", "ImageFile"]
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for i in range(5_000):
+            writer.writerow({"Frame": i, "Interval_sec": 1 / 30, "FPS": 30.0, "DiffFlag": "×" if i % 1000 == 1 else "〇",
+                             "Diff": 20, "SameHashFlag": "×", "frame_hash": "0", "RepeatOf": "", "RepeatDistance": "",
+                             "RepeatKind": "", "Timestamp_ms": 1e6 + i * 33.3, "CPU_percent": 10.0,
+                             "Memory_percent": 50.0, "ImageFile": f"frame_{i:04d}.jpg"})
+    assert detect_layout(path) == 'camera'
+    summary = summarize_log(path, width=100)
+    assert summary['rows'] == 5_000
+    assert summary['x0'] == 1e6
+    assert len(summary['flagged']['FPS'][0]) == 5
+    assert set(summary['series']) == {'FPS', 'Diff', 'CPU_percent', 'Memory_percent'}
+
+
+def test_render_report_writes_charts(tmp_path):
+    pytest.importorskip('matplotlib')
+    path = str(tmp_path / "adaptive_threshold_log.mlog")
+    _write_threshold_log(path, 10_000, {100}, 'mlog')
+    paths = render_report(summarize_log(path, width=300), str(tmp_path), width=300)
+    assert [p.endswith('00_stutter_detection.png') for p in paths] == [True]
@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.detector.main import detect_stutter
+from src.detector.processor import crop_regions, process_video
+from src.detector.roi import activity_map, calibrate, find_regions, parse_roi
+from src.detector.synthetic import write_synthetic_video
+
+
+# ===============================================
+# roi.py（アクティビティマップと ROI の自動検出）の単体テスト
+# ===============================================
+def _screen_video(tmp_path, region=(400, 192, 96, 64), motion='pan'):
+    # 640x360 の静止した枠の中で小さな領域だけが動く画面録画（動く画素は全体の約 3%）
+    return write_synthetic_video(tmp_path / "screen.avi", n_frames=120, size=(640, 360), motion=motion, seed=1,
+                                 active_region=region, n_freezes=3, freeze_len=(3, 8))
+
+
+def test_parse_roi():
+    assert parse_roi(None) is None
+    assert parse_roi('auto') == 'auto'
+    assert parse_roi('10,20,30,40') == [(10, 20, 30, 40)]
+    assert parse_roi('0,0,8,8; 16,0,8,8') == [(0, 0, 8, 8), (16, 0, 8, 8)]
+    with pytest.raises(ValueError):
+        parse_roi('1,2,3')
+    with pytest.raises(ValueError):
+        parse_roi('0,0,0,10')
+
+
+def test_find_regions_from_activity_map():
+    frames = []
+    rng = np.random.default_rng(0)
+    for i in range(20):
+        frame = np.zeros((96, 160), dtype=np.uint8)
+        frame[16:48, 32:80] = rng.integers(0, 256, size=(32, 48), dtype=np.uint8)   # 動く領域 1
+        frame[64:96, 128:160] = rng.integers(0, 256, size=(32, 32), dtype=np.uint8)  # 右下の端に接する領域 2
+        frame[0, 0] = 255 * (i % 2)                                                   # 1 画素の点滅（無視する）
+        frames.append((i, frame))
+    activity, pairs, shape = activity_map(frames, tile=16)
+    assert pairs == 19 and shape == (96, 160) and activity.shape == (6, 10)
+    assert find_regions(activity, shape, tile=16) == [(32, 16, 48, 32), (128, 64, 32, 32)]
+    assert find_regions(activity, shape, tile=16, max_regions=1) == [(32, 16, 48, 32)]
+    assert find_regions(np.zeros((6, 10), np.float32), shape, tile=16) == []
+
+
+def test_crop_regions_single_view_and_multiple():
+    frame = np.arange(100, dtype=np.uint8).reshape(10, 10)
+    (_, single), = crop_regions([(1, frame)], [(2, 3, 4, 2)])
+    assert np.shares_memory(single, frame) and single.tolist() == [[32, 33, 34, 35], [42, 43, 44, 45]]
+    (_, joined), = crop_regions([(1, frame)], [(0, 0, 2, 1), (8, 9, 2, 1)])
+    assert joined.ravel().tolist() == [0, 1, 98, 99]
+    with pytest.raises(ValueError):
+        list(crop_regions([(1, frame)], [(20, 20, 5, 5)]))
+
+
+def test_auto_roi_removes_false_freezes(tmp_path):
+    truth = _screen_video(tmp_path)
+    # 静止した枠が平均差分を 0 に近づけ、動画全体が「静止」と誤判定される
+    assert detect_stutter(truth['path'], min_consec=3) == [(2, 120)]
+    rois, report = calibrate(truth['path'], seconds=2.0)
+    assert rois == [tuple(truth['active_region'])]
+    assert report['mode'] == 'auto' and report['pixel_fraction'] < 0.05
+    expected = [tuple(r) for r in truth['freezes']]
+    assert detect_stutter(truth['path'], min_consec=3, roi='auto', roi_seconds=2.0) == expected
+    assert detect_stutter(truth['path'], min_consec=3, roi=[tuple(truth['active_region'])]) == expected
+
+
+def test_process_video_reports_roi(tmp_path):
+    truth = _screen_video(tmp_path)
+    result = process_video(truth['path'], min_consec=3, roi='auto', roi_seconds=2.0)
+    assert result['stutter_frames'] == [tuple(r) for r in truth['freezes']]
+    assert result['roi']['regions'] == [truth['active_region']]
+    assert result['roi']['frame_size'] == [640, 360]
+    manual = process_video(truth['path'], min_consec=3, roi=[(400, 192, 96, 64)])
+    assert manual['roi'] == {'mode': 'manual', 'regions': [[400, 192, 96, 64]], 'frame_size': [640, 360],
+                             'pixel_fraction': 0.0267}
+    json.dumps(result)
+
+
+def test_auto_roi_falls_back_to_whole_frame_without_motion(tmp_path):
+    truth = write_synthetic_video(tmp_path / "still.avi", n_frames=30, size=(64, 48), freezes=[(2, 30)],
+                                  duplicates=[])
+    rois, report = calibrate(truth['path'])
+    assert rois == [] and report['mode'] == 'full'
+    assert process_video(truth['path'], min_consec=3, roi='auto')['stutter_frames'] == [(2, 30)]
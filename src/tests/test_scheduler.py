@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from src.detector.capture import FrameRing
+from src.detector.profiling import Profiler
+from src.detector.scheduler import FrameScheduler
+
+
+# ===============================================
+# scheduler.FrameScheduler（締め切りごとにフレームを受け取るスケジューラ）の単体テスト
+# ===============================================
+def _publisher(ring, fps, stop, stall_after=None, stall_sec=0.0):
+    """fps でリングにフレームを公開するスレッド（stall_after フレーム目の後で stall_sec 止まる）"""
+    def run():
+        period = 1.0 / fps
+        next_time = time.perf_counter()
+        n = 0
+        while not stop.is_set():
+            next_time += period
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+            ring.acquire_write()[:] = n % 256
+            ring.publish()
+            n += 1
+            if n == stall_after:
+                time.sleep(stall_sec)
+                next_time = time.perf_counter()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _consume(scheduler, n, work_sec=0.0):
+    stop = threading.Event()
+    seqs = []
+    for seq, _ in scheduler.frames(stop, timeout=1.0):
+        seqs.append(seq)
+        if work_sec:
+            time.sleep(work_sec)
+        if len(seqs) == n:
+            break
+    return seqs
+
+
+def test_scheduler_never_repeats_a_frame_when_camera_is_slower():
+    # -----------------------------------------------
+    # カメラ 25fps・処理 100fps: 締め切りのたびに最新を読むと同じフレームを繰り返すが、
+    # スケジューラは新しいフレームが来るまで眠って待つ
+    # -----------------------------------------------
+    ring = FrameRing(8, (2, 2))
+    stop = threading.Event()
+    thread = _publisher(ring, 25, stop)
+    try:
+        profiler = Profiler()
+        scheduler = FrameScheduler(ring, 100, profiler=profiler)
+        seqs = _consume(scheduler, 10)
+    finally:
+        stop.set()
+        thread.join()
+    assert seqs == sorted(set(seqs))
+    assert scheduler.frames_read == 10
+    assert 'schedule.wait' in profiler.stages
+    # フレームを待つので締め切りには遅れる（同じフレームを処理して間に合わせはしない）
+    assert scheduler.late > 0
+
+
+def test_scheduler_skips_frames_when_camera_is_faster():
+    ring = FrameRing(16, (2, 2))
+    stop = threading.Event()
+    thread = _publisher(ring, 200, stop)
+    try:
+        scheduler = FrameScheduler(ring, 50)
+        seqs = _consume(scheduler, 10)
+    finally:
+        stop.set()
+        thread.join()
+    assert all(b > a for a, b in zip(seqs, seqs[1:]))
+    assert scheduler.skipped == seqs[-1] - seqs[0] - 9
+    assert scheduler.skipped > 0
+    s = scheduler.stats()
+    # 処理したフレームの間隔はほぼ 1 周期（20ms）
+    assert s['interval_periods']['1'] >= 5
+    assert 10 < s['interval_ms']['p50'] < 40
+
+
+def test_scheduler_records_stalls_and_missed_deadlines():
+    ring = FrameRing(8, (2, 2))
+    stop = threading.Event()
+    # 5 フレーム目の後でカメラが 0.2 秒止まる
+    thread = _publisher(ring, 50, stop, stall_after=5, stall_sec=0.2)
+    try:
+        scheduler = FrameScheduler(ring, 50)
+        seqs = _consume(scheduler, 12, work_sec=0.001)
+        assert seqs == sorted(set(seqs))
+        s = scheduler.stats()
+        # カメラ側の 0.2 秒の抜けは周期（20ms）の 4 倍以上の間隔として残る
+        assert s['interval_periods']['4+'] >= 1
+        assert s['interval_ms']['max'] >= 150
+        assert s['late'] >= 1
+
+        # 処理が周期を大きく超えると、過ぎた締め切りは追いかけずに飛ばして数える
+        _consume(scheduler, 2, work_sec=0.1)
+        assert scheduler.stats()['missed_deadlines'] >= 3
+    finally:
+        stop.set()
+        thread.join()
+    assert 'missed deadlines' in scheduler.summary()
+
+
+def test_scheduler_times_out_without_frames():
+    ring = FrameRing(4, (1,))
+    scheduler = FrameScheduler(ring, 100)
+    assert scheduler.read(timeout=0.05) is None
+    assert scheduler.frames_read == 0
+    with pytest.raises(ValueError):
+        FrameScheduler(ring, 0)
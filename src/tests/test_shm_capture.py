@@ -0,0 +1,56 @@
+import multiprocessing as mp
+
+import numpy as np
+
+from src.detector.capture import RingReader
+from src.detector.shm_capture import SharedFrameRing
+
+
+def _publish_frames(meta, count):
+    ring = SharedFrameRing.attach(meta)
+    for i in range(count):
+        ring.acquire_write()[:] = i
+        ring.publish()
+    ring.close()
+
+
+def test_attach_shares_frames_and_counters():
+    ring = SharedFrameRing(4, (8, 8), np.uint8)
+    try:
+        other = SharedFrameRing.attach(ring.meta())
+        # 別プロセスの読み手のカーソルも共有メモリ上にあり、書き込み側から見える
+        reader = RingReader(other, stride=2, start=0, slot=0)
+        for i in range(6):
+            ring.acquire_write()[:] = i
+            ring.publish()
+        # 読み手が読むはずだった seq 0, 2 だけを数える（間引く seq 1 は数えない）
+        assert (other.head, other.writes, other.overwrites) == (5, 6, 2)
+        assert other.get(1) is None           # 上書き済み
+        assert other.get(5)[0, 0] == 5
+        assert not other.get(5).flags.writeable
+        assert other.is_valid(3) and not other.is_valid(2)  # スロット 2 は次の書き込み先
+        reader.close()
+        ring.acquire_write()[:] = 6
+        ring.publish()
+        assert other.overwrites == 2
+        other.close()
+    finally:
+        ring.close()
+
+
+def test_reader_in_other_process_sees_frames_in_order():
+    ring = SharedFrameRing(64, (4, 4), np.uint8)
+    try:
+        reader = RingReader(ring, start=0)
+        proc = mp.Process(target=_publish_frames, args=(ring.meta(), 20))
+        proc.start()
+        values = []
+        while len(values) < 20:
+            item = reader.read(timeout=10)
+            assert item is not None
+            values.append(int(item[1][0, 0]))
+        proc.join()
+        assert values == list(range(20))
+        assert reader.dropped == 0
+    finally:
+        ring.close()
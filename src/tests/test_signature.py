@@ -0,0 +1,45 @@
+import os
+
+from src.detector.main import detect_stutter
+from src.detector.signature import (
+    compute_signatures,
+    detect_stutter_from_signatures,
+    load_signatures,
+    sidecar_path,
+)
+
+# ===============================================
+# signature モジュールの単体テスト
+# ===============================================
+def test_signatures_match_detect_stutter(stutter_video):
+    # -----------------------------------------------
+    # 保存した指標からの判定が、デコードした場合と同じ区間になることを確認
+    # -----------------------------------------------
+    signatures = compute_signatures(stutter_video)
+    assert len(signatures) == 60
+    for diff_thresh, min_consec in ((2.0, 3), (2.0, 2), (0.5, 1), (50.0, 3)):
+        expected = detect_stutter(stutter_video, diff_thresh=diff_thresh, min_consec=min_consec)
+        assert detect_stutter_from_signatures(signatures, diff_thresh, min_consec) == expected
+
+
+def test_cache_reuses_sidecar(stutter_video):
+    # -----------------------------------------------
+    # 1 回目でサイドカーが作成され、2 回目はそれを使って同じ結果を返すことを確認
+    # -----------------------------------------------
+    first = detect_stutter(stutter_video, cache=True)
+    assert os.path.exists(sidecar_path(stutter_video))
+    assert load_signatures(stutter_video) is not None
+    assert detect_stutter(stutter_video, min_consec=2, cache=True) == detect_stutter(stutter_video, min_consec=2)
+    assert first == [(10, 15), (40, 48)]
+
+
+def test_stale_sidecar_is_ignored(stutter_video):
+    # 動画が更新されたらサイドカーは無効になることを確認
+    detect_stutter(stutter_video, cache=True)
+    with open(stutter_video, 'ab') as f:
+        f.write(b'\0')
+    assert load_signatures(stutter_video) is None
+    # ingest モードが違う場合も無効
+    os.utime(stutter_video)
+    detect_stutter(stutter_video, cache=True)
+    assert load_signatures(stutter_video, ingest='raw') is None
@@ -0,0 +1,41 @@
+import numpy as np
+
+from src.detector.main import detect_stutter
+from src.detector.synthetic import frames_to_runs, make_frames, place_runs, score_runs, write_synthetic_video
+
+
+def test_synthetic_video_ground_truth_is_detected(tmp_path):
+    truth = write_synthetic_video(tmp_path / "s.avi", n_frames=120, size=(96, 64), motion='noise', seed=3,
+                                  n_freezes=3, freeze_len=(3, 6), n_duplicates=4)
+    assert len(truth['freezes']) == 3 and len(truth['duplicates']) == 4
+    detected = detect_stutter(truth['path'], min_consec=3)
+    assert detected == [tuple(r) for r in truth['freezes']]
+    # 1 フレームの重複も min_consec=1 なら検出される
+    singles = detect_stutter(truth['path'], min_consec=1)
+    assert sorted(s for s, e in singles if s == e) == truth['duplicates']
+
+
+def test_same_seed_gives_same_frames_and_truth(tmp_path):
+    a = write_synthetic_video(tmp_path / "a.avi", n_frames=60, size=(64, 48), seed=5)
+    b = write_synthetic_video(tmp_path / "b.avi", n_frames=60, size=(64, 48), seed=5)
+    assert (a['freezes'], a['duplicates']) == (b['freezes'], b['duplicates'])
+    frames_a = list(make_frames(10, (32, 16), 'static_noise', seed=1))
+    frames_b = list(make_frames(10, (32, 16), 'static_noise', seed=1))
+    assert all(np.array_equal(x, y) for x, y in zip(frames_a, frames_b))
+
+
+def test_place_runs_do_not_overlap():
+    runs = place_runs(500, 10, 2, 9, np.random.default_rng(0))
+    assert len(runs) == 10
+    for (s1, e1), (s2, e2) in zip(runs, runs[1:]):
+        assert e1 < s2
+    assert runs[0][0] >= 2 and runs[-1][1] <= 500
+
+
+def test_score_runs():
+    truth = [(10, 15), (40, 48)]
+    score = score_runs([(11, 15), (60, 62)], truth)
+    assert (score['precision'], score['recall']) == (0.5, 0.5)
+    assert score['frame_recall'] == round(5 / 15, 4)
+    assert score_runs([], [])['f1'] == 1.0
+    assert frames_to_runs([3, 1, 2, 7]) == [(1, 3), (7, 7)]
@@ -0,0 +1,105 @@
+import bisect
+
+import numpy as np
+import pytest
+
+from src.detector.threshold import AdaptiveThresholdTrainer, IndexedSortedList, RollingMedianThreshold, make_threshold
+
+
+def _stream(trainer, values):
+    rows = []
+    for x in values:
+        threshold = trainer.update(x)
+        rows.append((trainer.mean, trainer.std, threshold, trainer.dynamic_k, x <= threshold))
+    return rows
+
+
+@pytest.mark.parametrize("alpha_mean, alpha_std, base_k", [(0.05, 0.05, 2.0), (0.3, 0.01, 1.5), (0.9, 0.5, 3.0)])
+def test_batch_is_bit_identical_to_streaming(alpha_mean, alpha_std, base_k):
+    rng = np.random.default_rng(0)
+    values = rng.gamma(2.0, 5000.0, 5000).round()
+    values[100:130] = 0           # 静止区間
+    values[2000:2010] = 1e7       # 急な変化
+
+    expected = _stream(AdaptiveThresholdTrainer(alpha_mean, alpha_std, base_k), values)
+    batch = AdaptiveThresholdTrainer(alpha_mean, alpha_std, base_k).update_batch(values)
+
+    for name, column in zip(('mean', 'std', 'threshold', 'dynamic_k'), zip(*expected)):
+        # 許容誤差なしで一致すること
+        assert np.array_equal(batch[name], np.array(column)), name
+    assert batch['stutter_flag'].astype(bool).tolist() == [row[4] for row in expected]
+
+
+def test_batch_continues_streaming_state():
+    values = np.arange(1, 200, dtype=np.float64) % 17
+    streaming = AdaptiveThresholdTrainer()
+    expected = [streaming.update(x) for x in values]
+
+    trainer = AdaptiveThresholdTrainer()
+    first = [trainer.update(x) for x in values[:50]]
+    batch = trainer.update_batch(values[50:150])
+    rest = [trainer.update(x) for x in values[150:]]
+
+    assert first + batch['threshold'].tolist() + rest == expected
+    assert (trainer.mean, trainer.std, trainer.var_ratio) == (streaming.mean, streaming.std, streaming.var_ratio)
+
+
+def test_batch_empty():
+    assert len(AdaptiveThresholdTrainer().update_batch([])) == 0
+
+
+def test_indexed_sorted_list_matches_sorted():
+    rng = np.random.default_rng(1)
+    values = IndexedSortedList(load=4)
+    reference = []
+    for step in range(3000):
+        if reference and rng.random() < 0.45:
+            value = reference[rng.integers(len(reference))]
+            reference.remove(value)
+            values.remove(value)
+        else:
+            value = int(rng.integers(0, 50))
+            reference.append(value)
+            values.add(value)
+        reference.sort()
+        assert len(values) == len(reference)
+        if reference:
+            i = int(rng.integers(len(reference)))
+            assert values[i] == reference[i]
+            assert values.bisect_left(25) == bisect.bisect_left(reference, 25)
+    assert list(values) == reference
+    with pytest.raises(ValueError):
+        values.remove(1000)
+
+
+@pytest.mark.parametrize("window", [1, 2, 7, 100])
+def test_rolling_median_and_mad_match_numpy(window):
+    rng = np.random.default_rng(2)
+    values = rng.choice([0.0, 1.0, 3.5, 5.0, 5.0, 7.0, 100.0], size=400)
+    detector = RollingMedianThreshold(window, k=2.0)
+    for i, x in enumerate(values):
+        threshold = detector.update(x)
+        recent = values[max(0, i - window + 1):i + 1]
+        median = np.median(recent)
+        mad = np.median(np.abs(recent - median))
+        assert (detector.median, detector.mad) == (median, mad)
+        assert threshold == max(median - 2.0 * RollingMedianThreshold.MAD_SCALE * mad, 0.0)
+
+
+def test_rolling_median_ignores_bursts():
+    # 静止（0）が 1 割混じる定常状態に、動きのバーストが来ても中央値はほとんど動かない
+    detector = RollingMedianThreshold(window=200, k=2.0)
+    for i in range(300):
+        detector.update(0 if i % 10 == 0 else 1000 + (i % 7))
+    before = detector.median
+    for _ in range(20):
+        detector.update(1e6)
+    assert abs(detector.median - before) <= 6
+    assert detector.update(0) > 0
+
+
+def test_make_threshold():
+    assert isinstance(make_threshold('ema'), AdaptiveThresholdTrainer)
+    assert make_threshold('median', k=3.0, window=50).window == 50
+    with pytest.raises(ValueError):
+        make_threshold('mean')
@@ -0,0 +1,106 @@
+import threading
+
+import numpy as np
+import pytest
+
+from src.detector.main import detect_stutter
+from src.detector.processor import CascadeFilter, diff_metric, frame_diffs, process_video, stutter_events
+from src.detector.profiling import Profiler
+from src.detector.tiles import StripeDiff
+
+
+# ===============================================
+# tiles.StripeDiff（横帯に分けた並列の差分）の単体テスト
+# ===============================================
+def _stripe_threads():
+    return [t for t in threading.enumerate() if t.name.startswith('stripe')]
+
+
+def _random_lumas(n, shape=(100, 130), seed=0):
+    rng = np.random.default_rng(seed)
+    return [(i, rng.integers(0, 256, shape, dtype=np.uint8)) for i in range(1, n + 1)]
+
+
+@pytest.mark.parametrize('threads, stripes', [(1, None), (2, None), (4, None), (3, 7)])
+def test_stripe_diff_matches_mean_diff(threads, stripes):
+    # 帯の数・スレッド数によらず、平均差分は frame_diffs + diff_metric('mean') と一致する
+    lumas = _random_lumas(6)
+    expected = list(diff_metric(frame_diffs(iter(lumas)), 'mean'))
+    with StripeDiff(threads, stripes) as tiles:
+        assert list(tiles.values(iter(lumas), diff_thresh=2.0)) == expected
+        assert tiles.pairs == 5
+    assert not _stripe_threads()
+
+
+def test_stripe_diff_aggregates_and_tile_map():
+    rng = np.random.default_rng(1)
+    # 高さ・幅がタイルの倍数でなくても、端の画素は合計に含め tile_map からは除く
+    a = rng.integers(0, 256, (70, 100), dtype=np.uint8)
+    b = rng.integers(0, 256, (70, 100), dtype=np.uint8)
+    d = np.abs(a.astype(np.int16) - b.astype(np.int16))
+    with StripeDiff(threads=2, tile=16) as tiles:
+        last = tiles.measure(b, a)
+        assert last['sum'] == int(d.sum())
+        assert last['nonzero'] == int(np.count_nonzero(d))
+        assert last['max'] == int(d.max())
+        assert last['mean'] == pytest.approx(d.mean())
+        expected = d[:64, :96].reshape(4, 16, 6, 16).mean(axis=(1, 3))
+        np.testing.assert_allclose(tiles.tile_map, expected, rtol=1e-6)
+
+
+def test_stripe_diff_reports_localized_freeze():
+    # -----------------------------------------------
+    # フレーム全体は動き続けるが、左上の 64x64 だけがフレーム 10〜15 で止まる
+    # -----------------------------------------------
+    rng = np.random.default_rng(2)
+    lumas = []
+    frame = None
+    for i in range(1, 31):
+        current = rng.integers(0, 256, (128, 160), dtype=np.uint8)
+        if frame is not None and 10 <= i <= 15:
+            current[:64, :64] = frame[:64, :64]
+        frame = current
+        lumas.append((i, frame))
+
+    profiler = Profiler()
+    with StripeDiff(threads=2, tile=32) as tiles:
+        # フレーム全体のカクつきは検出しない
+        assert list(stutter_events(iter(lumas), 2.0, 3, profiler, tiles=tiles)) == []
+        s = tiles.stats()
+    assert s['local_freezes'] == [{'start': 10, 'end': 15, 'region': [0, 0, 64, 64], 'tiles': 4}]
+    assert 'tiles.diff' in profiler.stages
+
+
+def test_stripe_diff_ignores_static_chrome_and_whole_frame_freezes():
+    # 最初から動かない領域（枠・黒帯）とフレーム全体の静止は局所的な静止としない
+    rng = np.random.default_rng(3)
+    lumas = []
+    frame = None
+    for i in range(1, 31):
+        current = rng.integers(0, 256, (128, 160), dtype=np.uint8)
+        current[:, :64] = 0
+        if frame is not None and 10 <= i <= 15:
+            current = frame
+        frame = current
+        lumas.append((i, frame))
+    with StripeDiff(threads=2, tile=32) as tiles:
+        assert list(stutter_events(iter(lumas), 2.0, 3, tiles=tiles)) == [(10, 15)]
+        assert tiles.local_freezes == []
+
+
+def test_stripe_diff_in_pipeline_matches(stutter_video):
+    expected = process_video(stutter_video)
+    with StripeDiff(threads=2) as tiles:
+        results = process_video(stutter_video, tiles=tiles)
+    assert results['stutter_frames'] == expected['stutter_frames']
+    assert results['tiles']['pairs'] == expected['total_frames'] - 1
+
+    with StripeDiff(threads=2) as tiles:
+        assert detect_stutter(stutter_video, tiles=tiles) == detect_stutter(stutter_video)
+
+
+def test_stripe_diff_rejects_cascade_and_bad_threads():
+    with pytest.raises(ValueError):
+        StripeDiff(threads=0)
+    with StripeDiff(threads=1) as tiles, pytest.raises(ValueError):
+        stutter_events(iter([]), cascade=CascadeFilter(), tiles=tiles)
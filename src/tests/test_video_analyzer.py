@@ -0,0 +1,46 @@
+import cv2
+import numpy as np
+
+from src.detector.analyzer import METRIC_DTYPE, VideoAnalyzer
+
+# ===============================================
+# VideoAnalyzer のバッチ処理の単体テスト
+# ===============================================
+def _per_frame_luma_metrics(video_path):
+    cap = cv2.VideoCapture(video_path)
+    rows, previous, i = [], None, 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if previous is not None:
+            diff = cv2.absdiff(gray, previous)
+            rows.append((i, float(np.mean(diff)), int(np.count_nonzero(diff)), int(diff.max())))
+        previous = gray
+        i += 1
+    cap.release()
+    return np.array(rows, dtype=METRIC_DTYPE)
+
+
+def test_batched_metrics_match_per_frame_loop(stutter_video):
+    # -----------------------------------------------
+    # バッチ境界の位置によらず、1 フレームずつ計算した指標と完全に一致することを確認
+    # -----------------------------------------------
+    expected = _per_frame_luma_metrics(stutter_video)
+    for batch_size in (1, 7, 16, 59, 200):
+        metrics = VideoAnalyzer(stutter_video).analyze_metrics(batch_size)
+        assert metrics.dtype == METRIC_DTYPE
+        assert np.array_equal(metrics, expected)
+
+
+def test_batched_analyze_stutter_matches_luma_loop(stutter_video):
+    expected = VideoAnalyzer(stutter_video, ingest='bgr').analyze_stutter()
+    assert VideoAnalyzer(stutter_video).analyze_stutter(batch_size=8) == expected
+
+
+def test_stutter_duration_after_analysis(stutter_video):
+    # 解析後（動画を閉じた後）でも合計時間を計算できることを確認
+    analyzer = VideoAnalyzer(stutter_video)
+    frames = analyzer.analyze_stutter(batch_size=16)
+    assert analyzer.get_stutter_duration(frames) == len(frames) / 30
@@ -0,0 +1,113 @@
+# ===============================================
+# 差分パイプラインの 1 フレームあたりのメモリ確保量のベンチマーク（tracemalloc）
+# 使い方:
+#   python -m tests.benchmark_alloc
+#   python -m tests.benchmark_alloc --size 1920x1080 --frames 300
+#
+# 読み込み → 輝度 → 差分 → 平均差分 を、バッファを使い回さない従来の段（reuse=False）と
+# 出力先のバッファを使い回す段（reuse=True）で 1 フレームずつ進め、
+#   - 1 フレームを進める間に確保したメモリのピーク（tracemalloc の reset_peak からの増分）
+#   - 画像 1 枚以上（輝度 1 フレームぶん以上）を確保したフレームの割合
+#   - ガベージコレクション（gc）の実行回数
+#   - 1 フレームあたりの時間（tracemalloc なしで別に計測）
+# を比べる。NumPy / OpenCV の画像は NumPy の確保を通るので tracemalloc に現れる。
+#   source=file   : 合成動画をデコードするところから（ingest.open_luma_reader）
+#   source=memory : デコード済みの BGR フレームから（パイプラインの段だけ）
+# 最初の warmup フレーム（バッファの確保）は集計から除く。
+# ===============================================
+import argparse
+import gc
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.detector.ingest import open_luma_reader
+from src.detector.processor import diff_metric, frame_diffs, read_frames, to_luma
+from src.detector.synthetic import make_frames, write_synthetic_video
+
+
+def pipeline(source, frames, reuse):
+    """(フレーム番号, 平均差分) を返す段を組み立てる（source は動画のパスまたは BGR フレームのリスト）"""
+    if isinstance(source, str):
+        cap = open_luma_reader(source, 'bgr', reuse=reuse)
+        items = read_frames(cap, frames)
+    else:
+        items = enumerate(source, start=1)
+    return diff_metric(frame_diffs(to_luma(items, reuse), reuse), 'mean')
+
+
+def measure(source, frames, reuse, frame_bytes, warmup=10):
+    """
+    1 フレームずつ進めてメモリ確保のピークと gc の回数を測る
+
+    Returns:
+    dict: {'frames', 'mean_bytes', 'max_bytes', 'image_frames', 'gc_runs'}
+    """
+    collections = []
+
+    def on_gc(phase, info):
+        if phase == 'start':
+            collections.append(info['generation'])
+
+    peaks = []
+    stage = pipeline(source, frames, reuse)
+    tracemalloc.start()
+    gc.callbacks.append(on_gc)
+    try:
+        n = 0
+        while True:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            if next(stage, None) is None:
+                break
+            n += 1
+            if n > warmup:
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+                if n == warmup + 1:
+                    collections.clear()
+    finally:
+        gc.callbacks.remove(on_gc)
+        tracemalloc.stop()
+    peaks = np.array(peaks or [0])
+    return {'frames': len(peaks), 'mean_bytes': float(peaks.mean()), 'max_bytes': int(peaks.max()),
+            'image_frames': float(np.mean(peaks >= frame_bytes)), 'gc_runs': len(collections)}
+
+
+def per_frame_ms(source, frames, reuse):
+    start = time.perf_counter()
+    n = sum(1 for _ in pipeline(source, frames, reuse))
+    return (time.perf_counter() - start) / max(1, n) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-frame allocations of the diff pipeline with and without reuse')
+    parser.add_argument('--size', default='1280x720', help='WxH of the synthetic video')
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10, help='Frames excluded from the statistics')
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    frame_bytes = size[0] * size[1]
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, 'alloc.avi')
+        write_synthetic_video(path, args.frames, size, motion='noise', seed=0)
+        sources = {'file': path, 'memory': list(make_frames(args.frames, size, 'noise', 0))}
+        print(f"{args.size}, {args.frames} frames (luma frame = {frame_bytes / 1024:.0f} KiB)")
+        for name, source in sources.items():
+            for reuse in (False, True):
+                r = measure(source, args.frames, reuse, frame_bytes, args.warmup)
+                ms = per_frame_ms(source, args.frames, reuse)
+                print(f"{name:<7} reuse={str(reuse):<5} {r['mean_bytes'] / 1024:10.1f} KiB/frame "
+                      f"(max {r['max_bytes'] / 1024:8.1f} KiB)  image allocs in {r['image_frames'] * 100:5.1f}% "
+                      f"of frames  gc runs {r['gc_runs']:3d}  {ms:6.2f} ms/frame")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+# ===============================================
+# VideoAnalyzer のバッチ処理ベンチマーク
+# 使い方:
+#   python -m tests.benchmark_analyzer
+#   python -m tests.benchmark_analyzer --video path/to/video.mp4 --batch-size 64
+#
+# 1) 差分計算のみ（デコード済みフレーム）: フレームごとのループ vs バッチ一括
+# 2) 動画全体: analyze_stutter（従来のフレームごとループ） vs analyze_metrics（バッチ）
+# ===============================================
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from src.detector.analyzer import VideoAnalyzer, batch_diff_metrics
+
+
+def _make_video(path, width, height, frames, fps=30):
+    """動くノイズ模様の合成動画を作成する"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, size=(height, width), dtype=np.uint8)
+    for i in range(frames):
+        gray = np.roll(base, i * 4, axis=1)
+        writer.write(cv2.merge([gray, gray, gray]))
+    writer.release()
+
+
+def bench_diff_only(width, height, frames, batch_size):
+    """デコード済みの輝度フレームに対する差分計算のスループット（fps）"""
+    rng = np.random.default_rng(1)
+    lumas = rng.integers(0, 256, size=(frames, height, width), dtype=np.uint8)
+
+    # フレームごとのループ（従来の absdiff + count_nonzero）
+    start = time.perf_counter()
+    for i in range(1, frames):
+        diff = cv2.absdiff(lumas[i], lumas[i - 1])
+        np.count_nonzero(diff)
+        float(np.mean(diff))
+        int(diff.max())
+    per_frame = (frames - 1) / (time.perf_counter() - start)
+
+    # バッチ一括（実際の解析ではデコード結果がブロックに直接入るので、ブロックへの詰め替えは計測しない）
+    diff_block = np.empty((batch_size, height, width), dtype=np.uint8)
+    elapsed = 0.0
+    i = 1
+    while i < frames:
+        count = min(batch_size, frames - i)
+        block = lumas[i - 1:i + count]  # block[0] = 前バッチの最後のフレーム
+        start = time.perf_counter()
+        batch_diff_metrics(block, count, diff_block)
+        elapsed += time.perf_counter() - start
+        i += count
+    batched = (frames - 1) / elapsed
+    return per_frame, batched
+
+
+def bench_video(video_path, batch_size):
+    """動画全体（デコード込み）のスループット（fps）"""
+    start = time.perf_counter()
+    n = len(VideoAnalyzer(video_path).analyze_metrics(batch_size)) + 1
+    batched = n / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    VideoAnalyzer(video_path).analyze_stutter()
+    per_frame = n / (time.perf_counter() - start)
+    return per_frame, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark batched VideoAnalyzer metrics')
+    parser.add_argument('--video', default=None, help='Video file (default: generate a synthetic 1080p clip)')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--frames', type=int, default=120, help='Frames for the synthetic benchmarks')
+    args = parser.parse_args()
+
+    print("=== 差分計算のみ（fps） ===")
+    for name, (w, h) in {'720p': (1280, 720), '1080p': (1920, 1080)}.items():
+        per_frame, batched = bench_diff_only(w, h, args.frames, args.batch_size)
+        print(f"{name:>6}: per-frame {per_frame:8.1f} | batched {batched:8.1f} | x{batched / per_frame:.2f}")
+
+    video = args.video
+    tmp_dir = None
+    if video is None:
+        tmp_dir = tempfile.mkdtemp()
+        video = os.path.join(tmp_dir, 'bench_1080p.avi')
+        _make_video(video, 1920, 1080, args.frames)
+
+    per_frame, batched = bench_video(video, args.batch_size)
+    print(f"\n=== 動画全体（デコード込み, fps）: {video} ===")
+    print(f"analyze_stutter (per-frame BGR): {per_frame:8.1f}")
+    print(f"analyze_metrics (batched luma) : {batched:8.1f} | x{batched / per_frame:.2f}")
+
+    if tmp_dir is not None:
+        os.remove(video)
+        os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
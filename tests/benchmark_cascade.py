@@ -0,0 +1,97 @@
+# ===============================================
+# 2 段のカスケード判定（processor.CascadeFilter）のベンチマーク
+# 使い方:
+#   python -m tests.benchmark_cascade
+#   python -m tests.benchmark_cascade --size 1920x1080 --motions pan,slow_pan --frames 600 --repeat 3
+#
+# 動きごとに正解付きの合成動画を作り、detect_stutter を全解像度の判定とカスケードで交互に解析して
+#   - 最速の実行時間と frames/s（デコード込み）
+#   - デコード済みの輝度に対する判定だけの時間（カスケードが省く部分の速度差）
+#   - 段ごとの判定数（1 段目で落とした数・2 段目で落とした数・ほぼ同一と判定した数）
+#   - 検出区間が全解像度の判定と一致するか
+# を表示する。
+# ===============================================
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+
+from src.detector.main import detect_stutter
+from src.detector.processor import (
+    CascadeFilter,
+    below_threshold,
+    diff_metric,
+    frame_diffs,
+    read_frames,
+    to_luma,
+)
+from src.detector.synthetic import MOTIONS, write_synthetic_video
+
+
+def _timed(video, cascade, min_consec):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        runs = detect_stutter(video, min_consec=min_consec, cascade=cascade)
+        return runs, time.perf_counter() - start
+
+
+def _judge_only(lumas, repeat):
+    """デコード済みの輝度で判定だけを行い、(全解像度, カスケード) の最速時間を返す"""
+    full = cascade = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in below_threshold(diff_metric(frame_diffs(lumas), 'mean'), 2.0):
+            pass
+        full = min(full, time.perf_counter() - start)
+        start = time.perf_counter()
+        for _ in CascadeFilter().flags(lumas, 2.0):
+            pass
+        cascade = min(cascade, time.perf_counter() - start)
+    return full, cascade
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare cascade detection with full-resolution detection')
+    parser.add_argument('--size', default='1280x720', help='WxH of the synthetic videos')
+    parser.add_argument('--motions', default=','.join(MOTIONS), help=f"Comma-separated motions ({', '.join(MOTIONS)})")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--min-consec', type=int, default=3)
+    parser.add_argument('--block-thresh', type=float, default=None, help='Also run the block-wise check')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode (fastest is reported)')
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{'motion':<13} {'full fps':>9} {'cascade fps':>12} {'speedup':>8} {'judge only':>11} "
+              f"{'coarse rej':>11} {'full rej':>9} {'block rej':>10} {'similar':>8}  match")
+        for motion in args.motions.split(','):
+            truth = write_synthetic_video(os.path.join(workdir, f'{motion}.avi'), args.frames, size, 30, motion)
+            full_time = cascade_time = float('inf')
+            for _ in range(args.repeat):
+                full_runs, elapsed = _timed(truth['path'], None, args.min_consec)
+                full_time = min(full_time, elapsed)
+                cascade = CascadeFilter(block_thresh=args.block_thresh)
+                cascade_runs, elapsed = _timed(truth['path'], cascade, args.min_consec)
+                cascade_time = min(cascade_time, elapsed)
+            cap = cv2.VideoCapture(truth['path'])
+            lumas = list(to_luma(read_frames(cap)))
+            cap.release()
+            judge_full, judge_cascade = _judge_only(lumas, args.repeat)
+            s = cascade.stats()
+            n = truth['n_frames']
+            print(f"{motion:<13} {n / full_time:9.1f} {n / cascade_time:12.1f} {full_time / cascade_time:7.2f}x "
+                  f"{judge_full / judge_cascade:10.2f}x "
+                  f"{s['coarse_rejected']:11d} {s['full_rejected']:9d} {s['block_rejected']:10d} {s['similar']:8d}  "
+                  f"{'yes' if cascade_runs == full_runs else 'NO'}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# ===============================================
+# フレーム指紋（fingerprint.py）の 1 フレームあたりのコストのベンチマーク
+# 使い方:
+#   python -m tests.benchmark_fingerprint
+#   python -m tests.benchmark_fingerprint --size 3840x2160 --frames 200
+#
+# 合成の輝度フレームで、これまでの MD5（benchmark_test.py の重複判定）と
+# CRC32・dHash・FrameIndex.observe（CRC32 + dHash + 索引の検索・更新・古い指紋の削除）の時間を比べる。
+# ===============================================
+import argparse
+import hashlib
+import itertools
+import time
+
+import cv2
+
+from src.detector.fingerprint import FrameIndex, dhash, fast_hash
+from src.detector.synthetic import make_frames
+
+
+def per_frame_us(func, lumas, repeat):
+    """lumas 全体に func を repeat 回適用し、最速の 1 フレームあたりの時間（us）を返す"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for luma in lumas:
+            func(luma)
+        best = min(best, time.perf_counter() - start)
+    return best / len(lumas) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-frame cost of frame fingerprints vs MD5')
+    parser.add_argument('--size', default='1920x1080', help='WxH of the luma frames')
+    parser.add_argument('--frames', type=int, default=120)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    lumas = [cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in make_frames(args.frames, size, 'noise', 0)]
+
+    index = FrameIndex(max_age=60)
+    numbers = itertools.count(1)  # フレーム番号は repeat をまたいで単調増加にする
+    cases = {
+        'md5': lambda luma: hashlib.md5(luma.tobytes()).hexdigest(),
+        'crc32': fast_hash,
+        'dhash': dhash,
+        'FrameIndex.observe': lambda luma: index.observe(next(numbers), luma),
+    }
+    md5 = None
+    print(f"{args.size}, {args.frames} frames")
+    for name, func in cases.items():
+        us = per_frame_us(func, lumas, args.repeat)
+        md5 = md5 or us
+        print(f"{name:<20} {us:9.1f} us/frame ({us / md5 * 100:5.1f}% of MD5)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# ===============================================
+# 計測（--profile）のオーバーヘッドのベンチマーク
+# 使い方:
+#   python -m tests.benchmark_profiling
+#   python -m tests.benchmark_profiling --video path/to/video.mp4 --repeat 5
+#
+# 同じ動画を detect_stutter で profiler なし / あり（Profiler）で交互に解析し、
+# 最速の実行時間どうしを比べてオーバーヘッド（%）と段ごとの集計を表示する。
+# 実行時間の差はマシンの揺らぎに埋もれやすいので、1 サンプルあたりの計測コスト × サンプル数から
+# 求めた見積もり（実行時間に対する割合）も表示する。
+# --video を省略すると 1280x720 の合成動画（MJPG）を一時フォルダに作って使う。
+# ===============================================
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from src.detector.main import detect_stutter
+from src.detector.profiling import NULL_PROFILER, Profiler, print_report
+
+
+def _write_video(path, n_frames, size):
+    w, h = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (w, h))
+    rng = np.random.default_rng(0)
+    base = cv2.resize(rng.integers(0, 256, size=(h // 8, w // 8, 3), dtype=np.uint8), (w, h))
+    for i in range(n_frames):
+        # 3 フレームごとに同じ絵（カクつき）
+        writer.write(np.roll(base, (i // 3) * 8, axis=1))
+    writer.release()
+    return path
+
+
+def sample_cost_ns(n=200000):
+    """Profiler.timed の 1 サンプルあたりのコスト（ns）を空のイテレータで測る"""
+    prof = Profiler()
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        pass
+    base = time.perf_counter_ns() - start
+    start = time.perf_counter_ns()
+    for _ in prof.timed('empty', range(n)):
+        pass
+    return max(0, time.perf_counter_ns() - start - base) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the overhead of stage profiling in detect_stutter')
+    parser.add_argument('--video', default=None, help='Video to analyze (default: synthetic 720p clip)')
+    parser.add_argument('--frames', type=int, default=600, help='Frames in the synthetic clip')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode (fastest is reported)')
+    args = parser.parse_args()
+
+    tmp = None
+    video = args.video
+    if video is None:
+        tmp = tempfile.mkdtemp()
+        video = _write_video(os.path.join(tmp, 'bench.avi'), args.frames, (1280, 720))
+    try:
+        timings = {'off': [], 'on': []}
+        profiler = None
+        for _ in range(args.repeat):
+            for mode in ('off', 'on'):
+                prof = Profiler() if mode == 'on' else NULL_PROFILER
+                start = time.perf_counter()
+                detect_stutter(video, min_consec=3, profiler=prof)
+                timings[mode].append(time.perf_counter() - start)
+                if mode == 'on':
+                    profiler = prof
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    off, on = min(timings['off']), min(timings['on'])
+    report = profiler.report()
+    print_report(report)
+    samples = sum(s['count'] for s in report['stages'].values())
+    cost = sample_cost_ns()
+    estimate = cost * samples / 1e9
+    print(f"\nprofile off: {off:.3f}s, on: {on:.3f}s, measured overhead: {(on - off) / off * 100:+.2f}%")
+    print(f"estimated overhead: {samples} samples x {cost:.0f} ns = {estimate * 1000:.1f} ms "
+          f"({estimate / off * 100:.2f}% of the run)")
+
+
+if __name__ == '__main__':
+    main()
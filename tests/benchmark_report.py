@@ -0,0 +1,97 @@
+# ===============================================
+# 長時間のログのグラフ（report.py の min/max・LTTB の間引き）のベンチマーク
+# 使い方:
+#   python -m tests.benchmark_report
+#   python -m tests.benchmark_report --hours 10 --fps 60 --formats mlog --width 1600
+#
+# 逐次カクつき検知ログ（live.py と同じ列）を hours × fps 行（既定 10 時間・60fps = 216 万行）書き出し、
+# CSV / .mlog それぞれについて
+#   - チャンクごとに読んで間引くまでの時間と、メモリ確保のピーク（tracemalloc、遅くなるので別の実行で測る）
+#   - 間引いた後の点の数（min/max と LTTB）と、残したカクつきの行の数
+#   - グラフの描画・保存の時間（matplotlib がなければ省略）
+# を表示する。全行を読んで全点を描く場合の点の数（= 行数）と比べる。
+# ===============================================
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.detector.live import THRESHOLD_LOG_FIELDS, THRESHOLD_LOG_FORMATS
+from src.detector.metrics_log import MetricsLog
+from src.detector.report import WIDTH, render_report, summarize_log
+
+
+def write_log(path, rows, fps, log_format, seed=0):
+    """約 1 分に 1 回、数フレームのカクつき（stutter_flag=1）を含むログを書き出す"""
+    rng = np.random.default_rng(seed)
+    diffs = rng.integers(1000, 5000, rows)
+    flags = np.zeros(rows, dtype=np.uint8)
+    for start in range(int(fps * 30), rows, int(fps * 60)):
+        flags[start:start + 5] = 1
+    diffs[flags == 1] = 0
+    start_time = time.time()
+    with MetricsLog(path, THRESHOLD_LOG_FIELDS, log_format, flush_rows=65536, flush_interval=0,
+                    formats=THRESHOLD_LOG_FORMATS) as log:
+        for i in range(rows):
+            log.append(start_time + i / fps, i, diffs[i], 800.0, 2.0, flags[i])
+    return int(flags.sum())
+
+
+def measure(path, fps, width, mode):
+    """(結果, 秒, メモリ確保のピーク) を返す（tracemalloc は遅くなるので時間とは別の実行で測る）"""
+    start = time.perf_counter()
+    summary = summarize_log(path, 'threshold', width=width, mode=mode, x_scale=1 / fps)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    summarize_log(path, 'threshold', width=width, mode=mode, x_scale=1 / fps)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return summary, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Streaming min/max decimation of multi-hour logs')
+    parser.add_argument('--hours', type=float, default=10)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--width', type=int, default=WIDTH)
+    parser.add_argument('--formats', default='mlog,csv', help='Comma-separated log formats')
+    args = parser.parse_args()
+    rows = int(args.hours * 3600 * args.fps)
+
+    try:
+        import matplotlib  # noqa: F401
+        can_render = True
+    except ImportError:
+        can_render = False
+
+    workdir = tempfile.mkdtemp()
+    try:
+        print(f"{args.hours} h at {args.fps} fps = {rows} rows, width {args.width}")
+        for log_format in [f for f in args.formats.split(',') if f.strip()]:
+            path = os.path.join(workdir, f"adaptive_threshold_log.{log_format}")
+            flagged = write_log(path, rows, args.fps, log_format)
+            size_mb = os.path.getsize(path) / 1e6
+            for mode in ('minmax', 'lttb'):
+                summary, elapsed, peak = measure(path, args.fps, args.width, mode)
+                points = len(summary['series']['frame_diff'][0])
+                kept = len(summary['flagged']['frame_diff'][0])
+                line = (f"{log_format:<5} {size_mb:7.1f} MB {mode:<6} read+decimate {elapsed:6.2f} s "
+                        f"(peak {peak / 1e6:6.1f} MB)  {summary['rows']} rows -> {points} points/series, "
+                        f"stutter rows kept {kept}/{flagged}")
+                if can_render:
+                    start = time.perf_counter()
+                    render_report(summary, workdir, width=args.width)
+                    line += f"  render {time.perf_counter() - start:5.2f} s"
+                else:
+                    line += "  render skipped (matplotlib not installed)"
+                print(line)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+# ===============================================
+# 関心領域（--roi auto）のベンチマーク
+# 使い方:
+#   python -m tests.benchmark_roi
+#   python -m tests.benchmark_roi --size 1920x1080 --region 480,270,960,540 --motion slow_pan
+#
+# 静止した枠の中で一部の領域だけが動く画面録画を合成し、detect_stutter をフレーム全体と --roi auto で解析して
+#   - 実行時間（較正を含む）と 1 フレームあたりに差分を取った画素数
+#   - 静止区間に対する precision / recall（フレーム全体では静止画素に引きずられて偽のカクつきが出る）
+# を表示する。
+# ===============================================
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from src.detector.main import detect_stutter
+from src.detector.roi import calibrate
+from src.detector.synthetic import MOTIONS, score_runs, write_synthetic_video
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare whole-frame and auto-ROI detection on a screen recording')
+    parser.add_argument('--size', default='1280x720', help='WxH of the synthetic recording')
+    parser.add_argument('--region', default='640,352,320,176', help='x,y,w,h of the moving region')
+    parser.add_argument('--motion', default='pan', choices=MOTIONS)
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--seconds', type=float, default=5.0, help='Calibration length for --roi auto')
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split('x'))
+    region = tuple(int(v) for v in args.region.split(','))
+
+    workdir = tempfile.mkdtemp()
+    try:
+        truth = write_synthetic_video(os.path.join(workdir, 'screen.avi'), args.frames, size, 30, args.motion,
+                                      active_region=region)
+        _, report = calibrate(truth['path'], args.seconds)
+        print(f"ROI: {report['regions']} ({report['pixel_fraction'] * 100:.1f}% of the pixels, "
+              f"{report['calibration_frames']} calibration frames)")
+        for label, roi in (('whole frame', None), ('--roi auto', 'auto')):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                runs = detect_stutter(truth['path'], min_consec=3, roi=roi, roi_seconds=args.seconds)
+                elapsed = time.perf_counter() - start
+            pixels = size[0] * size[1] * (report['pixel_fraction'] if roi else 1.0)
+            s = score_runs(runs, truth['freezes'])
+            print(f"{label:<12} {elapsed:7.2f}s {args.frames / elapsed:8.1f} fps {pixels:10.0f} px/frame  "
+                  f"P {s['precision']:.2f} R {s['recall']:.2f} (frames P {s['frame_precision']:.2f} "
+                  f"R {s['frame_recall']:.2f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# ===============================================
+# ライブキャプチャの取りこぼし比較ベンチマーク（スレッド版 vs 共有メモリのマルチプロセス版）
+# 使い方:
+#   python -m tests.benchmark_shm_capture
+#   python -m tests.benchmark_shm_capture --width 1920 --height 1080 --fps 60 --duration 10
+#
+# カメラの代わりに synthetic.SyntheticCamera（一定間隔で JPEG をデコードして返す）を使い、
+# 同じ検知ワーカー・保存ワーカーを
+#   1) 1 プロセス内のスレッド（live.start_capture_and_detect_worker と同じ構成）
+#   2) shm_capture.start_multiprocess_capture（取得・検知・保存を別プロセス）
+# で動かして、取得フレーム数・各ワーカーの取りこぼし・未読のまま上書きされた数を比べる。
+# ===============================================
+import argparse
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from src.detector.capture import CameraCapture
+from src.detector.live import save_worker, stutter_worker_auto_threshold_cupy
+from src.detector.shm_capture import start_multiprocess_capture
+from src.detector.synthetic import SyntheticCamera
+
+
+def run_threaded(duration, width, height, fps, ring_size, output_root):
+    """スレッド版（1 プロセス）で duration 秒動かして取りこぼしを数える"""
+    cam = CameraCapture(0, width, height, fps, ring_size=ring_size, open_capture=SyntheticCamera)
+    temp_folder = os.path.join(output_root, "temp_frames")
+    output_folder = os.path.join(output_root, "stutter_frames")
+    os.makedirs(temp_folder, exist_ok=True)
+
+    stop_flag = threading.Event()
+    save_reader, detect_reader = cam.reader(), cam.reader()
+    threads = [
+        threading.Thread(target=save_worker, args=(save_reader, temp_folder, stop_flag)),
+        threading.Thread(target=stutter_worker_auto_threshold_cupy,
+                         args=(detect_reader, output_folder, stop_flag, cam.fps_set)),
+    ]
+    start = time.time()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop_flag.set()
+    for t in threads:
+        t.join()
+    save_reader.close()
+    detect_reader.close()
+    cam.release()
+    elapsed = time.time() - start
+    return {
+        'frames': cam.ring.writes,
+        'fps': cam.ring.writes / elapsed,
+        'overwrites': cam.ring.overwrites,
+        'detect': {'frames_read': detect_reader.frames_read, 'dropped': detect_reader.dropped},
+        'save': {'frames_read': save_reader.frames_read, 'dropped': save_reader.dropped},
+    }
+
+
+def run_multiprocess(duration, width, height, fps, ring_size, output_root):
+    """共有メモリのマルチプロセス版で duration 秒動かして取りこぼしを数える"""
+    return start_multiprocess_capture(0, width, height, capture_fps=fps, display_fps=0, target_fps=fps,
+                                      ring_size=ring_size, output_root=output_root, duration=duration,
+                                      open_capture=SyntheticCamera)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare dropped frames: threaded vs shared-memory multi-process capture')
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--fps', type=int, default=60)
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+    parser.add_argument('--ring-size', type=int, default=16)
+    args = parser.parse_args()
+
+    rows = {}
+    for name, run in (('threads', run_threaded), ('processes', run_multiprocess)):
+        output_root = tempfile.mkdtemp()
+        try:
+            rows[name] = run(args.duration, args.width, args.height, args.fps, args.ring_size, output_root)
+        finally:
+            shutil.rmtree(output_root, ignore_errors=True)
+
+    print(f"\n=== {args.width}x{args.height} @ {args.fps}fps, {args.duration:.0f}s, ring {args.ring_size}, "
+          f"CPU {os.cpu_count()} ===")
+    print(f"{'':>10} | {'captured':>8} | {'fps':>6} | {'detect read/drop':>16} | {'save read/drop':>14} | overwrites")
+    for name, r in rows.items():
+        print(f"{name:>10} | {r['frames']:8d} | {r['fps']:6.1f} | "
+              f"{r['detect']['frames_read']:7d}/{r['detect']['dropped']:<8d} | "
+              f"{r['save']['frames_read']:6d}/{r['save']['dropped']:<7d} | {r['overwrites']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+# ===============================================
+# CLI の起動時間のベンチマーク（重い依存の遅延読み込みの効果）
+# 使い方:
+#   python -m tests.benchmark_startup
+#   python -m tests.benchmark_startup --repeat 20 --importtime
+#
+# `python -m src.detector.main --help` などを毎回新しいプロセスで起動し、
+# 中央値を素の Python（python -c pass）と比べて表示する。
+# --importtime を付けると -X importtime の累積時間が大きいモジュールを上位から表示する。
+# ===============================================
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    'python': [sys.executable, '-c', 'pass'],
+    'main --help': [sys.executable, '-m', 'src.detector.main', '--help'],
+    'cli --help': [sys.executable, '-m', 'src.detector.cli', '--help'],
+    'live --help': [sys.executable, '-m', 'src.detector.live', '--help'],
+}
+
+
+def measure(cmd, repeat):
+    """cmd を repeat 回起動し、実行時間（秒）のリストを返す"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def import_times(cmd, top):
+    """-X importtime の出力から累積時間（us）の大きいモジュールを返す"""
+    result = subprocess.run([cmd[0], '-X', 'importtime'] + cmd[1:], capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure CLI startup time')
+    parser.add_argument('--repeat', type=int, default=10, help='Launches per command (median is reported)')
+    parser.add_argument('--importtime', action='store_true', help='Show the slowest imports of main --help')
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = None
+    for name, cmd in COMMANDS.items():
+        median = statistics.median(measure(cmd, args.repeat))
+        if baseline is None:
+            baseline = median
+            print(f"{name:<14} {median * 1000:8.1f} ms")
+        else:
+            print(f"{name:<14} {median * 1000:8.1f} ms (+{(median - baseline) * 1000:.1f} ms over bare python)")
+
+    if args.importtime:
+        print("\n=== slowest imports (main --help, cumulative) ===")
+        for cumulative, name in import_times(COMMANDS['main --help'], args.top):
+            print(f"{cumulative / 1000:8.1f} ms {name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+# ===============================================
+# 合成動画によるポータブルなベンチマークスイート（ヘッドレス・カメラ/GPU 不要）
+# 使い方:
+#   python -m tests.benchmark_suite
+#   python -m tests.benchmark_suite --sizes 1920x1080 --motions pan,static_noise --frames 600 --output bench.json
+#   python -m tests.benchmark_suite --engines detect_stutter,VideoAnalyzer --compare previous.json
+#
+# synthetic.write_synthetic_video で正解付きの動画（解像度・FPS・動き・静止区間・重複フレーム）を作り、
+# 登録したエンジン（ENGINES）ごとに別プロセスで解析して
+#   - 処理速度（frames/s、ms/frame）と段ごとの p50/p95/p99（profiling.py）
+#   - ピーク常駐メモリ（解析したプロセスの ru_maxrss）
+#   - 静止区間に対する precision / recall（区間単位・フレーム単位）
+# を JSON に保存する。--compare で以前の JSON（別のコミット）と frames/s を比べる。
+#
+# 新しいエンジンは ENGINES に「(動画パス, パラメータ, profiler) → 区間 (start, end) のリスト」を登録する。
+# 区間は detect_stutter と同じ 1 始まり・両端含む（正解は長さ min_consec 以上の静止区間）。
+# ===============================================
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing as mp
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from src.detector.analyzer import VideoAnalyzer
+from src.detector.main import detect_stutter
+from src.detector.processor import CascadeFilter, process_video
+from src.detector.profiling import Profiler
+from src.detector.synthetic import MOTIONS, frames_to_runs, score_runs, write_synthetic_video
+
+
+# ===============================================
+# エンジン（解析方法）の登録
+# ===============================================
+def _analyzer_runs(frames, min_consec):
+    # VideoAnalyzer のフレーム番号は 0 始まり（前フレームとの差分）→ detect_stutter の番号に合わせる
+    return [(s, e) for s, e in frames_to_runs(f + 1 for f in frames) if e - s + 1 >= min_consec]
+
+
+ENGINES = {
+    'detect_stutter': lambda path, p, prof: detect_stutter(
+        path, diff_thresh=p['diff_thresh'], min_consec=p['min_consec'], profiler=prof),
+    'detect_stutter_prefilter': lambda path, p, prof: detect_stutter(
+        path, diff_thresh=p['diff_thresh'], min_consec=p['min_consec'], prefilter=True, profiler=prof),
+    'detect_stutter_cascade': lambda path, p, prof: detect_stutter(
+        path, diff_thresh=p['diff_thresh'], min_consec=p['min_consec'], profiler=prof, cascade=CascadeFilter()),
+    'process_video': lambda path, p, prof: process_video(
+        path, diff_thresh=p['diff_thresh'], min_consec=p['min_consec'], profiler=prof)['stutter_frames'],
+    'VideoAnalyzer': lambda path, p, prof: _analyzer_runs(
+        VideoAnalyzer(path, profiler=prof).analyze_stutter(nonzero_thresh=p['nonzero_thresh']), p['min_consec']),
+    'VideoAnalyzer.batch': lambda path, p, prof: _analyzer_runs(
+        VideoAnalyzer(path, profiler=prof).analyze_stutter(batch_size=64, nonzero_thresh=p['nonzero_thresh']),
+        p['min_consec']),
+}
+DEFAULT_ENGINES = ('detect_stutter', 'process_video', 'VideoAnalyzer', 'VideoAnalyzer.batch')
+
+
+def _run_engine(engine, truth, params):
+    """子プロセスで 1 エンジン × 1 動画を解析する（ピークメモリをエンジンごとに分けるため）"""
+    profiler = Profiler()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        runs = ENGINES[engine](truth['path'], params, profiler)
+        wall = time.perf_counter() - start
+    expected = [r for r in truth['freezes'] if r[1] - r[0] + 1 >= params['min_consec']]
+    report = profiler.report()
+    stages = {name: {k: s[k] for k in ('count', 'total_ms', 'p50_us', 'p95_us', 'p99_us')}
+              for name, s in report['stages'].items()}
+    n = truth['n_frames']
+    return {
+        'wall_sec': round(wall, 4),
+        'fps': round(n / wall, 2) if wall > 0 else 0.0,
+        'ms_per_frame': round(wall / n * 1000, 4),
+        'peak_rss_mb': report['peak_rss_mb'],
+        'detected_runs': [list(r) for r in runs],
+        'score': score_runs(runs, expected),
+        'stages': stages,
+    }
+
+
+def _meta():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__,
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def _parse_size(text):
+    w, h = text.lower().split('x')
+    return int(w), int(h)
+
+
+def _case_key(case, engine):
+    return f"{case['size'][0]}x{case['size'][1]}/{case['motion']}/{case['fps']}fps/{case['frames']}f/{engine}"
+
+
+def compare(results, baseline_path):
+    """以前の結果 JSON と frames/s・recall を比べて表示する"""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    before = {r['key']: r for r in baseline['results']}
+    print(f"\n=== vs {baseline_path} (commit {baseline['meta'].get('commit')}) ===")
+    for r in results:
+        old = before.get(r['key'])
+        if old is None:
+            continue
+        change = (r['fps'] - old['fps']) / old['fps'] * 100 if old['fps'] else 0.0
+        print(f"{r['key']:<52} {old['fps']:8.1f} -> {r['fps']:8.1f} fps ({change:+6.1f}%)  "
+              f"recall {old['score']['recall']:.2f} -> {r['score']['recall']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless benchmark suite on synthetic stutter videos')
+    parser.add_argument('--sizes', default='640x360,1280x720', help='Comma-separated WxH list')
+    parser.add_argument('--motions', default='pan,noise', help=f"Comma-separated motions ({', '.join(MOTIONS)})")
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--frames', type=int, default=300, help='Frames per synthetic video')
+    parser.add_argument('--freezes', type=int, default=4, help='Injected freeze runs per video')
+    parser.add_argument('--duplicates', type=int, default=6, help='Injected single duplicate frames per video')
+    parser.add_argument('--codec', default='MJPG', choices=['MJPG', 'mp4v'],
+                        help='Codec of the synthetic videos (mp4v writes .mp4, needed for the prefilter engine)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--engines', default=','.join(DEFAULT_ENGINES),
+                        help=f"Comma-separated engines ({', '.join(ENGINES)})")
+    parser.add_argument('--diff-thresh', type=float, default=2.0)
+    parser.add_argument('--min-consec', type=int, default=3)
+    parser.add_argument('--nonzero-thresh', type=int, default=1000, help='Threshold for the VideoAnalyzer engines')
+    parser.add_argument('--output', default='benchmark_results.json', help='Where to save the JSON results')
+    parser.add_argument('--compare', default=None, help='Previous results JSON to compare against')
+    args = parser.parse_args()
+
+    engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        parser.error(f"Unknown engine(s): {', '.join(unknown)}")
+    params = {'diff_thresh': args.diff_thresh, 'min_consec': args.min_consec, 'nonzero_thresh': args.nonzero_thresh}
+    ext = '.mp4' if args.codec == 'mp4v' else '.avi'
+
+    workdir = tempfile.mkdtemp()
+    results, cases = [], []
+    # spawn: 毎回新しいプロセスで解析し、ピークメモリが前の解析の影響を受けないようにする
+    ctx = mp.get_context('spawn')
+    try:
+        for size_text in args.sizes.split(','):
+            size = _parse_size(size_text)
+            for motion in args.motions.split(','):
+                case = {'size': list(size), 'motion': motion, 'fps': args.fps, 'frames': args.frames}
+                truth = write_synthetic_video(
+                    os.path.join(workdir, f"{size[0]}x{size[1]}_{motion}{ext}"), args.frames, size, args.fps,
+                    motion, args.seed, n_freezes=args.freezes, n_duplicates=args.duplicates, fourcc=args.codec)
+                case['truth'] = {'freezes': truth['freezes'], 'duplicates': truth['duplicates']}
+                cases.append(case)
+                for engine in engines:
+                    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                        result = pool.submit(_run_engine, engine, truth, params).result()
+                    result.update(key=_case_key(case, engine), engine=engine, case=len(cases) - 1)
+                    results.append(result)
+                    s = result['score']
+                    print(f"{result['key']:<52} {result['fps']:8.1f} fps {result['ms_per_frame']:7.2f} ms/frame "
+                          f"{result['peak_rss_mb']:7.1f} MB  P {s['precision']:.2f} R {s['recall']:.2f} "
+                          f"(frames P {s['frame_precision']:.2f} R {s['frame_recall']:.2f})")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': _meta(), 'params': params, 'cases': cases, 'results': results}, f,
+                  ensure_ascii=False, indent=2)
+    print(f"\nResults saved to: {os.path.abspath(args.output)}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,81 +1,112 @@
 # ===============================
 # 実行環境（カーネル）はTSTVIDEO_Prog（Python 3.12.11）
+# 使い方:
+#   python tests/benchmark_test.py --device 0 --thread-fps 30 --main-fps 15 --capture-time 120
+#   python tests/benchmark_test.py --gui   # 設定ダイアログ（tkinter）で値を入力してから開始
+#   python tests/benchmark_test.py --backend numpy --no-plot   # GPU なし・グラフなし
+#
+# CuPy・matplotlib は使うときに初めて読み込む（GPU のないマシンでは NumPy で動く）
 # ===============================
+import argparse
+import csv
 import cv2
 import threading
 import time
-import hashlib
-import pandas as pd
 import os
 import tempfile
 import shutil
-import cupy
 import sys
-import cupy as cp
+import zlib
+from collections import deque
 from datetime import datetime
-from queue import Queue
-import matplotlib.pyplot as plt
-import matplotlib.font_manager as fm
+from queue import Empty, Queue
 import psutil
 import platform
-import psutil
-import GPUtil
-import tkinter as tk
-from tkinter import ttk
 import numpy as np
 
-# === 日本語フォント設定 ===
-plt.rcParams['font.family'] = 'MS Gothic'
-plt.rcParams['axes.unicode_minus'] = False
-
 # ===============================
-# 一時フォルダとCuPy環境の安全設定
+# 一時フォルダとCuPy環境の安全設定（Windows で CuPy を使うときだけ）
 # ===============================
+def setup_cupy_environment():
+    # すべての環境でASCIIパスを使う
+    SAFE_TEMP_DIR = r"C:\cupy_temp"
+    os.makedirs(SAFE_TEMP_DIR, exist_ok=True)
+
+    # Windowsの環境変数を一時的に上書き
+    os.environ["TMP"] = SAFE_TEMP_DIR
+    os.environ["TEMP"] = SAFE_TEMP_DIR
+    tempfile.tempdir = SAFE_TEMP_DIR
+
+    # CuPyのキャッシュ・インクルードディレクトリを安全パスに設定
+    CUPY_CACHE_DIR = os.path.join(SAFE_TEMP_DIR, "cupy_cache")
+    CUPY_INCLUDE_DIR = os.path.join(SAFE_TEMP_DIR, "cupy_include")
+    os.makedirs(CUPY_CACHE_DIR, exist_ok=True)
+    os.makedirs(CUPY_INCLUDE_DIR, exist_ok=True)
+
+    os.environ["CUPY_CACHE_DIR"] = CUPY_CACHE_DIR
+    os.environ["CUPY_INCLUDE_PATH"] = CUPY_INCLUDE_DIR
+
+    print(f"✅ CuPy cache dir set to: {CUPY_CACHE_DIR}")
+    print(f"✅ CuPy include dir set to: {CUPY_INCLUDE_DIR}")
+
+    # CuPy includeをコピー（ビルド済みexe配下 or site-packagesから）
+    # 2 回目以降の起動ではコピー済みのヘッダーをそのまま使う
+    dst = os.path.join(CUPY_INCLUDE_DIR, "cupy")
+    if os.path.exists(dst):
+        return
+    try:
+        if hasattr(sys, "_MEIPASS"):
+            base_dir = sys._MEIPASS
+        else:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+
+        possible_paths = [
+            os.path.join(base_dir, "cupy", "_core", "include", "cupy"),
+            os.path.join(sys.prefix, "Lib", "site-packages", "cupy", "_core", "include", "cupy")
+        ]
+        for p in possible_paths:
+            if os.path.exists(p):
+                shutil.copytree(p, dst)
+                print(f"✅ Copied CuPy headers from: {p}")
+                break
+        else:
+            print("⚠ CuPy header files not found, proceeding without copy")
+    except Exception as e:
+        print(f"⚠ Failed to copy CuPy headers: {e}")
 
-# すべての環境でASCIIパスを使う
-SAFE_TEMP_DIR = r"C:\cupy_temp"
-os.makedirs(SAFE_TEMP_DIR, exist_ok=True)
-
-# Windowsの環境変数を一時的に上書き
-os.environ["TMP"] = SAFE_TEMP_DIR
-os.environ["TEMP"] = SAFE_TEMP_DIR
-tempfile.tempdir = SAFE_TEMP_DIR
-
-# CuPyのキャッシュ・インクルードディレクトリを安全パスに設定
-CUPY_CACHE_DIR = os.path.join(SAFE_TEMP_DIR, "cupy_cache")
-CUPY_INCLUDE_DIR = os.path.join(SAFE_TEMP_DIR, "cupy_include")
-os.makedirs(CUPY_CACHE_DIR, exist_ok=True)
-os.makedirs(CUPY_INCLUDE_DIR, exist_ok=True)
 
-os.environ["CUPY_CACHE_DIR"] = CUPY_CACHE_DIR
-os.environ["CUPY_INCLUDE_PATH"] = CUPY_INCLUDE_DIR
-
-print(f"✅ CuPy cache dir set to: {CUPY_CACHE_DIR}")
-print(f"✅ CuPy include dir set to: {CUPY_INCLUDE_DIR}")
-
-# CuPy includeをコピー（ビルド済みexe配下 or site-packagesから）
-try:
-    if hasattr(sys, "_MEIPASS"):
-        base_dir = sys._MEIPASS
-    else:
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-
-    possible_paths = [
-        os.path.join(base_dir, "cupy", "_core", "include", "cupy"),
-        os.path.join(sys.prefix, "Lib", "site-packages", "cupy", "_core", "include", "cupy")
-    ]
-    for p in possible_paths:
-        if os.path.exists(p):
-            dst = os.path.join(CUPY_INCLUDE_DIR, "cupy")
-            if os.path.exists(dst):
-                shutil.rmtree(dst)
-            shutil.copytree(p, dst)
-            print(f"✅ Copied CuPy headers from: {p}")
-            break
-    else:
-        print("⚠ CuPy header files not found, proceeding without copy")
-except Exception as e:
-    print(f"⚠ Failed to copy CuPy headers: {e}")
+# ===============================
+# 配列バックエンド（src/detector/backend.py と同じ判定。exe 化のため単体で持つ）
+# ===============================
+def resolve_array_module(name="auto"):
+    """'auto' なら CuPy が読み込めて GPU があれば cupy、なければ numpy を返す"""
+    if name in ("auto", "cupy"):
+        if os.name == "nt":
+            setup_cupy_environment()
+        try:
+            import cupy
+            if cupy.cuda.runtime.getDeviceCount() > 0:
+                return cupy
+        except Exception as e:
+            if name == "cupy":
+                raise RuntimeError(f"CuPy backend is not available: {e}") from e
+        if name == "cupy":
+            raise RuntimeError("CuPy backend is not available: no CUDA device found")
+    return np
+
+
+def to_host(xp, a):
+    return xp.asnumpy(a) if xp is not np else a
+
+
+def device_name(xp):
+    if xp is np:
+        return "No GPU (NumPy)"
+    try:
+        name = xp.cuda.runtime.getDeviceProperties(0)["name"]
+        return name.decode() if isinstance(name, bytes) else str(name)
+    except Exception:
+        return "GPU (CuPy)"
 
 # ===============================
 # 出力フォルダの作成（デスクトップを避ける）
@@ -117,9 +148,11 @@ class CameraCapture:
         # --- カメラが実際に設定できたFPS値を取得して保持 ---
         self.fps_set = self.cap.get(cv2.CAP_PROP_FPS)
         
-        # --- 内部変数 ---
+        # --- 内部変数（最新フレームとその通し番号・取得時刻 perf_counter_ns） ---
         self.frame = None
-        self.lock = threading.Lock()
+        self.seq = -1
+        self.captured_ns = 0
+        self.cond = threading.Condition()
         self.running = True
 
         # --- 更新スレッド開始 ---
@@ -142,52 +175,183 @@ class CameraCapture:
 
             ret, frame = self.cap.retrieve()
             if ret:
-                with self.lock:
+                with self.cond:
                     self.frame = frame
+                    self.seq += 1
+                    self.captured_ns = time.perf_counter_ns()
+                    self.cond.notify_all()
             else:
                 time.sleep(0.001)
 
     def read(self):
         """最新フレームをコピーして返す"""
-        with self.lock:
+        with self.cond:
             return self.frame.copy() if self.frame is not None else None
 
+    def read_after(self, seq, timeout=None):
+        """
+        通し番号が seq より新しいフレームが来るまで眠って待ち、最新フレームを (通し番号, コピー, 取得時刻 ns) で返す
+        （同じフレームを 2 回返さない。timeout 秒待っても来なければ None）
+        """
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.seq > seq, timeout):
+                return None
+            return self.seq, self.frame.copy(), self.captured_ns
+
     def release(self):
         """キャプチャ終了"""
         self.running = False
         self.thread.join(timeout=1)
         self.cap.release()
 
+# =========================
+# 締め切りの記録（src/detector/scheduler.py と同じ考え方。exe 化のため単体で持つ）
+# perf_counter_ns の締め切りごとに 1 フレームを受け取り、フレーム間隔・遅れ・飛ばした締め切りを数える
+# =========================
+class DeadlineStats:
+    def __init__(self, fps):
+        self.period_ns = int(round(1e9 / fps))
+        self.late_ns = self.period_ns // 2
+        self.intervals = []     # 受け取ったフレームの取得時刻の間隔（ns）
+        self.lateness = []      # 締め切りからフレームを受け取るまでの遅れ（ns）
+        self.late = 0
+        self.missed = 0
+        self.skipped = 0
+        self.last = None
+
+    def observe(self, seq, captured_ns, lateness_ns):
+        if self.last is not None:
+            last_seq, last_ns = self.last
+            self.skipped += seq - last_seq - 1
+            self.intervals.append(captured_ns - last_ns)
+        self.last = (seq, captured_ns)
+        self.lateness.append(max(0, lateness_ns))
+        if lateness_ns > self.late_ns:
+            self.late += 1
+
+    def next_deadline(self, deadline, now):
+        """次の締め切り（処理が周期を超えた分はまとめて飛ばして missed に数える）"""
+        deadline += self.period_ns
+        if now >= deadline + self.period_ns:
+            missed = (now - deadline) // self.period_ns
+            self.missed += missed
+            deadline += missed * self.period_ns
+        return deadline
+
+    def lines(self):
+        iv = np.array(self.intervals or [0]) / 1e6
+        lt = np.array(self.lateness or [0]) / 1e6
+        periods = np.minimum(np.rint(np.array(self.intervals or [0]) / self.period_ns), 4).astype(int)
+        bins = " ".join(f"{k}{'+' if k == 4 else ''}x:{int(np.sum(periods == k))}" for k in range(5))
+        return [
+            f"⏱ フレーム間隔: p50 {np.percentile(iv, 50):.1f} / p95 {np.percentile(iv, 95):.1f} / "
+            f"p99 {np.percentile(iv, 99):.1f} / max {iv.max():.1f} ms（周期の何倍か: {bins}）",
+            f"⏱ 締め切りの遅れ: p99 {np.percentile(lt, 99):.1f} ms / max {lt.max():.1f} ms、"
+            f"遅れ {self.late} 回、飛ばした締め切り {self.missed} 回、読まずに飛ばしたフレーム {self.skipped}",
+        ]
+
+
+# =========================
+# 直近フレームの指紋の索引（src/detector/fingerprint.py と同じ考え方。exe 化のため単体で持つ）
+# CRC32（完全一致）と dHash（再エンコードされた再送）で、2 フレーム以上前と同じフレームも見つける
+# =========================
+class RecentFrameIndex:
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self.exact = {}
+        self.similar = {}
+        self.order = deque()
+        self.last = None
+
+    def observe(self, frame_id, gray):
+        """(CRC32, 一致したフレーム番号 or None, 完全一致か) を返す"""
+        while self.order and frame_id - self.order[0][0] > self.max_age:
+            old, crc, dh = self.order.popleft()
+            if self.exact.get(crc) == old:
+                del self.exact[crc]
+            if self.similar.get(dh) == old:
+                del self.similar[dh]
+        crc = zlib.crc32(np.ascontiguousarray(gray))
+        small = cv2.resize(gray[::8, ::8], (9, 8), interpolation=cv2.INTER_AREA)
+        dh = int.from_bytes(np.packbits(small[:, 1:] > small[:, :-1]).tobytes(), "big")
+        match, exact = self.exact.get(crc), True
+        if match is None:
+            match, exact = self.similar.get(dh), False
+        self.exact[crc] = frame_id
+        self.similar[dh] = frame_id
+        self.order.append((frame_id, crc, dh))
+        return crc, match, exact
+
+
 # =========================
 # GPU処理スレッド
 # =========================
 class GPUProcessingThread(threading.Thread):
-    def __init__(self, queue, save_folder, hash_threshold=5, debug_diff=False):
+    def __init__(self, queue, save_folder, hash_threshold=5, debug_diff=False, xp=np):
         super().__init__(daemon=True)
+        self.xp = xp  # numpy または cupy（resolve_array_module）
         self.queue = queue
         self.save_folder = save_folder
         self.hash_threshold = hash_threshold
         self.debug_diff = debug_diff
         self.records = []
         self.prev_gray_gpu = None
-        self.prev_hash = None
+        self.index = RecentFrameIndex()
         self.prev_cpu_gray = None
         self.running = True
+        # フレームごとに配列を確保しないように、転送先・中間・出力のバッファを使い回す（_allocate）
+        self._frame_gpu = None
+        self._turn = 0
+
+    def _allocate(self, shape):
+        xp = self.xp
+        h, w = shape[:2]
+        self._frame_gpu = xp.empty(shape, dtype=xp.uint8)
+        self._acc = xp.empty((h, w), dtype=xp.uint16)
+        self._term = xp.empty((h, w), dtype=xp.uint16)
+        self._diff = xp.empty((h, w), dtype=xp.int16)
+        # 今回と前回の輝度（ping-pong）
+        self._grays_gpu = [xp.empty((h, w), dtype=xp.uint8) for _ in range(2)]
+        self._grays_cpu = [np.empty((h, w), dtype=np.uint8) for _ in range(2)]
+
+    def _gray_gpu(self, frame):
+        """GPU に転送して整数の重み付き和でグレースケール化する（結果は 2 フレーム後に上書きされる）"""
+        xp = self.xp
+        if xp is np:
+            np.copyto(self._frame_gpu, frame)
+        else:
+            self._frame_gpu.set(frame)
+        f, acc, term = self._frame_gpu, self._acc, self._term
+        # 255 * (29 + 150 + 77) = 65280 なので uint16 の中で桁あふれしない
+        xp.multiply(f[..., 2], 29, out=acc, dtype=xp.uint16)    # B
+        xp.multiply(f[..., 1], 150, out=term, dtype=xp.uint16)  # G
+        xp.add(acc, term, out=acc)
+        xp.multiply(f[..., 0], 77, out=term, dtype=xp.uint16)   # R
+        xp.add(acc, term, out=acc)
+        xp.right_shift(acc, 8, out=acc)
+        gray = self._grays_gpu[self._turn]
+        xp.copyto(gray, acc, casting="unsafe")
+        return gray
 
     def run(self):
+        xp = self.xp
         frame_id = 0
         while self.running or not self.queue.empty():
-            if self.queue.empty():
-                time.sleep(0.001)
+            # 空なら眠って待つ（空読みで CPU を回さない）
+            try:
+                frame, timestamp = self.queue.get(timeout=0.1)
+            except Empty:
                 continue
 
             # --- 最新フレームのみ保持 ---
-            frame, timestamp = self.queue.get()
             while not self.queue.empty():
                 frame, timestamp = self.queue.get_nowait()
 
+            if self._frame_gpu is None or self._frame_gpu.shape != frame.shape:
+                self._allocate(frame.shape)
+
             # --- CPU側でグレースケール化（比較確認用） ---
-            frame_gray_cpu = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            frame_gray_cpu = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._grays_cpu[self._turn])
             # frame_gray_cpu = cv2.medianBlur(frame_gray_cpu, 3)  # ←必要ならノイズ除去ON
 
             # --- 2連続フレーム差分デバッグ (デバックを使用したいときに使用 → debug_diff=True)---
@@ -200,32 +364,30 @@ class GPUProcessingThread(threading.Thread):
                     cv2.imwrite(os.path.join(self.save_folder, f"dbg_prev_{frame_id-1:04d}.png"), self.prev_cpu_gray)
                     cv2.imwrite(os.path.join(self.save_folder, f"dbg_now_{frame_id:04d}.png"), frame_gray_cpu)
                     np.save(os.path.join(self.save_folder, f"dbg_diff_{frame_id:04d}.npy"), diff_cpu)
-            self.prev_cpu_gray = frame_gray_cpu.copy()
+            # （バッファは交互に使うので、前回の輝度はコピーせずに参照だけ残す）
+            self.prev_cpu_gray = frame_gray_cpu
 
             # --- GPUに転送してグレースケール化※GPUでグレースケール化（整数演算で完全一致保証） ---
-            frame_gpu = cp.asarray(frame, dtype=cp.uint8)
-            gray_gpu = (
-                (frame_gpu[..., 2].astype(cp.uint16) * 29 +   # B
-                frame_gpu[..., 1].astype(cp.uint16) * 150 +  # G
-                frame_gpu[..., 0].astype(cp.uint16) * 77) >> 8
-            ).astype(cp.uint8)
+            gray_gpu = self._gray_gpu(frame)
 
             # --- GPUで差分計算 ---
             if self.prev_gray_gpu is not None:
-                diff_gpu = cp.abs(gray_gpu.astype(cp.int16) - self.prev_gray_gpu.astype(cp.int16))
-                diff_max = int(cp.max(diff_gpu).get())
+                xp.subtract(gray_gpu, self.prev_gray_gpu, out=self._diff, dtype=xp.int16)
+                xp.abs(self._diff, out=self._diff)
+                diff_max = int(self._diff.max())
                 diff_flag = "〇" if diff_max > self.hash_threshold else "×"
             else:
                 diff_max = 0  # ← 初期化
                 diff_flag = "〇"
 
-            # --- ハッシュ計算（CPU側でMD5） ---
-            frame_gray_cpu = cp.asnumpy(gray_gpu)
-            frame_hash = hashlib.md5(frame_gray_cpu.tobytes()).hexdigest()
-            if self.prev_hash is not None:
-                same_hash_flag = "〇" if frame_hash == self.prev_hash else "×"
-            else:
-                same_hash_flag = "×"
+            # --- 指紋（CPU側で CRC32 + dHash。MD5 より速く、2 フレーム以上前の重複も引ける） ---
+            frame_gray_cpu = to_host(xp, gray_gpu)
+            crc, match, exact = self.index.observe(frame_id, frame_gray_cpu)
+            frame_hash = f"{crc:08x}"
+            same_hash_flag = "〇" if match is not None and match == frame_id - 1 and exact else "×"
+            # 直前より前のフレームと同じ（A-B-A-B の往復・古いバッファの再送）
+            repeat_of = match if match is not None and match != frame_id - 1 else ""
+            repeat_kind = ("exact" if exact else "similar") if repeat_of != "" else ""
 
             # --- 画像保存 ---
             img_file = f"frame_{frame_id:04d}.jpg"
@@ -246,6 +408,9 @@ class GPUProcessingThread(threading.Thread):
                 "Diff": diff_max,
                 "SameHashFlag": same_hash_flag,
                 "frame_hash": frame_hash,
+                "RepeatOf": repeat_of,
+                "RepeatDistance": frame_id - repeat_of if repeat_of != "" else "",
+                "RepeatKind": repeat_kind,
                 "Timestamp_ms": timestamp*1000,
                 "CPU_percent": cpu_percent,
                 "Memory_percent": mem_percent,
@@ -253,72 +418,94 @@ class GPUProcessingThread(threading.Thread):
             })
 
             # --- 現在値プリント ---
-            print(f"[{frame_id:04d}] {interval*1000:6.2f} ms | FPS:{fps:5.2f} | Diff:{diff_flag} | HashSame:{same_hash_flag}")
+            repeat_text = f" | Repeat:{repeat_of}({repeat_kind})" if repeat_of != "" else ""
+            print(f"[{frame_id:04d}] {interval*1000:6.2f} ms | FPS:{fps:5.2f} | Diff:{diff_flag} | HashSame:{same_hash_flag}{repeat_text}")
 
             # --- 次回用 ---
             self.prev_gray_gpu = gray_gpu
-            self.prev_hash = frame_hash
+            self._turn ^= 1
             frame_id += 1
 
 # =========================
-# メイン設定（初期値）
+# メイン設定（初期値はコマンドライン引数で上書き）
 # =========================
-device_number = 0      # カメラデバイス番号
-thread_fps = 30        # カメラスレッド設定FPS
-target_fps = 15        # メインループ設定FPS
-capture_time = 120     # 撮影時間（秒）
+parser = argparse.ArgumentParser(description="Camera capture FPS benchmark (headless by default)")
+parser.add_argument("--device", type=int, default=0, help="カメラデバイス番号")
+parser.add_argument("--thread-fps", type=int, default=30, help="カメラスレッド設定FPS")
+parser.add_argument("--main-fps", type=int, default=15, help="メインループ設定FPS")
+parser.add_argument("--capture-time", type=int, default=120, help="撮影時間（秒）")
+parser.add_argument("--gui", action="store_true", help="開始前に tkinter の設定ダイアログを表示する")
+parser.add_argument("--backend", choices=["auto", "numpy", "cupy"], default="auto",
+                    help="差分計算の配列バックエンド（auto: GPU があれば CuPy）")
+parser.add_argument("--no-plot", action="store_true", help="終了後のグラフ作成（matplotlib）を省略する")
+args = parser.parse_args()
+
+device_number = args.device        # カメラデバイス番号
+thread_fps = args.thread_fps       # カメラスレッド設定FPS
+target_fps = args.main_fps         # メインループ設定FPS
+capture_time = args.capture_time   # 撮影時間（秒）
 frame_interval = 1.0 / target_fps
 limit_frames = capture_time * target_fps  # 撮影時間 × FPS
 
 # =========================
-# GUI
+# GUI（--gui のときだけ tkinter を読み込む）
 # =========================
-def apply_settings():
-    global device_number, thread_fps, target_fps, frame_interval, limit_frames, capture_time
-    device_number = int(device_entry.get())
-    thread_fps = int(thread_fps_slider.get())
-    target_fps = int(main_fps_slider.get())
-    capture_time = int(capture_time_slider.get())  # 撮影時間を取得
-    frame_interval = 1.0 / target_fps
-    limit_frames = capture_time * target_fps
-    print(f"✅ 設定反映: target_fps={target_fps}, 撮影時間={capture_time}秒, limit_frames={limit_frames}")
-    root.destroy()  # GUIを閉じる
-
-root = tk.Tk()
-root.title("カメラ設定")
-
-# デバイス番号
-tk.Label(root, text="デバイス番号").grid(row=0, column=0)
-device_entry = tk.Entry(root)
-device_entry.insert(0, str(device_number))
-device_entry.grid(row=0, column=1)
-
-# カメラスレッドFPS
-tk.Label(root, text="カメラスレッドFPS").grid(row=1, column=0)
-thread_fps_slider = tk.Scale(root, from_=1, to=60, orient=tk.HORIZONTAL)
-thread_fps_slider.set(thread_fps)
-thread_fps_slider.grid(row=1, column=1)
-
-# メインループFPS
-tk.Label(root, text="メインループFPS").grid(row=2, column=0)
-main_fps_slider = tk.Scale(root, from_=1, to=60, orient=tk.HORIZONTAL)
-main_fps_slider.set(target_fps)
-main_fps_slider.grid(row=2, column=1)
-
-# --- 撮影時間（秒） ---
-tk.Label(root, text="撮影時間（秒）").grid(row=3, column=0)
-capture_time_slider = tk.Scale(root, from_=10, to=600, orient=tk.HORIZONTAL)  # 10秒〜10分
-capture_time_slider.set(capture_time)
-capture_time_slider.grid(row=3, column=1)
-
-tk.Button(root, text="適用", command=apply_settings).grid(row=4, column=0, columnspan=2, pady=10)
-
-# GUIを表示して設定を待つ
-root.mainloop()
+def show_settings_dialog():
+    import tkinter as tk
+
+    def apply_settings():
+        global device_number, thread_fps, target_fps, frame_interval, limit_frames, capture_time
+        device_number = int(device_entry.get())
+        thread_fps = int(thread_fps_slider.get())
+        target_fps = int(main_fps_slider.get())
+        capture_time = int(capture_time_slider.get())  # 撮影時間を取得
+        frame_interval = 1.0 / target_fps
+        limit_frames = capture_time * target_fps
+        print(f"✅ 設定反映: target_fps={target_fps}, 撮影時間={capture_time}秒, limit_frames={limit_frames}")
+        root.destroy()  # GUIを閉じる
+
+    root = tk.Tk()
+    root.title("カメラ設定")
+
+    # デバイス番号
+    tk.Label(root, text="デバイス番号").grid(row=0, column=0)
+    device_entry = tk.Entry(root)
+    device_entry.insert(0, str(device_number))
+    device_entry.grid(row=0, column=1)
+
+    # カメラスレッドFPS
+    tk.Label(root, text="カメラスレッドFPS").grid(row=1, column=0)
+    thread_fps_slider = tk.Scale(root, from_=1, to=60, orient=tk.HORIZONTAL)
+    thread_fps_slider.set(thread_fps)
+    thread_fps_slider.grid(row=1, column=1)
+
+    # メインループFPS
+    tk.Label(root, text="メインループFPS").grid(row=2, column=0)
+    main_fps_slider = tk.Scale(root, from_=1, to=60, orient=tk.HORIZONTAL)
+    main_fps_slider.set(target_fps)
+    main_fps_slider.grid(row=2, column=1)
+
+    # --- 撮影時間（秒） ---
+    tk.Label(root, text="撮影時間（秒）").grid(row=3, column=0)
+    capture_time_slider = tk.Scale(root, from_=10, to=600, orient=tk.HORIZONTAL)  # 10秒〜10分
+    capture_time_slider.set(capture_time)
+    capture_time_slider.grid(row=3, column=1)
+
+    tk.Button(root, text="適用", command=apply_settings).grid(row=4, column=0, columnspan=2, pady=10)
+
+    # GUIを表示して設定を待つ
+    root.mainloop()
+
+
+if args.gui:
+    show_settings_dialog()
+
+xp = resolve_array_module(args.backend)
+print(f"🧮 配列バックエンド: {xp.__name__}")
 
 cam = CameraCapture(device_number, fps=thread_fps)
 queue = Queue(maxsize=10)
-processor = GPUProcessingThread(queue, save_folder)
+processor = GPUProcessingThread(queue, save_folder, xp=xp)
 processor.start()
 
 print(f"🎥 カメラスレッド設定FPS: {thread_fps}")
@@ -327,30 +514,34 @@ print(f"🎥 メインループ設定FPS: {target_fps}")
 
 # =========================
 # メインループ
+# perf_counter_ns（時刻合わせで跳ばない）の締め切りごとに、前回より新しいフレームを通し番号で受け取る。
+# まだ来ていなければ眠って待つので、同じフレームを 2 回処理することも空読みで CPU を回すこともない。
 # =========================
 frame_id = 0
-next_time = time.time()
-# start_time = time.time()
+last_seq = -1
+deadlines = DeadlineStats(target_fps)
+deadline = time.perf_counter_ns()
 
 try:
     while frame_id < limit_frames:
-        now = time.time()
-        if now < next_time:
-            time.sleep(next_time - now)
+        remaining = deadline - time.perf_counter_ns()
+        if remaining > 0:
+            time.sleep(remaining / 1e9)
 
-        frame = cam.read()
-        if frame is None:
-            time.sleep(0.001)
+        item = cam.read_after(last_seq, timeout=1.0)
+        if item is None:
             continue
+        last_seq, frame, captured_ns = item
+        deadlines.observe(last_seq, captured_ns, time.perf_counter_ns() - deadline)
 
-        timestamp = time.time()
+        # 時刻はカメラスレッドの取得時刻（perf_counter 秒）
         try:
-            queue.put_nowait((frame, timestamp))
+            queue.put_nowait((frame, captured_ns / 1e9))
         except:
             pass
 
         frame_id += 1
-        next_time += frame_interval
+        deadline = deadlines.next_deadline(deadline, time.perf_counter_ns())
 
 except KeyboardInterrupt:
     print("⏹ 中断")
@@ -361,8 +552,11 @@ finally:
     processor.join()
 
     # CSV保存
-    df = pd.DataFrame(processor.records)
-    df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+    with open(csv_path, "w", newline="", encoding="utf-8-sig") as f:
+        if processor.records:
+            writer = csv.DictWriter(f, fieldnames=list(processor.records[0].keys()))
+            writer.writeheader()
+            writer.writerows(processor.records)
 
     # 平均FPS
     if len(processor.records) > 1:
@@ -377,9 +571,8 @@ finally:
     memory = psutil.virtual_memory()
     mem_total_gb = memory.total / (1024 ** 3)  # GB単位
 
-    # GPU情報（複数ある場合は1台目を使用）
-    gpus = GPUtil.getGPUs()
-    gpu_info = gpus[0].name if gpus else "No GPU"
+    # GPU情報（1台目を使用）
+    gpu_info = device_name(xp)
 
     # テキスト保存
     txt_path = os.path.join(save_folder, "fps_summary.txt")
@@ -388,6 +581,8 @@ finally:
         f.write(f"🎥 カメラスレッド設定FPS（取得値）: {cam.fps_set:.2f}\n")
         f.write(f"⏱ メインループFPS: {target_fps:.2f}\n")
         f.write(f"📈 実測平均FPS: {avg_fps:.2f}\n")
+        for line in deadlines.lines():
+            f.write(line + "\n")
         f.write("\n--- システム情報 ---\n")
         f.write(f"OS: {os_info}\n")
         f.write(f"CPU: {cpu_info}\n")
@@ -395,77 +590,118 @@ finally:
         f.write(f"GPU: {gpu_info}\n")
 
     print(f"📈 実測平均FPS: {avg_fps:.2f}")
+    for line in deadlines.lines():
+        print(line)
     print(f"📁 保存フォルダ: {save_folder}")
     print(f"✅ CSV保存完了 : {csv_path}")
     print(f"✅ FPSサマリー保存完了: {txt_path}")
 
-# === CSV読み込み ===
-df = pd.read_csv(csv_path)
-df["Time_sec"] = (df["Timestamp_ms"] - df["Timestamp_ms"].iloc[0]) / 1000
-df["DiffFlag_num"] = df["DiffFlag"].map({"〇": 1, "×": 0})
-
-# === グラフ描画 ===
-fig, ax1 = plt.subplots(figsize=(12, 6))
-
-# --- FPSの折れ線グラフ（左軸）---
-ax1.plot(df["Time_sec"], df["FPS"], color="tab:blue", label="FPS", linewidth=1.5)
-ax1.set_xlabel("Time (s)")
-ax1.set_ylabel("FPS", color="tab:blue")
-ax1.tick_params(axis="y", labelcolor="tab:blue")
-ax1.grid(True, alpha=0.3)
-ax1.set_ylim(0, 120)  # 縦軸固定
-
-# --- DiffFlagを右軸で点表示 ---
-ax2 = ax1.twinx()
-ax2.scatter(df["Time_sec"], df["DiffFlag_num"], color="tab:red", label="DiffFlag", s=20, alpha=0.7)
-ax2.set_ylabel("DiffFlag (1=〇, 0=×)", color="tab:red")
-ax2.tick_params(axis="y", labelcolor="tab:red")
-ax2.set_ylim(0, 1.5)  # 縦軸固定
-
-# --- 凡例とタイトル ---
-lines, labels = ax1.get_legend_handles_labels()
-lines2, labels2 = ax2.get_legend_handles_labels()
-ax1.legend(lines + lines2, labels + labels2, loc="upper right")
-
-plt.title("Frame Rate and Difference Detection Over Time")
-plt.tight_layout()
-
-# --- JPEG保存 ---
-graph_path = os.path.join(save_folder, "00_frame_rate_diff.jpg")
-plt.savefig(graph_path, format="jpeg", dpi=200)
-plt.show()
-
-print(f"📁 グラフ保存先: {graph_path}")
-
-# --- CPU/メモリ用のグラフ（縦軸固定0-100%） ---
-fig2, ax1 = plt.subplots(figsize=(12, 6))
-
-# CPU使用率（左軸）
-ax1.plot(df["Time_sec"], df["CPU_percent"], color="tab:green", label="CPU (%)", linewidth=1.5)
-ax1.set_xlabel("Time (s)")
-ax1.set_ylabel("CPU (%)", color="tab:green")
-ax1.tick_params(axis="y", labelcolor="tab:green")
-ax1.set_ylim(0, 100)  # 縦軸固定
-ax1.grid(True, alpha=0.3)
-
-# メモリ使用率（右軸）
-ax2 = ax1.twinx()
-ax2.plot(df["Time_sec"], df["Memory_percent"], color="tab:orange", label="Memory (%)", linewidth=1.5)
-ax2.set_ylabel("Memory (%)", color="tab:orange")
-ax2.tick_params(axis="y", labelcolor="tab:orange")
-ax2.set_ylim(0, 100)  # 縦軸固定
-
-# 凡例統合
-lines, labels = ax1.get_legend_handles_labels()
-lines2, labels2 = ax2.get_legend_handles_labels()
-ax1.legend(lines + lines2, labels + labels2, loc="upper right")
-
-plt.title("CPU and Memory Usage Over Time (0-100%)")
-plt.tight_layout()
-
-# JPEG保存
-cpu_mem_graph_path = os.path.join(save_folder, "00_cpu_memory_usage_fixed.jpg")
-plt.savefig(cpu_mem_graph_path, format="jpeg", dpi=200)
-plt.show()
-
-print(f"📁 CPU/メモリグラフ保存先: {cpu_mem_graph_path}")
\ No newline at end of file
+
+# =========================
+# グラフ作成（matplotlib はここで初めて読み込む）
+# 長時間の計測でも数秒で描けるように、各系列は画素の列ごとの最小・最大の 2 点に間引く
+# （src/detector/report.py と同じ考え方。exe 化のため単体で持つ。DiffFlag が × の行は間引かずにすべて描く）
+# =========================
+PLOT_WIDTH = 1600
+
+
+def read_columns(csv_path, columns):
+    """CSV の指定した列を NumPy 配列で読む（pandas を使わない）"""
+    values = {c: [] for c in columns}
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            for c in columns:
+                values[c].append(row[c])
+    return values
+
+
+def minmax_points(t, y, width=PLOT_WIDTH):
+    """画素の列ごとに最小・最大の点だけを残す（t は単調増加）"""
+    if len(t) <= 2 * width:
+        return t, y
+    cols = np.minimum(((t - t[0]) / ((t[-1] - t[0]) or 1) * width).astype(np.int64), width - 1)
+    starts = np.flatnonzero(np.r_[True, cols[1:] != cols[:-1]])
+    keep = []
+    for a, b in zip(starts, np.r_[starts[1:], len(t)]):
+        keep.extend(sorted({a + int(np.argmin(y[a:b])), a + int(np.argmax(y[a:b]))}))
+    return t[keep], y[keep]
+
+
+def plot_results(csv_path, save_folder):
+    import matplotlib.pyplot as plt
+
+    # === 日本語フォント設定 ===
+    plt.rcParams['font.family'] = 'MS Gothic'
+    plt.rcParams['axes.unicode_minus'] = False
+
+    # === CSV読み込み ===
+    cols = read_columns(csv_path, ["Timestamp_ms", "FPS", "DiffFlag", "CPU_percent", "Memory_percent"])
+    timestamps = np.array(cols["Timestamp_ms"], dtype=np.float64)
+    time_sec = (timestamps - timestamps[0]) / 1000
+    fps = np.array(cols["FPS"], dtype=np.float64)
+    no_diff = np.array([flag == "×" for flag in cols["DiffFlag"]])
+
+    # === グラフ描画 ===
+    fig, ax1 = plt.subplots(figsize=(12, 6))
+
+    # --- FPSの折れ線グラフ（間引き）---
+    ax1.plot(*minmax_points(time_sec, fps), color="tab:blue", label="FPS", linewidth=1.5)
+    ax1.set_xlabel("Time (s)")
+    ax1.set_ylabel("FPS", color="tab:blue")
+    ax1.tick_params(axis="y", labelcolor="tab:blue")
+    ax1.grid(True, alpha=0.3)
+    ax1.set_ylim(0, 120)  # 縦軸固定
+
+    # --- 差分なし（DiffFlag ×）のフレームはすべて点で表示 ---
+    ax1.scatter(time_sec[no_diff], fps[no_diff], color="tab:red", label=f"DiffFlag × ({int(no_diff.sum())})",
+                s=20, alpha=0.7, zorder=3)
+    ax1.legend(loc="upper right")
+
+    plt.title("Frame Rate and Difference Detection Over Time")
+    plt.tight_layout()
+
+    # --- JPEG保存 ---
+    graph_path = os.path.join(save_folder, "00_frame_rate_diff.jpg")
+    plt.savefig(graph_path, format="jpeg", dpi=200)
+    plt.show()
+
+    print(f"📁 グラフ保存先: {graph_path}")
+
+    # --- CPU/メモリ用のグラフ（縦軸固定0-100%） ---
+    fig2, ax1 = plt.subplots(figsize=(12, 6))
+
+    # CPU使用率（左軸）
+    ax1.plot(*minmax_points(time_sec, np.array(cols["CPU_percent"], dtype=np.float64)),
+             color="tab:green", label="CPU (%)", linewidth=1.5)
+    ax1.set_xlabel("Time (s)")
+    ax1.set_ylabel("CPU (%)", color="tab:green")
+    ax1.tick_params(axis="y", labelcolor="tab:green")
+    ax1.set_ylim(0, 100)  # 縦軸固定
+    ax1.grid(True, alpha=0.3)
+
+    # メモリ使用率（右軸）
+    ax2 = ax1.twinx()
+    ax2.plot(*minmax_points(time_sec, np.array(cols["Memory_percent"], dtype=np.float64)),
+             color="tab:orange", label="Memory (%)", linewidth=1.5)
+    ax2.set_ylabel("Memory (%)", color="tab:orange")
+    ax2.tick_params(axis="y", labelcolor="tab:orange")
+    ax2.set_ylim(0, 100)  # 縦軸固定
+
+    # 凡例統合
+    lines, labels = ax1.get_legend_handles_labels()
+    lines2, labels2 = ax2.get_legend_handles_labels()
+    ax1.legend(lines + lines2, labels + labels2, loc="upper right")
+
+    plt.title("CPU and Memory Usage Over Time (0-100%)")
+    plt.tight_layout()
+
+    # JPEG保存
+    cpu_mem_graph_path = os.path.join(save_folder, "00_cpu_memory_usage_fixed.jpg")
+    plt.savefig(cpu_mem_graph_path, format="jpeg", dpi=200)
+    plt.show()
+
+    print(f"📁 CPU/メモリグラフ保存先: {cpu_mem_graph_path}")
+
+
+if not args.no_plot and processor.records:
+    plot_results(csv_path, save_folder)
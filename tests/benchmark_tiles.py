@@ -0,0 +1,64 @@
+# ===============================================
+# 横帯に分けた並列の差分（tiles.StripeDiff）のベンチマーク（4K 入力向け）
+# 使い方:
+#   python -m tests.benchmark_tiles
+#   python -m tests.benchmark_tiles --size 1920x1080 --frames 60 --threads 1,2,4,8
+#
+# 合成の輝度フレーム（既定 3840x2160）の差分を、従来の frame_diffs + diff_metric('mean')（1 スレッド）と
+# スレッド数ごとの StripeDiff で計算し、
+#   - 1 組あたりの時間（最速の繰り返し）と、1 スレッド・従来の段に対する速さ
+#   - 平均差分が従来の段と一致するか
+# を表示する。StripeDiff は差分に加えて非ゼロ画素数・最大値・タイルごとの平均差分も計算している。
+# スレッドで速くなるのは CPU が 2 コア以上ある場合（os.cpu_count() も表示する）。
+# ===============================================
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.detector.processor import diff_metric, frame_diffs
+from src.detector.tiles import StripeDiff
+
+
+def _best(run, lumas, repeat):
+    """repeat 回のうち最速の (1 組あたりの秒, 値) を返す"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        values = list(run(iter(lumas)))
+        wall = (time.perf_counter() - start) / max(1, len(lumas) - 1)
+        if best is None or wall < best[0]:
+            best = (wall, values)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling of the stripe-parallel frame diff')
+    parser.add_argument('--size', default='3840x2160', help='WxH of the synthetic luma frames')
+    parser.add_argument('--frames', type=int, default=30)
+    parser.add_argument('--threads', default=None, help='Comma-separated thread counts (default: 1,2,4,cpu_count)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    w, h = (int(v) for v in args.size.lower().split('x'))
+    cpus = os.cpu_count() or 1
+    threads = ([int(t) for t in args.threads.split(',') if t.strip()] if args.threads
+               else sorted({1, 2, 4, cpus}))
+
+    rng = np.random.default_rng(0)
+    lumas = [(i, rng.integers(0, 256, (h, w), dtype=np.uint8)) for i in range(1, args.frames + 1)]
+    print(f"{args.size}, {args.frames} frames, cpu_count={cpus}")
+
+    base_wall, base = _best(lambda items: diff_metric(frame_diffs(items, reuse=True), 'mean'), lumas, args.repeat)
+    print(f"{'frame_diffs':<12} {base_wall * 1000:7.2f} ms/pair")
+    single = None
+    for n in threads:
+        with StripeDiff(n) as tiles:
+            wall, values = _best(lambda items: tiles.values(items, diff_thresh=2.0), lumas, args.repeat)
+        single = single or wall
+        print(f"{'threads=' + str(n):<12} {wall * 1000:7.2f} ms/pair ({single / wall:4.2f}x vs 1 thread, "
+              f"{base_wall / wall:4.2f}x vs frame_diffs)  same={values == base}")
+
+
+if __name__ == '__main__':
+    main()